@@ -1,13 +1,21 @@
 import { Injectable } from '@nestjs/common';
 import { promisify } from 'util';
+import * as grpc from '@grpc/grpc-js';
 import GrpcClient from '../grpc/client';
 import { GetUserRequest } from '../grpc/generated/example/GetUserRequest';
 import { CreateUserRequest } from '../grpc/generated/example/CreateUserRequest';
 import { ListUsersRequest } from '../grpc/generated/example/ListUsersRequest';
+import { BatchGetUsersRequest } from '../grpc/generated/example/BatchGetUsersRequest';
+import { SearchUsersRequest } from '../grpc/generated/example/SearchUsersRequest';
 import { User__Output } from '../grpc/generated/example/User';
 import { GetUserResponse__Output } from '../grpc/generated/example/GetUserResponse';
 import { CreateUserResponse__Output } from '../grpc/generated/example/CreateUserResponse';
 import { ListUsersResponse__Output } from '../grpc/generated/example/ListUsersResponse';
+import { BatchGetUsersResponse__Output } from '../grpc/generated/example/BatchGetUsersResponse';
+import { SearchUsersResponse__Output } from '../grpc/generated/example/SearchUsersResponse';
+import { WatchUsersRequest } from '../grpc/generated/example/WatchUsersRequest';
+import { WatchUsersResponse__Output } from '../grpc/generated/example/WatchUsersResponse';
+import { UserChange__Output } from '../grpc/generated/example/UserChange';
 
 /**
  * User Service - Provides high-level methods to interact with the gRPC backend
@@ -35,6 +43,31 @@ export class UserService {
     return response.user;
   }
 
+  /**
+   * Get several users by ID in a single round trip
+   * @param userIds - The IDs of the users to retrieve (at most 1000)
+   * @returns Promise with the users found, in the order of first request, and the IDs not found
+   */
+  async getUsers(userIds: number[]): Promise<{
+    users: User__Output[];
+    missingIds: number[];
+  }> {
+    if (userIds.length === 0) {
+      return { users: [], missingIds: [] };
+    }
+
+    const client = this.grpcClient.getClient();
+    const batchGetUsersAsync = promisify(client.BatchGetUsers.bind(client));
+    
+    const request: BatchGetUsersRequest = { ids: userIds };
+    const response = await batchGetUsersAsync(request) as BatchGetUsersResponse__Output;
+    
+    return {
+      users: response.users || [],
+      missingIds: response.missingIds || [],
+    };
+  }
+
   /**
    * Create a new user
    * @param name - User's name
@@ -76,4 +109,66 @@ export class UserService {
       totalCount: response.totalCount || 0,
     };
   }
+
+  /**
+   * Search users by filters, one page at a time
+   * @param filters - Exact email, name/surname prefixes and a created_at range (unix seconds); unset filters match every user
+   * @param pageSize - Number of users per page (default: 10)
+   * @param pageToken - nextPageToken of the previous page of the same search
+   * @returns Promise with the matching users and the token of the next page, empty on the last page
+   */
+  async searchUsers(
+    filters: Omit<SearchUsersRequest, 'pageSize' | 'pageToken'>,
+    pageSize: number = 10,
+    pageToken: string = '',
+  ): Promise<{
+    users: User__Output[];
+    nextPageToken: string;
+  }> {
+    const client = this.grpcClient.getClient();
+    const searchUsersAsync = promisify(client.SearchUsers.bind(client));
+    
+    const request: SearchUsersRequest = { ...filters, pageSize, pageToken };
+    const response = await searchUsersAsync(request) as SearchUsersResponse__Output;
+    
+    return {
+      users: response.users || [],
+      nextPageToken: response.nextPageToken || '',
+    };
+  }
+
+  /**
+   * Watch user changes to keep a local copy of users up to date
+   * @param onChanges - Called with each batch of changes, the sequence to resume after and the feed it belongs to
+   * @param onResync - Called when changes were missed; reload the users, then watch again after the given sequence and feed
+   * @param afterSequence - Sequence of the last change applied, or '0' for changes from now on
+   * @param feedId - Feed the sequence was received from
+   * @returns Function that stops watching
+   */
+  watchUsers(
+    onChanges: (changes: UserChange__Output[], sequence: string, feedId: string) => void,
+    onResync: (sequence: string, feedId: string) => void,
+    afterSequence: string = '0',
+    feedId: string = '0',
+  ): () => void {
+    const client = this.grpcClient.getClient();
+    
+    const request: WatchUsersRequest = { afterSequence, feedId };
+    const call = client.WatchUsers(request);
+    
+    call.on('data', (response: WatchUsersResponse__Output) => {
+      if (response.resync) {
+        onResync(response.sequence, response.feedId);
+      } else {
+        onChanges(response.changes || [], response.sequence, response.feedId);
+      }
+    });
+    call.on('error', (error: Error & { code?: number }) => {
+      if (error.code !== grpc.status.CANCELLED) {
+        console.error('❌ WatchUsers stream failed:', error.message);
+      }
+    });
+    
+    return () => call.cancel();
+  }
 }
@@ -0,0 +1,4 @@
+"""Micro-benchmarks for the Python gRPC backend.
+
+Run from the service directory, e.g. ``python -m benchmarks.bench_user_repository``.
+"""
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Compare building responses as messages with assembling them from encoded users.
+
+For each in-process store filled with ``--users`` users, times what
+``GetUser`` and ``ListUsers`` do between reading the store and handing
+bytes to gRPC, in two ways:
+
+* ``message``: read ``User`` messages, build the response message and
+  serialize it, as the servicer did before responses were pre-encoded.
+* ``encoded``: read serialized users with ``get_encoded`` and
+  ``page_after_encoded`` and frame them as the response bytes. Every user
+  is read once beforehand, so stores caching encodings serve them warm.
+
+Both produce the same bytes, which is checked before timing. Request
+parsing, interceptors and transport are left out, as they cost the same
+either way.
+"""
+
+import argparse
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.api.encoded_responses import (
+    encode_get_user_response,
+    encode_list_users_response,
+)
+from src.repositories import (
+    ColumnarUserRepository,
+    InMemoryUserRepository,
+    ShardedUserRepository,
+    UserRepository,
+)
+
+FILL_BATCH_SIZE = 10000
+NEXT_PAGE_TOKEN = "next-page"
+
+
+def fill(repository: UserRepository, users: int) -> List[int]:
+    """Create ``users`` users and return their IDs."""
+    ids: List[int] = []
+    for start in range(0, users, FILL_BATCH_SIZE):
+        created = repository.create_many(
+            [
+                (f"User {i}", f"user{i}@example.com", f"Surname {i}")
+                for i in range(start, min(users, start + FILL_BATCH_SIZE))
+            ]
+        )
+        ids.extend(user.id for user in created if user is not None)
+    return ids
+
+
+def time_per_call(call: Callable[[int], bytes], arguments: List[int]) -> float:
+    """Return the mean seconds of ``call`` over ``arguments``."""
+    start = time.perf_counter()
+    for argument in arguments:
+        call(argument)
+    return (time.perf_counter() - start) / len(arguments)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument(
+        "--page-sizes", default="10,100", help="Comma separated ListUsers page sizes"
+    )
+    parser.add_argument("--calls", type=int, default=20000, help="Calls per method")
+    parser.add_argument(
+        "--stores",
+        default="memory,sharded,columnar",
+        help="Comma separated stores to measure",
+    )
+    args = parser.parse_args()
+
+    factories: Dict[str, Callable[[], UserRepository]] = {
+        "memory": InMemoryUserRepository,
+        "sharded": ShardedUserRepository,
+        "columnar": ColumnarUserRepository,
+    }
+    print(
+        f"{'store':<10} {'method':<14} {'message µs':>11} {'encoded µs':>11} "
+        f"{'speedup':>8}"
+    )
+    for store in args.stores.split(","):
+        repository = factories[store]()
+        ids = fill(repository, args.users)
+        for user_id in ids:
+            repository.get_encoded(user_id)
+
+        def get_message(user_id: int) -> bytes:
+            user = repository.get(user_id)
+            response = example_service_pb2.GetUserResponse(user=user)
+            data: bytes = response.SerializeToString()
+            return data
+
+        def get_encoded(user_id: int) -> bytes:
+            user = repository.get_encoded(user_id)
+            return encode_get_user_response(user)  # type: ignore[arg-type]
+
+        methods: List[Tuple[str, Callable[[int], bytes], Callable[[int], bytes]]] = [
+            ("GetUser", get_message, get_encoded)
+        ]
+        for page_size in (int(size) for size in args.page_sizes.split(",")):
+
+            def list_message(after_id: int, page_size: int = page_size) -> bytes:
+                page = repository.page_after(after_id, page_size)
+                data: bytes = example_service_pb2.ListUsersResponse(
+                    users=page.users,
+                    total_count=page.total_count,
+                    next_page_token=NEXT_PAGE_TOKEN,
+                ).SerializeToString()
+                return data
+
+            def list_encoded(after_id: int, page_size: int = page_size) -> bytes:
+                page = repository.page_after_encoded(after_id, page_size)
+                return encode_list_users_response(
+                    page.users, page.total_count, NEXT_PAGE_TOKEN
+                )
+
+            methods.append((f"ListUsers/{page_size}", list_message, list_encoded))
+
+        sample = [random.choice(ids) for _ in range(args.calls)]
+        for name, message, encoded in methods:
+            if message(sample[0]) != encoded(sample[0]):
+                raise SystemExit(f"{store} {name}: encoded response differs")
+            message_time = time_per_call(message, sample)
+            encoded_time = time_per_call(encoded, sample)
+            print(
+                f"{store:<10} {name:<14} {message_time * 1e6:>11.2f} "
+                f"{encoded_time * 1e6:>11.2f} {message_time / encoded_time:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
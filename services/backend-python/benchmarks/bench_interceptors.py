@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Compare ExampleService throughput with and without the interceptor chain.
+
+Every configuration runs an in-process server on a free local port and
+drives GetUser, CreateUser and ListUsers in turn from several client
+threads, reporting requests per second:
+
+* ``none``       - no interceptors
+* ``deadline``   - a chain with only the deadline check, which isolates
+                   the cost of the memoized dispatch itself
+* ``validation`` - deadline check + validation
+* ``cached``     - the production chain (deadline check + response cache +
+                   validation); GetUser and ListUsers repeat one request,
+                   so after the first call they are served from the cache
+"""
+
+import argparse
+
+import grpc
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from benchmarks.common import make_calls, measure_throughput, start_server
+from proto_generated import example_service_pb2, example_service_pb2_grpc
+from src.interceptors import (
+    CachingInterceptor,
+    DeadlineInterceptor,
+    InterceptorChain,
+    ValidationInterceptor,
+)
+from src.main import CACHE_INVALIDATIONS, CACHED_METHODS
+from src.utils.response_cache import ResponseCache
+from src.utils.validator_cache import quiet_cel_logging
+
+
+def build_configurations() -> dict:
+    validation = ValidationInterceptor()
+    validation.warm_up(example_service_pb2.DESCRIPTOR.services_by_name.values())
+    return {
+        "none": [],
+        "deadline": [InterceptorChain([DeadlineInterceptor()])],
+        "validation": [InterceptorChain([DeadlineInterceptor(), validation])],
+        "cached": [
+            InterceptorChain(
+                [
+                    DeadlineInterceptor(),
+                    CachingInterceptor(
+                        ResponseCache(), CACHED_METHODS, CACHE_INVALIDATIONS
+                    ),
+                    validation,
+                ]
+            )
+        ],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--threads", type=int, default=8, help="Client threads")
+    parser.add_argument(
+        "--duration", type=float, default=3.0, help="Seconds per method"
+    )
+    args = parser.parse_args()
+    quiet_cel_logging()
+
+    print(f"{'config':<12} {'method':<12} {'req/s':>10}")
+    for name, interceptors in build_configurations().items():
+        server, address = start_server(interceptors)
+        channel = grpc.insecure_channel(address)
+        stub = example_service_pb2_grpc.ExampleServiceStub(channel)
+        try:
+            for method, call in make_calls(stub).items():
+                call()  # warm up the connection and the handler table
+                rate = measure_throughput(call, args.threads, args.duration)
+                print(f"{name:<12} {method:<12} {rate:>10.0f}")
+        finally:
+            channel.close()
+            server.stop(None)
+
+
+if __name__ == "__main__":
+    main()
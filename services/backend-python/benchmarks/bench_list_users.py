@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Compare ListUsers page lookups against copying the whole table.
+
+For each store size this times three ways of fetching a page of users:
+the old ``list(users.values())[start:end]`` slice, an offset page served
+from the sorted ID index, and a keyset page resumed from a cursor.
+"""
+
+import argparse
+import time
+from typing import Callable
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from src.repositories import InMemoryUserRepository
+
+
+def time_per_call(fn: Callable[[], object], iterations: int) -> float:
+    """Return the mean seconds per call of ``fn``."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000,1000000",
+        help="Comma separated store sizes to measure at",
+    )
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    page_size = args.page_size
+
+    print(
+        f"{'users':>10} {'copy+slice µs':>14} {'offset p1 µs':>13} "
+        f"{'offset mid µs':>14} {'keyset mid µs':>14}"
+    )
+    for size in (int(s) for s in args.sizes.split(",")):
+        repository = InMemoryUserRepository()
+        for i in range(size):
+            repository.create(name=f"User {i}", email=f"user{i}@example.com")
+        users = {user.id: user for user in repository.page(0, size).users}
+        middle = size // 2
+
+        copy_slice = time_per_call(
+            lambda: list(users.values())[0:page_size], args.iterations
+        )
+        offset_first = time_per_call(
+            lambda: repository.page(0, page_size), args.iterations
+        )
+        offset_middle = time_per_call(
+            lambda: repository.page(middle, page_size), args.iterations
+        )
+        keyset_middle = time_per_call(
+            lambda: repository.page_after(middle, page_size), args.iterations
+        )
+        print(
+            f"{size:>10} {copy_slice * 1e6:>14.1f} {offset_first * 1e6:>13.1f} "
+            f"{offset_middle * 1e6:>14.1f} {keyset_middle * 1e6:>14.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Measure what a request log line costs the thread that logs it.
+
+Several threads each log ``--records`` request lines through a
+``RequestLogger``, like the servicer's per-call ``logger.info``, to a
+file. The time per record is compared for:
+
+* ``direct``: ``logging.basicConfig``'s stream handler, formatting and
+  writing in the logging thread under the handler's lock
+* ``queued``: ``start_logging``, handing records to the listener thread
+* ``sampled``: ``start_logging`` with ``--request-log-rate``
+* ``disabled``: the request logger's level above INFO
+
+The time to write out what is still queued afterwards is reported
+separately, as is how many records were dropped or left out.
+"""
+
+import argparse
+import logging
+import tempfile
+import threading
+import time
+
+from src.utils.log_pipeline import LOG_FORMAT, request_logger, start_logging
+
+REQUEST_LOGGER = "src.api.example_service"
+
+
+def log_requests(records: int, threads: int) -> float:
+    """Return the mean seconds per record with ``threads`` threads logging."""
+    logger = request_logger(REQUEST_LOGGER)
+
+    def run() -> None:
+        for user_id in range(records):
+            logger.info("GetUser called with user_id: %d", user_id)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (records * threads)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--records", type=int, default=20000, help="Records per thread")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--request-log-rate", type=float, default=100.0)
+    args = parser.parse_args()
+
+    print(
+        f"{'setup':<10} {'µs/record':>10} {'flush ms':>9} {'dropped':>8} "
+        f"{'suppressed':>11}"
+    )
+    for setup in ("direct", "queued", "sampled", "disabled"):
+        with tempfile.TemporaryFile("w") as log_file:
+            root = logging.getLogger()
+            for handler in root.handlers[:]:
+                root.removeHandler(handler)
+            pipeline = None
+            if setup == "direct":
+                logging.basicConfig(
+                    level=logging.INFO, format=LOG_FORMAT, stream=log_file
+                )
+            else:
+                pipeline = start_logging(
+                    max_queued=args.queue_size,
+                    request_log_rate=args.request_log_rate if setup == "sampled" else 0,
+                )
+                # Write to the file rather than stderr
+                listener = pipeline.listener
+                listener.handlers[0].setStream(log_file)  # type: ignore[union-attr]
+            logging.getLogger(REQUEST_LOGGER).setLevel(
+                logging.WARNING if setup == "disabled" else logging.NOTSET
+            )
+
+            per_record = log_requests(args.records, args.threads)
+            start = time.perf_counter()
+            stats = None
+            if pipeline is not None:
+                stats = pipeline.stats()
+                pipeline.stop()
+            flush = time.perf_counter() - start
+            print(
+                f"{setup:<10} {per_record * 1e6:>10.2f} {flush * 1e3:>9.1f} "
+                f"{stats.dropped if stats else 0:>8} "
+                f"{stats.suppressed if stats else 0:>11}"
+            )
+
+
+if __name__ == "__main__":
+    main()
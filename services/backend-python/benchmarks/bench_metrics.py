@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Measure the per-call cost of MetricsInterceptor.
+
+Times a trivial unary behavior called directly and through the handler
+built by ``MetricsInterceptor``, from one thread and from several threads
+at once, and reports the difference in microseconds per call. Also times
+rendering ``/metrics`` for every ExampleService method.
+"""
+
+import argparse
+import threading
+import time
+from typing import Any, Callable, Optional
+
+import grpc
+
+from src.interceptors import MetricsInterceptor
+from src.utils.metrics import MetricsRegistry
+
+
+class _Context:
+    """The parts of ``grpc.ServicerContext`` the interceptor reads."""
+
+    def code(self) -> Optional[grpc.StatusCode]:
+        return None
+
+
+def behavior(request: Any, context: Any) -> Any:
+    return request
+
+
+def time_per_call(
+    call: Callable[[Any, Any], Any], iterations: int, threads: int
+) -> float:
+    """Return the mean seconds per call with ``threads`` threads calling."""
+    context = _Context()
+
+    def run() -> None:
+        for _ in range(iterations):
+            call(None, context)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (iterations * threads)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    registry = MetricsRegistry()
+    interceptor = MetricsInterceptor(registry)
+    handler = interceptor.wrap_handler(
+        "/example.ExampleService/GetUser", grpc.unary_unary_rpc_method_handler(behavior)
+    )
+    wrapped = handler.unary_unary
+
+    print(f"{'threads':>7} {'bare µs':>9} {'metrics µs':>11} {'overhead µs':>12}")
+    for threads in (1, args.threads):
+        iterations = args.iterations // threads
+        bare = time_per_call(behavior, iterations, threads)
+        measured = time_per_call(wrapped, iterations, threads)
+        print(
+            f"{threads:>7} {bare * 1e6:>9.2f} {measured * 1e6:>11.2f} "
+            f"{(measured - bare) * 1e6:>12.2f}"
+        )
+
+    for name in (
+        "CreateUser",
+        "ListUsers",
+        "StreamUsers",
+        "BatchGetUsers",
+        "BulkCreateUsers",
+    ):
+        interceptor.wrap_handler(
+            f"/example.ExampleService/{name}",
+            grpc.unary_unary_rpc_method_handler(behavior),
+        )
+    start = time.perf_counter()
+    for _ in range(100):
+        text = registry.render()
+    render = (time.perf_counter() - start) / 100
+    print(f"render: {render * 1e3:.2f} ms for {len(text.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Compare the in-memory and SQLAlchemy user stores.
+
+Each store is filled with ``--users`` users and then measured twice:
+
+* per call latency of the repository methods behind GetUser, CreateUser
+  and ListUsers, called directly from one thread
+* GetUser, CreateUser and ListUsers throughput through an in-process
+  server without interceptors, from several client threads
+
+The SQL store is measured on an in-memory SQLite database and on a SQLite
+file in a temporary directory; pass ``--database-url`` to add another
+database, e.g. PostgreSQL.
+"""
+
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from typing import Callable, Dict
+
+import grpc
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from benchmarks.common import make_calls, measure_throughput, start_server
+from proto_generated import example_service_pb2_grpc
+from src.api.example_service import ExampleServiceServicer
+from src.repositories import InMemoryUserRepository, SqlUserRepository, UserRepository
+
+FILL_BATCH_SIZE = 1000
+
+
+def time_per_call(fn: Callable[[], object], iterations: int) -> float:
+    """Return the mean seconds per call of ``fn``."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def fill(repository: UserRepository, users: int) -> None:
+    ExampleServiceServicer.seed_demo_users(repository)
+    for start in range(0, users, FILL_BATCH_SIZE):
+        repository.create_many(
+            [
+                (f"User {i}", f"user{i}@example.com", "")
+                for i in range(start, min(users, start + FILL_BATCH_SIZE))
+            ]
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=10000, help="Users per store")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--threads", type=int, default=8, help="Client threads")
+    parser.add_argument(
+        "--duration", type=float, default=2.0, help="Seconds per method"
+    )
+    parser.add_argument("--database-url", help="Extra SQLAlchemy URL to measure")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    stores: Dict[str, Callable[[], UserRepository]] = {
+        "memory": InMemoryUserRepository,
+        "sqlite-memory": lambda: SqlUserRepository.from_url(
+            "sqlite://", pool_size=args.threads
+        ),
+        "sqlite-file": lambda: SqlUserRepository.from_url(
+            "sqlite:///" + os.path.join(tmpdir.name, "bench.db"),
+            pool_size=args.threads,
+        ),
+    }
+    if args.database_url:
+        stores["database-url"] = lambda: SqlUserRepository.from_url(
+            args.database_url, pool_size=args.threads
+        )
+
+    print(
+        f"{'store':<14} {'get µs':>9} {'create µs':>10} {'page µs':>9} "
+        f"{'GetUser/s':>10} {'CreateUser/s':>13} {'ListUsers/s':>12}"
+    )
+    with tmpdir:
+        for name, factory in stores.items():
+            repository = factory()
+            fill(repository, args.users)
+            emails = itertools.count()
+            middle = args.users // 2
+
+            get = time_per_call(lambda: repository.get(middle), args.iterations)
+            create = time_per_call(
+                lambda: repository.create(
+                    "Bench User", f"direct{next(emails)}@example.com"
+                ),
+                args.iterations,
+            )
+            page = time_per_call(lambda: repository.page(0, 10), args.iterations)
+
+            server, address = start_server(
+                servicer=ExampleServiceServicer(repository),
+                max_workers=args.threads,
+            )
+            channel = grpc.insecure_channel(address)
+            stub = example_service_pb2_grpc.ExampleServiceStub(channel)
+            try:
+                calls = make_calls(stub)
+                rates = {
+                    method: measure_throughput(call, args.threads, args.duration)
+                    for method, call in calls.items()
+                }
+            finally:
+                channel.close()
+                server.stop(None)
+                close = getattr(repository, "close", None)
+                if close is not None:
+                    close()
+
+            print(
+                f"{name:<14} {get * 1e6:>9.1f} {create * 1e6:>10.1f} "
+                f"{page * 1e6:>9.1f} {rates['GetUser']:>10.0f} "
+                f"{rates['CreateUser']:>13.0f} {rates['ListUsers']:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
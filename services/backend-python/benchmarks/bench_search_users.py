@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Compare indexed searches with the full scan of ``UserRepository.search``.
+
+For each in-process store filled with ``--users`` users, times a page of
+``--page-size`` results for searches served by each index: exact email,
+name prefix, surname prefix and a ``created_at`` range. ``scan`` is the
+same store answering through the base class's default ``search``, which
+reads every user, as a store without secondary indexes would.
+
+Users get one of ``--names`` distinct names and surnames and a creation
+time spread over ``--users`` seconds, so a prefix matches about
+``users / names`` users and the time range about a tenth of them. Both
+ways must return the same page, which is checked before timing.
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, List, Tuple
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.repositories import (
+    ColumnarUserRepository,
+    InMemoryUserRepository,
+    SearchPage,
+    ShardedUserRepository,
+    UserQuery,
+    UserRepository,
+)
+
+FILL_BATCH_SIZE = 10000
+CREATED_AT_BASE = 1640995200
+
+
+def fill(repository: UserRepository, users: int, names: int) -> None:
+    """Store ``users`` users with ``names`` distinct names and surnames."""
+    for start in range(0, users, FILL_BATCH_SIZE):
+        repository.restore(
+            example_service_pb2.User(
+                id=i + 1,
+                name=f"Name{i % names:05d}",
+                surname=f"Surname{i * 7 % names:05d}",
+                email=f"user{i}@example.com",
+                created_at=CREATED_AT_BASE + i,
+                updated_at=CREATED_AT_BASE + i,
+            )
+            for i in range(start, min(users, start + FILL_BATCH_SIZE))
+        )
+
+
+def time_per_call(call: Callable[[], SearchPage], calls: int) -> float:
+    """Return the mean seconds of ``call``."""
+    start = time.perf_counter()
+    for _ in range(calls):
+        call()
+    return (time.perf_counter() - start) / calls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=100000)
+    parser.add_argument("--names", type=int, default=1000)
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--calls", type=int, default=200, help="Calls per search")
+    parser.add_argument(
+        "--scan-calls", type=int, default=5, help="Calls per search of the full scan"
+    )
+    parser.add_argument(
+        "--stores",
+        default="memory,sharded,columnar",
+        help="Comma separated stores to measure",
+    )
+    args = parser.parse_args()
+
+    factories: Dict[str, Callable[[], UserRepository]] = {
+        "memory": InMemoryUserRepository,
+        "sharded": ShardedUserRepository,
+        "columnar": ColumnarUserRepository,
+    }
+    middle = CREATED_AT_BASE + args.users // 2
+    queries: List[Tuple[str, UserQuery]] = [
+        ("email", UserQuery(email=f"user{args.users // 2}@example.com")),
+        ("name prefix", UserQuery(name_prefix=f"Name{args.names // 2:05d}")),
+        ("surname prefix", UserQuery(surname_prefix=f"Surname{args.names // 3:05d}")),
+        (
+            "created_at",
+            UserQuery(created_after=middle, created_before=middle + args.users // 10),
+        ),
+    ]
+    print(
+        f"{'store':<10} {'search':<15} {'indexed µs':>11} {'scan µs':>11} "
+        f"{'speedup':>8}"
+    )
+    for store in args.stores.split(","):
+        repository = factories[store]()
+        fill(repository, args.users, args.names)
+        for name, query in queries:
+
+            def indexed(query: UserQuery = query) -> SearchPage:
+                return repository.search(query, args.page_size)
+
+            def scan(query: UserQuery = query) -> SearchPage:
+                return UserRepository.search(repository, query, args.page_size)
+
+            if indexed() != scan():
+                raise SystemExit(f"{store} {name}: indexed search differs")
+            indexed_time = time_per_call(indexed, args.calls)
+            scan_time = time_per_call(scan, args.scan_calls)
+            print(
+                f"{store:<10} {name:<15} {indexed_time * 1e6:>11.1f} "
+                f"{scan_time * 1e6:>11.1f} {scan_time / indexed_time:>7.0f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
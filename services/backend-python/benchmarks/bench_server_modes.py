@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Load-test the sync and aio server modes with many concurrent streams.
+
+For each mode a server is started as a subprocess (``python -m src.main``)
+and an asyncio client keeps ``--concurrency`` calls in flight at all times,
+spread over ``--channels`` connections. Throughput and latency percentiles
+are printed per mode. ``--workers`` runs each mode under the pre-fork
+launcher; use at least as many channels as workers, since every channel is
+one connection and connections are what SO_REUSEPORT balances.
+"""
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+import grpc
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from benchmarks.common import free_port, percentile, spawn_server, stop_server
+from proto_generated import example_service_pb2, example_service_pb2_grpc
+
+
+async def drive(
+    address: str, concurrency: int, channels: int, duration: float
+) -> List[float]:
+    """Keep ``concurrency`` GetUser calls in flight for ``duration`` seconds.
+
+    Returns:
+        Latency in seconds of every successful call
+    """
+    pool = [grpc.aio.insecure_channel(address) for _ in range(channels)]
+    stubs = [example_service_pb2_grpc.ExampleServiceStub(channel) for channel in pool]
+    request = example_service_pb2.GetUserRequest(user_id=1)
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(stub: example_service_pb2_grpc.ExampleServiceStub) -> None:
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await stub.GetUser(request, timeout=30)
+            except grpc.aio.AioRpcError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    try:
+        await asyncio.gather(*(worker(stubs[i % channels]) for i in range(concurrency)))
+    finally:
+        for channel in pool:
+            await channel.close()
+    if errors:
+        print(f"  {errors} calls failed")
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modes", default="sync,aio", help="Server modes to compare")
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Server processes per mode (the pre-fork launcher when > 1)",
+    )
+    parser.add_argument(
+        "--validation",
+        action="store_true",
+        help="Keep request validation enabled on the server",
+    )
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for mode in args.modes.split(","):
+        address = f"127.0.0.1:{free_port()}"
+        server_args = [
+            "--mode",
+            mode,
+            "--listen-addr",
+            address,
+            "--workers",
+            str(args.workers),
+        ]
+        if not args.validation:
+            server_args.append("--no-validation")
+        process = spawn_server(server_args, address)
+        try:
+            start = time.perf_counter()
+            latencies = asyncio.run(
+                drive(address, args.concurrency, args.channels, args.duration)
+            )
+            elapsed = time.perf_counter() - start
+        finally:
+            stop_server(process)
+
+        latencies.sort()
+        print(
+            f"{mode:<6} {len(latencies) / elapsed:>9.0f} "
+            f"{percentile(latencies, 0.50) * 1e3:>9.1f} "
+            f"{percentile(latencies, 0.99) * 1e3:>9.1f} "
+            f"{(latencies[-1] if latencies else 0) * 1e3:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Measure reads and writes per second of the store shared by ``--workers``.
+
+Starts the store process the launcher uses, filled with ``--users`` users,
+and for each count in ``--processes`` runs that many worker processes for
+``--duration`` seconds. Every worker loops over ``get``, ``get_by_email``
+and ``page_after`` calls, ``--write-ratio`` of them creates, through a
+``SharedUserRepository``:
+
+- ``store``: every call is a round trip to the store process, which serves
+  all workers' calls itself (``--no-worker-replicas``)
+- ``replica``: reads come from a copy of the store in each worker that
+  follows the store's changes; only writes are round trips (the default)
+
+With ``store`` the total barely grows with more processes, since every
+call ends up in the one store process. Reads from a copy scale with the
+cores available, at the memory cost of one copy per worker.
+"""
+
+import argparse
+import functools
+import multiprocessing
+import os
+import random
+import time
+from typing import Any, List, Tuple
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from benchmarks.common import percentile
+from src.repositories import InMemoryUserRepository, UserRepository
+from src.repositories.shared import SharedUserRepository, start_user_store
+
+FILL_BATCH_SIZE = 1000
+
+_mp = multiprocessing.get_context("spawn")
+
+
+def filled_store(users: int) -> UserRepository:
+    """Build the store process's repository holding ``users`` users."""
+    repository = InMemoryUserRepository()
+    for start in range(0, users, FILL_BATCH_SIZE):
+        repository.create_many(
+            [
+                ("User", f"user{i}@example.com", "")
+                for i in range(start, min(users, start + FILL_BATCH_SIZE))
+            ]
+        )
+    return repository
+
+
+def run_worker(
+    index: int,
+    address: Any,
+    authkey: bytes,
+    published: Any,
+    replica: bool,
+    users: int,
+    duration: float,
+    write_ratio: float,
+    start: Any,
+    results: Any,
+) -> None:
+    """Run the call mix for ``duration`` seconds and report its timings."""
+    repository = SharedUserRepository(
+        address, authkey, published, InMemoryUserRepository if replica else None
+    )
+    rng = random.Random(index)
+    timings: List[float] = []
+    created = 0
+    start.wait()
+    deadline = time.perf_counter() + duration
+    while True:
+        roll = rng.random()
+        begin = time.perf_counter()
+        if begin >= deadline:
+            break
+        if roll < write_ratio:
+            repository.create("Bench User", f"w{index}-{created}@example.com")
+            created += 1
+        elif roll < write_ratio + (1 - write_ratio) / 3:
+            repository.get(rng.randint(1, users))
+        elif roll < write_ratio + 2 * (1 - write_ratio) / 3:
+            repository.get_by_email(f"user{rng.randrange(users)}@example.com")
+        else:
+            repository.page_after(rng.randint(0, users), 10)
+        timings.append(time.perf_counter() - begin)
+    repository.close()
+    results.put(timings)
+
+
+def measure(
+    processes: int, replica: bool, args: argparse.Namespace
+) -> Tuple[float, float, float]:
+    """Return total calls/s and p50 and p99 latency for one configuration."""
+    authkey = os.urandom(16)
+    store = start_user_store(
+        authkey, ctx=_mp, factory=functools.partial(filled_store, args.users)
+    )
+    start = _mp.Event()
+    results = _mp.Queue()
+    workers = [
+        _mp.Process(
+            target=run_worker,
+            args=(
+                index,
+                store.address,
+                authkey,
+                store.published,
+                replica,
+                args.users,
+                args.duration,
+                args.write_ratio,
+                start,
+                results,
+            ),
+        )
+        for index in range(processes)
+    ]
+    try:
+        for worker in workers:
+            worker.start()
+        # Let every worker connect, and load its copy, before timing
+        time.sleep(args.warmup)
+        start.set()
+        timings: List[float] = []
+        for _ in workers:
+            timings += results.get()
+        for worker in workers:
+            worker.join()
+    finally:
+        store.shutdown()
+    timings.sort()
+    return (
+        len(timings) / args.duration,
+        percentile(timings, 0.5),
+        percentile(timings, 0.99),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=100000, help="Users in the store")
+    parser.add_argument(
+        "--processes", default="1,2,4", help="Comma separated worker process counts"
+    )
+    parser.add_argument(
+        "--write-ratio", type=float, default=0.05, help="Fraction of creates"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=3.0, help="Seconds per measurement"
+    )
+    parser.add_argument(
+        "--warmup",
+        type=float,
+        default=5.0,
+        help="Seconds workers get to connect and copy the store",
+    )
+    args = parser.parse_args()
+
+    print(f"cores: {os.cpu_count()}")
+    print(
+        f"{'reads from':<10} {'processes':>9} {'calls/s':>10} "
+        f"{'p50 µs':>8} {'p99 µs':>8}"
+    )
+    for processes in (int(p) for p in args.processes.split(",")):
+        for name, replica in (("store", False), ("replica", True)):
+            calls, p50, p99 = measure(processes, replica, args)
+            print(
+                f"{name:<10} {processes:>9} {calls:>10.0f} "
+                f"{p50 * 1e6:>8.1f} {p99 * 1e6:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Measure startup costs of the server and probes against a time budget.
+
+Imports: runs ``python -X importtime -c "import MODULE"`` for the health
+check script, which Kubernetes execs as a probe, and for the server, and
+breaks the import time down by top-level package.
+
+Startup: spawns ``python -m src.main`` with each set of flags below and
+times the first GetUser call, made with ``wait_for_ready`` right after the
+spawn, so it includes interpreter start, imports, validation warm-up and
+binding the port. ``probe`` is the wall-clock time of running
+``health_check.py`` against the started ``sync`` server.
+
+Every median is compared with ``BUDGETS`` times ``--budget-scale``; the
+script exits with 1 if any is over, so it can guard against regressions in
+CI. The budgets hold for one slow core; scale them for other machines.
+"""
+
+import argparse
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+import grpc
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from benchmarks.common import free_port, stop_server
+from proto_generated import example_service_pb2, example_service_pb2_grpc
+
+IMPORTS = {
+    "health_check": "health_check",
+    "server": "src.main",
+}
+SERVER_VARIANTS = {
+    "sync": [],
+    "sync-lazy": ["--lazy-validation"],
+    "sync-novalidate": ["--no-validation"],
+    "aio": ["--mode", "aio"],
+}
+# Seconds allowed for the median of each measurement
+BUDGETS = {
+    "import health_check": 0.2,
+    "import server": 0.4,
+    "probe": 0.35,
+    "first rpc sync": 1.2,
+    "first rpc sync-lazy": 0.9,
+    "first rpc sync-novalidate": 0.5,
+    "first rpc aio": 1.2,
+}
+# Retry connecting quickly while the spawned server starts up
+CLIENT_OPTIONS = [
+    ("grpc.initial_reconnect_backoff_ms", 20),
+    ("grpc.min_reconnect_backoff_ms", 20),
+    ("grpc.max_reconnect_backoff_ms", 50),
+]
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_times(module: str) -> Tuple[float, Dict[str, float]]:
+    """Return the seconds importing ``module`` takes, and self time per package."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0.0
+    packages: Dict[str, float] = defaultdict(float)
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        packages[name.split(".")[0]] += int(self_us) / 1e6
+        # Unindented lines are imported by the -c statement itself
+        if len(indent) == 1:
+            total += int(cumulative_us) / 1e6
+    return total, packages
+
+
+def first_rpc_time(server_args: Sequence[str]) -> Tuple[float, subprocess.Popen, str]:
+    """Spawn a server and return the seconds until it served a GetUser call.
+
+    The server is left running for the caller to stop.
+    """
+    address = f"127.0.0.1:{free_port()}"
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "src.main",
+            "--listen-addr",
+            address,
+            "--metrics-port",
+            "0",
+            *server_args,
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with grpc.insecure_channel(address, options=CLIENT_OPTIONS) as channel:
+            stub = example_service_pb2_grpc.ExampleServiceStub(channel)
+            stub.GetUser(
+                example_service_pb2.GetUserRequest(user_id=1),
+                timeout=60,
+                wait_for_ready=True,
+            )
+    except grpc.RpcError:
+        process.kill()
+        raise
+    return time.perf_counter() - start, process, address
+
+
+def probe_time(address: str) -> float:
+    """Return the wall-clock seconds of one ``health_check.py`` run."""
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "health_check.py", "--target", address],
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measurement")
+    parser.add_argument(
+        "--variants",
+        default=",".join(SERVER_VARIANTS),
+        help="Comma separated server variants to start",
+    )
+    parser.add_argument(
+        "--top", type=int, default=6, help="Packages shown per import breakdown"
+    )
+    parser.add_argument(
+        "--budget-scale",
+        type=float,
+        default=1.0,
+        help="Factor applied to every budget, e.g. 0.5 on a fast machine",
+    )
+    args = parser.parse_args()
+
+    results: Dict[str, float] = {}
+
+    for label, module in IMPORTS.items():
+        totals: List[float] = []
+        packages: Dict[str, List[float]] = defaultdict(list)
+        for _ in range(args.runs):
+            total, by_package = import_times(module)
+            totals.append(total)
+            for package, seconds in by_package.items():
+                packages[package].append(seconds)
+        results[f"import {label}"] = statistics.median(totals)
+        heaviest = sorted(
+            packages.items(), key=lambda item: statistics.median(item[1]), reverse=True
+        )
+        print(f"import {module}: {statistics.median(totals) * 1000:.0f} ms")
+        for package, samples in heaviest[: args.top]:
+            print(f"  {package:<20} {statistics.median(samples) * 1000:>7.1f} ms")
+
+    probes: List[float] = []
+    for variant in args.variants.split(","):
+        times: List[float] = []
+        for _ in range(args.runs):
+            elapsed, process, address = first_rpc_time(SERVER_VARIANTS[variant])
+            try:
+                times.append(elapsed)
+                if variant == "sync":
+                    probes.append(probe_time(address))
+            finally:
+                stop_server(process)
+        results[f"first rpc {variant}"] = statistics.median(times)
+    if probes:
+        results["probe"] = statistics.median(probes)
+
+    print()
+    print(f"{'measurement':<28} {'median ms':>10} {'budget ms':>10}")
+    over = []
+    for name, seconds in results.items():
+        budget = BUDGETS[name] * args.budget_scale
+        flag = "" if seconds <= budget else "  OVER"
+        if flag:
+            over.append(name)
+        print(f"{name:<28} {seconds * 1000:>10.0f} {budget * 1000:>10.0f}{flag}")
+    if over:
+        print(f"\nOver budget: {', '.join(over)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Measure user store throughput with many threads reading and writing.
+
+Every thread loops for ``--duration`` seconds over a mix of ``get``,
+``get_by_email`` and ``create`` calls, ``--write-ratio`` of them creates,
+directly against the repository. The single-lock ``InMemoryUserRepository``
+is compared with ``ShardedUserRepository`` at each ``--shards`` count, for
+each thread count in ``--threads``.
+
+Under the GIL only one thread runs Python code at a time, so sharding
+mostly removes lock convoys: with one lock, a thread that loses the GIL
+while holding it stalls every other thread until it runs again. On a
+free-threaded build the shards also let writers run in parallel.
+"""
+
+import argparse
+import random
+import threading
+import time
+from functools import partial
+from typing import Callable, Dict, List
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from benchmarks.common import percentile
+from src.api.example_service import ExampleServiceServicer
+from src.repositories import (
+    InMemoryUserRepository,
+    ShardedUserRepository,
+    UserRepository,
+)
+
+FILL_BATCH_SIZE = 1000
+
+
+def fill(repository: UserRepository, users: int) -> List[str]:
+    """Create ``users`` users and return their emails."""
+    ExampleServiceServicer.seed_demo_users(repository)
+    emails = [f"user{i}@example.com" for i in range(users)]
+    for start in range(0, users, FILL_BATCH_SIZE):
+        repository.create_many(
+            [("User", email, "") for email in emails[start : start + FILL_BATCH_SIZE]]
+        )
+    return emails
+
+
+def run_mix(
+    repository: UserRepository,
+    emails: List[str],
+    threads: int,
+    duration: float,
+    write_ratio: float,
+) -> Dict[str, float]:
+    """Run the read/write mix and return throughput and latency figures."""
+    user_ids = [user.id for user in repository.page(0, len(emails)).users]
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+    start_barrier = threading.Barrier(threads + 1)
+
+    def worker(index: int) -> None:
+        rng = random.Random(index)
+        timings = latencies[index]
+        created = 0
+        start_barrier.wait()
+        deadline = time.perf_counter() + duration
+        while True:
+            roll = rng.random()
+            begin = time.perf_counter()
+            if begin >= deadline:
+                break
+            if roll < write_ratio:
+                repository.create("Bench User", f"t{index}-{created}@example.com")
+                created += 1
+            elif roll < (1 + write_ratio) / 2:
+                repository.get(rng.choice(user_ids))
+            else:
+                repository.get_by_email(rng.choice(emails))
+            timings.append(time.perf_counter() - begin)
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    start_barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    timings = sorted(t for per_thread in latencies for t in per_thread)
+    return {
+        "ops": len(timings) / elapsed,
+        "p50": percentile(timings, 0.5),
+        "p99": percentile(timings, 0.99),
+        "max": timings[-1] if timings else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=100000, help="Users per store")
+    parser.add_argument(
+        "--threads", default="10,16,32,64", help="Comma separated thread counts"
+    )
+    parser.add_argument(
+        "--shards", default="4,16,64", help="Comma separated shard counts"
+    )
+    parser.add_argument(
+        "--write-ratio", type=float, default=0.2, help="Fraction of creates"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=2.0, help="Seconds per measurement"
+    )
+    args = parser.parse_args()
+
+    stores: Dict[str, Callable[[], UserRepository]] = {"memory": InMemoryUserRepository}
+    for shards in (int(s) for s in args.shards.split(",")):
+        stores[f"sharded-{shards}"] = partial(ShardedUserRepository, shards)
+
+    print(
+        f"{'store':<12} {'threads':>7} {'ops/s':>10} {'p50 µs':>8} "
+        f"{'p99 µs':>8} {'max ms':>8}"
+    )
+    for threads in (int(t) for t in args.threads.split(",")):
+        for name, factory in stores.items():
+            repository = factory()
+            emails = fill(repository, args.users)
+            result = run_mix(
+                repository, emails, threads, args.duration, args.write_ratio
+            )
+            print(
+                f"{name:<12} {threads:>7} {result['ops']:>10.0f} "
+                f"{result['p50'] * 1e6:>8.1f} {result['p99'] * 1e6:>8.1f} "
+                f"{result['max'] * 1e3:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
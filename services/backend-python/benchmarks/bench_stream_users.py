@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""Export every user through StreamUsers and report throughput and memory.
+
+An in-process server is filled with ``--users`` users, then a client streams
+all of them. Peak RSS growth during the export should stay roughly
+constant as the store grows, since the server holds only one scan chunk
+and one batch at a time.
+"""
+
+import argparse
+import resource
+import time
+
+import grpc
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from benchmarks.common import start_server
+from proto_generated import example_service_pb2, example_service_pb2_grpc
+from src.api.example_service import ExampleServiceServicer
+from src.repositories import InMemoryUserRepository
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=1000000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    repository = InMemoryUserRepository()
+    for i in range(args.users):
+        repository.create(name=f"User {i}", email=f"user{i}@example.com")
+    server, address = start_server(servicer=ExampleServiceServicer(repository))
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with grpc.insecure_channel(address) as channel:
+        stub = example_service_pb2_grpc.ExampleServiceStub(channel)
+        request = example_service_pb2.StreamUsersRequest(batch_size=args.batch_size)
+        start = time.perf_counter()
+        received = sum(len(response.users) for response in stub.StreamUsers(request))
+        elapsed = time.perf_counter() - start
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before
+    server.stop(None)
+
+    rate = received / elapsed
+    print(f"streamed {received} users in {elapsed:.2f}s ({rate:.0f} users/s)")
+    print(f"peak RSS growth during export: {rss_growth / 1024:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""Measure bytes on the wire and latency of large responses per transport preset.
+
+For each preset of ``src.transport`` (``--transport-preset``), starts an
+in-process server over ``--users`` users and calls it through a local TCP
+proxy that counts the bytes sent each way. The proxy can add a one-way
+delay of half ``--rtt-ms`` and cap throughput at ``--bandwidth-mbps``, to
+stand in for a link between availability zones; by default it forwards
+as fast as it can, so latency then shows the CPU cost of compression.
+
+Calls measured:
+  list    ListUsers pages of 100 users
+  search  SearchUsers pages of 100 users matching a name prefix
+  stream  StreamUsers exports of every user in batches of 1000
+
+Bytes include HTTP/2 framing and headers, averaged over ``--calls`` calls
+after a few warm-up calls on the same connection.
+"""
+
+import argparse
+import queue
+import socket
+import statistics
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import grpc
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from benchmarks.common import start_server
+from proto_generated import example_service_pb2, example_service_pb2_grpc
+from src.api.example_service import ExampleServiceServicer
+from src.config import ServerConfig
+from src.main import build_interceptors, server_options
+from src.repositories import InMemoryUserRepository
+from src.transport import TRANSPORT_PRESETS
+
+NAMES = ("Alice", "Bob", "Carol", "Dave", "Erin", "Frank", "Grace", "Heidi")
+SURNAMES = ("Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller")
+CREATED_AT_BASE = 1640995200
+PAGE_SIZE = 100
+STREAM_BATCH_SIZE = 1000
+WARMUP_CALLS = 3
+CHUNK_SIZE = 65536
+
+
+class WireProxy:
+    """Forwards TCP connections to ``target``, counting bytes in each direction.
+
+    Every chunk is held back until it would have crossed a link with the
+    given one-way delay and bandwidth; chunks still leave in order, so a
+    large response is paced rather than delayed as a whole.
+    """
+
+    def __init__(self, target: str, delay: float = 0.0, bandwidth: float = 0.0):
+        """Initialize the proxy and start accepting connections.
+
+        Args:
+            target: ``host:port`` to forward to
+            delay: One-way delay in seconds
+            bandwidth: Bytes per second in each direction, 0 for no limit
+        """
+        host, port = target.rsplit(":", 1)
+        self._target = (host, int(port))
+        self._delay = delay
+        self._bandwidth = bandwidth
+        self._lock = threading.Lock()
+        self.bytes_up = 0
+        self.bytes_down = 0
+        self._listener = socket.create_server(("127.0.0.1", 0))
+        self.address = f"127.0.0.1:{self._listener.getsockname()[1]}"
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def reset(self) -> None:
+        """Zero the byte counters."""
+        with self._lock:
+            self.bytes_up = 0
+            self.bytes_down = 0
+
+    def close(self) -> None:
+        """Stop accepting connections."""
+        self._listener.close()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                client, _ = self._listener.accept()
+            except OSError:
+                return
+            server = socket.create_connection(self._target)
+            for sock in (client, server):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._forward(client, server, up=True)
+            self._forward(server, client, up=False)
+
+    def _forward(self, src: socket.socket, dst: socket.socket, up: bool) -> None:
+        chunks: "queue.SimpleQueue[Optional[Tuple[float, bytes]]]" = queue.SimpleQueue()
+
+        def read() -> None:
+            while True:
+                try:
+                    data = src.recv(CHUNK_SIZE)
+                except OSError:
+                    data = b""
+                if not data:
+                    chunks.put(None)
+                    return
+                with self._lock:
+                    if up:
+                        self.bytes_up += len(data)
+                    else:
+                        self.bytes_down += len(data)
+                chunks.put((time.perf_counter(), data))
+
+        def write() -> None:
+            link_free = 0.0
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                arrived, data = chunk
+                sent = max(arrived, link_free)
+                if self._bandwidth:
+                    sent += len(data) / self._bandwidth
+                link_free = sent
+                wait = sent + self._delay - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+                try:
+                    dst.sendall(data)
+                except OSError:
+                    break
+            try:
+                dst.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+        threading.Thread(target=read, daemon=True).start()
+        threading.Thread(target=write, daemon=True).start()
+
+
+def fill(repository: InMemoryUserRepository, users: int) -> None:
+    """Store ``users`` users with names drawn from short lists."""
+    repository.restore(
+        example_service_pb2.User(
+            id=i + 1,
+            name=NAMES[i % len(NAMES)],
+            surname=SURNAMES[i * 3 % len(SURNAMES)],
+            email=f"{NAMES[i % len(NAMES)].lower()}.{i}@example.com",
+            created_at=CREATED_AT_BASE + i,
+            updated_at=CREATED_AT_BASE + i,
+        )
+        for i in range(users)
+    )
+
+
+def make_workloads(
+    stub: example_service_pb2_grpc.ExampleServiceStub, users: int
+) -> Dict[str, Callable[[int], None]]:
+    """Return the measured calls, each taking the index of the call."""
+    pages = max(1, users // PAGE_SIZE)
+
+    def list_users(i: int) -> None:
+        stub.ListUsers(
+            example_service_pb2.ListUsersRequest(
+                page=i % pages + 1, page_size=PAGE_SIZE
+            )
+        )
+
+    def search_users(i: int) -> None:
+        stub.SearchUsers(
+            example_service_pb2.SearchUsersRequest(
+                name_prefix=NAMES[i % len(NAMES)][:2], page_size=PAGE_SIZE
+            )
+        )
+
+    def stream_users(i: int) -> None:
+        for _ in stub.StreamUsers(
+            example_service_pb2.StreamUsersRequest(batch_size=STREAM_BATCH_SIZE)
+        ):
+            pass
+
+    return {"list": list_users, "search": search_users, "stream": stream_users}
+
+
+def measure(
+    preset: str,
+    repository: InMemoryUserRepository,
+    args: argparse.Namespace,
+) -> List[Tuple[str, float, float, float, float]]:
+    """Return (call, bytes down, bytes up, p50 ms, mean ms) per workload."""
+    config = ServerConfig.from_args(
+        [
+            "--transport-preset",
+            preset,
+            "--metrics-port",
+            "0",
+            "--response-cache-bytes",
+            "0",
+            "--concurrency-limit",
+            "off",
+        ]
+    )
+    server, address = start_server(
+        build_interceptors(config),
+        ExampleServiceServicer(repository),
+        options=server_options(config),
+    )
+    proxy = WireProxy(
+        address,
+        delay=args.rtt_ms / 2000.0,
+        bandwidth=args.bandwidth_mbps * 1e6 / 8,
+    )
+    results = []
+    try:
+        with grpc.insecure_channel(proxy.address) as channel:
+            stub = example_service_pb2_grpc.ExampleServiceStub(channel)
+            workloads = make_workloads(stub, args.users)
+            for name in args.calls_to_measure.split(","):
+                call = workloads[name]
+                for i in range(WARMUP_CALLS):
+                    call(i)
+                proxy.reset()
+                latencies = []
+                for i in range(args.calls):
+                    start = time.perf_counter()
+                    call(i)
+                    latencies.append(time.perf_counter() - start)
+                results.append(
+                    (
+                        name,
+                        proxy.bytes_down / args.calls,
+                        proxy.bytes_up / args.calls,
+                        statistics.median(latencies) * 1000,
+                        statistics.fmean(latencies) * 1000,
+                    )
+                )
+    finally:
+        proxy.close()
+        server.stop(None)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--calls", type=int, default=50, help="Calls per workload")
+    parser.add_argument(
+        "--presets",
+        default=",".join(TRANSPORT_PRESETS),
+        help="Comma separated transport presets to measure",
+    )
+    parser.add_argument(
+        "--calls-to-measure",
+        default="list,search,stream",
+        help="Comma separated workloads: list, search, stream",
+    )
+    parser.add_argument(
+        "--rtt-ms", type=float, default=0.0, help="Round trip time added by the proxy"
+    )
+    parser.add_argument(
+        "--bandwidth-mbps",
+        type=float,
+        default=0.0,
+        help="Throughput cap of the proxy in Mbit/s, 0 for none",
+    )
+    args = parser.parse_args()
+
+    repository = InMemoryUserRepository()
+    fill(repository, args.users)
+
+    print(
+        f"{args.users} users, rtt {args.rtt_ms:g} ms, "
+        f"bandwidth {args.bandwidth_mbps or 'unlimited'} Mbit/s"
+    )
+    print(
+        f"{'preset':<10} {'call':<8} {'bytes down':>12} {'bytes up':>10} "
+        f"{'p50 ms':>9} {'mean ms':>9}"
+    )
+    for preset in args.presets.split(","):
+        for name, down, up, p50, mean in measure(preset, repository, args):
+            print(
+                f"{preset:<10} {name:<8} {down:>12,.0f} {up:>10,.0f} "
+                f"{p50:>9.2f} {mean:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
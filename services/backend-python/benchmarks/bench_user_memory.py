@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""Measure memory per stored user and read latency of the in-process stores.
+
+Each store is filled with ``--users`` users in a fresh process, so earlier
+runs do not skew its memory figures. Memory per user is the growth of the
+process's resident set size during the fill divided by the user count; it
+includes everything the store keeps alive - ``User`` messages, strings,
+dict and index entries, or the columns and arena of the columnar store.
+
+The stores build their search indexes on the first search, unless the
+server runs with ``--search-indexes``; ``search bytes/user`` is the
+further growth once a search has built them.
+
+``get µs`` is the mean ``get`` of a random stored ID, which for the
+columnar store includes parsing the ``User`` message.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import time
+from typing import Dict, Tuple
+
+FILL_BATCH_SIZE = 1000
+GET_SAMPLES = 100000
+
+
+def resident_bytes() -> int:
+    """Return the current resident set size of this process."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # Peak rather than current size; kilobytes on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure(store: str, users: int) -> Tuple[float, float, float]:
+    """Fill ``store`` with ``users`` users.
+
+    Returns:
+        Bytes per user, bytes per user of the search indexes, and get µs
+    """
+    # Setup protovalidate module aliases BEFORE importing proto files
+    from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+    from src.repositories import (
+        ColumnarUserRepository,
+        InMemoryUserRepository,
+        ShardedUserRepository,
+    )
+    from src.repositories.search import UserQuery
+
+    factories = {
+        "memory": InMemoryUserRepository,
+        "sharded": ShardedUserRepository,
+        "columnar": ColumnarUserRepository,
+    }
+    before = resident_bytes()
+    repository = factories[store]()
+    for first in range(0, users, FILL_BATCH_SIZE):
+        repository.create_many(
+            [
+                (f"User {i}", f"user{i}@example.com", f"Surname {i}")
+                for i in range(first, min(users, first + FILL_BATCH_SIZE))
+            ]
+        )
+    filled = resident_bytes()
+    per_user = (filled - before) / users
+    repository.search(UserQuery(name_prefix="User"), 1)
+    search_per_user = (resident_bytes() - filled) / users
+
+    ids = [user.id for user in repository.page(0, users).users]
+    sample = [random.choice(ids) for _ in range(GET_SAMPLES)]
+    start = time.perf_counter()
+    for user_id in sample:
+        repository.get(user_id)
+    get = (time.perf_counter() - start) / GET_SAMPLES
+    return per_user, search_per_user, get
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--users",
+        default="100000,1000000",
+        help="Comma separated store sizes to measure at",
+    )
+    parser.add_argument(
+        "--stores",
+        default="memory,sharded,columnar",
+        help="Comma separated stores to measure",
+    )
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    print(
+        f"{'store':<10} {'users':>10} {'bytes/user':>11} {'total MiB':>10} "
+        f"{'search bytes/user':>17} {'get µs':>8}"
+    )
+    for users in (int(u) for u in args.users.split(",")):
+        results: Dict[str, Tuple[float, float, float]] = {}
+        for store in args.stores.split(","):
+            with ctx.Pool(1) as pool:
+                results[store] = pool.apply(measure, (store, users))
+        for store, (per_user, search_per_user, get) in results.items():
+            print(
+                f"{store:<10} {users:>10} {per_user:>11.0f} "
+                f"{per_user * users / 2**20:>10.1f} {search_per_user:>17.0f} "
+                f"{get * 1e6:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Measure CreateUser latency of the in-memory repository as it grows.
+
+Each round fills a fresh repository up to the target size and then times
+individual ``create`` calls on top of it. With the email index the per-call
+latency should stay flat from thousands to millions of stored users.
+"""
+
+import argparse
+import statistics
+import time
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from src.repositories import InMemoryUserRepository
+
+
+def fill(repository: InMemoryUserRepository, count: int) -> None:
+    """Create ``count`` users with unique emails."""
+    for i in range(count):
+        repository.create(name=f"User {i}", email=f"user{i}@example.com")
+
+
+def measure_creates(repository: InMemoryUserRepository, samples: int) -> list:
+    """Time ``samples`` creates individually, returning seconds per call."""
+    timings = []
+    for i in range(samples):
+        email = f"bench{i}@example.com"
+        start = time.perf_counter()
+        repository.create(name="Bench User", email=email)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes",
+        default="1000,10000,100000,1000000",
+        help="Comma separated store sizes to measure at",
+    )
+    parser.add_argument(
+        "--samples", type=int, default=10000, help="Timed creates per size"
+    )
+    args = parser.parse_args()
+
+    print(f"{'users':>10} {'mean µs':>10} {'p50 µs':>10} {'p99 µs':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        repository = InMemoryUserRepository()
+        fill(repository, size)
+        timings = sorted(measure_creates(repository, args.samples))
+        p50 = timings[len(timings) // 2]
+        p99 = timings[int(len(timings) * 0.99)]
+        print(
+            f"{size:>10} {statistics.fmean(timings) * 1e6:>10.2f} "
+            f"{p50 * 1e6:>10.2f} {p99 * 1e6:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""Measure what WatchUsers subscribers cost writers and how fast they hear.
+
+An in-process server is watched by 0, 1, 10 and 100 (``--watchers``)
+WatchUsers streams, each read by its own client thread. ``--creates``
+CreateUser calls are then made one after another and the report shows,
+per watcher count:
+
+* ``create p50/p99``: CreateUser latency, which includes queueing the
+  change for every watcher
+* ``deliver p50/p99``: time from sending a CreateUser call until the last
+  watcher received the change
+* ``dropped``: watchers dropped for falling behind
+
+The server gets one worker thread per watcher on top of ``--max-workers``,
+since a sync WatchUsers call holds its thread for as long as it runs.
+"""
+
+import argparse
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import grpc
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from benchmarks.common import percentile, start_server
+from proto_generated import example_service_pb2, example_service_pb2_grpc
+from src.api.example_service import ExampleServiceServicer
+from src.utils.change_feed import ChangeFeed
+
+
+def watch(
+    stub: example_service_pb2_grpc.ExampleServiceStub,
+    started: threading.Barrier,
+    received: Dict[int, Tuple[int, float]],
+    arrived: threading.Condition,
+    streams: List[grpc.Future],
+) -> None:
+    """Read a WatchUsers stream, counting arrivals per user ID.
+
+    ``received`` maps each user ID to the watchers that got it so far and
+    when the latest of them did.
+    """
+    stream = stub.WatchUsers(example_service_pb2.WatchUsersRequest())
+    streams.append(stream)
+    try:
+        next(stream)
+        started.wait()
+        for response in stream:
+            now = time.perf_counter()
+            with arrived:
+                for change in response.changes:
+                    count, _ = received.get(change.user.id, (0, now))
+                    received[change.user.id] = (count + 1, now)
+                arrived.notify_all()
+    except grpc.RpcError as e:
+        if e.code() != grpc.StatusCode.CANCELLED:
+            raise
+
+
+def run(watchers: int, creates: int, max_workers: int) -> None:
+    changes: ChangeFeed[Tuple[int, bytes]] = ChangeFeed()
+    servicer = ExampleServiceServicer(changes=changes)
+    server, address = start_server(
+        servicer=servicer, max_workers=max_workers + watchers
+    )
+    received: Dict[int, Tuple[int, float]] = {}
+    arrived = threading.Condition()
+    streams: List[grpc.Future] = []
+    started = threading.Barrier(watchers + 1)
+    try:
+        with grpc.insecure_channel(address) as channel:
+            stub = example_service_pb2_grpc.ExampleServiceStub(channel)
+            threads = [
+                threading.Thread(
+                    target=watch, args=(stub, started, received, arrived, streams)
+                )
+                for _ in range(watchers)
+            ]
+            for thread in threads:
+                thread.start()
+            started.wait()
+
+            sent: Dict[int, float] = {}
+            create_times: List[float] = []
+            for i in range(creates):
+                request = example_service_pb2.CreateUserRequest(
+                    name="Watch Bench", email=f"watch{i}@example.com"
+                )
+                start = time.perf_counter()
+                response = stub.CreateUser(request)
+                create_times.append(time.perf_counter() - start)
+                sent[response.user.id] = start
+
+            last = response.user.id
+            with arrived:
+                arrived.wait_for(
+                    lambda: received.get(last, (0, 0.0))[0] >= watchers, timeout=60
+                )
+            for stream in streams:
+                stream.cancel()
+            for thread in threads:
+                thread.join()
+    finally:
+        server.stop(None)
+
+    create_times.sort()
+    deliver = sorted(
+        received[user_id][1] - start
+        for user_id, start in sent.items()
+        if user_id in received and received[user_id][0] == watchers
+    )
+    deliver_p50 = f"{percentile(deliver, 0.5) * 1e3:.2f}" if deliver else "-"
+    deliver_p99 = f"{percentile(deliver, 0.99) * 1e3:.2f}" if deliver else "-"
+    print(
+        f"{watchers:>8} {percentile(create_times, 0.5) * 1e3:>10.2f} "
+        f"{percentile(create_times, 0.99) * 1e3:>10.2f} "
+        f"{deliver_p50:>11} {deliver_p99:>11} {changes.dropped:>8}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--watchers",
+        default="0,1,10,100",
+        help="Comma separated numbers of watchers to measure",
+    )
+    parser.add_argument("--creates", type=int, default=500, help="CreateUser calls")
+    parser.add_argument("--max-workers", type=int, default=10)
+    args = parser.parse_args()
+
+    print(
+        f"{'watchers':>8} {'create p50':>10} {'create p99':>10} "
+        f"{'deliver p50':>11} {'deliver p99':>11} {'dropped':>8}"
+    )
+    for watchers in (int(n) for n in args.watchers.split(",")):
+        run(watchers, args.creates, args.max_workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Shared helpers for the benchmark scripts."""
+
+import itertools
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent import futures
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+import grpc
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2, example_service_pb2_grpc
+from src.api.encoded_responses import EXAMPLE_SERVICE, add_servicer_to_server
+from src.api.example_service import ExampleServiceServicer
+
+
+def start_server(
+    interceptors: Sequence[grpc.ServerInterceptor] = (),
+    servicer: Optional[ExampleServiceServicer] = None,
+    max_workers: int = 10,
+    options: Sequence[Tuple[str, Any]] = (),
+) -> Tuple[grpc.Server, str]:
+    """Start an in-process ExampleService server on a free local port.
+
+    Returns:
+        The started server and the ``host:port`` address it listens on
+    """
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        interceptors=list(interceptors),
+        options=list(options),
+    )
+    add_servicer_to_server(
+        EXAMPLE_SERVICE,
+        servicer or ExampleServiceServicer(),
+        server,
+    )
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    return server, f"127.0.0.1:{port}"
+
+
+def make_calls(
+    stub: example_service_pb2_grpc.ExampleServiceStub,
+) -> dict:
+    """Return one zero-argument callable per ExampleService method."""
+    emails = itertools.count()
+    get_request = example_service_pb2.GetUserRequest(user_id=1)
+    list_request = example_service_pb2.ListUsersRequest(page=1, page_size=10)
+
+    def create_user() -> None:
+        stub.CreateUser(
+            example_service_pb2.CreateUserRequest(
+                name="Bench User", email=f"bench{next(emails)}@example.com"
+            )
+        )
+
+    return {
+        "GetUser": lambda: stub.GetUser(get_request),
+        "CreateUser": create_user,
+        "ListUsers": lambda: stub.ListUsers(list_request),
+    }
+
+
+def measure_throughput(
+    call: Callable[[], object], threads: int, duration: float
+) -> float:
+    """Run ``call`` from ``threads`` threads for ``duration`` seconds.
+
+    Returns:
+        Completed calls per second
+    """
+    deadline = time.perf_counter() + duration
+    counts = [0] * threads
+
+    def worker(index: int) -> None:
+        done = 0
+        while time.perf_counter() < deadline:
+            call()
+            done += 1
+        counts[index] = done
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return sum(counts) / (time.perf_counter() - start)
+
+
+def free_port() -> int:
+    """Return a TCP port on localhost that is currently free."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        port: int = sock.getsockname()[1]
+        return port
+
+
+def spawn_server(
+    args: Sequence[str], address: str, timeout: float = 15.0
+) -> subprocess.Popen:
+    """Run ``python -m src.main`` with ``args`` and wait until it accepts calls.
+
+    The server's output goes to this process's stderr.
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.main", *args],
+        stdout=subprocess.DEVNULL,
+    )
+    with grpc.insecure_channel(address) as channel:
+        try:
+            grpc.channel_ready_future(channel).result(timeout=timeout)
+        except grpc.FutureTimeoutError:
+            process.kill()
+            raise RuntimeError(f"Server did not start listening on {address}")
+    return process
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    """Ask a spawned server to shut down and wait for it."""
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Return the value at ``fraction`` (0..1) of an ascending sequence."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
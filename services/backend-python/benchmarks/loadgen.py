@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""Load generator reporting ExampleService throughput and tail latency.
+
+Drives a weighted mix of GetUser, CreateUser and ListUsers calls with
+``--concurrency`` calls in flight at all times, spread over a pool of
+``--channels`` connections, against one of:
+
+* ``subprocess`` - ``python -m src.main`` started on a free port (default)
+* ``inprocess``  - a sync server with the production interceptor chain,
+                   running in this process; client and server then share
+                   one GIL, so compare in-process results only with each
+                   other
+* ``external``   - an already running server at ``--target``
+
+``--server-args`` is passed to the server's command line (or to
+``ServerConfig`` in-process), e.g. ``--server-args="--mode aio --workers 4"``.
+Before measuring, ``--preload`` users are created through BulkCreateUsers
+and calls run for ``--warmup`` seconds without being recorded. The result
+is printed as JSON, overall and per method, with req/s and p50/p95/p99/p999
+latencies in milliseconds, so runs can be diffed across commits::
+
+    python -m benchmarks.loadgen --mix GetUser=80,ListUsers=15,CreateUser=5 \\
+        --concurrency 200 --duration 30 --output before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import grpc
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from benchmarks.common import free_port, percentile, spawn_server, stop_server
+from proto_generated import example_service_pb2, example_service_pb2_grpc
+
+METHODS = ("GetUser", "CreateUser", "ListUsers")
+PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99), ("p999", 0.999))
+
+Stub = example_service_pb2_grpc.ExampleServiceStub
+CallFactory = Callable[[Stub, random.Random], Any]
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """Parse ``GetUser=80,ListUsers=20`` into method weights."""
+    mix: Dict[str, float] = {}
+    for part in text.split(","):
+        method, _, weight = part.partition("=")
+        method = method.strip()
+        if method not in METHODS:
+            raise argparse.ArgumentTypeError(
+                f"unknown method {method!r}, expected one of {', '.join(METHODS)}"
+            )
+        mix[method] = float(weight) if weight else 1.0
+    if not any(weight > 0 for weight in mix.values()):
+        raise argparse.ArgumentTypeError("the mix needs a positive weight")
+    return mix
+
+
+def build_calls(
+    user_ids: int, list_pages: int, page_size: int
+) -> Dict[str, CallFactory]:
+    """Return a function per method that starts one call on a stub.
+
+    GetUser asks for a random ID in ``1..user_ids``, ListUsers for one of
+    the first ``list_pages`` pages and CreateUser for a new unique email.
+    """
+    run_id = uuid.uuid4().hex[:8]
+    counter = iter(range(sys.maxsize))
+
+    def get_user(stub: Stub, rng: random.Random) -> Any:
+        return stub.GetUser(
+            example_service_pb2.GetUserRequest(user_id=rng.randint(1, user_ids))
+        )
+
+    def create_user(stub: Stub, rng: random.Random) -> Any:
+        return stub.CreateUser(
+            example_service_pb2.CreateUserRequest(
+                name="Load User", email=f"load-{run_id}-{next(counter)}@example.com"
+            )
+        )
+
+    def list_users(stub: Stub, rng: random.Random) -> Any:
+        return stub.ListUsers(
+            example_service_pb2.ListUsersRequest(
+                page=rng.randint(1, list_pages), page_size=page_size
+            )
+        )
+
+    return {"GetUser": get_user, "CreateUser": create_user, "ListUsers": list_users}
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Build the JSON summary for one set of call latencies in seconds."""
+    latencies.sort()
+    summary: Dict[str, Any] = {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+    latency_ms = {
+        name: round(percentile(latencies, fraction) * 1e3, 3)
+        for name, fraction in PERCENTILES
+    }
+    latency_ms["max"] = round(latencies[-1] * 1e3, 3) if latencies else 0.0
+    latency_ms["mean"] = (
+        round(sum(latencies) / len(latencies) * 1e3, 3) if latencies else 0.0
+    )
+    summary["latency_ms"] = latency_ms
+    return summary
+
+
+async def preload(address: str, users: int) -> None:
+    """Create ``users`` users in one BulkCreateUsers stream."""
+    run_id = uuid.uuid4().hex[:8]
+    async with grpc.aio.insecure_channel(address) as channel:
+        stub = example_service_pb2_grpc.ExampleServiceStub(channel)
+        await stub.BulkCreateUsers(
+            example_service_pb2.CreateUserRequest(
+                name=f"Preloaded {i}", email=f"preload-{run_id}-{i}@example.com"
+            )
+            for i in range(users)
+        )
+
+
+async def drive(
+    address: str,
+    calls: Dict[str, CallFactory],
+    mix: Dict[str, float],
+    concurrency: int,
+    channels: int,
+    warmup: float,
+    duration: float,
+    seed: int,
+) -> Dict[str, Any]:
+    """Run the load and return the JSON summary."""
+    pool = [grpc.aio.insecure_channel(address) for _ in range(channels)]
+    stubs = [example_service_pb2_grpc.ExampleServiceStub(channel) for channel in pool]
+    methods = [method for method, weight in mix.items() if weight > 0]
+    weights = [mix[method] for method in methods]
+    latencies: Dict[str, List[float]] = {method: [] for method in methods}
+    errors: Dict[str, int] = {method: 0 for method in methods}
+    error_codes: Dict[str, int] = {}
+
+    start = time.perf_counter()
+    record_from = start + warmup
+    stop_at = record_from + duration
+
+    async def worker(index: int) -> None:
+        stub = stubs[index % channels]
+        rng = random.Random(seed + index)
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            method = rng.choices(methods, weights)[0]
+            try:
+                await calls[method](stub, rng)
+            except grpc.aio.AioRpcError as e:
+                if now >= record_from:
+                    errors[method] += 1
+                    code = e.code().name
+                    error_codes[code] = error_codes.get(code, 0) + 1
+                continue
+            if now >= record_from:
+                latencies[method].append(time.perf_counter() - now)
+
+    try:
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    finally:
+        for channel in pool:
+            await channel.close()
+    elapsed = time.perf_counter() - record_from
+
+    result = summarize(
+        [latency for values in latencies.values() for latency in values],
+        sum(errors.values()),
+        elapsed,
+    )
+    result["error_codes"] = error_codes
+    result["methods"] = {
+        method: summarize(latencies[method], errors[method], elapsed)
+        for method in methods
+    }
+    return result
+
+
+def start_inprocess(server_args: Sequence[str]) -> Tuple[grpc.Server, str]:
+    """Start a sync server configured from ``server_args`` in this process."""
+    from concurrent import futures
+
+    from src.api.encoded_responses import EXAMPLE_SERVICE, add_servicer_to_server
+    from src.api.example_service import ExampleServiceServicer
+    from src.config import ServerConfig
+    from src.main import (
+        build_interceptors,
+        build_repository,
+        build_response_cache,
+        server_options,
+    )
+
+    config = ServerConfig.from_args(list(server_args))
+    if config.mode != "sync" or config.workers != 1:
+        raise SystemExit("--server inprocess supports a single sync server only")
+
+    server = grpc.server(
+        futures.ThreadPoolExecutor(max_workers=config.max_workers),
+        interceptors=build_interceptors(config, build_response_cache(config)),
+        options=server_options(config),
+    )
+    add_servicer_to_server(
+        EXAMPLE_SERVICE,
+        ExampleServiceServicer(build_repository(config)),
+        server,
+    )
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    return server, f"127.0.0.1:{port}"
+
+
+def git_commit() -> Optional[str]:
+    """Return the checked out commit, to tell results of different trees apart."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--server",
+        choices=("subprocess", "inprocess", "external"),
+        default="subprocess",
+    )
+    parser.add_argument(
+        "--target", help="host:port of the server with --server external"
+    )
+    parser.add_argument(
+        "--server-args", default="", help="Command-line flags for the server"
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=parse_mix("GetUser=80,ListUsers=15,CreateUser=5"),
+        help="Weighted method mix (default GetUser=80,ListUsers=15,CreateUser=5)",
+    )
+    parser.add_argument("--concurrency", type=int, default=100, help="Calls in flight")
+    parser.add_argument("--channels", type=int, default=4, help="Pooled connections")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured seconds")
+    parser.add_argument(
+        "--warmup", type=float, default=2.0, help="Unmeasured seconds first"
+    )
+    parser.add_argument(
+        "--preload", type=int, default=1000, help="Users created before the run"
+    )
+    parser.add_argument(
+        "--list-pages", type=int, default=3, help="ListUsers pages to spread over"
+    )
+    parser.add_argument("--page-size", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON result to this file as well")
+    args = parser.parse_args()
+
+    server_args = shlex.split(args.server_args)
+    process: Optional[subprocess.Popen] = None
+    server: Optional[grpc.Server] = None
+    if args.server == "external":
+        if not args.target:
+            parser.error("--server external needs --target")
+        address = args.target
+    elif args.server == "inprocess":
+        server, address = start_inprocess(server_args)
+    else:
+        address = f"127.0.0.1:{free_port()}"
+        process = spawn_server([*server_args, "--listen-addr", address], address)
+
+    try:
+        if args.preload:
+            asyncio.run(preload(address, args.preload))
+        calls = build_calls(args.preload + 2, args.list_pages, args.page_size)
+        result = asyncio.run(
+            drive(
+                address,
+                calls,
+                args.mix,
+                args.concurrency,
+                args.channels,
+                args.warmup,
+                args.duration,
+                args.seed,
+            )
+        )
+    finally:
+        if process is not None:
+            stop_server(process)
+        if server is not None:
+            server.stop(None)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": int(time.time()),
+        "config": {
+            "server": args.server,
+            "server_args": server_args,
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "channels": args.channels,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "preload": args.preload,
+            "cpus": os.cpu_count(),
+        },
+        **result,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
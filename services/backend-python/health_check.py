@@ -1,42 +1,51 @@
 #!/usr/bin/env python3
-"""Health check script for the gRPC server."""
+"""Health check script for the gRPC server.
 
-import grpc
+Asks the standard ``grpc.health.v1.Health`` service for the server's
+status. The check is a lookup on the server, so it is cheap enough for
+frequent liveness and readiness probes. Exits with 0 when the server (or
+``--service``) is SERVING and 1 otherwise, including while it drains.
+"""
+
+import argparse
 import sys
-import time
 
-from proto_generated import example_service_pb2
-from proto_generated import example_service_pb2_grpc
+import grpc
+
+from proto_generated import health_pb2, health_pb2_grpc
 
 
-def health_check():
-    """Perform a simple health check on the gRPC server."""
+def health_check(target: str, service: str = "", timeout: float = 5.0) -> bool:
+    """Return True if ``service`` at ``target`` reports SERVING."""
     try:
-        # Create channel with timeout
-        channel = grpc.insecure_channel('localhost:50051')
-        
-        # Wait for channel to be ready (with timeout)
-        grpc.channel_ready_future(channel).result(timeout=5)
-        
-        # Try a simple request
-        stub = example_service_pb2_grpc.ExampleServiceStub(channel)
-        request = example_service_pb2.ListUsersRequest(page=1, page_size=1)
-        response = stub.ListUsers(request, timeout=5)
-        
-        print("✅ gRPC server is healthy")
-        print(f"📊 Server has {response.total_count} users")
-        channel.close()
-        return True
-        
+        with grpc.insecure_channel(target) as channel:
+            stub = health_pb2_grpc.HealthStub(channel)
+            response = stub.Check(
+                health_pb2.HealthCheckRequest(service=service),
+                timeout=timeout,
+                wait_for_ready=True,
+            )
     except grpc.RpcError as e:
         print(f"❌ gRPC server error: {e.code()} - {e.details()}")
         return False
-    except Exception as e:
-        print(f"❌ Health check failed: {e}")
+
+    status = health_pb2.HealthCheckResponse.ServingStatus.Name(response.status)
+    if response.status != health_pb2.HealthCheckResponse.SERVING:
+        print(f"❌ gRPC server is {status}")
         return False
+    print("✅ gRPC server is healthy")
+    return True
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", default="localhost:50051", help="Server address")
+    parser.add_argument(
+        "--service", default="", help="Service to check, the whole server if empty"
+    )
+    parser.add_argument("--timeout", type=float, default=5.0, help="Seconds to wait")
+    args = parser.parse_args()
+
     print("🏥 Checking gRPC server health...")
-    success = health_check()
-    sys.exit(0 if success else 1)
\ No newline at end of file
+    success = health_check(args.target, args.service, args.timeout)
+    sys.exit(0 if success else 1)
@@ -1 +1 @@
-"""API module for gRPC services."""
\ No newline at end of file
+"""API module for gRPC services."""
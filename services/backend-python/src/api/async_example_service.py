@@ -0,0 +1,185 @@
+"""Asyncio implementation of the example gRPC service for grpc.aio servers."""
+
+import asyncio
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable, List, Optional, TypeVar, Union
+
+import grpc
+
+# Import generated gRPC code
+from proto_generated import example_service_pb2, example_service_pb2_grpc
+from src.api.example_service import (
+    BULK_CREATE_MAX_REQUESTS,
+    WATCH_BATCH_SIZE,
+    WATCH_CLOSED,
+    WATCH_UNAVAILABLE,
+    ExampleServiceServicer,
+)
+from src.repositories import RepositoryError
+from src.utils.change_feed import SubscriberLimitError
+from src.utils.log_pipeline import request_logger
+
+# Logs a record per call
+logger = request_logger(__name__)
+
+# What next() returns once StreamUsers has scanned every user; never sent
+_STREAM_END = example_service_pb2.StreamUsersResponse()
+
+T = TypeVar("T")
+
+
+class AsyncExampleServiceServicer(example_service_pb2_grpc.ExampleServiceServicer):
+    """Coroutine-based ExampleService for ``grpc.aio`` servers.
+
+    Request handling is delegated to an ``ExampleServiceServicer`` so both
+    server modes share one implementation. The in-memory repository never
+    blocks, so its methods run directly on the event loop. Repositories
+    marked ``blocking`` (SQL, the shared store) run on ``executor`` instead,
+    keeping the loop free while they wait on I/O. ``context`` is a
+    ``grpc.aio.ServicerContext``, whose ``set_code``/``set_details`` are
+    plain methods just like in the sync API.
+    """
+
+    def __init__(
+        self,
+        servicer: Optional[ExampleServiceServicer] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self._servicer = servicer or ExampleServiceServicer()
+        self._executor = executor
+        self._blocking = self._servicer.repository.blocking
+
+    async def _run(self, function: Callable[..., T], *args: object) -> T:
+        """Call ``function``, off the event loop if the repository blocks."""
+        if not self._blocking:
+            return function(*args)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    async def GetUser(
+        self,
+        request: example_service_pb2.GetUserRequest,
+        context: grpc.aio.ServicerContext,
+    ) -> Union[example_service_pb2.GetUserResponse, bytes]:
+        """Get a user by ID."""
+        return await self._run(self._servicer.GetUser, request, context)
+
+    async def CreateUser(
+        self,
+        request: example_service_pb2.CreateUserRequest,
+        context: grpc.aio.ServicerContext,
+    ) -> example_service_pb2.CreateUserResponse:
+        """Create a new user."""
+        return await self._run(self._servicer.CreateUser, request, context)
+
+    async def ListUsers(
+        self,
+        request: example_service_pb2.ListUsersRequest,
+        context: grpc.aio.ServicerContext,
+    ) -> Union[example_service_pb2.ListUsersResponse, bytes]:
+        """List users with pagination."""
+        return await self._run(self._servicer.ListUsers, request, context)
+
+    async def SearchUsers(
+        self,
+        request: example_service_pb2.SearchUsersRequest,
+        context: grpc.aio.ServicerContext,
+    ) -> example_service_pb2.SearchUsersResponse:
+        """Search users by the request filters, a page at a time."""
+        return await self._run(self._servicer.SearchUsers, request, context)
+
+    async def BatchGetUsers(
+        self,
+        request: example_service_pb2.BatchGetUsersRequest,
+        context: grpc.aio.ServicerContext,
+    ) -> example_service_pb2.BatchGetUsersResponse:
+        """Get several users by ID in one call."""
+        return await self._run(self._servicer.BatchGetUsers, request, context)
+
+    async def BulkCreateUsers(
+        self,
+        request_iterator: AsyncIterator[example_service_pb2.CreateUserRequest],
+        context: grpc.aio.ServicerContext,
+    ) -> example_service_pb2.BulkCreateUsersResponse:
+        """Create users from a client stream of CreateUser requests."""
+        logger.info("BulkCreateUsers called")
+        # Every request is validated before any user is created; read one
+        # past the limit, as the sync servicer does, to refuse larger calls
+        requests: List[example_service_pb2.CreateUserRequest] = []
+        async for request in request_iterator:
+            requests.append(request)
+            if len(requests) > BULK_CREATE_MAX_REQUESTS:
+                break
+        return await self._run(self._servicer.bulk_create_users, requests, context)
+
+    async def StreamUsers(
+        self,
+        request: example_service_pb2.StreamUsersRequest,
+        context: grpc.aio.ServicerContext,
+    ) -> AsyncIterator[example_service_pb2.StreamUsersResponse]:
+        """Stream users matching the request filters in batches."""
+        logger.info(
+            "StreamUsers called with batch_size: %d, after_id: %d",
+            request.batch_size,
+            request.after_id,
+        )
+        # Each yield suspends until the response is written, so a cancelled
+        # or slow client stops or throttles the scan.
+        batches = self._servicer.stream_user_batches(request)
+        while True:
+            try:
+                response = await self._run(next, batches, _STREAM_END)
+            except RepositoryError as e:
+                await context.abort(grpc.StatusCode.UNAVAILABLE, str(e))
+            if response is _STREAM_END:
+                return
+            if response is None:
+                # A chunk was scanned without filling a batch; let other
+                # calls run before scanning the next one
+                await asyncio.sleep(0)
+                continue
+            yield response
+
+    async def WatchUsers(
+        self,
+        request: example_service_pb2.WatchUsersRequest,
+        context: grpc.aio.ServicerContext,
+    ) -> AsyncIterator[bytes]:
+        """Stream user changes as they are published."""
+        logger.info("WatchUsers called with after_sequence: %d", request.after_sequence)
+        servicer = self._servicer
+        feed = servicer.changes
+        if feed is None:
+            await context.abort(grpc.StatusCode.UNIMPLEMENTED, WATCH_UNAVAILABLE)
+            return
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+
+        # Writers publish from the loop or from executor threads
+        def wake() -> None:
+            loop.call_soon_threadsafe(wakeup.set)
+
+        try:
+            subscription = servicer.subscribe_changes(request, wake)
+        except SubscriberLimitError as e:
+            await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+
+        # A cancelled call raises CancelledError out of the wait
+        try:
+            if not subscription.lagged:
+                yield servicer.watch_response(subscription, [])
+            while not subscription.lagged:
+                wakeup.clear()
+                changes = subscription.drain(WATCH_BATCH_SIZE)
+                if changes:
+                    yield servicer.watch_response(subscription, changes)
+                elif subscription.closed:
+                    break
+                else:
+                    await wakeup.wait()
+            if subscription.lagged:
+                yield servicer.watch_response(subscription, [], resync=True)
+            else:
+                await context.abort(grpc.StatusCode.UNAVAILABLE, WATCH_CLOSED)
+        finally:
+            feed.unsubscribe(subscription)
@@ -0,0 +1,147 @@
+"""Responses assembled from serialized users instead of built as messages.
+
+``GetUserResponse(user=user)`` copies the user into a new message and
+gRPC serializes the whole response again on every call. The repositories
+hand out users already serialized (see ``UserRepository.get_encoded``),
+so the servicer frames those bytes as a response directly; the handlers
+registered by ``add_servicer_to_server`` send such bytes unchanged.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+
+import grpc
+from google.protobuf.descriptor import ServiceDescriptor
+from google.protobuf.message_factory import GetMessageClass
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.utils.wire_format import encode_varint, field_tag, length_delimited
+
+_GET_USER_RESPONSE = example_service_pb2.GetUserResponse.DESCRIPTOR
+_LIST_USERS_RESPONSE = example_service_pb2.ListUsersResponse.DESCRIPTOR
+_USER_TAG = field_tag(_GET_USER_RESPONSE, "user")
+_USERS_TAG = field_tag(_LIST_USERS_RESPONSE, "users")
+_TOTAL_COUNT_TAG = field_tag(_LIST_USERS_RESPONSE, "total_count")
+_NEXT_PAGE_TOKEN_TAG = field_tag(_LIST_USERS_RESPONSE, "next_page_token")
+_USER_CHANGE = example_service_pb2.UserChange.DESCRIPTOR
+_CHANGE_SEQUENCE_TAG = field_tag(_USER_CHANGE, "sequence")
+_CHANGE_TYPE_TAG = field_tag(_USER_CHANGE, "type")
+_CHANGE_USER_TAG = field_tag(_USER_CHANGE, "user")
+_WATCH_USERS_RESPONSE = example_service_pb2.WatchUsersResponse.DESCRIPTOR
+_CHANGES_TAG = field_tag(_WATCH_USERS_RESPONSE, "changes")
+_SEQUENCE_TAG = field_tag(_WATCH_USERS_RESPONSE, "sequence")
+_FEED_ID_TAG = field_tag(_WATCH_USERS_RESPONSE, "feed_id")
+_RESYNC_TAG = field_tag(_WATCH_USERS_RESPONSE, "resync")
+
+EXAMPLE_SERVICE = example_service_pb2.DESCRIPTOR.services_by_name["ExampleService"]
+
+
+def encode_get_user_response(user: bytes) -> bytes:
+    """Return the serialized ``GetUserResponse`` holding serialized ``user``."""
+    return length_delimited(_USER_TAG, user)
+
+
+def encode_list_users_response(
+    users: List[bytes], total_count: int, next_page_token: str = ""
+) -> bytes:
+    """Return the serialized ``ListUsersResponse`` of serialized ``users``."""
+    parts: List[bytes] = []
+    for user in users:
+        parts += (_USERS_TAG, encode_varint(len(user)), user)
+    if total_count:
+        parts += (_TOTAL_COUNT_TAG, encode_varint(total_count))
+    if next_page_token:
+        parts.append(length_delimited(_NEXT_PAGE_TOKEN_TAG, next_page_token.encode()))
+    return b"".join(parts)
+
+
+def encode_user_change(sequence: int, change_type: int, user: bytes) -> bytes:
+    """Return the serialized ``UserChange`` of serialized ``user``."""
+    return b"".join(
+        (
+            _CHANGE_SEQUENCE_TAG,
+            encode_varint(sequence),
+            _CHANGE_TYPE_TAG,
+            encode_varint(change_type),
+            length_delimited(_CHANGE_USER_TAG, user),
+        )
+    )
+
+
+def encode_watch_users_response(
+    changes: List[bytes], sequence: int, feed_id: int, resync: bool = False
+) -> bytes:
+    """Return the serialized ``WatchUsersResponse`` of serialized ``changes``."""
+    parts: List[bytes] = []
+    for change in changes:
+        parts += (_CHANGES_TAG, encode_varint(len(change)), change)
+    if sequence:
+        parts += (_SEQUENCE_TAG, encode_varint(sequence))
+    parts += (_FEED_ID_TAG, encode_varint(feed_id))
+    if resync:
+        parts += (_RESYNC_TAG, encode_varint(1))
+    return b"".join(parts)
+
+
+def passthrough_serializer(
+    serialize: Optional[Callable[[Any], bytes]],
+) -> Callable[[Any], bytes]:
+    """Return ``serialize`` sending responses that are already ``bytes`` as is."""
+
+    def serializer(response: Any) -> bytes:
+        if type(response) is bytes or serialize is None:
+            return response  # type: ignore[no-any-return]
+        return serialize(response)
+
+    return serializer
+
+
+_HANDLER_FACTORIES = {
+    (False, False): grpc.unary_unary_rpc_method_handler,
+    (False, True): grpc.unary_stream_rpc_method_handler,
+    (True, False): grpc.stream_unary_rpc_method_handler,
+    (True, True): grpc.stream_stream_rpc_method_handler,
+}
+
+
+def method_handlers(
+    service: ServiceDescriptor, servicer: Any
+) -> Dict[str, grpc.RpcMethodHandler]:
+    """Return handlers of the methods of ``service`` that take encoded responses.
+
+    Built from the service descriptor the way a generated
+    ``add_*Servicer_to_server`` builds them, except that each response
+    serializer is wrapped by ``passthrough_serializer``, so any method of
+    ``servicer`` may return its response already serialized.
+    """
+    handlers = {}
+    for method in service.methods:
+        make_handler = _HANDLER_FACTORIES[
+            (method.client_streaming, method.server_streaming)
+        ]
+        handlers[method.name] = make_handler(
+            getattr(servicer, method.name),
+            request_deserializer=GetMessageClass(method.input_type).FromString,
+            response_serializer=passthrough_serializer(
+                GetMessageClass(method.output_type).SerializeToString
+            ),
+        )
+    return handlers
+
+
+def add_servicer_to_server(
+    service: ServiceDescriptor, servicer: Any, server: Any
+) -> None:
+    """Register ``servicer`` as the implementation of ``service`` on ``server``.
+
+    Takes the place of the generated ``add_*Servicer_to_server`` for
+    servicers returning encoded responses (see ``method_handlers``). Works
+    with ``grpc.server`` and ``grpc.aio.server`` alike.
+    """
+    handlers = method_handlers(service, servicer)
+    server.add_generic_rpc_handlers(
+        (grpc.method_handlers_generic_handler(service.full_name, handlers),)
+    )
+    server.add_registered_method_handlers(service.full_name, handlers)
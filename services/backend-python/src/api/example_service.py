@@ -1,103 +1,535 @@
 """Example gRPC service implementation."""
 
-import logging
-from typing import Iterator
+import threading
+from itertools import islice
+from typing import (
+    Callable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
 import grpc
-from concurrent import futures
 
 # Import generated gRPC code
-from proto_generated import example_service_pb2
-from proto_generated import example_service_pb2_grpc
+from proto_generated import example_service_pb2, example_service_pb2_grpc
+from src.api.encoded_responses import (
+    encode_get_user_response,
+    encode_list_users_response,
+    encode_user_change,
+    encode_watch_users_response,
+)
+from src.api.pagination import (
+    decode_page_token,
+    decode_search_token,
+    encode_page_token,
+    encode_search_token,
+)
+from src.repositories import (
+    EmailAlreadyExistsError,
+    InMemoryUserRepository,
+    RepositoryError,
+    UserChangeFeed,
+    UserQuery,
+    UserRepository,
+)
+from src.utils.change_feed import ChangeFeed, SubscriberLimitError, Subscription
+from src.utils.log_pipeline import request_logger
+
+# Logs a record per call
+logger = request_logger(__name__)
+
+# Users per StreamUsers message when the request leaves batch_size unset
+STREAM_DEFAULT_BATCH_SIZE = 100
+# Users read from the repository per lock acquisition while streaming
+STREAM_SCAN_CHUNK_SIZE = 1000
+# Streamed CreateUser requests written to the repository per batch
+BULK_CREATE_CHUNK_SIZE = 500
+# CreateUser requests one BulkCreateUsers call accepts; all of them are
+# held in memory until the stream ends
+BULK_CREATE_MAX_REQUESTS = 100000
+BULK_CREATE_TOO_MANY = (
+    f"BulkCreateUsers accepts at most {BULK_CREATE_MAX_REQUESTS} requests per call"
+)
+# Changes per WatchUsers message
+WATCH_BATCH_SIZE = 100
+# Details of WatchUsers calls without a feed, or ended by its closing
+WATCH_UNAVAILABLE = "WatchUsers is not available on this server"
+WATCH_CLOSED = "Server is shutting down; resume from the last sequence"
 
-logger = logging.getLogger(__name__)
+BulkCreateStatus = example_service_pb2.BulkCreateUserResult.Status
+UserChangeType = example_service_pb2.UserChange.Type
+UserChangeSubscription = Subscription[Tuple[int, bytes]]
 
 
 class ExampleServiceServicer(example_service_pb2_grpc.ExampleServiceServicer):
-    """Implementation of ExampleService gRPC service."""
+    """Implementation of ExampleService gRPC service.
+
+    ``GetUser``, ``ListUsers`` and ``WatchUsers`` answer with serialized
+    responses, so the servicer must be registered with
+    ``encoded_responses.add_servicer_to_server``.
+
+    Users created through this servicer are published to ``changes``, the
+    feed ``WatchUsers`` streams from, unless the repository publishes them
+    itself because other processes write to it too. Without
+    ``watch_users``, nothing is published and ``WatchUsers`` is
+    unimplemented.
+    """
 
-    def __init__(self):
-        # In-memory storage for demo purposes
-        self.users = {
-            1: example_service_pb2.User(
+    def __init__(
+        self,
+        repository: Optional[UserRepository] = None,
+        changes: Optional[UserChangeFeed] = None,
+        watch_users: bool = True,
+    ):
+        if repository is None:
+            # In-memory storage for demo purposes
+            repository = InMemoryUserRepository()
+            self.seed_demo_users(repository)
+        self.repository = repository
+        self.changes: Optional[UserChangeFeed] = None
+        # Feed the servicer publishes created users to, if the repository does not
+        self._publish_to: Optional[UserChangeFeed] = None
+        if watch_users:
+            self.changes = changes if changes is not None else ChangeFeed()
+            if not repository.publish_to(self.changes):
+                self._publish_to = self.changes
+
+    @staticmethod
+    def seed_demo_users(repository: UserRepository) -> None:
+        """Populate an empty repository with demo users."""
+        for user in (
+            example_service_pb2.User(
                 id=1,
                 name="John Doe",
                 email="john@example.com",
                 created_at=1640995200,  # 2022-01-01 timestamp
-                updated_at=1640995200
+                updated_at=1640995200,
             ),
-            2: example_service_pb2.User(
+            example_service_pb2.User(
                 id=2,
                 name="Jane Smith",
                 email="jane@example.com",
                 created_at=1640995200,
-                updated_at=1640995200
-            )
-        }
-        self.next_user_id = 3
-
-    def GetUser(self, request: example_service_pb2.GetUserRequest, context: grpc.ServicerContext) -> example_service_pb2.GetUserResponse:
-        """Get a user by ID."""
-        logger.info(f"GetUser called with user_id: {request.user_id}")
-        
-        user = self.users.get(request.user_id)
+                updated_at=1640995200,
+            ),
+        ):
+            repository.add(user)
+
+    def GetUser(
+        self, request: example_service_pb2.GetUserRequest, context: grpc.ServicerContext
+    ) -> Union[example_service_pb2.GetUserResponse, bytes]:
+        """Get a user by ID, as a serialized response."""
+        logger.info("GetUser called with user_id: %d", request.user_id)
+
+        try:
+            user = self.repository.get_encoded(request.user_id)
+        except RepositoryError as e:
+            _unavailable(context, e)
+            return example_service_pb2.GetUserResponse()
         if user is None:
             context.set_code(grpc.StatusCode.NOT_FOUND)
             context.set_details(f"User with ID {request.user_id} not found")
             return example_service_pb2.GetUserResponse()
-        
-        return example_service_pb2.GetUserResponse(user=user)
 
-    def CreateUser(self, request: example_service_pb2.CreateUserRequest, context: grpc.ServicerContext) -> example_service_pb2.CreateUserResponse:
+        return encode_get_user_response(user)
+
+    def CreateUser(
+        self,
+        request: example_service_pb2.CreateUserRequest,
+        context: grpc.ServicerContext,
+    ) -> example_service_pb2.CreateUserResponse:
         """Create a new user."""
-        logger.info(f"CreateUser called with name: {request.name}, email: {request.email}")
-        
-        # Validation is now handled by ValidationInterceptor
-        
-        # Check if email already exists
-        for user in self.users.values():
-            if user.email == request.email:
-                context.set_code(grpc.StatusCode.ALREADY_EXISTS)
-                context.set_details(f"User with email {request.email} already exists")
-                return example_service_pb2.CreateUserResponse()
-        
-        # Create new user
-        import time
-        current_time = int(time.time())
-        
-        new_user = example_service_pb2.User(
-            id=self.next_user_id,
-            name=request.name,
-            email=request.email,
-            created_at=current_time,
-            updated_at=current_time
+        logger.info(
+            "CreateUser called with name: %s, email: %s", request.name, request.email
         )
-        
-        self.users[self.next_user_id] = new_user
-        self.next_user_id += 1
-        
+
+        # Validation is now handled by ValidationInterceptor
+
+        try:
+            new_user = self.repository.create(name=request.name, email=request.email)
+        except EmailAlreadyExistsError:
+            context.set_code(grpc.StatusCode.ALREADY_EXISTS)
+            context.set_details(f"User with email {request.email} already exists")
+            return example_service_pb2.CreateUserResponse()
+        except RepositoryError as e:
+            # The store cannot take writes, e.g. after its log failed
+            _unavailable(context, e)
+            return example_service_pb2.CreateUserResponse()
+
+        if self._publish_to is not None:
+            self._publish_to.publish(
+                [(UserChangeType.CREATED, new_user.SerializeToString())]
+            )
         return example_service_pb2.CreateUserResponse(user=new_user)
 
-    def ListUsers(self, request: example_service_pb2.ListUsersRequest, context: grpc.ServicerContext) -> example_service_pb2.ListUsersResponse:
-        """List users with pagination."""
-        logger.info(f"ListUsers called with page: {request.page}, page_size: {request.page_size}")
-        
+    def ListUsers(
+        self,
+        request: example_service_pb2.ListUsersRequest,
+        context: grpc.ServicerContext,
+    ) -> Union[example_service_pb2.ListUsersResponse, bytes]:
+        """List users with pagination, as a serialized response."""
+        logger.info(
+            "ListUsers called with page: %d, page_size: %d",
+            request.page,
+            request.page_size,
+        )
+
         # Validation is now handled by ValidationInterceptor
         # Default values if not set
         page = request.page if request.page > 0 else 1
         page_size = request.page_size if request.page_size > 0 else 10
-        
-        # Get all users as a list
-        all_users = list(self.users.values())
-        total_count = len(all_users)
-        
-        # Calculate pagination
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
-        
-        # Get paginated users
-        paginated_users = all_users[start_index:end_index]
-        
-        return example_service_pb2.ListUsersResponse(
-            users=paginated_users,
-            total_count=total_count
-        )
\ No newline at end of file
+
+        after_id = None
+        if request.page_token:
+            # Keyset pagination: resume after the last ID of the previous page
+            try:
+                after_id = decode_page_token(request.page_token)
+            except ValueError as e:
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details(str(e))
+                return example_service_pb2.ListUsersResponse()
+        try:
+            if after_id is None:
+                offset = (page - 1) * page_size
+                user_page = self.repository.page_encoded(offset, page_size)
+            else:
+                user_page = self.repository.page_after_encoded(after_id, page_size)
+        except RepositoryError as e:
+            _unavailable(context, e)
+            return example_service_pb2.ListUsersResponse()
+
+        next_page_token = ""
+        if user_page.next_after_id is not None:
+            next_page_token = encode_page_token(user_page.next_after_id)
+
+        return encode_list_users_response(
+            user_page.users, user_page.total_count, next_page_token
+        )
+
+    def SearchUsers(
+        self,
+        request: example_service_pb2.SearchUsersRequest,
+        context: grpc.ServicerContext,
+    ) -> example_service_pb2.SearchUsersResponse:
+        """Search users by the request filters, a page at a time."""
+        logger.info("SearchUsers called with page_size: %d", request.page_size)
+
+        # Validation is now handled by ValidationInterceptor
+        page_size = request.page_size if request.page_size > 0 else 10
+        query = UserQuery(
+            email=request.email,
+            name_prefix=request.name_prefix,
+            surname_prefix=request.surname_prefix,
+            created_after=request.created_after,
+            created_before=request.created_before,
+        )
+
+        after = None
+        if request.page_token:
+            # The cursor only resumes a search served from the same index
+            try:
+                index, after = decode_search_token(request.page_token)
+                if not query.accepts(index, after):
+                    raise ValueError(
+                        "Page token belongs to a search with other filters"
+                    )
+            except ValueError as e:
+                context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+                context.set_details(str(e))
+                return example_service_pb2.SearchUsersResponse()
+
+        try:
+            search_page = self.repository.search(query, page_size, after)
+        except RepositoryError as e:
+            _unavailable(context, e)
+            return example_service_pb2.SearchUsersResponse()
+
+        next_page_token = ""
+        if search_page.next_cursor is not None:
+            next_page_token = encode_search_token(
+                query.index_name(), search_page.next_cursor
+            )
+
+        return example_service_pb2.SearchUsersResponse(
+            users=search_page.users, next_page_token=next_page_token
+        )
+
+    def BatchGetUsers(
+        self,
+        request: example_service_pb2.BatchGetUsersRequest,
+        context: grpc.ServicerContext,
+    ) -> example_service_pb2.BatchGetUsersResponse:
+        """Get several users by ID in one call."""
+        logger.info("BatchGetUsers called with %d ids", len(request.ids))
+
+        # Repeated IDs are answered once, in order of first appearance
+        user_ids = list(dict.fromkeys(request.ids))
+        try:
+            users = self.repository.get_many(user_ids)
+        except RepositoryError as e:
+            _unavailable(context, e)
+            return example_service_pb2.BatchGetUsersResponse()
+
+        return example_service_pb2.BatchGetUsersResponse(
+            users=[users[user_id] for user_id in user_ids if user_id in users],
+            missing_ids=[user_id for user_id in user_ids if user_id not in users],
+        )
+
+    def BulkCreateUsers(
+        self,
+        request_iterator: Iterator[example_service_pb2.CreateUserRequest],
+        context: grpc.ServicerContext,
+    ) -> example_service_pb2.BulkCreateUsersResponse:
+        """Create users from a client stream of CreateUser requests."""
+        logger.info("BulkCreateUsers called")
+
+        # Validation of each request is handled by ValidationInterceptor as
+        # the stream is read, so an invalid request aborts the call before
+        # any user is created
+        requests = list(islice(request_iterator, BULK_CREATE_MAX_REQUESTS + 1))
+        return self.bulk_create_users(requests, context)
+
+    def StreamUsers(
+        self,
+        request: example_service_pb2.StreamUsersRequest,
+        context: grpc.ServicerContext,
+    ) -> Iterator[example_service_pb2.StreamUsersResponse]:
+        """Stream users matching the request filters in batches."""
+        logger.info(
+            "StreamUsers called with batch_size: %d, after_id: %d",
+            request.batch_size,
+            request.after_id,
+        )
+
+        try:
+            for response in self.stream_user_batches(request):
+                # Stop scanning as soon as the client goes away, even while
+                # a selective filter finds no batch to send
+                if not context.is_active():
+                    return
+                if response is not None:
+                    yield response
+        except RepositoryError as e:
+            context.abort(grpc.StatusCode.UNAVAILABLE, str(e))
+
+    def WatchUsers(
+        self,
+        request: example_service_pb2.WatchUsersRequest,
+        context: grpc.ServicerContext,
+    ) -> Iterator[bytes]:
+        """Stream user changes as they are published, as serialized responses."""
+        logger.info("WatchUsers called with after_sequence: %d", request.after_sequence)
+
+        feed = self.changes
+        if feed is None:
+            context.abort(grpc.StatusCode.UNIMPLEMENTED, WATCH_UNAVAILABLE)
+            return
+        # Set when changes arrive, and when the call ends so the wait below
+        # does not hold its worker thread any longer
+        wakeup = threading.Event()
+        try:
+            subscription = self.subscribe_changes(request, wakeup.set)
+        except SubscriberLimitError as e:
+            context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+        context.add_callback(wakeup.set)
+
+        try:
+            if not subscription.lagged:
+                yield self.watch_response(subscription, [])
+            while not subscription.lagged and context.is_active():
+                wakeup.clear()
+                changes = subscription.drain(WATCH_BATCH_SIZE)
+                if changes:
+                    yield self.watch_response(subscription, changes)
+                elif subscription.closed:
+                    break
+                else:
+                    wakeup.wait()
+            if subscription.lagged:
+                yield self.watch_response(subscription, [], resync=True)
+            elif subscription.closed:
+                context.abort(grpc.StatusCode.UNAVAILABLE, WATCH_CLOSED)
+        finally:
+            feed.unsubscribe(subscription)
+
+    def bulk_create_users(
+        self,
+        requests: Sequence[example_service_pb2.CreateUserRequest],
+        context: grpc.ServicerContext,
+    ) -> example_service_pb2.BulkCreateUsersResponse:
+        """Create the users of one BulkCreateUsers call; used by both modes.
+
+        ``requests`` is the client stream read up to one request past
+        ``BULK_CREATE_MAX_REQUESTS``, so an oversized call is refused
+        without reading the rest of it. Failures are reported with
+        ``context.set_code``, which works alike in both server modes.
+        """
+        if len(requests) > BULK_CREATE_MAX_REQUESTS:
+            context.set_code(grpc.StatusCode.INVALID_ARGUMENT)
+            context.set_details(BULK_CREATE_TOO_MANY)
+            return example_service_pb2.BulkCreateUsersResponse()
+
+        bulk = BulkCreate(self.repository, self._publish_to)
+        try:
+            bulk.add(requests)
+        except RepositoryError as e:
+            _unavailable(context, e)
+            return example_service_pb2.BulkCreateUsersResponse()
+        return bulk.response()
+
+    def subscribe_changes(
+        self, request: example_service_pb2.WatchUsersRequest, wake: Callable[[], None]
+    ) -> UserChangeSubscription:
+        """Subscribe to the changes a WatchUsers request asks for.
+
+        Must only be called when ``changes`` is set.
+
+        Raises:
+            SubscriberLimitError: If the feed has no room for another watcher.
+        """
+        assert self.changes is not None
+        if not request.after_sequence:
+            return self.changes.subscribe(wake)
+        return self.changes.subscribe(wake, request.after_sequence, request.feed_id)
+
+    def watch_response(
+        self,
+        subscription: UserChangeSubscription,
+        changes: List[Tuple[int, Tuple[int, bytes]]],
+        resync: bool = False,
+    ) -> bytes:
+        """Return the serialized WatchUsers response carrying ``changes``."""
+        assert self.changes is not None
+        return encode_watch_users_response(
+            [
+                encode_user_change(sequence, change_type, user)
+                for sequence, (change_type, user) in changes
+            ],
+            changes[-1][0] if changes else subscription.sequence,
+            self.changes.feed_id,
+            resync,
+        )
+
+    def stream_user_batches(
+        self, request: example_service_pb2.StreamUsersRequest
+    ) -> Iterator[Optional[example_service_pb2.StreamUsersResponse]]:
+        """Yield StreamUsers responses without touching the call context.
+
+        The repository is scanned in ID order, one chunk at a time, so the
+        export holds at most one chunk and one batch in memory however many
+        users are stored. The generator only advances when gRPC asks for the
+        next message, which happens once the previous one has been handed to
+        the transport, so a slow client throttles the scan.
+
+        None is yielded after every scanned chunk, so a filter matching few
+        users still hands control back to the caller every
+        ``STREAM_SCAN_CHUNK_SIZE`` users; callers skip it.
+        """
+        batch_size = (
+            request.batch_size if request.batch_size > 0 else STREAM_DEFAULT_BATCH_SIZE
+        )
+        matches = _stream_filter(request)
+
+        batch = []
+        for users in self.repository.scan(request.after_id, STREAM_SCAN_CHUNK_SIZE):
+            for user in users:
+                if matches(user):
+                    batch.append(user)
+                    if len(batch) == batch_size:
+                        yield example_service_pb2.StreamUsersResponse(users=batch)
+                        batch = []
+            yield None
+
+        if batch:
+            yield example_service_pb2.StreamUsersResponse(users=batch)
+
+
+class BulkCreate:
+    """Accumulates the results of one BulkCreateUsers call.
+
+    Requests are written ``BULK_CREATE_CHUNK_SIZE`` at a time, each chunk
+    with a single ``create_many`` call, so email uniqueness is checked and
+    users are inserted in one repository operation per chunk. Emails
+    repeated within the stream are rejected before reaching the repository.
+    The users each chunk creates are published to ``changes`` together.
+    """
+
+    def __init__(
+        self, repository: UserRepository, changes: Optional[UserChangeFeed] = None
+    ):
+        self._repository = repository
+        self._changes = changes
+        self._results: List[example_service_pb2.BulkCreateUserResult] = []
+        self._seen_emails: Set[str] = set()
+        self._created_count = 0
+
+    def add(self, requests: Sequence[example_service_pb2.CreateUserRequest]) -> None:
+        """Create the users for the next streamed requests."""
+        for start in range(0, len(requests), BULK_CREATE_CHUNK_SIZE):
+            self._add_chunk(requests[start : start + BULK_CREATE_CHUNK_SIZE])
+
+    def _add_chunk(
+        self, requests: Sequence[example_service_pb2.CreateUserRequest]
+    ) -> None:
+        pending = []
+        entries = []
+        for request in requests:
+            result = example_service_pb2.BulkCreateUserResult(index=len(self._results))
+            self._results.append(result)
+            if request.email in self._seen_emails:
+                result.status = BulkCreateStatus.DUPLICATE_IN_REQUEST
+                continue
+            self._seen_emails.add(request.email)
+            pending.append(result)
+            entries.append((request.name, request.email, ""))
+
+        if not entries:
+            return
+        created = []
+        for result, user in zip(pending, self._repository.create_many(entries)):
+            if user is None:
+                result.status = BulkCreateStatus.EMAIL_ALREADY_EXISTS
+            else:
+                result.status = BulkCreateStatus.CREATED
+                result.user.CopyFrom(user)
+                self._created_count += 1
+                created.append((UserChangeType.CREATED, user.SerializeToString()))
+        if self._changes is not None:
+            self._changes.publish(created)
+
+    def response(self) -> example_service_pb2.BulkCreateUsersResponse:
+        """Build the response for every request added so far."""
+        return example_service_pb2.BulkCreateUsersResponse(
+            results=self._results, created_count=self._created_count
+        )
+
+
+def _unavailable(context: grpc.ServicerContext, error: RepositoryError) -> None:
+    """Fail the call with UNAVAILABLE: the store cannot serve it right now."""
+    context.set_code(grpc.StatusCode.UNAVAILABLE)
+    context.set_details(str(error))
+
+
+def _stream_filter(
+    request: example_service_pb2.StreamUsersRequest,
+) -> Callable[[example_service_pb2.User], bool]:
+    """Build a predicate for the filters set on a StreamUsers request."""
+    checks: List[Callable[[example_service_pb2.User], bool]] = []
+    if request.email_domain:
+        suffix = "@" + request.email_domain.lower()
+        checks.append(lambda user: user.email.lower().endswith(suffix))
+    if request.name_prefix:
+        prefix = request.name_prefix
+        checks.append(lambda user: user.name.startswith(prefix))
+    if request.created_after:
+        created_after = request.created_after
+        checks.append(lambda user: user.created_at >= created_after)
+    if request.created_before:
+        created_before = request.created_before
+        checks.append(lambda user: user.created_at < created_before)
+    return lambda user: all(check(user) for check in checks)
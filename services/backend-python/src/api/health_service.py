@@ -0,0 +1,165 @@
+"""Standard ``grpc.health.v1.Health`` service for probes and load balancers."""
+
+import asyncio
+import logging
+import threading
+from typing import AsyncIterator, Callable, Dict, Iterator, List
+
+import grpc
+
+# Import generated gRPC code
+from proto_generated import health_pb2, health_pb2_grpc
+
+logger = logging.getLogger(__name__)
+
+ServingStatus = health_pb2.HealthCheckResponse.ServingStatus
+SERVING = health_pb2.HealthCheckResponse.SERVING
+NOT_SERVING = health_pb2.HealthCheckResponse.NOT_SERVING
+SERVICE_UNKNOWN = health_pb2.HealthCheckResponse.SERVICE_UNKNOWN
+
+# Full name of the health service itself, e.g. to keep it out of interceptors
+HEALTH_SERVICE_NAME = health_pb2.DESCRIPTOR.services_by_name["Health"].full_name
+
+
+class HealthServicer(health_pb2_grpc.HealthServicer):
+    """Serves the serving status of each service name set through ``set``.
+
+    The empty service name stands for the whole server. Services start out
+    unknown, so probes fail until the server marks them ``SERVING`` after
+    it has started. ``enter_graceful_shutdown`` turns every service
+    ``NOT_SERVING`` for good, telling load balancers to move traffic away
+    while in-flight calls drain. Watch calls end after reporting that, so
+    they do not hold up the drain; clients retry them against another
+    server.
+
+    Check is a dictionary lookup. Each Watch call holds a worker thread of
+    the sync server until the client goes away.
+    """
+
+    def __init__(self) -> None:
+        self._statuses: Dict[str, ServingStatus] = {}
+        self._listeners: List[Callable[[], object]] = []
+        self._lock = threading.Lock()
+        self._shutting_down = False
+
+    def set(self, service: str, status: ServingStatus) -> None:
+        """Set the status of ``service``; ignored once shutdown has begun."""
+        with self._lock:
+            if self._shutting_down:
+                return
+            self._statuses[service] = status
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def enter_graceful_shutdown(self) -> None:
+        """Mark every service ``NOT_SERVING`` and ignore later changes."""
+        with self._lock:
+            if self._shutting_down:
+                return
+            for service in self._statuses:
+                self._statuses[service] = NOT_SERVING
+            self._shutting_down = True
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+        logger.info("🚦 Health status set to NOT_SERVING")
+
+    @property
+    def shutting_down(self) -> bool:
+        """Whether ``enter_graceful_shutdown`` was called."""
+        return self._shutting_down
+
+    def status(self, service: str) -> ServingStatus:
+        """Return the status of ``service``, ``SERVICE_UNKNOWN`` if never set."""
+        return self._statuses.get(service, SERVICE_UNKNOWN)
+
+    def subscribe(self, listener: Callable[[], object]) -> Callable[[], None]:
+        """Call ``listener`` after every status change; returns an unsubscriber.
+
+        Listeners run on the thread that changed the status.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                self._listeners.remove(listener)
+
+        return unsubscribe
+
+    def Check(
+        self, request: health_pb2.HealthCheckRequest, context: grpc.ServicerContext
+    ) -> health_pb2.HealthCheckResponse:
+        """Return the current status of the requested service."""
+        status = self.status(request.service)
+        if status == SERVICE_UNKNOWN:
+            context.set_code(grpc.StatusCode.NOT_FOUND)
+            context.set_details(f"Unknown service {request.service!r}")
+            return health_pb2.HealthCheckResponse()
+        return health_pb2.HealthCheckResponse(status=status)
+
+    def Watch(
+        self, request: health_pb2.HealthCheckRequest, context: grpc.ServicerContext
+    ) -> Iterator[health_pb2.HealthCheckResponse]:
+        """Stream the status of the requested service, then every change of it."""
+        changed = threading.Event()
+        unsubscribe = self.subscribe(changed.set)
+        # Wake up when the client cancels or the server stops
+        context.add_callback(changed.set)
+        try:
+            last = None
+            while context.is_active():
+                # Cleared before reading, so a change made meanwhile is not lost
+                changed.clear()
+                # Read before the status: once it is set, the status read
+                # next is final and gets reported before the call ends
+                shutting_down = self._shutting_down
+                status = self.status(request.service)
+                if status != last:
+                    last = status
+                    yield health_pb2.HealthCheckResponse(status=status)
+                if shutting_down:
+                    return
+                changed.wait()
+        finally:
+            unsubscribe()
+
+
+class AsyncHealthServicer(health_pb2_grpc.HealthServicer):
+    """``grpc.aio`` Health service serving the statuses of a ``HealthServicer``."""
+
+    def __init__(self, health: HealthServicer):
+        self._health = health
+
+    async def Check(
+        self, request: health_pb2.HealthCheckRequest, context: grpc.aio.ServicerContext
+    ) -> health_pb2.HealthCheckResponse:
+        """Return the current status of the requested service."""
+        return self._health.Check(request, context)
+
+    async def Watch(
+        self, request: health_pb2.HealthCheckRequest, context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[health_pb2.HealthCheckResponse]:
+        """Stream the status of the requested service, then every change of it."""
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        # Statuses may change on another thread; the call is cancelled when
+        # the client goes away, which ends the loop below.
+        unsubscribe = self._health.subscribe(
+            lambda: loop.call_soon_threadsafe(changed.set)
+        )
+        try:
+            last = None
+            while True:
+                changed.clear()
+                shutting_down = self._health.shutting_down
+                status = self._health.status(request.service)
+                if status != last:
+                    last = status
+                    yield health_pb2.HealthCheckResponse(status=status)
+                if shutting_down:
+                    return
+                await changed.wait()
+        finally:
+            unsubscribe()
@@ -0,0 +1,62 @@
+"""Opaque page tokens for keyset pagination."""
+
+import base64
+import binascii
+import json
+from typing import Any, Tuple
+
+_TOKEN_PREFIX = b"after:"
+_SEARCH_TOKEN_PREFIX = b"search:"
+
+
+def encode_page_token(after_id: int) -> str:
+    """Encode the last ID of a page as an opaque page token."""
+    return base64.urlsafe_b64encode(_TOKEN_PREFIX + str(after_id).encode()).decode()
+
+
+def decode_page_token(token: str) -> int:
+    """Decode a page token back into the ID to resume after.
+
+    Raises:
+        ValueError: If the token was not produced by ``encode_page_token``.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token.encode())
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Malformed page token: {token!r}") from e
+    if not raw.startswith(_TOKEN_PREFIX):
+        raise ValueError(f"Malformed page token: {token!r}")
+    try:
+        return int(raw[len(_TOKEN_PREFIX) :])
+    except ValueError as e:
+        raise ValueError(f"Malformed page token: {token!r}") from e
+
+
+def encode_search_token(index: str, cursor: Tuple[Any, int]) -> str:
+    """Encode the index and cursor a search resumes from as a page token."""
+    key, user_id = cursor
+    payload = json.dumps([index, key, user_id], ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(_SEARCH_TOKEN_PREFIX + payload).decode()
+
+
+def decode_search_token(token: str) -> Tuple[str, Tuple[Any, int]]:
+    """Decode a search page token back into its index and cursor.
+
+    Raises:
+        ValueError: If the token was not produced by ``encode_search_token``.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token.encode())
+    except (binascii.Error, ValueError) as e:
+        raise ValueError(f"Malformed page token: {token!r}") from e
+    if not raw.startswith(_SEARCH_TOKEN_PREFIX):
+        raise ValueError(f"Malformed page token: {token!r}")
+    try:
+        index, key, user_id = json.loads(raw[len(_SEARCH_TOKEN_PREFIX) :])
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Malformed page token: {token!r}") from e
+    if not (
+        isinstance(index, str) and type(key) in (int, str) and type(user_id) is int
+    ):
+        raise ValueError(f"Malformed page token: {token!r}")
+    return index, (key, user_id)
@@ -0,0 +1,502 @@
+"""Server configuration from environment variables and command-line flags."""
+
+import argparse
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Callable, Optional, Sequence, TypeVar
+
+from src.transport import (
+    COMPRESSION_ALGORITHMS,
+    TRANSPORT_PRESETS,
+    TransportSettings,
+    resolve_transport,
+)
+
+SERVER_MODES = ("sync", "aio")
+CONCURRENCY_LIMITS = ("gradient", "aimd", "off")
+USER_STORES = ("memory", "sharded", "columnar", "sql")
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+T = TypeVar("T")
+
+
+def _parse_bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return _parse_bool(value)
+
+
+def _env_optional(name: str, convert: Callable[[str], T]) -> Optional[T]:
+    value = os.environ.get(name)
+    return None if value is None else convert(value)
+
+
+def _seconds_to_ms(seconds: Optional[float]) -> Optional[int]:
+    return None if seconds is None else int(seconds * 1000)
+
+
+@dataclass
+class ServerConfig:
+    """Settings for one gRPC server process.
+
+    Every field can be set through an environment variable and overridden on
+    the command line; see ``from_args``.
+    """
+
+    # "sync" runs grpc.server on a thread pool, "aio" runs grpc.aio on asyncio
+    mode: str = "sync"
+    listen_addr: str = "[::]:50051"
+    # Thread pool size, and database connections per process with the sql store
+    max_workers: int = 10
+    validate_requests: bool = True
+    # Compile every request type's validation rules before serving; when
+    # off, protovalidate is imported and rules compiled on first use
+    warm_up_validation: bool = True
+    # Server processes sharing listen_addr via SO_REUSEPORT
+    workers: int = 1
+    # With workers, serve reads of an in-process store from a copy in each
+    # worker instead of asking the store process every time
+    worker_replicas: bool = True
+    # Seconds in-flight RPCs get to finish after SIGTERM
+    shutdown_grace: float = 10.0
+    # Seconds between reporting NOT_SERVING on SIGTERM and refusing new
+    # RPCs, so health-checking load balancers stop routing here first
+    drain_delay: float = 0.0
+    # Admission control: "gradient" or "aimd" adapt how many calls run at
+    # once to observed latency and reject the rest with RESOURCE_EXHAUSTED
+    concurrency_limit: str = "gradient"
+    # Calls accepted at once, queued ones included; gRPC rejects any more
+    max_concurrent_rpcs: int = 1000
+    # "memory" keeps users in process behind one lock, "sharded" splits them
+    # across store_shards locks, "columnar" packs them into typed arrays to
+    # save memory, "sql" persists them at database_url
+    store: str = "memory"
+    store_shards: int = 16
+    # Build an in-process store's search indexes at startup instead of on
+    # the first SearchUsers call; they cost about 190 bytes per user
+    search_indexes: bool = False
+    # Directory an in-process store logs writes and snapshots to, so users
+    # survive restarts; empty keeps them in memory only
+    data_dir: str = ""
+    # Seconds between snapshots that compact the log of data_dir
+    snapshot_interval: float = 300.0
+    database_url: str = "sqlite:///users.db"
+    # Memory for cached GetUser/ListUsers responses per process, 0 disables
+    response_cache_bytes: int = 32 * 1024 * 1024
+    # Seconds a cached response is served; also bounds how stale other
+    # worker processes' caches can be after a write
+    response_cache_ttl: float = 5.0
+    # Port of the local HTTP /metrics endpoint, 0 disables it. Worker
+    # processes of the launcher use consecutive ports from here.
+    metrics_port: int = 9464
+    metrics_host: str = "127.0.0.1"
+    # Sample stacks on SIGUSR1 and serve /debug/ endpoints next to /metrics
+    profiling: bool = False
+    # Length of a profile triggered by SIGUSR1, and where it is written
+    profile_seconds: float = 10.0
+    profile_dir: str = tempfile.gettempdir()
+    # Fraction of unary calls whose deserialize/validate/handler/serialize
+    # stages are timed; needs metrics and validation enabled
+    stage_sample_rate: float = 0.0
+    log_level: str = "INFO"
+    # Log records buffered for the thread writing them out before new ones
+    # are dropped; 0 writes them from the logging thread instead
+    log_queue_size: int = 10000
+    # Per-request log records written per second and process, 0 for all
+    request_log_rate: float = 100.0
+    # Recent user changes a WatchUsers call can resume from
+    watch_buffer: int = 10000
+    # WatchUsers calls per process; 0 allows half of max_workers in sync
+    # mode, where each holds a worker thread, and any number in aio mode
+    max_watchers: int = 0
+    # Compression, keepalive and flow control settings; see src.transport.
+    # The fields after it override the preset's value unless None.
+    transport_preset: str = "default"
+    compression: Optional[str] = None
+    # Comma-separated method names, "*" for all
+    compressed_methods: Optional[str] = None
+    # Seconds
+    keepalive_time: Optional[float] = None
+    keepalive_timeout: Optional[float] = None
+    max_concurrent_streams: Optional[int] = None
+    max_message_bytes: Optional[int] = None
+    bdp_probe: Optional[bool] = None
+    stream_window_bytes: Optional[int] = None
+
+    def transport(self) -> TransportSettings:
+        """Return the transport preset with the overrides of this config."""
+        methods = self.compressed_methods
+        return resolve_transport(
+            self.transport_preset,
+            compression=self.compression,
+            compressed_methods=(
+                None
+                if methods is None
+                else tuple(name.strip() for name in methods.split(",") if name.strip())
+            ),
+            keepalive_time_ms=_seconds_to_ms(self.keepalive_time),
+            keepalive_timeout_ms=_seconds_to_ms(self.keepalive_timeout),
+            max_concurrent_streams=self.max_concurrent_streams,
+            max_message_bytes=self.max_message_bytes,
+            bdp_probe=self.bdp_probe,
+            stream_window_bytes=self.stream_window_bytes,
+        )
+
+    @classmethod
+    def from_args(cls, argv: Optional[Sequence[str]] = None) -> "ServerConfig":
+        """Build a config from the environment, then command-line overrides."""
+        parser = argparse.ArgumentParser(description="Python gRPC backend server")
+        parser.add_argument(
+            "--mode",
+            choices=SERVER_MODES,
+            default=os.environ.get("GRPC_SERVER_MODE", cls.mode),
+            help="Server implementation (env: GRPC_SERVER_MODE)",
+        )
+        parser.add_argument(
+            "--listen-addr",
+            default=os.environ.get("GRPC_LISTEN_ADDR", cls.listen_addr),
+            help="Address to listen on (env: GRPC_LISTEN_ADDR)",
+        )
+        parser.add_argument(
+            "--max-workers",
+            type=int,
+            default=int(os.environ.get("GRPC_MAX_WORKERS", cls.max_workers)),
+            help="Worker threads and database connections (env: GRPC_MAX_WORKERS)",
+        )
+        parser.add_argument(
+            "--no-validation",
+            dest="validate_requests",
+            action="store_false",
+            default=_env_bool("GRPC_VALIDATE_REQUESTS", cls.validate_requests),
+            help="Skip protovalidate request validation (env: GRPC_VALIDATE_REQUESTS)",
+        )
+        parser.add_argument(
+            "--lazy-validation",
+            dest="warm_up_validation",
+            action="store_false",
+            default=_env_bool("GRPC_WARM_UP_VALIDATION", cls.warm_up_validation),
+            help=(
+                "Compile validation rules on first use instead of at startup (env: "
+                "GRPC_WARM_UP_VALIDATION)"
+            ),
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=int(os.environ.get("GRPC_WORKERS", cls.workers)),
+            help="Server processes to run, one per core is typical (env: GRPC_WORKERS)",
+        )
+        parser.add_argument(
+            "--no-worker-replicas",
+            dest="worker_replicas",
+            action="store_false",
+            default=_env_bool("GRPC_WORKER_REPLICAS", cls.worker_replicas),
+            help=(
+                "Read from the shared store process instead of a copy per worker (env: "
+                "GRPC_WORKER_REPLICAS)"
+            ),
+        )
+        parser.add_argument(
+            "--shutdown-grace",
+            type=float,
+            default=float(os.environ.get("GRPC_SHUTDOWN_GRACE", cls.shutdown_grace)),
+            help=(
+                "Seconds to let in-flight RPCs finish on shutdown (env: "
+                "GRPC_SHUTDOWN_GRACE)"
+            ),
+        )
+        parser.add_argument(
+            "--drain-delay",
+            type=float,
+            default=float(os.environ.get("GRPC_DRAIN_DELAY", cls.drain_delay)),
+            help=(
+                "Seconds to report NOT_SERVING before refusing new RPCs on shutdown "
+                "(env: GRPC_DRAIN_DELAY)"
+            ),
+        )
+        parser.add_argument(
+            "--concurrency-limit",
+            choices=CONCURRENCY_LIMITS,
+            default=os.environ.get("GRPC_CONCURRENCY_LIMIT", cls.concurrency_limit),
+            help="Adaptive concurrency limit algorithm (env: GRPC_CONCURRENCY_LIMIT)",
+        )
+        parser.add_argument(
+            "--max-concurrent-rpcs",
+            type=int,
+            default=int(
+                os.environ.get("GRPC_MAX_CONCURRENT_RPCS", cls.max_concurrent_rpcs)
+            ),
+            help="Hard limit on calls accepted at once (env: GRPC_MAX_CONCURRENT_RPCS)",
+        )
+        parser.add_argument(
+            "--store",
+            choices=USER_STORES,
+            default=os.environ.get("GRPC_USER_STORE", cls.store),
+            help="Where users are stored (env: GRPC_USER_STORE)",
+        )
+        parser.add_argument(
+            "--store-shards",
+            type=int,
+            default=int(os.environ.get("GRPC_STORE_SHARDS", cls.store_shards)),
+            help=(
+                "Independently locked partitions of the sharded store (env: "
+                "GRPC_STORE_SHARDS)"
+            ),
+        )
+        parser.add_argument(
+            "--search-indexes",
+            action="store_true",
+            default=_env_bool("GRPC_SEARCH_INDEXES", cls.search_indexes),
+            help=(
+                "Build SearchUsers indexes at startup rather than on the first search "
+                "(env: GRPC_SEARCH_INDEXES)"
+            ),
+        )
+        parser.add_argument(
+            "--data-dir",
+            default=os.environ.get("GRPC_DATA_DIR", cls.data_dir),
+            help=(
+                "Persist an in-process store here, empty to disable (env: "
+                "GRPC_DATA_DIR)"
+            ),
+        )
+        parser.add_argument(
+            "--snapshot-interval",
+            type=float,
+            default=float(
+                os.environ.get("GRPC_SNAPSHOT_INTERVAL", cls.snapshot_interval)
+            ),
+            help=(
+                "Seconds between snapshots of --data-dir, 0 only on shutdown (env: "
+                "GRPC_SNAPSHOT_INTERVAL)"
+            ),
+        )
+        parser.add_argument(
+            "--database-url",
+            default=os.environ.get("DATABASE_URL", cls.database_url),
+            help="SQLAlchemy URL used by the sql store (env: DATABASE_URL)",
+        )
+        parser.add_argument(
+            "--response-cache-bytes",
+            type=int,
+            default=int(
+                os.environ.get("GRPC_RESPONSE_CACHE_BYTES", cls.response_cache_bytes)
+            ),
+            help=(
+                "Size limit of the response cache, 0 disables it (env: "
+                "GRPC_RESPONSE_CACHE_BYTES)"
+            ),
+        )
+        parser.add_argument(
+            "--response-cache-ttl",
+            type=float,
+            default=float(
+                os.environ.get("GRPC_RESPONSE_CACHE_TTL", cls.response_cache_ttl)
+            ),
+            help="Seconds a cached response stays valid (env: GRPC_RESPONSE_CACHE_TTL)",
+        )
+        parser.add_argument(
+            "--metrics-port",
+            type=int,
+            default=int(os.environ.get("GRPC_METRICS_PORT", cls.metrics_port)),
+            help=(
+                "Port of the HTTP /metrics endpoint, 0 disables it (env: "
+                "GRPC_METRICS_PORT)"
+            ),
+        )
+        parser.add_argument(
+            "--metrics-host",
+            default=os.environ.get("GRPC_METRICS_HOST", cls.metrics_host),
+            help="Address the /metrics endpoint binds to (env: GRPC_METRICS_HOST)",
+        )
+        parser.add_argument(
+            "--profiling",
+            action="store_true",
+            default=_env_bool("GRPC_PROFILING", cls.profiling),
+            help=(
+                "Profile on SIGUSR1 and enable the /debug/ endpoints (env: "
+                "GRPC_PROFILING)"
+            ),
+        )
+        parser.add_argument(
+            "--profile-seconds",
+            type=float,
+            default=float(os.environ.get("GRPC_PROFILE_SECONDS", cls.profile_seconds)),
+            help="Length of a profile taken on SIGUSR1 (env: GRPC_PROFILE_SECONDS)",
+        )
+        parser.add_argument(
+            "--profile-dir",
+            default=os.environ.get("GRPC_PROFILE_DIR", cls.profile_dir),
+            help="Directory SIGUSR1 profiles are written to (env: GRPC_PROFILE_DIR)",
+        )
+        parser.add_argument(
+            "--stage-sample-rate",
+            type=float,
+            default=float(
+                os.environ.get("GRPC_STAGE_SAMPLE_RATE", cls.stage_sample_rate)
+            ),
+            help=(
+                "Fraction of calls to time per stage, 0 to 1 (env: "
+                "GRPC_STAGE_SAMPLE_RATE)"
+            ),
+        )
+        parser.add_argument(
+            "--log-level",
+            choices=LOG_LEVELS,
+            default=os.environ.get("LOG_LEVEL", cls.log_level).upper(),
+            help="Lowest level of log records written (env: LOG_LEVEL)",
+        )
+        parser.add_argument(
+            "--log-queue-size",
+            type=int,
+            default=int(os.environ.get("GRPC_LOG_QUEUE_SIZE", cls.log_queue_size)),
+            help=(
+                "Log records buffered before dropping, 0 logs synchronously (env: "
+                "GRPC_LOG_QUEUE_SIZE)"
+            ),
+        )
+        parser.add_argument(
+            "--request-log-rate",
+            type=float,
+            default=float(
+                os.environ.get("GRPC_REQUEST_LOG_RATE", cls.request_log_rate)
+            ),
+            help=(
+                "Per-request log records written per second, 0 for all (env: "
+                "GRPC_REQUEST_LOG_RATE)"
+            ),
+        )
+        parser.add_argument(
+            "--watch-buffer",
+            type=int,
+            default=int(os.environ.get("GRPC_WATCH_BUFFER", cls.watch_buffer)),
+            help=(
+                "Recent user changes WatchUsers can resume from (env: "
+                "GRPC_WATCH_BUFFER)"
+            ),
+        )
+        parser.add_argument(
+            "--max-watchers",
+            type=int,
+            default=int(os.environ.get("GRPC_MAX_WATCHERS", cls.max_watchers)),
+            help=(
+                "WatchUsers calls at once, 0 for a default per mode (env: "
+                "GRPC_MAX_WATCHERS)"
+            ),
+        )
+        parser.add_argument(
+            "--transport-preset",
+            choices=tuple(TRANSPORT_PRESETS),
+            default=os.environ.get("GRPC_TRANSPORT_PRESET", cls.transport_preset),
+            help=(
+                "Compression, keepalive and flow control defaults: default, lan or wan "
+                "(env: GRPC_TRANSPORT_PRESET)"
+            ),
+        )
+        parser.add_argument(
+            "--compression",
+            choices=tuple(COMPRESSION_ALGORITHMS),
+            default=os.environ.get("GRPC_COMPRESSION"),
+            help=(
+                "Algorithm for responses of --compressed-methods (env: "
+                "GRPC_COMPRESSION)"
+            ),
+        )
+        parser.add_argument(
+            "--compressed-methods",
+            default=os.environ.get("GRPC_COMPRESSED_METHODS"),
+            help=(
+                "Comma-separated methods whose responses are compressed, * for all "
+                "(env: GRPC_COMPRESSED_METHODS)"
+            ),
+        )
+        parser.add_argument(
+            "--keepalive-time",
+            type=float,
+            default=_env_optional("GRPC_KEEPALIVE_TIME", float),
+            help=(
+                "Seconds between keepalive pings on idle connections (env: "
+                "GRPC_KEEPALIVE_TIME)"
+            ),
+        )
+        parser.add_argument(
+            "--keepalive-timeout",
+            type=float,
+            default=_env_optional("GRPC_KEEPALIVE_TIMEOUT", float),
+            help=(
+                "Seconds to wait for a ping reply before closing (env: "
+                "GRPC_KEEPALIVE_TIMEOUT)"
+            ),
+        )
+        parser.add_argument(
+            "--max-concurrent-streams",
+            type=int,
+            default=_env_optional("GRPC_MAX_CONCURRENT_STREAMS", int),
+            help=(
+                "Calls open at once on one connection (env: "
+                "GRPC_MAX_CONCURRENT_STREAMS)"
+            ),
+        )
+        parser.add_argument(
+            "--max-message-bytes",
+            type=int,
+            default=_env_optional("GRPC_MAX_MESSAGE_BYTES", int),
+            help="Largest request or response message (env: GRPC_MAX_MESSAGE_BYTES)",
+        )
+        parser.add_argument(
+            "--bdp-probe",
+            action=argparse.BooleanOptionalAction,
+            default=_env_optional("GRPC_BDP_PROBE", _parse_bool),
+            help=(
+                "Size flow control windows by bandwidth-delay product probing (env: "
+                "GRPC_BDP_PROBE)"
+            ),
+        )
+        parser.add_argument(
+            "--stream-window-bytes",
+            type=int,
+            default=_env_optional("GRPC_STREAM_WINDOW_BYTES", int),
+            help=(
+                "Initial flow control window of each call (env: "
+                "GRPC_STREAM_WINDOW_BYTES)"
+            ),
+        )
+        args = parser.parse_args(argv)
+        if not 0.0 <= args.stage_sample_rate <= 1.0:
+            parser.error("--stage-sample-rate must be between 0 and 1")
+        if args.log_queue_size < 0:
+            parser.error("--log-queue-size must not be negative")
+        if args.request_log_rate < 0:
+            parser.error("--request-log-rate must not be negative")
+        if args.watch_buffer < 1:
+            parser.error("--watch-buffer must be at least 1")
+        if args.max_watchers < 0:
+            parser.error("--max-watchers must not be negative")
+        for flag in (
+            "keepalive_time",
+            "keepalive_timeout",
+            "max_concurrent_streams",
+            "max_message_bytes",
+            "stream_window_bytes",
+        ):
+            value = getattr(args, flag)
+            if value is not None and value < 0:
+                parser.error(f"--{flag.replace('_', '-')} must not be negative")
+        if args.store_shards < 1:
+            parser.error("--store-shards must be at least 1")
+        if args.store == "sql" and args.data_dir:
+            parser.error("--data-dir does not apply to the sql store")
+        if args.store == "sql" and args.workers > 1:
+            from src.repositories.sql import is_in_memory_sqlite
+
+            if is_in_memory_sqlite(args.database_url):
+                parser.error(
+                    "an in-memory SQLite database cannot be shared by --workers"
+                )
+        return cls(**vars(args))
@@ -1,5 +1,36 @@
 """Interceptors package for gRPC service."""
 
-from .validation_interceptor import ValidationInterceptor
+from .admission_interceptor import AdmissionInterceptor, AsyncAdmissionInterceptor
+from .base import (
+    AsyncHandlerInterceptor,
+    AsyncInterceptorChain,
+    HandlerInterceptor,
+    InterceptorChain,
+)
+from .caching_interceptor import AsyncCachingInterceptor, CachingInterceptor
+from .compression_interceptor import (
+    AsyncCompressionInterceptor,
+    CompressionInterceptor,
+)
+from .deadline_interceptor import AsyncDeadlineInterceptor, DeadlineInterceptor
+from .metrics_interceptor import AsyncMetricsInterceptor, MetricsInterceptor
+from .validation_interceptor import AsyncValidationInterceptor, ValidationInterceptor
 
-__all__ = ["ValidationInterceptor"]
+__all__ = [
+    "AdmissionInterceptor",
+    "AsyncAdmissionInterceptor",
+    "AsyncCachingInterceptor",
+    "AsyncCompressionInterceptor",
+    "AsyncDeadlineInterceptor",
+    "AsyncHandlerInterceptor",
+    "AsyncInterceptorChain",
+    "AsyncMetricsInterceptor",
+    "AsyncValidationInterceptor",
+    "CachingInterceptor",
+    "CompressionInterceptor",
+    "DeadlineInterceptor",
+    "HandlerInterceptor",
+    "InterceptorChain",
+    "MetricsInterceptor",
+    "ValidationInterceptor",
+]
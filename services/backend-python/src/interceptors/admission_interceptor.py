@@ -0,0 +1,290 @@
+"""gRPC interceptor shedding calls the server cannot serve in time."""
+
+import logging
+import time
+from typing import Any, AsyncIterator, Iterable, Iterator, Optional
+
+import grpc
+
+from src.interceptors.base import (
+    AsyncHandlerInterceptor,
+    Behavior,
+    HandlerInterceptor,
+    iterate_responses,
+    replace_behavior,
+)
+from src.utils.concurrency_limit import ConcurrencyLimiter
+from src.utils.metrics import CounterChild, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Weight of a new latency sample in a method's moving average
+_LATENCY_WEIGHT = 0.1
+
+
+class _MethodAdmission:
+    """Latency estimate and shed counters of one method."""
+
+    def __init__(self, method: str, metrics: Optional[MetricsRegistry]):
+        # Moving average of the method's unary latency, 0 until measured
+        self.latency = 0.0
+        self.shed_limit: Optional[CounterChild] = None
+        self.shed_deadline: Optional[CounterChild] = None
+        if metrics is not None:
+            shed = metrics.counter(
+                "grpc_server_shed_total",
+                "Calls rejected by admission control, by reason",
+                ("grpc_method", "reason"),
+            )
+            name = method.rpartition("/")[2]
+            self.shed_limit = shed.labels(name, "limit")
+            self.shed_deadline = shed.labels(name, "deadline")
+
+    def cannot_finish(self, time_remaining: Optional[float]) -> bool:
+        # time_remaining() is None when the client set no deadline. Streams
+        # keep no estimate, so only an expired deadline stops them.
+        return time_remaining is not None and time_remaining < self.latency
+
+    def observe(self, latency: float) -> None:
+        self.latency += (latency - self.latency) * _LATENCY_WEIGHT
+
+
+def _missed_deadline(context: Any) -> bool:
+    remaining = context.time_remaining()
+    return bool(
+        (remaining is not None and remaining <= 0)
+        or context.code() == grpc.StatusCode.DEADLINE_EXCEEDED
+    )
+
+
+def register_limiter_metrics(
+    metrics: MetricsRegistry, limiter: ConcurrencyLimiter
+) -> None:
+    """Expose the current limit and admitted calls of ``limiter``."""
+    metrics.register_callback(
+        "grpc_server_concurrency_limit",
+        "Calls admission control currently lets run at once",
+        lambda: limiter.limit,
+    )
+    metrics.register_callback(
+        "grpc_server_concurrency_in_flight",
+        "Calls admitted and not yet completed",
+        lambda: limiter.in_flight,
+    )
+
+
+class AdmissionInterceptor(HandlerInterceptor):
+    """Rejects calls beyond an adaptive concurrency limit or their deadline.
+
+    A call is failed right away, before validation and the servicer run:
+
+    * with DEADLINE_EXCEEDED if its remaining deadline is shorter than the
+      method's average latency, since the client would give up before the
+      response arrives
+    * with RESOURCE_EXHAUSTED if ``limiter`` already runs as many calls as
+      its current limit, so overload turns into fast retriable errors
+      instead of growing queues
+
+    Unary calls feed their latency, and whether they missed their deadline,
+    back to the limiter. Streams only count as in flight, and calls of
+    ``exempt_methods`` not at all.
+    """
+
+    def __init__(
+        self,
+        limiter: ConcurrencyLimiter,
+        metrics: Optional[MetricsRegistry] = None,
+        exempt_methods: Iterable[str] = (),
+    ):
+        """Initialize the admission interceptor.
+
+        Args:
+            limiter: Concurrency limit shared by all methods
+            metrics: Registry to count shed calls in, if provided
+            exempt_methods: Full names of methods admitted unconditionally,
+                such as streams that stay open indefinitely
+        """
+        super().__init__()
+        self._limiter = limiter
+        self._metrics = metrics
+        self._exempt_methods = frozenset(exempt_methods)
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap the handler of ``method`` with admission control."""
+        if method in self._exempt_methods:
+            return handler
+        admission = _MethodAdmission(method, self._metrics)
+        if handler.unary_unary:
+            return replace_behavior(handler, lambda b: self._admit(admission, b))
+        if handler.unary_stream or handler.stream_stream:
+            return replace_behavior(handler, lambda b: self._admit_stream(admission, b))
+        return replace_behavior(
+            handler, lambda b: self._admit_client_stream(admission, b)
+        )
+
+    def _admit_or_abort(
+        self, admission: _MethodAdmission, context: grpc.ServicerContext
+    ) -> None:
+        if admission.cannot_finish(context.time_remaining()):
+            if admission.shed_deadline is not None:
+                admission.shed_deadline.inc()
+            context.abort(
+                grpc.StatusCode.DEADLINE_EXCEEDED,
+                "Deadline too short for the request to be handled",
+            )
+        if not self._limiter.try_acquire():
+            if admission.shed_limit is not None:
+                admission.shed_limit.inc()
+            context.abort(
+                grpc.StatusCode.RESOURCE_EXHAUSTED,
+                "Server is overloaded, retry later",
+            )
+
+    def _admit(self, admission: _MethodAdmission, behavior: Behavior) -> Behavior:
+        limiter = self._limiter
+
+        def wrapper(request: Any, context: grpc.ServicerContext) -> Any:
+            self._admit_or_abort(admission, context)
+            start = time.perf_counter()
+            try:
+                return behavior(request, context)
+            finally:
+                latency = time.perf_counter() - start
+                admission.observe(latency)
+                limiter.release(latency, _missed_deadline(context))
+
+        return wrapper
+
+    def _admit_client_stream(
+        self, admission: _MethodAdmission, behavior: Behavior
+    ) -> Behavior:
+        limiter = self._limiter
+
+        def wrapper(request_iterator: Any, context: grpc.ServicerContext) -> Any:
+            self._admit_or_abort(admission, context)
+            try:
+                return behavior(request_iterator, context)
+            finally:
+                limiter.release(None)
+
+        return wrapper
+
+    def _admit_stream(
+        self, admission: _MethodAdmission, behavior: Behavior
+    ) -> Behavior:
+        limiter = self._limiter
+
+        def wrapper(request: Any, context: grpc.ServicerContext) -> Iterator[Any]:
+            self._admit_or_abort(admission, context)
+            try:
+                yield from behavior(request, context)
+            finally:
+                limiter.release(None)
+
+        return wrapper
+
+
+class AsyncAdmissionInterceptor(AsyncHandlerInterceptor):
+    """``grpc.aio`` counterpart of ``AdmissionInterceptor``."""
+
+    def __init__(
+        self,
+        limiter: ConcurrencyLimiter,
+        metrics: Optional[MetricsRegistry] = None,
+        exempt_methods: Iterable[str] = (),
+    ):
+        """Initialize the admission interceptor.
+
+        Args:
+            limiter: Concurrency limit shared by all methods
+            metrics: Registry to count shed calls in, if provided
+            exempt_methods: Full names of methods admitted unconditionally,
+                such as streams that stay open indefinitely
+        """
+        super().__init__()
+        self._limiter = limiter
+        self._metrics = metrics
+        self._exempt_methods = frozenset(exempt_methods)
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap the handler of ``method`` with admission control."""
+        if method in self._exempt_methods:
+            return handler
+        admission = _MethodAdmission(method, self._metrics)
+        if handler.unary_unary:
+            return replace_behavior(handler, lambda b: self._admit(admission, b))
+        if handler.unary_stream or handler.stream_stream:
+            return replace_behavior(handler, lambda b: self._admit_stream(admission, b))
+        return replace_behavior(
+            handler, lambda b: self._admit_client_stream(admission, b)
+        )
+
+    async def _admit_or_abort(
+        self, admission: _MethodAdmission, context: grpc.aio.ServicerContext
+    ) -> None:
+        if admission.cannot_finish(context.time_remaining()):
+            if admission.shed_deadline is not None:
+                admission.shed_deadline.inc()
+            await context.abort(
+                grpc.StatusCode.DEADLINE_EXCEEDED,
+                "Deadline too short for the request to be handled",
+            )
+        if not self._limiter.try_acquire():
+            if admission.shed_limit is not None:
+                admission.shed_limit.inc()
+            await context.abort(
+                grpc.StatusCode.RESOURCE_EXHAUSTED,
+                "Server is overloaded, retry later",
+            )
+
+    def _admit(self, admission: _MethodAdmission, behavior: Behavior) -> Behavior:
+        limiter = self._limiter
+
+        async def wrapper(request: Any, context: grpc.aio.ServicerContext) -> Any:
+            await self._admit_or_abort(admission, context)
+            start = time.perf_counter()
+            try:
+                return await behavior(request, context)
+            finally:
+                latency = time.perf_counter() - start
+                admission.observe(latency)
+                limiter.release(latency, _missed_deadline(context))
+
+        return wrapper
+
+    def _admit_client_stream(
+        self, admission: _MethodAdmission, behavior: Behavior
+    ) -> Behavior:
+        limiter = self._limiter
+
+        async def wrapper(
+            request_iterator: AsyncIterator[Any], context: grpc.aio.ServicerContext
+        ) -> Any:
+            await self._admit_or_abort(admission, context)
+            try:
+                return await behavior(request_iterator, context)
+            finally:
+                limiter.release(None)
+
+        return wrapper
+
+    def _admit_stream(
+        self, admission: _MethodAdmission, behavior: Behavior
+    ) -> Behavior:
+        limiter = self._limiter
+
+        async def wrapper(
+            request: Any, context: grpc.aio.ServicerContext
+        ) -> AsyncIterator[Any]:
+            await self._admit_or_abort(admission, context)
+            try:
+                async for response in iterate_responses(behavior(request, context)):
+                    yield response
+            finally:
+                limiter.release(None)
+
+        return wrapper
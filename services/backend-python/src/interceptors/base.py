@@ -0,0 +1,217 @@
+"""Building blocks for interceptors that wrap handlers once per method."""
+
+import logging
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Optional,
+    Sequence,
+    Union,
+)
+
+import grpc
+
+logger = logging.getLogger(__name__)
+
+# A behavior is the servicer callable stored in an RpcMethodHandler. All four
+# RPC kinds share the ``(request_or_iterator, context) -> response`` shape.
+Behavior = Callable[..., Any]
+
+
+def replace_behavior(
+    handler: grpc.RpcMethodHandler,
+    wrap: Callable[[Behavior], Behavior],
+    response_serializer: Optional[Callable[[Any], bytes]] = None,
+) -> grpc.RpcMethodHandler:
+    """Return a handler of the same kind whose behavior is ``wrap(behavior)``.
+
+    The request deserializer is carried over unchanged, and so is the
+    response serializer unless ``response_serializer`` replaces it.
+    """
+    if handler.unary_unary:
+        factory, behavior = grpc.unary_unary_rpc_method_handler, handler.unary_unary
+    elif handler.unary_stream:
+        factory, behavior = grpc.unary_stream_rpc_method_handler, handler.unary_stream
+    elif handler.stream_unary:
+        factory, behavior = grpc.stream_unary_rpc_method_handler, handler.stream_unary
+    else:
+        factory, behavior = (
+            grpc.stream_stream_rpc_method_handler,
+            handler.stream_stream,
+        )
+    return factory(
+        wrap(behavior),
+        request_deserializer=handler.request_deserializer,
+        response_serializer=response_serializer or handler.response_serializer,
+    )
+
+
+async def iterate_responses(responses: Any) -> AsyncIterator[Any]:
+    """Yield from the result of a streaming ``grpc.aio`` behavior.
+
+    Streaming aio behaviors are either async generators or coroutines that
+    write responses through ``context.write``.
+    """
+    if hasattr(responses, "__aiter__"):
+        async for response in responses:
+            yield response
+    else:
+        await responses
+
+
+class HandlerInterceptor(grpc.ServerInterceptor):
+    """Interceptor that wraps each method's handler once and reuses it.
+
+    gRPC runs ``intercept_service`` for every incoming call. Subclasses
+    implement ``wrap_handler`` instead, which runs on the first call of a
+    method; later calls are served from a per-method table with a single dict
+    lookup. This relies on the continuation resolving a method name to the
+    same handler every time, which holds for services registered up front
+    with ``add_*Servicer_to_server``.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, grpc.RpcMethodHandler] = {}
+
+    def intercept_service(
+        self,
+        continuation: Callable[
+            [grpc.HandlerCallDetails], Optional[grpc.RpcMethodHandler]
+        ],
+        handler_call_details: grpc.HandlerCallDetails,
+    ) -> Optional[grpc.RpcMethodHandler]:
+        """Return the memoized wrapped handler for the called method."""
+        method = handler_call_details.method
+        handler = self._handlers.get(method)
+        if handler is not None:
+            return handler
+
+        handler = continuation(handler_call_details)
+        if handler is None:
+            # Unknown methods are not memoized so arbitrary method names
+            # cannot grow the table.
+            return None
+
+        wrapped = self.wrap_handler(method, handler)
+        # A racing first call may wrap the handler twice; both results are
+        # equivalent and the last assignment wins.
+        self._handlers[method] = wrapped
+        return wrapped
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Return ``handler`` wrapped with this interceptor's behavior."""
+        raise NotImplementedError
+
+
+class AsyncHandlerInterceptor(grpc.aio.ServerInterceptor):
+    """``grpc.aio`` counterpart of ``HandlerInterceptor``.
+
+    Subclasses implement ``wrap_handler`` with coroutine behaviors; the
+    wrapped handler is still built once per method.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, grpc.RpcMethodHandler] = {}
+
+    async def intercept_service(
+        self,
+        continuation: Callable[
+            [grpc.HandlerCallDetails], Awaitable[Optional[grpc.RpcMethodHandler]]
+        ],
+        handler_call_details: grpc.HandlerCallDetails,
+    ) -> Optional[grpc.RpcMethodHandler]:
+        """Return the memoized wrapped handler for the called method."""
+        method = handler_call_details.method
+        handler = self._handlers.get(method)
+        if handler is not None:
+            return handler
+
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            return None
+
+        wrapped = self.wrap_handler(method, handler)
+        self._handlers[method] = wrapped
+        return wrapped
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Return ``handler`` wrapped with this interceptor's behavior."""
+        raise NotImplementedError
+
+
+AnyHandlerInterceptor = Union[HandlerInterceptor, AsyncHandlerInterceptor]
+
+
+def compose_stages(
+    stages: Sequence[AnyHandlerInterceptor],
+    method: str,
+    handler: grpc.RpcMethodHandler,
+    exempt_services: Iterable[str] = (),
+) -> grpc.RpcMethodHandler:
+    """Wrap ``handler`` with every stage, so the first stage is outermost.
+
+    Methods of ``exempt_services`` (full service names) are left unwrapped.
+    """
+    if method.lstrip("/").rpartition("/")[0] in exempt_services:
+        return handler
+    for stage in reversed(stages):
+        handler = stage.wrap_handler(method, handler)
+    logger.debug(
+        "Resolved interceptor chain for %s: %s",
+        method,
+        " -> ".join(type(stage).__name__ for stage in stages),
+    )
+    return handler
+
+
+class InterceptorChain(HandlerInterceptor):
+    """Composes several handler interceptors into one resolved-once chain.
+
+    The first stage is the outermost wrapper, so it sees a call first and its
+    response last. The composed handler is built once per method, leaving
+    a single dict lookup on the per-request path no matter how many stages
+    the chain has. Calls to ``exempt_services``, such as health probes,
+    bypass every stage.
+    """
+
+    def __init__(
+        self,
+        stages: Sequence[HandlerInterceptor],
+        exempt_services: Iterable[str] = (),
+    ) -> None:
+        super().__init__()
+        self._stages = list(stages)
+        self._exempt_services = frozenset(exempt_services)
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap ``handler`` with every stage, innermost stage first."""
+        return compose_stages(self._stages, method, handler, self._exempt_services)
+
+
+class AsyncInterceptorChain(AsyncHandlerInterceptor):
+    """``grpc.aio`` counterpart of ``InterceptorChain``."""
+
+    def __init__(
+        self,
+        stages: Sequence[AsyncHandlerInterceptor],
+        exempt_services: Iterable[str] = (),
+    ) -> None:
+        super().__init__()
+        self._stages = list(stages)
+        self._exempt_services = frozenset(exempt_services)
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap ``handler`` with every stage, innermost stage first."""
+        return compose_stages(self._stages, method, handler, self._exempt_services)
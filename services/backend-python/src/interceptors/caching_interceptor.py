@@ -0,0 +1,229 @@
+"""gRPC interceptor serving repeated reads from a response cache."""
+
+import logging
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+import grpc
+
+from src.interceptors.base import (
+    AsyncHandlerInterceptor,
+    Behavior,
+    HandlerInterceptor,
+    replace_behavior,
+)
+from src.utils.response_cache import ResponseCache
+
+logger = logging.getLogger(__name__)
+
+Deserializer = Optional[Callable[[bytes], Any]]
+Serializer = Optional[Callable[[Any], bytes]]
+
+
+def _succeeded(code: Optional[grpc.StatusCode]) -> bool:
+    return code is None or code == grpc.StatusCode.OK
+
+
+class _CachingRules:
+    """Which methods are cached and which ones invalidate them."""
+
+    def __init__(
+        self,
+        cache: ResponseCache,
+        cached_methods: Iterable[str],
+        invalidations: Mapping[str, Iterable[str]],
+    ):
+        self._cache = cache
+        self._cached_methods = frozenset(cached_methods)
+        self._invalidations: Dict[str, Tuple[str, ...]] = {
+            method: tuple(targets) for method, targets in invalidations.items()
+        }
+
+    def is_cached(self, method: str, handler: grpc.RpcMethodHandler) -> bool:
+        # Only unary calls have a single request to key on.
+        return method in self._cached_methods and bool(handler.unary_unary)
+
+    def invalidate_after(self, method: str) -> None:
+        for target in self._invalidations.get(method, ()):
+            self._cache.invalidate(target)
+
+    def invalidates(self, method: str) -> bool:
+        return method in self._invalidations
+
+
+class CachingInterceptor(HandlerInterceptor):
+    """Answers cached methods from a ``ResponseCache`` of serialized responses.
+
+    The handler of a cached method is replaced by one without request
+    deserializer and response serializer, so the behavior receives the raw
+    request bytes and returns response bytes. A hit returns the stored bytes
+    without deserializing the request, running the inner stages and the
+    servicer, or serializing the response. A miss runs them and stores the
+    result if the call succeeded. Successful calls of a method listed in
+    ``invalidations`` drop every cached response of the methods it maps to.
+
+    Stages placed after this one (closer to the servicer) only run on a
+    miss, so validation should come after caching: a cached response always
+    belongs to a request that passed validation before.
+    """
+
+    def __init__(
+        self,
+        cache: ResponseCache,
+        cached_methods: Iterable[str],
+        invalidations: Mapping[str, Iterable[str]],
+    ):
+        """Initialize the caching interceptor.
+
+        Args:
+            cache: Cache to store responses in
+            cached_methods: Full names of unary methods to cache, such as
+                ``/example.ExampleService/GetUser``
+            invalidations: Full method name mapped to the cached methods
+                its successful calls invalidate
+        """
+        super().__init__()
+        self._cache = cache
+        self._rules = _CachingRules(cache, cached_methods, invalidations)
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap the handler of ``method`` with cache lookups or invalidation."""
+        if self._rules.is_cached(method, handler):
+            return grpc.unary_unary_rpc_method_handler(
+                self._cached(
+                    method,
+                    handler.unary_unary,
+                    handler.request_deserializer,
+                    handler.response_serializer,
+                )
+            )
+        if self._rules.invalidates(method):
+            return replace_behavior(handler, lambda b: self._invalidating(method, b))
+        return handler
+
+    def _cached(
+        self,
+        method: str,
+        behavior: Behavior,
+        deserialize: Deserializer,
+        serialize: Serializer,
+    ) -> Behavior:
+        cache = self._cache
+
+        def wrapper(request_bytes: bytes, context: grpc.ServicerContext) -> bytes:
+            response_bytes = cache.get(method, request_bytes)
+            if response_bytes is not None:
+                return response_bytes
+
+            generation = cache.generation(method)
+            try:
+                request = deserialize(request_bytes) if deserialize else request_bytes
+            except Exception:
+                logger.exception("Exception deserializing request for %s", method)
+                context.abort(
+                    grpc.StatusCode.INTERNAL, "Exception deserializing request!"
+                )
+            response = behavior(request, context)
+            response_bytes = serialize(response) if serialize else response
+            if _succeeded(context.code()):
+                cache.put(method, request_bytes, response_bytes, generation)
+            return response_bytes
+
+        return wrapper
+
+    def _invalidating(self, method: str, behavior: Behavior) -> Behavior:
+        rules = self._rules
+
+        def wrapper(request: Any, context: grpc.ServicerContext) -> Any:
+            response = behavior(request, context)
+            if _succeeded(context.code()):
+                rules.invalidate_after(method)
+            return response
+
+        return wrapper
+
+
+class AsyncCachingInterceptor(AsyncHandlerInterceptor):
+    """``grpc.aio`` counterpart of ``CachingInterceptor``."""
+
+    def __init__(
+        self,
+        cache: ResponseCache,
+        cached_methods: Iterable[str],
+        invalidations: Mapping[str, Iterable[str]],
+    ):
+        """Initialize the caching interceptor.
+
+        Args:
+            cache: Cache to store responses in
+            cached_methods: Full names of unary methods to cache, such as
+                ``/example.ExampleService/GetUser``
+            invalidations: Full method name mapped to the cached methods
+                its successful calls invalidate
+        """
+        super().__init__()
+        self._cache = cache
+        self._rules = _CachingRules(cache, cached_methods, invalidations)
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap the handler of ``method`` with cache lookups or invalidation."""
+        if self._rules.is_cached(method, handler):
+            return grpc.unary_unary_rpc_method_handler(
+                self._cached(
+                    method,
+                    handler.unary_unary,
+                    handler.request_deserializer,
+                    handler.response_serializer,
+                )
+            )
+        if self._rules.invalidates(method) and not (
+            handler.unary_stream or handler.stream_stream
+        ):
+            return replace_behavior(handler, lambda b: self._invalidating(method, b))
+        return handler
+
+    def _cached(
+        self,
+        method: str,
+        behavior: Behavior,
+        deserialize: Deserializer,
+        serialize: Serializer,
+    ) -> Behavior:
+        cache = self._cache
+
+        async def wrapper(
+            request_bytes: bytes, context: grpc.aio.ServicerContext
+        ) -> bytes:
+            response_bytes = cache.get(method, request_bytes)
+            if response_bytes is not None:
+                return response_bytes
+
+            generation = cache.generation(method)
+            try:
+                request = deserialize(request_bytes) if deserialize else request_bytes
+            except Exception:
+                logger.exception("Exception deserializing request for %s", method)
+                await context.abort(
+                    grpc.StatusCode.INTERNAL, "Exception deserializing request!"
+                )
+            response = await behavior(request, context)
+            response_bytes = serialize(response) if serialize else response
+            if _succeeded(context.code()):
+                cache.put(method, request_bytes, response_bytes, generation)
+            return response_bytes
+
+        return wrapper
+
+    def _invalidating(self, method: str, behavior: Behavior) -> Behavior:
+        rules = self._rules
+
+        async def wrapper(request: Any, context: grpc.aio.ServicerContext) -> Any:
+            response = await behavior(request, context)
+            if _succeeded(context.code()):
+                rules.invalidate_after(method)
+            return response
+
+        return wrapper
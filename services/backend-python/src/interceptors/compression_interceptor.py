@@ -0,0 +1,100 @@
+"""gRPC interceptor that compresses the responses of selected methods."""
+
+from typing import Any, AsyncIterator
+
+import grpc
+
+from src.interceptors.base import (
+    AsyncHandlerInterceptor,
+    Behavior,
+    HandlerInterceptor,
+    iterate_responses,
+    replace_behavior,
+)
+from src.transport import COMPRESSION_ALGORITHMS, TransportSettings
+
+
+def _method_name(method: str) -> str:
+    # "/example.ExampleService/ListUsers" -> "ListUsers"
+    return method.rsplit("/", 1)[-1]
+
+
+class CompressionInterceptor(HandlerInterceptor):
+    """Sends responses of ``settings.compressed_methods`` compressed.
+
+    gRPC falls back to uncompressed messages for clients that do not list
+    the algorithm in ``grpc-accept-encoding``. Handlers of other methods are
+    left as they are.
+    """
+
+    def __init__(self, settings: TransportSettings):
+        """Initialize the compression interceptor.
+
+        Args:
+            settings: Transport settings naming the algorithm and methods
+        """
+        super().__init__()
+        self._settings = settings
+        self._algorithm = COMPRESSION_ALGORITHMS[settings.compression]
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap the handler of ``method`` if its responses are compressed."""
+        if not self._settings.compressed(_method_name(method)):
+            return handler
+        return replace_behavior(handler, self._compress)
+
+    def _compress(self, behavior: Behavior) -> Behavior:
+        algorithm = self._algorithm
+
+        def wrapper(request: Any, context: grpc.ServicerContext) -> Any:
+            context.set_compression(algorithm)
+            return behavior(request, context)
+
+        return wrapper
+
+
+class AsyncCompressionInterceptor(AsyncHandlerInterceptor):
+    """``grpc.aio`` counterpart of ``CompressionInterceptor``."""
+
+    def __init__(self, settings: TransportSettings):
+        """Initialize the compression interceptor.
+
+        Args:
+            settings: Transport settings naming the algorithm and methods
+        """
+        super().__init__()
+        self._settings = settings
+        self._algorithm = COMPRESSION_ALGORITHMS[settings.compression]
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap the handler of ``method`` if its responses are compressed."""
+        if not self._settings.compressed(_method_name(method)):
+            return handler
+        if handler.unary_stream or handler.stream_stream:
+            return replace_behavior(handler, self._compress_streaming)
+        return replace_behavior(handler, self._compress)
+
+    def _compress(self, behavior: Behavior) -> Behavior:
+        algorithm = self._algorithm
+
+        async def wrapper(request: Any, context: grpc.aio.ServicerContext) -> Any:
+            context.set_compression(algorithm)
+            return await behavior(request, context)
+
+        return wrapper
+
+    def _compress_streaming(self, behavior: Behavior) -> Behavior:
+        algorithm = self._algorithm
+
+        async def wrapper(
+            request: Any, context: grpc.aio.ServicerContext
+        ) -> AsyncIterator[Any]:
+            context.set_compression(algorithm)
+            async for response in iterate_responses(behavior(request, context)):
+                yield response
+
+        return wrapper
@@ -0,0 +1,105 @@
+"""gRPC interceptor that rejects calls whose deadline has already passed."""
+
+import logging
+from typing import Any, AsyncIterator
+
+import grpc
+
+from src.interceptors.base import (
+    AsyncHandlerInterceptor,
+    Behavior,
+    HandlerInterceptor,
+    iterate_responses,
+    replace_behavior,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineInterceptor(HandlerInterceptor):
+    """Fails calls with DEADLINE_EXCEEDED before running the servicer.
+
+    A call that sat in the executor queue until its deadline passed can no
+    longer produce a useful response, so running the handler only wastes a
+    worker thread.
+    """
+
+    def __init__(self, min_time_remaining: float = 0.0):
+        """Initialize the deadline interceptor.
+
+        Args:
+            min_time_remaining: Seconds that must be left on the deadline
+                for a call to be started
+        """
+        super().__init__()
+        self._min_time_remaining = min_time_remaining
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap the handler of ``method`` with a deadline check."""
+        return replace_behavior(handler, self._check_deadline)
+
+    def _check_deadline(self, behavior: Behavior) -> Behavior:
+        min_time_remaining = self._min_time_remaining
+
+        def wrapper(request: Any, context: grpc.ServicerContext) -> Any:
+            time_remaining = context.time_remaining()
+            # time_remaining() is None when the client set no deadline.
+            if time_remaining is not None and time_remaining <= min_time_remaining:
+                logger.debug("Deadline expired before handling, dropping call")
+                context.abort(
+                    grpc.StatusCode.DEADLINE_EXCEEDED,
+                    "Deadline expired before the request was handled",
+                )
+            return behavior(request, context)
+
+        return wrapper
+
+
+class AsyncDeadlineInterceptor(AsyncHandlerInterceptor):
+    """``grpc.aio`` counterpart of ``DeadlineInterceptor``."""
+
+    def __init__(self, min_time_remaining: float = 0.0):
+        """Initialize the deadline interceptor.
+
+        Args:
+            min_time_remaining: Seconds that must be left on the deadline
+                for a call to be started
+        """
+        super().__init__()
+        self._min_time_remaining = min_time_remaining
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap the handler of ``method`` with a deadline check."""
+        if handler.unary_stream or handler.stream_stream:
+            return replace_behavior(handler, self._check_deadline_streaming)
+        return replace_behavior(handler, self._check_deadline)
+
+    async def _abort_if_expired(self, context: grpc.aio.ServicerContext) -> None:
+        time_remaining = context.time_remaining()
+        if time_remaining is not None and time_remaining <= self._min_time_remaining:
+            logger.debug("Deadline expired before handling, dropping call")
+            await context.abort(
+                grpc.StatusCode.DEADLINE_EXCEEDED,
+                "Deadline expired before the request was handled",
+            )
+
+    def _check_deadline(self, behavior: Behavior) -> Behavior:
+        async def wrapper(request: Any, context: grpc.aio.ServicerContext) -> Any:
+            await self._abort_if_expired(context)
+            return await behavior(request, context)
+
+        return wrapper
+
+    def _check_deadline_streaming(self, behavior: Behavior) -> Behavior:
+        async def wrapper(
+            request: Any, context: grpc.aio.ServicerContext
+        ) -> AsyncIterator[Any]:
+            await self._abort_if_expired(context)
+            async for response in iterate_responses(behavior(request, context)):
+                yield response
+
+        return wrapper
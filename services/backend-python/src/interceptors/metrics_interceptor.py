@@ -0,0 +1,190 @@
+"""gRPC interceptor recording per-method request metrics."""
+
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+import grpc
+
+from src.interceptors.base import (
+    AsyncHandlerInterceptor,
+    Behavior,
+    HandlerInterceptor,
+    iterate_responses,
+    replace_behavior,
+)
+from src.utils.metrics import CounterChild, GaugeChild, HistogramChild, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+_LABELS = ("grpc_type", "grpc_service", "grpc_method")
+
+
+def _rpc_type(handler: grpc.RpcMethodHandler) -> str:
+    if handler.unary_unary:
+        return "unary"
+    if handler.unary_stream:
+        return "server_stream"
+    if handler.stream_unary:
+        return "client_stream"
+    return "bidi_stream"
+
+
+def _split_method(method: str) -> Tuple[str, str]:
+    # "/package.Service/Method" -> ("package.Service", "Method")
+    service, _, name = method.lstrip("/").rpartition("/")
+    return service, name
+
+
+class _MethodMetrics:
+    """Metric children of one method, resolved once when it is first called."""
+
+    def __init__(self, registry: MetricsRegistry, method: str, rpc_type: str):
+        service, name = _split_method(method)
+        self._labels = (rpc_type, service, name)
+        self._handled_metric = registry.counter(
+            "grpc_server_handled_total",
+            "RPCs completed on the server, by status code",
+            (*_LABELS, "grpc_code"),
+        )
+        self.started: CounterChild = registry.counter(
+            "grpc_server_started_total", "RPCs started on the server", _LABELS
+        ).labels(*self._labels)
+        self.in_flight: GaugeChild = registry.gauge(
+            "grpc_server_in_flight_requests", "RPCs currently being handled", _LABELS
+        ).labels(*self._labels)
+        self.latency: HistogramChild = registry.histogram(
+            "grpc_server_handling_seconds",
+            "Time from the interceptor receiving an RPC to it completing",
+            _LABELS,
+        ).labels(*self._labels)
+        self._handled: Dict[Optional[grpc.StatusCode], CounterChild] = {}
+
+    def handled(self, code: Optional[grpc.StatusCode]) -> CounterChild:
+        child = self._handled.get(code)
+        if child is None:
+            name = "OK" if code is None else code.name
+            child = self._handled_metric.labels(*self._labels, name)
+            self._handled[code] = child
+        return child
+
+    def finish(self, start: float, context: Any, failed: bool) -> None:
+        self.latency.observe(time.perf_counter() - start)
+        self.in_flight.dec()
+        # abort() sets the code before raising; any other exception ends
+        # the call with UNKNOWN.
+        code = context.code()
+        if code is None and failed:
+            code = grpc.StatusCode.UNKNOWN
+        self.handled(code).inc()
+
+
+class MetricsInterceptor(HandlerInterceptor):
+    """Counts started and completed RPCs and times them per method.
+
+    Exposes, labelled by RPC type, service and method:
+
+    * ``grpc_server_started_total`` and ``grpc_server_handled_total``
+      (the latter also by status code)
+    * ``grpc_server_in_flight_requests``
+    * ``grpc_server_handling_seconds``, a latency histogram
+
+    Metric children are resolved when a method is first called and written
+    through per-thread cells, so a call costs a few list increments and two
+    clock reads. Place it first in the chain to time every other stage.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        super().__init__()
+        self._registry = registry
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap the handler of ``method`` with metric recording."""
+        metrics = _MethodMetrics(self._registry, method, _rpc_type(handler))
+        if handler.unary_stream or handler.stream_stream:
+            return replace_behavior(handler, lambda b: self._record_stream(metrics, b))
+        return replace_behavior(handler, lambda b: self._record(metrics, b))
+
+    @staticmethod
+    def _record(metrics: _MethodMetrics, behavior: Behavior) -> Behavior:
+        def wrapper(request: Any, context: grpc.ServicerContext) -> Any:
+            metrics.started.inc()
+            metrics.in_flight.inc()
+            start = time.perf_counter()
+            failed = True
+            try:
+                response = behavior(request, context)
+                failed = False
+                return response
+            finally:
+                metrics.finish(start, context, failed)
+
+        return wrapper
+
+    @staticmethod
+    def _record_stream(metrics: _MethodMetrics, behavior: Behavior) -> Behavior:
+        def wrapper(request: Any, context: grpc.ServicerContext) -> Iterator[Any]:
+            metrics.started.inc()
+            metrics.in_flight.inc()
+            start = time.perf_counter()
+            failed = True
+            try:
+                yield from behavior(request, context)
+                failed = False
+            finally:
+                metrics.finish(start, context, failed)
+
+        return wrapper
+
+
+class AsyncMetricsInterceptor(AsyncHandlerInterceptor):
+    """``grpc.aio`` counterpart of ``MetricsInterceptor``."""
+
+    def __init__(self, registry: MetricsRegistry):
+        super().__init__()
+        self._registry = registry
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap the handler of ``method`` with metric recording."""
+        metrics = _MethodMetrics(self._registry, method, _rpc_type(handler))
+        if handler.unary_stream or handler.stream_stream:
+            return replace_behavior(handler, lambda b: self._record_stream(metrics, b))
+        return replace_behavior(handler, lambda b: self._record(metrics, b))
+
+    @staticmethod
+    def _record(metrics: _MethodMetrics, behavior: Behavior) -> Behavior:
+        async def wrapper(request: Any, context: grpc.aio.ServicerContext) -> Any:
+            metrics.started.inc()
+            metrics.in_flight.inc()
+            start = time.perf_counter()
+            failed = True
+            try:
+                response = await behavior(request, context)
+                failed = False
+                return response
+            finally:
+                metrics.finish(start, context, failed)
+
+        return wrapper
+
+    @staticmethod
+    def _record_stream(metrics: _MethodMetrics, behavior: Behavior) -> Behavior:
+        async def wrapper(
+            request: Any, context: grpc.aio.ServicerContext
+        ) -> AsyncIterator[Any]:
+            metrics.started.inc()
+            metrics.in_flight.inc()
+            start = time.perf_counter()
+            failed = True
+            try:
+                async for response in iterate_responses(behavior(request, context)):
+                    yield response
+                failed = False
+            finally:
+                metrics.finish(start, context, failed)
+
+        return wrapper
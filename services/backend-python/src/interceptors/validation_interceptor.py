@@ -1,90 +1,147 @@
 """gRPC interceptor for protovalidate validation."""
 
 import logging
-from typing import Callable, Any
+import time
+from typing import Any, AsyncIterator, Iterable, Iterator, Optional, Tuple
 
 import grpc
+from google.protobuf.descriptor import ServiceDescriptor
 
-# Setup protovalidate module aliases
-from src.utils import protovalidate_setup  # noqa: F401
-
-from protovalidate import validate, ValidationError
+from src.interceptors.base import (
+    AsyncHandlerInterceptor,
+    HandlerInterceptor,
+    iterate_responses,
+)
+from src.utils.metrics import Counter, MetricsRegistry
+from src.utils.stage_timer import Sampled, StageTimer
+from src.utils.validator_cache import ValidationError, ValidatorCache
 
 logger = logging.getLogger(__name__)
 
 
-class ValidationInterceptor(grpc.ServerInterceptor):
+def _failure_counter(metrics: Optional[MetricsRegistry]) -> Optional[Counter]:
+    if metrics is None:
+        return None
+    return metrics.counter(
+        "grpc_server_validation_failures_total",
+        "Requests rejected by protovalidate, by message type",
+        ("message",),
+    )
+
+
+def _serializers(
+    method: str, handler: grpc.RpcMethodHandler, stage_timer: Optional[StageTimer]
+) -> Tuple[Any, Any]:
+    """Return the (de)serializers of ``handler``, timed if ``stage_timer`` is set."""
+    if stage_timer is None:
+        return handler.request_deserializer, handler.response_serializer
+    name = method.rpartition("/")[2]
+    return (
+        stage_timer.wrap_deserializer(name, handler.request_deserializer),
+        stage_timer.wrap_serializer(handler.response_serializer),
+    )
+
+
+class ValidationInterceptor(HandlerInterceptor):
     """Interceptor that validates incoming gRPC requests using protovalidate."""
-    
-    def __init__(self):
-        """Initialize the validation interceptor."""
-        logger.info("🔒 ValidationInterceptor initialized")
 
-    def intercept_service(
+    def __init__(
         self,
-        continuation: Callable,
-        handler_call_details: grpc.HandlerCallDetails,
+        validator_cache: Optional[ValidatorCache] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        stage_timer: Optional[StageTimer] = None,
+    ) -> None:
+        """Initialize the validation interceptor.
+
+        Args:
+            validator_cache: Cache of compiled rules, shared if provided
+            metrics: Registry to count validation failures in, if provided
+            stage_timer: Times the stages of sampled unary calls, if provided
+        """
+        super().__init__()
+        self._validators = validator_cache or ValidatorCache()
+        self._failures = _failure_counter(metrics)
+        self._stage_timer = stage_timer
+        logger.info("🔒 ValidationInterceptor initialized")
+
+    def warm_up(self, services: Iterable[ServiceDescriptor]) -> None:
+        """Compile validation rules for every request type of ``services``.
+
+        Called at server start so the first RPC of each method does not pay
+        for rule compilation.
+        """
+        self._validators.warm_up_services(services)
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
     ) -> grpc.RpcMethodHandler:
-        """Intercept gRPC service calls to validate requests."""
-        logger.info(f"🔍 Intercepting service call: {handler_call_details.method}")
-        
-        # Get the original handler
-        handler = continuation(handler_call_details)
-        
-        if handler is None:
-            return None
-        
-        # Wrap the handler with validation
+        """Wrap the handler of ``method`` with request validation."""
+        logger.debug("🔍 Adding validation to %s", method)
+
         if handler.unary_unary:
-            return self._wrap_unary_unary(handler)
+            return self._wrap_unary_unary(method, handler)
         elif handler.unary_stream:
             return self._wrap_unary_stream(handler)
         elif handler.stream_unary:
             return self._wrap_stream_unary(handler)
         elif handler.stream_stream:
             return self._wrap_stream_stream(handler)
-        
+
         return handler
 
     def _validate_request(self, request: Any, context: grpc.ServicerContext) -> bool:
         """Validate a request message using protovalidate.
-        
+
         Args:
             request: The request message to validate
             context: The gRPC context
-            
+
         Returns:
             True if validation passes, False otherwise
         """
         try:
-            logger.info(f"Validating request: {type(request).__name__}")
-            validate(request)
-            logger.info("Validation passed")
+            self._validators.validate(request)
             return True
         except ValidationError as e:
-            logger.warning(f"Validation failed for {type(request).__name__}: {e}")
-            context.abort(
-                grpc.StatusCode.INVALID_ARGUMENT,
-                f"Validation failed: {e}"
-            )
+            logger.warning("Validation failed for %s: %s", type(request).__name__, e)
+            if self._failures is not None:
+                self._failures.labels(request.DESCRIPTOR.full_name).inc()
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, f"Validation failed: {e}")
             return False
 
-    def _wrap_unary_unary(self, handler: grpc.RpcMethodHandler) -> grpc.RpcMethodHandler:
-        """Wrap unary-unary handler with validation."""
+    def _wrap_unary_unary(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap unary-unary handler with validation and stage timing."""
         original_handler = handler.unary_unary
+        deserializer, serializer = _serializers(method, handler, self._stage_timer)
 
         def wrapper(request: Any, context: grpc.ServicerContext) -> Any:
-            if not self._validate_request(request, context):
+            if type(request) is not Sampled:
+                if not self._validate_request(request, context):
+                    return None
+                return original_handler(request, context)
+
+            sample = request.sample
+            start = time.perf_counter()
+            valid = self._validate_request(request.message, context)
+            validated = time.perf_counter()
+            sample.durations["validate"] = validated - start
+            if not valid:
                 return None
-            return original_handler(request, context)
+            response = original_handler(request.message, context)
+            sample.durations["handler"] = time.perf_counter() - validated
+            return Sampled(response, sample)
 
         return grpc.unary_unary_rpc_method_handler(
             wrapper,
-            request_deserializer=handler.request_deserializer,
-            response_serializer=handler.response_serializer,
+            request_deserializer=deserializer,
+            response_serializer=serializer,
         )
 
-    def _wrap_unary_stream(self, handler: grpc.RpcMethodHandler) -> grpc.RpcMethodHandler:
+    def _wrap_unary_stream(
+        self, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
         """Wrap unary-stream handler with validation."""
         original_handler = handler.unary_stream
 
@@ -99,18 +156,20 @@ class ValidationInterceptor(grpc.ServerInterceptor):
             response_serializer=handler.response_serializer,
         )
 
-    def _wrap_stream_unary(self, handler: grpc.RpcMethodHandler) -> grpc.RpcMethodHandler:
+    def _wrap_stream_unary(
+        self, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
         """Wrap stream-unary handler with validation."""
         original_handler = handler.stream_unary
 
         def wrapper(request_iterator: Any, context: grpc.ServicerContext) -> Any:
             # Validate each request in the stream
-            def validated_iterator():
+            def validated_iterator() -> Iterator[Any]:
                 for request in request_iterator:
                     if not self._validate_request(request, context):
                         return
                     yield request
-            
+
             return original_handler(validated_iterator(), context)
 
         return grpc.stream_unary_rpc_method_handler(
@@ -119,18 +178,20 @@ class ValidationInterceptor(grpc.ServerInterceptor):
             response_serializer=handler.response_serializer,
         )
 
-    def _wrap_stream_stream(self, handler: grpc.RpcMethodHandler) -> grpc.RpcMethodHandler:
+    def _wrap_stream_stream(
+        self, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
         """Wrap stream-stream handler with validation."""
         original_handler = handler.stream_stream
 
         def wrapper(request_iterator: Any, context: grpc.ServicerContext) -> Any:
             # Validate each request in the stream
-            def validated_iterator():
+            def validated_iterator() -> Iterator[Any]:
                 for request in request_iterator:
                     if not self._validate_request(request, context):
                         return
                     yield request
-            
+
             return original_handler(validated_iterator(), context)
 
         return grpc.stream_stream_rpc_method_handler(
@@ -138,3 +199,157 @@ class ValidationInterceptor(grpc.ServerInterceptor):
             request_deserializer=handler.request_deserializer,
             response_serializer=handler.response_serializer,
         )
+
+
+class AsyncValidationInterceptor(AsyncHandlerInterceptor):
+    """``grpc.aio`` interceptor that validates requests using protovalidate."""
+
+    def __init__(
+        self,
+        validator_cache: Optional[ValidatorCache] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        stage_timer: Optional[StageTimer] = None,
+    ):
+        """Initialize the validation interceptor.
+
+        Args:
+            validator_cache: Cache of compiled rules, shared if provided
+            metrics: Registry to count validation failures in, if provided
+            stage_timer: Times the stages of sampled unary calls, if provided
+        """
+        super().__init__()
+        self._validators = validator_cache or ValidatorCache()
+        self._failures = _failure_counter(metrics)
+        self._stage_timer = stage_timer
+        logger.info("🔒 AsyncValidationInterceptor initialized")
+
+    def warm_up(self, services: Iterable[ServiceDescriptor]) -> None:
+        """Compile validation rules for every request type of ``services``."""
+        self._validators.warm_up_services(services)
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap the handler of ``method`` with request validation."""
+        logger.debug("🔍 Adding validation to %s", method)
+
+        if handler.unary_unary:
+            return self._wrap_unary_unary(method, handler)
+        elif handler.unary_stream:
+            return self._wrap_unary_stream(handler)
+        elif handler.stream_unary:
+            return self._wrap_stream_unary(handler)
+        elif handler.stream_stream:
+            return self._wrap_stream_stream(handler)
+
+        return handler
+
+    async def _validate_request(
+        self, request: Any, context: grpc.aio.ServicerContext
+    ) -> None:
+        """Validate a request message, aborting the call if it is invalid."""
+        try:
+            self._validators.validate(request)
+        except ValidationError as e:
+            logger.warning("Validation failed for %s: %s", type(request).__name__, e)
+            if self._failures is not None:
+                self._failures.labels(request.DESCRIPTOR.full_name).inc()
+            await context.abort(
+                grpc.StatusCode.INVALID_ARGUMENT, f"Validation failed: {e}"
+            )
+
+    def _validated_iterator(
+        self, request_iterator: AsyncIterator[Any], context: grpc.aio.ServicerContext
+    ) -> AsyncIterator[Any]:
+        async def validated_iterator() -> AsyncIterator[Any]:
+            async for request in request_iterator:
+                await self._validate_request(request, context)
+                yield request
+
+        return validated_iterator()
+
+    def _wrap_unary_unary(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap unary-unary handler with validation and stage timing."""
+        original_handler = handler.unary_unary
+        deserializer, serializer = _serializers(method, handler, self._stage_timer)
+
+        async def wrapper(request: Any, context: grpc.aio.ServicerContext) -> Any:
+            if type(request) is not Sampled:
+                await self._validate_request(request, context)
+                return await original_handler(request, context)
+
+            sample = request.sample
+            start = time.perf_counter()
+            await self._validate_request(request.message, context)
+            validated = time.perf_counter()
+            sample.durations["validate"] = validated - start
+            response = await original_handler(request.message, context)
+            sample.durations["handler"] = time.perf_counter() - validated
+            return Sampled(response, sample)
+
+        return grpc.unary_unary_rpc_method_handler(
+            wrapper,
+            request_deserializer=deserializer,
+            response_serializer=serializer,
+        )
+
+    def _wrap_unary_stream(
+        self, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap unary-stream handler with validation."""
+        original_handler = handler.unary_stream
+
+        async def wrapper(
+            request: Any, context: grpc.aio.ServicerContext
+        ) -> AsyncIterator[Any]:
+            await self._validate_request(request, context)
+            async for response in iterate_responses(original_handler(request, context)):
+                yield response
+
+        return grpc.unary_stream_rpc_method_handler(
+            wrapper,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
+
+    def _wrap_stream_unary(
+        self, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap stream-unary handler with validation."""
+        original_handler = handler.stream_unary
+
+        async def wrapper(
+            request_iterator: AsyncIterator[Any], context: grpc.aio.ServicerContext
+        ) -> Any:
+            return await original_handler(
+                self._validated_iterator(request_iterator, context), context
+            )
+
+        return grpc.stream_unary_rpc_method_handler(
+            wrapper,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
+
+    def _wrap_stream_stream(
+        self, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        """Wrap stream-stream handler with validation."""
+        original_handler = handler.stream_stream
+
+        async def wrapper(
+            request_iterator: AsyncIterator[Any], context: grpc.aio.ServicerContext
+        ) -> AsyncIterator[Any]:
+            responses = original_handler(
+                self._validated_iterator(request_iterator, context), context
+            )
+            async for response in iterate_responses(responses):
+                yield response
+
+        return grpc.stream_stream_rpc_method_handler(
+            wrapper,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
@@ -0,0 +1,189 @@
+"""Pre-fork launcher running several gRPC server processes on one address.
+
+One Python process saturates a single core because of the GIL. The launcher
+spawns ``config.workers`` server processes that all bind
+``config.listen_addr`` with ``SO_REUSEPORT``, so the kernel spreads incoming
+connections across them.
+
+With the in-process stores, users live in one repository hosted by a
+``multiprocessing`` manager process (see ``src.repositories.shared``).
+Every worker writes to it through a ``SharedUserRepository``, so a user
+created through one worker is immediately visible through all others, and
+reaches WatchUsers calls on every worker. Unless
+``config.worker_replicas`` is off, each worker reads from its own copy of
+the store, which follows the store's changes. With the sql store, every worker
+connects to the database itself and WatchUsers is unavailable.
+"""
+
+import dataclasses
+import functools
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from multiprocessing.connection import wait
+from typing import Any, Dict, Iterable, Optional
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from src.config import ServerConfig
+from src.repositories.shared import SharedUserRepository, start_user_store
+
+logger = logging.getLogger(__name__)
+
+# grpc must not be initialized in a process that forks, so every child
+# starts from a fresh interpreter.
+_mp = multiprocessing.get_context("spawn")
+
+# Seconds a worker gets beyond its drain delay and grace period to exit
+DRAIN_MARGIN = 5.0
+
+
+def _run_worker(
+    config: ServerConfig, store_address: Any, authkey: bytes, published: Any
+) -> None:
+    """Entry point of a worker process."""
+    from src.main import (
+        build_in_process_store,
+        configure_logging,
+        serve,
+        serve_async,
+    )
+
+    configure_logging(config)
+    repository = None
+    if store_address is not None:
+        replica = None
+        if config.worker_replicas:
+            replica = functools.partial(build_in_process_store, config)
+        repository = SharedUserRepository(store_address, authkey, published, replica)
+
+    logger.info("👷 Worker %d serving on %s", os.getpid(), config.listen_addr)
+    if config.mode == "aio":
+        import asyncio
+
+        asyncio.run(serve_async(config, repository))
+    else:
+        serve(config, repository)
+
+
+def stop_workers(
+    processes: Iterable[multiprocessing.process.BaseProcess], timeout: float
+) -> None:
+    """Send SIGTERM to every process and kill those still running after ``timeout``.
+
+    Workers report NOT_SERVING for ``drain_delay`` and then finish
+    in-flight RPCs within ``shutdown_grace``, so ``timeout`` must cover
+    both.
+    """
+    processes = list(processes)
+    for process in processes:
+        if process.is_alive():
+            # Sends SIGTERM
+            process.terminate()
+
+    deadline = time.monotonic() + timeout
+    for process in processes:
+        process.join(max(0.0, deadline - time.monotonic()))
+        if process.is_alive():
+            logger.warning("Worker %s did not drain in time, killing it", process.name)
+            process.kill()
+            process.join()
+
+
+def launch(config: ServerConfig) -> None:
+    """Run ``config.workers`` server processes until SIGTERM or SIGINT.
+
+    On shutdown the signal is forwarded to every worker, which reports
+    NOT_SERVING for ``config.drain_delay`` seconds, then stops accepting new
+    RPCs and lets in-flight ones finish within ``config.shutdown_grace``
+    seconds. Workers still running after both are killed. A worker that
+    exits on its own is replaced.
+    """
+    authkey = os.urandom(16)
+    store = None
+    from src.main import build_repository
+
+    if config.store == "sql":
+        # Create the schema and seed it once, before workers race to do so
+        build_repository(config).close()  # type: ignore[union-attr]
+    else:
+        store = start_user_store(
+            authkey,
+            ctx=_mp,
+            factory=functools.partial(build_repository, config),
+            capacity=config.watch_buffer,
+        )
+        logger.info("🗄️  Shared user store started")
+    store_address: Optional[Any] = None if store is None else store.address
+    published: Optional[Any] = None if store is None else store.published
+
+    workers: Dict[int, multiprocessing.process.BaseProcess] = {}
+
+    def start_worker(index: int) -> None:
+        worker_config = config
+        if config.metrics_port:
+            # Each worker serves its own /metrics
+            worker_config = dataclasses.replace(
+                config, metrics_port=config.metrics_port + index
+            )
+        process = _mp.Process(
+            target=_run_worker,
+            args=(worker_config, store_address, authkey, published),
+            name=f"grpc-worker-{index}",
+        )
+        process.start()
+        workers[index] = process
+
+    stopping = False
+
+    def forward_profile_request(signum: int, frame: Any) -> None:
+        # Profile every worker; the launcher itself only waits
+        for process in workers.values():
+            if process.is_alive() and process.pid is not None:
+                os.kill(process.pid, signal.SIGUSR1)
+
+    def request_stop(signum: int, frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+    if config.profiling:
+        signal.signal(signal.SIGUSR1, forward_profile_request)
+
+    for index in range(config.workers):
+        start_worker(index)
+    logger.info(
+        "🚀 Launched %d workers on %s (%s mode)",
+        config.workers,
+        config.listen_addr,
+        config.mode,
+    )
+
+    while not stopping:
+        wait([process.sentinel for process in workers.values()], timeout=1.0)
+        if stopping:
+            break
+        for index, process in list(workers.items()):
+            if not process.is_alive():
+                logger.error(
+                    "💥 Worker %s exited with code %s, restarting",
+                    process.name,
+                    process.exitcode,
+                )
+                start_worker(index)
+
+    logger.info("🛑 Draining %d workers...", len(workers))
+    stop_workers(
+        workers.values(),
+        config.drain_delay + config.shutdown_grace + DRAIN_MARGIN,
+    )
+
+    if store is not None:
+        # Lets a persistent store take its final snapshot
+        store.UserStore().close()  # type: ignore[attr-defined]
+        store.shutdown()
+    logger.info("👋 All workers stopped")
@@ -1,81 +1,556 @@
 """Main entry point for the gRPC server."""
 
+import asyncio
 import logging
+import os
 import signal
 import sys
 import time
 from concurrent import futures
+from typing import Any, Callable, NoReturn, Optional, Sequence, Tuple
 
 import grpc
 
 # Setup protovalidate module aliases BEFORE importing proto files
-from src.utils import protovalidate_setup  # noqa: F401
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+# Import generated gRPC code
+from proto_generated import example_service_pb2, health_pb2_grpc
 
 # Import our service implementation
+from src.api.async_example_service import AsyncExampleServiceServicer
+from src.api.encoded_responses import EXAMPLE_SERVICE, add_servicer_to_server
 from src.api.example_service import ExampleServiceServicer
-from src.interceptors import ValidationInterceptor
+from src.api.health_service import (
+    HEALTH_SERVICE_NAME,
+    SERVING,
+    AsyncHealthServicer,
+    HealthServicer,
+)
+from src.config import ServerConfig
+from src.interceptors import (
+    AdmissionInterceptor,
+    AsyncAdmissionInterceptor,
+    AsyncCachingInterceptor,
+    AsyncCompressionInterceptor,
+    AsyncDeadlineInterceptor,
+    AsyncInterceptorChain,
+    AsyncMetricsInterceptor,
+    AsyncValidationInterceptor,
+    CachingInterceptor,
+    CompressionInterceptor,
+    DeadlineInterceptor,
+    InterceptorChain,
+    MetricsInterceptor,
+    ValidationInterceptor,
+)
+from src.interceptors.admission_interceptor import register_limiter_metrics
+from src.repositories import (
+    ColumnarUserRepository,
+    DurableUserRepository,
+    InMemoryUserRepository,
+    ShardedUserRepository,
+    UserRepository,
+)
+from src.utils.change_feed import ChangeFeed
+from src.utils.concurrency_limit import build_limiter
+from src.utils.debug_endpoints import debug_routes
+from src.utils.log_pipeline import log_stats, start_logging
+from src.utils.metrics import MetricsRegistry
+from src.utils.metrics_server import start_metrics_server
+from src.utils.profiler import Profile, SamplingProfiler, write_profile
+from src.utils.response_cache import ResponseCache
+from src.utils.stage_timer import StageTimer
+from src.utils.validator_cache import quiet_cel_logging
 
-# Import generated gRPC code
-from proto_generated import example_service_pb2_grpc
+logger = logging.getLogger(__name__)
+quiet_cel_logging()
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+_METHOD_PREFIX = (
+    f"/{example_service_pb2.DESCRIPTOR.services_by_name['ExampleService'].full_name}/"
 )
-logger = logging.getLogger(__name__)
+# Read methods whose responses are cached
+CACHED_METHODS = (
+    _METHOD_PREFIX + "GetUser",
+    _METHOD_PREFIX + "ListUsers",
+    _METHOD_PREFIX + "SearchUsers",
+)
+# Writes mapped to the cached reads they change. Users are never modified,
+# so a new user only changes list and search pages; GetUser misses are not
+# cached.
+_USER_LISTINGS = (_METHOD_PREFIX + "ListUsers", _METHOD_PREFIX + "SearchUsers")
+CACHE_INVALIDATIONS = {
+    _METHOD_PREFIX + "CreateUser": _USER_LISTINGS,
+    _METHOD_PREFIX + "BulkCreateUsers": _USER_LISTINGS,
+}
+# Streams that stay open for as long as the client wants them, so they are
+# not counted against the adaptive concurrency limit
+LONG_LIVED_METHODS = (_METHOD_PREFIX + "WatchUsers",)
+
+
+def configure_logging(config: ServerConfig) -> None:
+    """Log through a queue and a writer thread as ``config`` sets out."""
+    start_logging(
+        level=getattr(logging, config.log_level),
+        max_queued=config.log_queue_size,
+        request_log_rate=config.request_log_rate,
+    )
+    quiet_cel_logging()
+
+
+def build_response_cache(config: ServerConfig) -> Optional[ResponseCache]:
+    """Create the response cache, or None if ``config`` disables it."""
+    if config.response_cache_bytes <= 0:
+        return None
+    return ResponseCache(config.response_cache_bytes, config.response_cache_ttl)
+
+
+def build_interceptors(
+    config: ServerConfig,
+    response_cache: Optional[ResponseCache] = None,
+    metrics: Optional[MetricsRegistry] = None,
+    stage_timer: Optional[StageTimer] = None,
+) -> list:
+    """Create the interceptor chain for ``config.mode``, resolved once per method.
+
+    Metrics come first so they time every other stage. Compression is
+    chosen before the response cache, so cache hits are compressed too. The
+    response cache sits before admission control and validation, so cache
+    hits are never shed and skip validation. Validation also times the stages of calls
+    sampled by ``stage_timer``, and compiles its rules up front unless
+    ``config.warm_up_validation`` is off. Health probes bypass the chain.
+    """
+    services = example_service_pb2.DESCRIPTOR.services_by_name.values()
+    limiter = build_limiter(config.concurrency_limit, config.max_concurrent_rpcs)
+    if limiter is not None and metrics is not None:
+        register_limiter_metrics(metrics, limiter)
+    transport = config.transport()
+    if config.mode == "aio":
+        stages: list = []
+        if metrics is not None:
+            stages.append(AsyncMetricsInterceptor(metrics))
+        if transport.compression != "none":
+            stages.append(AsyncCompressionInterceptor(transport))
+        stages.append(AsyncDeadlineInterceptor())
+        if response_cache is not None:
+            stages.append(
+                AsyncCachingInterceptor(
+                    response_cache, CACHED_METHODS, CACHE_INVALIDATIONS
+                )
+            )
+        if limiter is not None:
+            stages.append(
+                AsyncAdmissionInterceptor(limiter, metrics, LONG_LIVED_METHODS)
+            )
+        if config.validate_requests:
+            validation_interceptor = AsyncValidationInterceptor(
+                metrics=metrics, stage_timer=stage_timer
+            )
+            if config.warm_up_validation:
+                validation_interceptor.warm_up(services)
+            stages.append(validation_interceptor)
+        return [AsyncInterceptorChain(stages, exempt_services=(HEALTH_SERVICE_NAME,))]
+
+    stages = []
+    if metrics is not None:
+        stages.append(MetricsInterceptor(metrics))
+    if transport.compression != "none":
+        stages.append(CompressionInterceptor(transport))
+    stages.append(DeadlineInterceptor())
+    if response_cache is not None:
+        stages.append(
+            CachingInterceptor(response_cache, CACHED_METHODS, CACHE_INVALIDATIONS)
+        )
+    if limiter is not None:
+        stages.append(AdmissionInterceptor(limiter, metrics, LONG_LIVED_METHODS))
+    if config.validate_requests:
+        validation_interceptor = ValidationInterceptor(
+            metrics=metrics, stage_timer=stage_timer
+        )
+        if config.warm_up_validation:
+            validation_interceptor.warm_up(services)
+        stages.append(validation_interceptor)
+    return [InterceptorChain(stages, exempt_services=(HEALTH_SERVICE_NAME,))]
+
+
+def build_in_process_store(config: ServerConfig) -> UserRepository:
+    """Create an empty, unpersisted store of the kind ``config.store`` selects.
+
+    Also builds the copy of the shared store each ``--workers`` process
+    serves reads from.
+    """
+    if config.store == "sharded":
+        return ShardedUserRepository(
+            config.store_shards, search_indexes=config.search_indexes
+        )
+    if config.store == "columnar":
+        return ColumnarUserRepository(config.search_indexes)
+    return InMemoryUserRepository(config.search_indexes)
 
 
-def serve():
-    """Start the gRPC server."""
-    # Create gRPC server with validation interceptor
-    interceptors = [ValidationInterceptor()]
+def build_repository(config: ServerConfig) -> Optional[UserRepository]:
+    """Create the user store selected by ``config.store``.
+
+    Returns None for the in-memory store without ``data_dir`` or
+    ``search_indexes``, which the servicer creates and seeds itself. Other
+    stores are seeded with the same demo users when they start out empty.
+    """
+    if config.store == "sql":
+        from src.repositories.sql import SqlUserRepository
+
+        # One connection per thread that can query at the same time
+        repository: UserRepository = SqlUserRepository.from_url(
+            config.database_url, pool_size=config.max_workers
+        )
+    elif config.store == "memory" and not config.data_dir and not config.search_indexes:
+        return None
+    else:
+        repository = build_in_process_store(config)
+        if config.data_dir:
+            repository = DurableUserRepository(
+                repository, config.data_dir, config.snapshot_interval
+            )
+    if len(repository) == 0:
+        ExampleServiceServicer.seed_demo_users(repository)
+    return repository
+
+
+def build_change_feed(config: ServerConfig) -> Optional[ChangeFeed]:
+    """Create the feed of user changes WatchUsers streams from.
+
+    Returns None when WatchUsers cannot see every change: ``--workers``
+    processes writing to a SQL database each only learn of their own
+    writes. The shared in-process store publishes every process's writes
+    to the feed of each (see ``SharedUserRepository.publish_to``).
+    """
+    if config.workers > 1 and config.store == "sql":
+        logger.warning("👀 WatchUsers is off: --store sql with --workers > 1")
+        return None
+    max_watchers = config.max_watchers
+    if not max_watchers and config.mode == "sync":
+        # Every watcher holds a worker thread; leave the rest for other calls
+        max_watchers = max(1, config.max_workers // 2)
+    return ChangeFeed(capacity=config.watch_buffer, max_subscribers=max_watchers)
+
+
+def _stat(stats: Callable[[], object], field: str) -> Callable[[], float]:
+    """Return a metric callback reading ``field`` of the current ``stats()``."""
+    return lambda: getattr(stats(), field, 0)
+
+
+def start_metrics(
+    config: ServerConfig,
+    response_cache: Optional[ResponseCache],
+    profiler: Optional[SamplingProfiler] = None,
+    changes: Optional[ChangeFeed] = None,
+) -> Tuple[Optional[MetricsRegistry], Optional[StageTimer]]:
+    """Create the metrics registry and serve it, if ``config`` enables it.
+
+    The stage timer is created when stage sampling or profiling is enabled,
+    as it records into the registry and is driven by validation. With a
+    ``profiler``, the ``/debug/`` endpoints are served next to ``/metrics``.
+    """
+    if not config.metrics_port:
+        return None, None
+    metrics = MetricsRegistry()
+    if response_cache is not None:
+        for field, kind, documentation in (
+            ("hits", "counter", "Responses served from the cache"),
+            ("misses", "counter", "Cacheable calls that ran the servicer"),
+            ("evictions", "counter", "Entries evicted to stay within the size limit"),
+            ("expirations", "counter", "Entries found past their TTL"),
+            ("invalidations", "counter", "Entries dropped after writes"),
+            ("entries", "gauge", "Entries currently cached"),
+            ("size_bytes", "gauge", "Bytes currently cached"),
+        ):
+            metrics.register_callback(
+                f"grpc_server_response_cache_{field}"
+                + ("_total" if kind == "counter" else ""),
+                documentation,
+                _stat(response_cache.stats, field),
+                kind,
+            )
+    for name, field, kind, documentation in (
+        ("log_queue_records", "queued", "gauge", "Log records waiting to be written"),
+        (
+            "log_records_dropped_total",
+            "dropped",
+            "counter",
+            "Log records dropped because the log queue was full",
+        ),
+        (
+            "log_records_suppressed_total",
+            "suppressed",
+            "counter",
+            "Per-request log records left out by the rate limit",
+        ),
+    ):
+        metrics.register_callback(
+            f"grpc_server_{name}",
+            documentation,
+            _stat(log_stats, field),
+            kind,
+        )
+    if changes is not None:
+        metrics.register_callback(
+            "grpc_server_watchers",
+            "WatchUsers calls streaming changes",
+            lambda: changes.subscribers,
+            "gauge",
+        )
+        metrics.register_callback(
+            "grpc_server_watchers_dropped_total",
+            "WatchUsers calls told to resync because they fell behind",
+            lambda: changes.dropped,
+            "counter",
+        )
+    stage_timer = None
+    if config.validate_requests and (config.profiling or config.stage_sample_rate):
+        stage_timer = StageTimer(metrics, config.stage_sample_rate)
+    routes = debug_routes(profiler, stage_timer) if profiler is not None else None
+    start_metrics_server(metrics, config.metrics_port, config.metrics_host, routes)
+    return metrics, stage_timer
+
+
+def dump_profile(profiler: SamplingProfiler, config: ServerConfig) -> None:
+    """Profile for ``config.profile_seconds`` in the background, then write it out."""
+
+    def write(profile: Profile) -> None:
+        prefix = f"profile-{os.getpid()}-{int(time.time())}"
+        paths = write_profile(profile, config.profile_dir, prefix)
+        logger.info(
+            "🔥 Wrote %d samples over %.1fs to %s",
+            profile.samples,
+            profile.duration,
+            ", ".join(paths),
+        )
+
+    logger.info("🔥 Profiling for %.1fs...", config.profile_seconds)
+    profiler.profile_in_background(config.profile_seconds, write)
+
+
+def log_cache_stats(response_cache: Optional[ResponseCache]) -> None:
+    """Log the response cache counters, if the cache is enabled."""
+    if response_cache is None:
+        return
+    stats = response_cache.stats()
+    logger.info(
+        "📦 Response cache: %d hits, %d misses, %d evictions, %d expired, "
+        "%d invalidated, %d entries (%d/%d bytes)",
+        stats.hits,
+        stats.misses,
+        stats.evictions,
+        stats.expirations,
+        stats.invalidations,
+        stats.entries,
+        stats.size_bytes,
+        stats.max_bytes,
+    )
+
+
+def log_logging_stats() -> None:
+    """Log how many records the logging pipeline dropped or left out."""
+    stats = log_stats()
+    if stats is None or not (stats.dropped or stats.suppressed):
+        return
+    logger.info(
+        "📝 Logging: %d records dropped on a full queue, %d request records "
+        "over the rate limit",
+        stats.dropped,
+        stats.suppressed,
+    )
+
+
+def mark_serving(health: HealthServicer) -> None:
+    """Report the server and each of its services as ``SERVING``."""
+    health.set("", SERVING)
+    for service in example_service_pb2.DESCRIPTOR.services_by_name.values():
+        health.set(service.full_name, SERVING)
+
+
+def enter_graceful_shutdown(
+    health: HealthServicer, changes: Optional[ChangeFeed]
+) -> None:
+    """Report NOT_SERVING and end WatchUsers streams.
+
+    Watchers would otherwise hold their calls, and in sync mode their
+    worker threads, open until ``shutdown_grace`` runs out. They end with
+    UNAVAILABLE and can resume from their last sequence elsewhere.
+    """
+    health.enter_graceful_shutdown()
+    if changes is not None:
+        changes.close()
+
+
+def log_startup(listen_addr: str) -> None:
+    """Log where the server listens and how to reach it."""
+    logger.info(f"🚀 gRPC server started on {listen_addr}")
+    logger.info("📋 Available services:")
+    for service in example_service_pb2.DESCRIPTOR.services_by_name.values():
+        methods = ", ".join(method.name for method in service.methods)
+        logger.info(f"  - {service.name} ({methods})")
+    logger.info("🔍 Use grpcurl or a gRPC client to test the service")
+    logger.info("💡 Example: grpcurl -plaintext localhost:50051 list")
+
+
+def server_options(config: ServerConfig) -> Sequence[Tuple[str, int]]:
+    """Channel arguments for the gRPC server built from ``config``."""
+    # Worker processes of the launcher all bind the same address
+    return [
+        ("grpc.so_reuseport", 1 if config.workers > 1 else 0),
+        *config.transport().channel_options(),
+    ]
+
+
+def serve(
+    config: Optional[ServerConfig] = None,
+    repository: Optional[UserRepository] = None,
+) -> None:
+    """Start the gRPC server on a thread pool.
+
+    Args:
+        config: Server settings, defaults if omitted
+        repository: User store to serve, built from ``config.store`` if omitted
+    """
+    config = config or ServerConfig()
+    if repository is None:
+        repository = build_repository(config)
+    response_cache = build_response_cache(config)
+    profiler = SamplingProfiler() if config.profiling else None
+    changes = build_change_feed(config)
+    metrics, stage_timer = start_metrics(config, response_cache, profiler, changes)
     server = grpc.server(
-        futures.ThreadPoolExecutor(max_workers=10),
-        interceptors=interceptors
+        futures.ThreadPoolExecutor(max_workers=config.max_workers),
+        interceptors=build_interceptors(config, response_cache, metrics, stage_timer),
+        options=server_options(config),
+        maximum_concurrent_rpcs=config.max_concurrent_rpcs or None,
     )
-    
+
     # Add our service to the server
-    example_service_servicer = ExampleServiceServicer()
-    example_service_pb2_grpc.add_ExampleServiceServicer_to_server(
-        example_service_servicer, server
+    example_service_servicer = ExampleServiceServicer(
+        repository, changes, watch_users=changes is not None
+    )
+    add_servicer_to_server(
+        EXAMPLE_SERVICE,
+        example_service_servicer,
+        server,
     )
-    
+    health = HealthServicer()
+    health_pb2_grpc.add_HealthServicer_to_server(health, server)
+
     # Configure server address
-    listen_addr = '[::]:50051'
-    server.add_insecure_port(listen_addr)
-    
+    server.add_insecure_port(config.listen_addr)
+
     # Start server
     server.start()
-    logger.info(f"🚀 gRPC server started on {listen_addr}")
-    logger.info("📋 Available services:")
-    logger.info("  - ExampleService (GetUser, CreateUser, ListUsers)")
-    logger.info("🔍 Use grpcurl or a gRPC client to test the service")
-    logger.info("💡 Example: grpcurl -plaintext localhost:50051 list")
-    
-    # Handle graceful shutdown
-    def signal_handler(signum, frame):
+    mark_serving(health)
+    log_startup(config.listen_addr)
+
+    # Handle graceful shutdown: report NOT_SERVING, give load balancers
+    # drain_delay to notice, then refuse new RPCs and let in-flight ones
+    # finish within shutdown_grace
+    def signal_handler(signum: int, frame: Any) -> NoReturn:
         logger.info("🛑 Received shutdown signal, stopping server...")
-        server.stop(0)
+        enter_graceful_shutdown(health, changes)
+        time.sleep(config.drain_delay)
+        server.stop(config.shutdown_grace).wait()
+        example_service_servicer.repository.close()
+        log_cache_stats(response_cache)
+        log_logging_stats()
         sys.exit(0)
-    
+
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
-    
+    if profiler is not None:
+        signal.signal(
+            signal.SIGUSR1, lambda signum, frame: dump_profile(profiler, config)
+        )
+
     try:
         # Keep the server running
         while True:
             time.sleep(86400)  # Sleep for a day
     except KeyboardInterrupt:
         logger.info("🛑 Server interrupted by user")
-        server.stop(0)
+        enter_graceful_shutdown(health, changes)
+        server.stop(config.shutdown_grace).wait()
+        example_service_servicer.repository.close()
+
+
+async def serve_async(
+    config: Optional[ServerConfig] = None,
+    repository: Optional[UserRepository] = None,
+) -> None:
+    """Start the gRPC server on the asyncio event loop.
 
+    Blocking stores run on a pool of ``config.max_workers`` threads.
 
-def main():
+    Args:
+        config: Server settings, defaults to aio mode if omitted
+        repository: User store to serve, built from ``config.store`` if omitted
+    """
+    config = config or ServerConfig(mode="aio")
+    if repository is None:
+        repository = build_repository(config)
+    response_cache = build_response_cache(config)
+    profiler = SamplingProfiler() if config.profiling else None
+    changes = build_change_feed(config)
+    metrics, stage_timer = start_metrics(config, response_cache, profiler, changes)
+    server = grpc.aio.server(
+        interceptors=build_interceptors(config, response_cache, metrics, stage_timer),
+        options=server_options(config),
+        maximum_concurrent_rpcs=config.max_concurrent_rpcs or None,
+    )
+    executor = futures.ThreadPoolExecutor(max_workers=config.max_workers)
+    example_service_servicer = ExampleServiceServicer(
+        repository, changes, watch_users=changes is not None
+    )
+    add_servicer_to_server(
+        EXAMPLE_SERVICE,
+        AsyncExampleServiceServicer(example_service_servicer, executor),
+        server,
+    )
+    health = HealthServicer()
+    health_pb2_grpc.add_HealthServicer_to_server(AsyncHealthServicer(health), server)
+    server.add_insecure_port(config.listen_addr)
+
+    await server.start()
+    mark_serving(health)
+    log_startup(config.listen_addr)
+
+    # Handle graceful shutdown
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopping.set)
+    if profiler is not None:
+        loop.add_signal_handler(signal.SIGUSR1, dump_profile, profiler, config)
+
+    await stopping.wait()
+    logger.info("🛑 Received shutdown signal, stopping server...")
+    enter_graceful_shutdown(health, changes)
+    await asyncio.sleep(config.drain_delay)
+    await server.stop(config.shutdown_grace)
+    executor.shutdown()
+    example_service_servicer.repository.close()
+    log_cache_stats(response_cache)
+    log_logging_stats()
+
+
+def main() -> None:
     """Main function."""
-    logger.info("🐍 Starting Python gRPC backend server...")
-    serve()
+    config = ServerConfig.from_args()
+    configure_logging(config)
+    logger.info(f"🐍 Starting Python gRPC backend server ({config.mode} mode)...")
+    if config.workers > 1:
+        from src.launcher import launch
+
+        launch(config)
+    elif config.mode == "aio":
+        asyncio.run(serve_async(config))
+    else:
+        serve(config)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,8 @@
+"""SQLAlchemy models for the persistent user store."""
+
+from .user import Base, UserModel
+
+__all__ = [
+    "Base",
+    "UserModel",
+]
@@ -0,0 +1,34 @@
+"""User table mapped with SQLAlchemy."""
+
+from sqlalchemy import BigInteger, Index, Integer, String
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+
+class Base(DeclarativeBase):
+    """Declarative base for the service's tables."""
+
+
+class UserModel(Base):
+    """Row of the ``users`` table, mirroring the ``User`` message."""
+
+    __tablename__ = "users"
+
+    # The primary key index serves GetUser and keyset pagination
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    name: Mapped[str] = mapped_column(String(100), nullable=False)
+    surname: Mapped[str] = mapped_column(String(100), nullable=False, default="")
+    # Unique index enforcing one user per email and serving lookups by email
+    email: Mapped[str] = mapped_column(
+        String(255), nullable=False, unique=True, index=True
+    )
+    # Unix timestamps in seconds, like the proto fields
+    created_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    updated_at: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    # Serve SearchUsers: each filter's range is scanned in (column, id)
+    # order, which is also the order of the results
+    __table_args__ = (
+        Index("ix_users_name_id", "name", "id"),
+        Index("ix_users_surname_id", "surname", "id"),
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
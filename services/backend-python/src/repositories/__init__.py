@@ -0,0 +1,47 @@
+"""User repositories backing the gRPC services.
+
+``SqlUserRepository`` is imported on first access, so processes using the
+in-process stores do not load SQLAlchemy.
+"""
+
+from typing import Any
+
+from .base import EncodedUserPage, UserChangeFeed, UserPage, UserRepository
+from .columnar import ColumnarUserRepository
+from .durable import DurableUserRepository
+from .errors import (
+    DatabaseError,
+    EmailAlreadyExistsError,
+    ReadOnlyError,
+    RepositoryError,
+)
+from .memory import InMemoryUserRepository
+from .search import SearchCursor, SearchPage, UserQuery
+from .sharded import ShardedUserRepository
+
+__all__ = [
+    "ColumnarUserRepository",
+    "DatabaseError",
+    "DurableUserRepository",
+    "EmailAlreadyExistsError",
+    "EncodedUserPage",
+    "InMemoryUserRepository",
+    "ReadOnlyError",
+    "RepositoryError",
+    "SearchCursor",
+    "SearchPage",
+    "ShardedUserRepository",
+    "SqlUserRepository",
+    "UserChangeFeed",
+    "UserPage",
+    "UserQuery",
+    "UserRepository",
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name == "SqlUserRepository":
+        from .sql import SqlUserRepository
+
+        return SqlUserRepository
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
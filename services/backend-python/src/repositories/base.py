@@ -0,0 +1,211 @@
+"""Interface shared by every user repository."""
+
+from abc import ABC, abstractmethod
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.utils.change_feed import ChangeFeed
+
+from .errors import EmailAlreadyExistsError
+from .search import SearchCursor, SearchPage, UserQuery, search_page
+
+# Users read per page by the full scan of the default ``search``
+SEARCH_SCAN_CHUNK_SIZE = 1000
+
+# Feed of user changes: a ``UserChange.Type`` and the serialized user
+UserChangeFeed = ChangeFeed[Tuple[int, bytes]]
+
+
+class UserPage(NamedTuple):
+    """One page of users in ascending ID order."""
+
+    users: List[example_service_pb2.User]
+    total_count: int
+    # ID to resume a keyset scan from, or None when this is the last page.
+    next_after_id: Optional[int]
+
+
+class EncodedUserPage(NamedTuple):
+    """One page of serialized ``User`` messages in ascending ID order."""
+
+    users: List[bytes]
+    total_count: int
+    # ID to resume a keyset scan from, or None when this is the last page.
+    next_after_id: Optional[int]
+
+
+def encode_page(page: UserPage) -> EncodedUserPage:
+    """Serialize the users of ``page``."""
+    return EncodedUserPage(
+        users=[user.SerializeToString() for user in page.users],
+        total_count=page.total_count,
+        next_after_id=page.next_after_id,
+    )
+
+
+class UserRepository(ABC):
+    """Storage for users, used by the gRPC servicers.
+
+    Implementations must be safe to call from several threads at once.
+    """
+
+    # True when calls wait on I/O, such as a database or another process.
+    # The asyncio servicer runs such repositories on a thread pool instead of
+    # the event loop.
+    blocking = False
+
+    def close(self) -> None:
+        """Release what the repository holds; it must not be used afterwards."""
+
+    def publish_to(self, changes: UserChangeFeed) -> bool:
+        """Have the repository publish every user it stores to ``changes``.
+
+        Repositories written to by several processes implement this, so
+        that ``changes`` also carries the users other processes create.
+
+        Returns:
+            False if the repository does not publish changes, in which case
+            whoever creates users through it publishes them.
+        """
+        return False
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Return the number of stored users."""
+
+    @abstractmethod
+    def get(self, user_id: int) -> Optional[example_service_pb2.User]:
+        """Return the user with the given ID, or None if it does not exist."""
+
+    def get_encoded(self, user_id: int) -> Optional[bytes]:
+        """Return the user with the given ID serialized, or None if there is none.
+
+        Repositories that keep users encoded, or cache their encoding,
+        override this and the other ``*_encoded`` reads so that serving an
+        unchanged user does not serialize it again.
+        """
+        user = self.get(user_id)
+        return None if user is None else user.SerializeToString()
+
+    @abstractmethod
+    def get_by_email(self, email: str) -> Optional[example_service_pb2.User]:
+        """Return the user with the given email, or None if it does not exist."""
+
+    @abstractmethod
+    def get_many(self, user_ids: Iterable[int]) -> Dict[int, example_service_pb2.User]:
+        """Return the users that exist among ``user_ids``, keyed by ID."""
+
+    @abstractmethod
+    def create(
+        self, name: str, email: str, surname: str = ""
+    ) -> example_service_pb2.User:
+        """Create a user with the next free ID.
+
+        Raises:
+            EmailAlreadyExistsError: If the email is already taken.
+        """
+
+    @abstractmethod
+    def create_many(
+        self, entries: Sequence[Tuple[str, str, str]]
+    ) -> List[Optional[example_service_pb2.User]]:
+        """Create a user for each ``(name, email, surname)`` entry.
+
+        An entry whose email is already taken, including by an earlier entry
+        of the same batch, is skipped.
+
+        Returns:
+            The created user for each entry, or None where it was skipped.
+        """
+
+    @abstractmethod
+    def add(self, user: example_service_pb2.User) -> None:
+        """Store a fully built user, keeping its ID.
+
+        Used for seeding and for restoring users that were created elsewhere.
+        An existing user with the same ID is replaced.
+
+        Raises:
+            EmailAlreadyExistsError: If another user already has the email.
+        """
+
+    def restore(self, users: Iterable[example_service_pb2.User]) -> int:
+        """Store fully built users as ``add`` does, e.g. to load a snapshot.
+
+        A user whose email another stored user already has is skipped
+        instead of raising.
+
+        Returns:
+            The number of skipped users
+        """
+        skipped = 0
+        for user in users:
+            try:
+                self.add(user)
+            except EmailAlreadyExistsError:
+                skipped += 1
+        return skipped
+
+    @abstractmethod
+    def page(self, offset: int, limit: int) -> UserPage:
+        """Return up to ``limit`` users starting at position ``offset``."""
+
+    @abstractmethod
+    def page_after(self, after_id: int, limit: int) -> UserPage:
+        """Return up to ``limit`` users whose ID is greater than ``after_id``."""
+
+    def scan(
+        self, after_id: int, chunk_size: int
+    ) -> Iterator[List[example_service_pb2.User]]:
+        """Yield the users whose ID is greater than ``after_id``, in ID order.
+
+        Users are read ``chunk_size`` at a time, each chunk with its own
+        ``page_after``, so nothing is held between chunks. Repositories for
+        which the ``total_count`` of a page is costly override this to
+        skip it.
+        """
+        while True:
+            page = self.page_after(after_id, chunk_size)
+            if page.users:
+                yield page.users
+            if page.next_after_id is None:
+                return
+            after_id = page.next_after_id
+
+    def search(
+        self, query: UserQuery, limit: int, after: Optional[SearchCursor] = None
+    ) -> SearchPage:
+        """Return up to ``limit`` users matching ``query``, in the order of its index.
+
+        Only users after ``after``, the ``next_cursor`` of a previous page
+        of the same query, are returned. This default scans every user;
+        repositories with secondary indexes override it.
+        """
+        matches = [
+            user
+            for users in self.scan(0, SEARCH_SCAN_CHUNK_SIZE)
+            for user in users
+            if query.matches(user) and (after is None or query.cursor(user) > after)
+        ]
+        matches.sort(key=query.cursor)
+        return search_page(query, matches[: limit + 1], limit)
+
+    def page_encoded(self, offset: int, limit: int) -> EncodedUserPage:
+        """Return ``page(offset, limit)`` with its users serialized."""
+        return encode_page(self.page(offset, limit))
+
+    def page_after_encoded(self, after_id: int, limit: int) -> EncodedUserPage:
+        """Return ``page_after(after_id, limit)`` with its users serialized."""
+        return encode_page(self.page_after(after_id, limit))
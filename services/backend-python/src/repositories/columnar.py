@@ -0,0 +1,405 @@
+"""In-process user repository storing users in typed columns."""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.utils.wire_format import encode_varint
+
+from .base import EncodedUserPage, UserPage, UserRepository
+from .errors import EmailAlreadyExistsError
+from .search import (
+    SearchCursor,
+    SearchPage,
+    UserIndexes,
+    UserQuery,
+    search_page,
+    take_matches,
+)
+
+T = TypeVar("T")
+
+# Marks a free slot of the email table, which holds int32 user IDs
+_EMPTY = -(2**31)
+_MIN_TABLE_SIZE = 8
+
+
+class ColumnarUserRepository(UserRepository):
+    """Stores users as rows of typed columns instead of ``User`` messages.
+
+    A ``User`` message with three ``str`` fields costs a few hundred bytes
+    of Python and protobuf objects; a dict of them adds boxed ``int`` keys.
+    Here each user is kept serialized in one shared ``bytearray`` arena,
+    and row ``i`` is spread over ``array`` columns - ID, position and
+    length of the serialized user, and where its email lies within it -
+    about 24 bytes plus the serialized user itself.
+
+    Rows are kept sorted by ID. IDs are allocated in increasing order, so a
+    create appends; ``get`` bisects the ID column and offset pages slice it
+    directly. Emails are indexed by an open-addressing hash table holding
+    user IDs in an ``array``, compared against the arena on lookup.
+
+    ``User`` messages are parsed from the arena on every read, which makes
+    reads slower than with ``InMemoryUserRepository``; the ``*_encoded``
+    reads only copy the bytes out. ``add`` with an ID below the highest
+    stored one inserts into the middle of every column, and replacing a
+    user leaves its old bytes in the arena. Both only happen when seeding
+    or restoring users. All calls go through a single lock.
+
+    ``search`` is served from ``UserIndexes``. Their packed keys take
+    about 190 bytes per user, more than the columns and the arena, but
+    avoid parsing every user to filter them. Unless ``search_indexes`` is
+    set they are only built on the first search, which parses every
+    stored user while holding the lock.
+    """
+
+    def __init__(self, search_indexes: bool = False) -> None:
+        self._lock = threading.RLock()
+        self._ids = array("i")
+        # Serialized users back to back in the arena
+        self._offsets = array("Q")
+        self._lengths = array("I")
+        # Where the email bytes start within a row's serialized user
+        self._email_offsets = array("I")
+        self._email_lengths = array("I")
+        self._arena = bytearray()
+        self._email_table = array("i", [_EMPTY]) * _MIN_TABLE_SIZE
+        # 8 bits of each slot's email hash, so most probes of other emails
+        # are rejected without reading the arena
+        self._email_tags = bytearray(_MIN_TABLE_SIZE)
+        self._indexes: Optional[UserIndexes] = UserIndexes() if search_indexes else None
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def get(self, user_id: int) -> Optional[example_service_pb2.User]:
+        """Return the user with the given ID, or None if it does not exist."""
+        with self._lock:
+            row = self._row(user_id)
+            return None if row is None else self._build_user(row)
+
+    def get_encoded(self, user_id: int) -> Optional[bytes]:
+        """Return the user with the given ID serialized, or None if there is none."""
+        with self._lock:
+            row = self._row(user_id)
+            return None if row is None else self._encoded_user(row)
+
+    def get_by_email(self, email: str) -> Optional[example_service_pb2.User]:
+        """Return the user with the given email, or None if it does not exist."""
+        with self._lock:
+            user_id = self._email_table[self._email_slot(email.encode())]
+            if user_id == _EMPTY:
+                return None
+            return self._build_user(self._row(user_id))  # type: ignore[arg-type]
+
+    def get_many(self, user_ids: Iterable[int]) -> Dict[int, example_service_pb2.User]:
+        """Return the users that exist among ``user_ids``, keyed by ID."""
+        found: Dict[int, example_service_pb2.User] = {}
+        with self._lock:
+            for user_id in user_ids:
+                row = self._row(user_id)
+                if row is not None:
+                    found[user_id] = self._build_user(row)
+        return found
+
+    def create(
+        self, name: str, email: str, surname: str = ""
+    ) -> example_service_pb2.User:
+        """Create a user with the next free ID.
+
+        Raises:
+            EmailAlreadyExistsError: If the email is already taken.
+        """
+        current_time = int(time.time())
+        encoded = email.encode()
+        with self._lock:
+            slot = self._email_slot(encoded)
+            if self._email_table[slot] != _EMPTY:
+                raise EmailAlreadyExistsError(email)
+            user = example_service_pb2.User(
+                id=self._next_id,
+                name=name,
+                surname=surname,
+                email=email,
+                created_at=current_time,
+                updated_at=current_time,
+            )
+            self._append_row(user, encoded)
+            self._index_email(slot, user.id, encoded)
+            return user
+
+    def create_many(
+        self, entries: Sequence[Tuple[str, str, str]]
+    ) -> List[Optional[example_service_pb2.User]]:
+        """Create a user for each ``(name, email, surname)`` entry.
+
+        All entries are checked and inserted under one lock acquisition. An
+        entry whose email is already taken, including by an earlier entry of
+        the same batch, is skipped.
+
+        Returns:
+            The created user for each entry, or None where it was skipped.
+        """
+        current_time = int(time.time())
+        created: List[Optional[example_service_pb2.User]] = []
+        with self._lock:
+            for name, email, surname in entries:
+                encoded = email.encode()
+                slot = self._email_slot(encoded)
+                if self._email_table[slot] != _EMPTY:
+                    created.append(None)
+                    continue
+                user = example_service_pb2.User(
+                    id=self._next_id,
+                    name=name,
+                    surname=surname,
+                    email=email,
+                    created_at=current_time,
+                    updated_at=current_time,
+                )
+                self._append_row(user, encoded)
+                self._index_email(slot, user.id, encoded)
+                created.append(user)
+        return created
+
+    def add(self, user: example_service_pb2.User) -> None:
+        """Store a fully built user, keeping its ID.
+
+        Used for seeding and for restoring users that were created elsewhere.
+        An existing user with the same ID is replaced.
+
+        Raises:
+            EmailAlreadyExistsError: If another user already has the email.
+        """
+        encoded = user.email.encode()
+        with self._lock:
+            slot = self._email_slot(encoded)
+            owner = self._email_table[slot]
+            if owner != _EMPTY and owner != user.id:
+                raise EmailAlreadyExistsError(user.email)
+
+            ids = self._ids
+            if ids and user.id <= ids[-1]:
+                row = bisect_left(ids, user.id)
+                if ids[row] != user.id:
+                    self._insert_row(row, user, encoded)
+                    self._index_email(slot, user.id, encoded)
+                    return
+                if self._indexes is not None:
+                    self._indexes.discard(self._build_user(row))
+                    self._indexes.add(user)
+                self._write_record(row, user, encoded)
+                # Open addressing cannot drop the old email without breaking
+                # probe chains; rebuilding indexes the new one as well
+                self._rebuild_email_table(len(self._email_table))
+                return
+
+            self._append_row(user, encoded)
+            self._index_email(slot, user.id, encoded)
+
+    def restore(self, users: Iterable[example_service_pb2.User]) -> int:
+        """Store fully built users as ``add`` does, under one lock acquisition.
+
+        A user whose email another stored user already has is skipped.
+
+        Returns:
+            The number of skipped users
+        """
+        with self._lock:
+            return super().restore(users)
+
+    def search(
+        self, query: UserQuery, limit: int, after: Optional[SearchCursor] = None
+    ) -> SearchPage:
+        """Return up to ``limit`` users matching ``query``, in the order of its index.
+
+        Served from the email table, the ID column or ``UserIndexes``; only
+        the users the index yields are parsed from the arena.
+        """
+        with self._lock:
+            ids = self._search_indexes().candidates(
+                query, after, self._ids_after, self._id_by_email
+            )
+            rows = map(self._row, ids)
+            users = (self._build_user(row) for row in rows)  # type: ignore[arg-type]
+            return search_page(query, take_matches(query, users, limit), limit)
+
+    def page(self, offset: int, limit: int) -> UserPage:
+        """Return up to ``limit`` users starting at position ``offset``."""
+        with self._lock:
+            return UserPage(*self._build_page(offset, limit, self._build_user))
+
+    def page_after(self, after_id: int, limit: int) -> UserPage:
+        """Return up to ``limit`` users whose ID is greater than ``after_id``."""
+        with self._lock:
+            start = bisect_right(self._ids, after_id)
+            return UserPage(*self._build_page(start, limit, self._build_user))
+
+    def page_encoded(self, offset: int, limit: int) -> EncodedUserPage:
+        """Return ``page(offset, limit)`` with its users serialized."""
+        with self._lock:
+            return EncodedUserPage(*self._build_page(offset, limit, self._encoded_user))
+
+    def page_after_encoded(self, after_id: int, limit: int) -> EncodedUserPage:
+        """Return ``page_after(after_id, limit)`` with its users serialized."""
+        with self._lock:
+            start = bisect_right(self._ids, after_id)
+            return EncodedUserPage(*self._build_page(start, limit, self._encoded_user))
+
+    def _build_page(
+        self, start: int, limit: int, read: Callable[[int], T]
+    ) -> Tuple[List[T], int, Optional[int]]:
+        # Caller must hold self._lock. ``read`` turns a row into a page entry.
+        count = len(self._ids)
+        stop = min(count, start + limit)
+        return (
+            [read(row) for row in range(start, stop)],
+            count,
+            self._ids[stop - 1] if start < stop < count else None,
+        )
+
+    def _ids_after(self, after_id: int) -> Iterable[int]:
+        # Caller must hold self._lock.
+        ids = self._ids
+        return (ids[row] for row in range(bisect_right(ids, after_id), len(ids)))
+
+    def _id_by_email(self, email: str) -> Optional[int]:
+        # Caller must hold self._lock.
+        user_id = self._email_table[self._email_slot(email.encode())]
+        return None if user_id == _EMPTY else user_id
+
+    def _row(self, user_id: int) -> Optional[int]:
+        # Caller must hold self._lock.
+        row = bisect_left(self._ids, user_id)
+        if row < len(self._ids) and self._ids[row] == user_id:
+            return row
+        return None
+
+    def _build_user(self, row: int) -> example_service_pb2.User:
+        # Caller must hold self._lock.
+        user: example_service_pb2.User = example_service_pb2.User.FromString(
+            self._encoded_user(row)
+        )
+        return user
+
+    def _encoded_user(self, row: int) -> bytes:
+        # Caller must hold self._lock.
+        start = self._offsets[row]
+        return bytes(self._arena[start : start + self._lengths[row]])
+
+    def _email(self, row: int) -> bytes:
+        # Caller must hold self._lock.
+        start = self._offsets[row] + self._email_offsets[row]
+        return bytes(self._arena[start : start + self._email_lengths[row]])
+
+    def _append_row(self, user: example_service_pb2.User, email: bytes) -> None:
+        # Caller must hold self._lock and ``user.id`` must exceed every
+        # stored ID.
+        self._ids.append(user.id)
+        self._offsets.append(0)
+        self._lengths.append(0)
+        self._email_offsets.append(0)
+        self._email_lengths.append(0)
+        self._write_record(len(self._ids) - 1, user, email)
+        if self._indexes is not None:
+            self._indexes.add(user)
+        self._next_id = user.id + 1
+
+    def _insert_row(
+        self, row: int, user: example_service_pb2.User, email: bytes
+    ) -> None:
+        # Caller must hold self._lock. O(n): moves every later row.
+        self._ids.insert(row, user.id)
+        self._offsets.insert(row, 0)
+        self._lengths.insert(row, 0)
+        self._email_offsets.insert(row, 0)
+        self._email_lengths.insert(row, 0)
+        self._write_record(row, user, email)
+        if self._indexes is not None:
+            self._indexes.add(user)
+
+    def _search_indexes(self) -> UserIndexes:
+        # Caller must hold self._lock.
+        if self._indexes is None:
+            self._indexes = UserIndexes.of(map(self._build_user, range(len(self._ids))))
+        return self._indexes
+
+    def _write_record(
+        self, row: int, user: example_service_pb2.User, email: bytes
+    ) -> None:
+        # Caller must hold self._lock. Appends to the arena; bytes a row
+        # pointed to before stay behind unused.
+        record = user.SerializeToString()
+        self._offsets[row] = len(self._arena)
+        self._lengths[row] = len(record)
+        self._email_offsets[row] = _email_offset(user, record, email)
+        self._email_lengths[row] = len(email)
+        self._arena += record
+
+    def _email_slot(self, email: bytes) -> int:
+        # Caller must hold self._lock. Returns the slot holding ``email``,
+        # or the free slot where it would go. Linear probing; the table is
+        # at most half full, so a free slot is always found.
+        table = self._email_table
+        tags = self._email_tags
+        mask = len(table) - 1
+        # bytes cache their hash, so hashing again in _index_email is free
+        email_hash = hash(email)
+        tag = _tag(email_hash)
+        slot = email_hash & mask
+        while True:
+            user_id = table[slot]
+            if user_id == _EMPTY:
+                return slot
+            if (
+                tags[slot] == tag
+                and self._email(self._row(user_id)) == email  # type: ignore[arg-type]
+            ):
+                return slot
+            slot = (slot + 1) & mask
+
+    def _index_email(self, slot: int, user_id: int, email: bytes) -> None:
+        # Caller must hold self._lock; ``slot`` comes from ``_email_slot``.
+        self._email_table[slot] = user_id
+        self._email_tags[slot] = _tag(hash(email))
+        if len(self._ids) * 2 > len(self._email_table):
+            self._rebuild_email_table(len(self._email_table) * 2)
+
+    def _rebuild_email_table(self, size: int) -> None:
+        # Caller must hold self._lock. Stored emails are unique, so each
+        # goes into the first free slot without comparing.
+        table = array("i", [_EMPTY]) * size
+        tags = bytearray(size)
+        mask = size - 1
+        for row, user_id in enumerate(self._ids):
+            email_hash = hash(self._email(row))
+            slot = email_hash & mask
+            while table[slot] != _EMPTY:
+                slot = (slot + 1) & mask
+            table[slot] = user_id
+            tags[slot] = _tag(email_hash)
+        self._email_table = table
+        self._email_tags = tags
+
+
+def _email_offset(user: example_service_pb2.User, record: bytes, email: bytes) -> int:
+    # Fields are serialized in field number order, so the email is followed
+    # only by the timestamps, each a one byte tag and a varint unless zero.
+    tail = sum(
+        1 + len(encode_varint(timestamp))
+        for timestamp in (user.created_at, user.updated_at)
+        if timestamp
+    )
+    return len(record) - tail - len(email)
+
+
+def _tag(email_hash: int) -> int:
+    # High bits, as the low ones pick the slot
+    return (email_hash >> 56) & 0xFF
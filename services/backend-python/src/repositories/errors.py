@@ -0,0 +1,27 @@
+"""Errors raised by user repositories."""
+
+from typing import Tuple
+
+
+class RepositoryError(Exception):
+    """Base class for user repository errors."""
+
+
+class EmailAlreadyExistsError(RepositoryError):
+    """Raised when a user with the same email is already stored."""
+
+    def __init__(self, email: str):
+        super().__init__(f"User with email {email} already exists")
+        self.email = email
+
+    def __reduce__(self) -> Tuple[type, Tuple[str]]:
+        # Keep the email when the error crosses a process boundary.
+        return type(self), (self.email,)
+
+
+class ReadOnlyError(RepositoryError):
+    """Raised on writes to a repository that can no longer persist them."""
+
+
+class DatabaseError(RepositoryError):
+    """Raised when the database behind a repository fails an operation."""
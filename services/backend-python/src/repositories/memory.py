@@ -0,0 +1,251 @@
+"""Thread-safe in-process user repository."""
+
+import threading
+import time
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+
+from .base import EncodedUserPage, UserPage, UserRepository
+from .errors import EmailAlreadyExistsError
+from .search import (
+    SearchCursor,
+    SearchPage,
+    UserIndexes,
+    UserQuery,
+    search_page,
+    take_matches,
+)
+from .sorted_index import SortedIndex
+
+T = TypeVar("T")
+
+
+class InMemoryUserRepository(UserRepository):
+    """Stores users in process memory with secondary indexes on email and ID.
+
+    All reads and writes go through a single lock, so the repository can be
+    shared by the worker threads of a ``grpc.server`` executor. Email
+    uniqueness is checked against the email index, which keeps ``create``
+    O(1) regardless of how many users are stored. A sorted ID index serves
+    pages in O(log n + page_size) without copying the whole table, and
+    ``UserIndexes`` on name, surname and creation time serve ``search``.
+
+    The ``*_encoded`` reads serialize a user once and keep its bytes until
+    the user is replaced, so unchanged users are served without encoding
+    them again. Users never read that way cost nothing extra.
+
+    Args:
+        search_indexes: Build the ``UserIndexes`` now rather than on the
+            first ``search``, which otherwise indexes every stored user
+            while holding the lock. Until then they cost nothing.
+    """
+
+    def __init__(self, search_indexes: bool = False) -> None:
+        self._lock = threading.RLock()
+        self._users: Dict[int, example_service_pb2.User] = {}
+        # Serialized users, filled by the *_encoded reads
+        self._encoded: Dict[int, bytes] = {}
+        self._ids_by_email: Dict[str, int] = {}
+        self._ids = SortedIndex()
+        self._indexes: Optional[UserIndexes] = UserIndexes() if search_indexes else None
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def get(self, user_id: int) -> Optional[example_service_pb2.User]:
+        """Return the user with the given ID, or None if it does not exist."""
+        with self._lock:
+            return self._users.get(user_id)
+
+    def get_encoded(self, user_id: int) -> Optional[bytes]:
+        """Return the user with the given ID serialized, or None if there is none."""
+        with self._lock:
+            if user_id not in self._users:
+                return None
+            return self._encode(user_id)
+
+    def get_by_email(self, email: str) -> Optional[example_service_pb2.User]:
+        """Return the user with the given email, or None if it does not exist."""
+        with self._lock:
+            user_id = self._ids_by_email.get(email)
+            return None if user_id is None else self._users[user_id]
+
+    def get_many(self, user_ids: Iterable[int]) -> Dict[int, example_service_pb2.User]:
+        """Return the users that exist among ``user_ids``, keyed by ID."""
+        with self._lock:
+            users = self._users
+            return {user_id: users[user_id] for user_id in user_ids if user_id in users}
+
+    def create(
+        self, name: str, email: str, surname: str = ""
+    ) -> example_service_pb2.User:
+        """Create a user with the next free ID.
+
+        Raises:
+            EmailAlreadyExistsError: If the email is already taken.
+        """
+        current_time = int(time.time())
+        with self._lock:
+            if email in self._ids_by_email:
+                raise EmailAlreadyExistsError(email)
+
+            user = example_service_pb2.User(
+                id=self._next_id,
+                name=name,
+                surname=surname,
+                email=email,
+                created_at=current_time,
+                updated_at=current_time,
+            )
+            self._insert(user)
+            return user
+
+    def create_many(
+        self, entries: Sequence[Tuple[str, str, str]]
+    ) -> List[Optional[example_service_pb2.User]]:
+        """Create a user for each ``(name, email, surname)`` entry.
+
+        All entries are checked and inserted under one lock acquisition, so
+        the batch is not interleaved with other writers. An entry whose email
+        is already taken, including by an earlier entry of the same batch, is
+        skipped.
+
+        Returns:
+            The created user for each entry, or None where it was skipped.
+        """
+        current_time = int(time.time())
+        created: List[Optional[example_service_pb2.User]] = []
+        with self._lock:
+            for name, email, surname in entries:
+                if email in self._ids_by_email:
+                    created.append(None)
+                    continue
+                user = example_service_pb2.User(
+                    id=self._next_id,
+                    name=name,
+                    surname=surname,
+                    email=email,
+                    created_at=current_time,
+                    updated_at=current_time,
+                )
+                self._insert(user)
+                created.append(user)
+        return created
+
+    def add(self, user: example_service_pb2.User) -> None:
+        """Store a fully built user, keeping its ID.
+
+        Used for seeding and for restoring users that were created elsewhere.
+        An existing user with the same ID is replaced.
+
+        Raises:
+            EmailAlreadyExistsError: If another user already has the email.
+        """
+        with self._lock:
+            owner = self._ids_by_email.get(user.email)
+            if owner is not None and owner != user.id:
+                raise EmailAlreadyExistsError(user.email)
+
+            previous = self._users.get(user.id)
+            if previous is not None:
+                del self._ids_by_email[previous.email]
+                if self._indexes is not None:
+                    self._indexes.discard(previous)
+            self._insert(user)
+
+    def restore(self, users: Iterable[example_service_pb2.User]) -> int:
+        """Store fully built users as ``add`` does, under one lock acquisition.
+
+        A user whose email another stored user already has is skipped.
+
+        Returns:
+            The number of skipped users
+        """
+        with self._lock:
+            return super().restore(users)
+
+    def page(self, offset: int, limit: int) -> UserPage:
+        """Return up to ``limit`` users starting at position ``offset``."""
+        with self._lock:
+            ids = list(self._ids.islice(offset, offset + limit + 1))
+            return UserPage(*self._build_page(ids, limit, self._users.__getitem__))
+
+    def page_after(self, after_id: int, limit: int) -> UserPage:
+        """Return up to ``limit`` users whose ID is greater than ``after_id``."""
+        with self._lock:
+            ids = list(islice(self._ids.irange(after_id, inclusive=False), limit + 1))
+            return UserPage(*self._build_page(ids, limit, self._users.__getitem__))
+
+    def search(
+        self, query: UserQuery, limit: int, after: Optional[SearchCursor] = None
+    ) -> SearchPage:
+        """Return up to ``limit`` users matching ``query``, in the order of its index.
+
+        Served from the email, ID or secondary index that ``query.index_name()``
+        names, in O(log n + k) for the k users it yields.
+        """
+        with self._lock:
+            ids = self._search_indexes().candidates(
+                query,
+                after,
+                lambda after_id: self._ids.irange(after_id, inclusive=False),
+                self._ids_by_email.get,
+            )
+            users = take_matches(query, map(self._users.__getitem__, ids), limit)
+            return search_page(query, users, limit)
+
+    def page_encoded(self, offset: int, limit: int) -> EncodedUserPage:
+        """Return ``page(offset, limit)`` with its users serialized."""
+        with self._lock:
+            ids = list(self._ids.islice(offset, offset + limit + 1))
+            return EncodedUserPage(*self._build_page(ids, limit, self._encode))
+
+    def page_after_encoded(self, after_id: int, limit: int) -> EncodedUserPage:
+        """Return ``page_after(after_id, limit)`` with its users serialized."""
+        with self._lock:
+            ids = list(islice(self._ids.irange(after_id, inclusive=False), limit + 1))
+            return EncodedUserPage(*self._build_page(ids, limit, self._encode))
+
+    def _build_page(
+        self, ids: List[int], limit: int, read: Callable[[int], T]
+    ) -> Tuple[List[T], int, Optional[int]]:
+        # Caller must hold self._lock. ``ids`` holds one extra ID when more
+        # users follow the page; ``read`` turns an ID into a page entry.
+        has_more = len(ids) > limit
+        ids = ids[:limit]
+        return (
+            [read(user_id) for user_id in ids],
+            len(self._users),
+            ids[-1] if has_more else None,
+        )
+
+    def _encode(self, user_id: int) -> bytes:
+        # Caller must hold self._lock; the user must exist.
+        encoded = self._encoded.get(user_id)
+        if encoded is None:
+            encoded = self._encoded[user_id] = self._users[user_id].SerializeToString()
+        return encoded
+
+    def _insert(self, user: example_service_pb2.User) -> None:
+        # Caller must hold self._lock.
+        self._users[user.id] = user
+        # A replaced user's encoding is stale
+        self._encoded.pop(user.id, None)
+        self._ids_by_email[user.email] = user.id
+        self._ids.add(user.id)
+        if self._indexes is not None:
+            self._indexes.add(user)
+        if user.id >= self._next_id:
+            self._next_id = user.id + 1
+
+    def _search_indexes(self) -> UserIndexes:
+        # Caller must hold self._lock.
+        if self._indexes is None:
+            self._indexes = UserIndexes.of(self._users.values())
+        return self._indexes
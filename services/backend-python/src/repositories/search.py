@@ -0,0 +1,238 @@
+"""User search: query filters, result cursors and secondary indexes."""
+
+import struct
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+
+from .sorted_index import SortedIndex
+
+# Indexes a search can be served from, which also order its results
+INDEX_EMAIL = "email"
+INDEX_NAME = "name"
+INDEX_SURNAME = "surname"
+INDEX_CREATED_AT = "created_at"
+INDEX_ID = "id"
+
+# Position in a search's result order: the indexed field of the last user
+# returned, and its ID
+SearchCursor = Tuple[Any, int]
+
+# User IDs are positive int32 values; big-endian keeps their byte order
+_USER_ID = struct.Struct(">I")
+
+
+class UserQuery(NamedTuple):
+    """Filters of a user search; a user must match every filter that is set.
+
+    Prefixes are matched case-sensitively, like ``str.startswith``.
+    """
+
+    # Exact email
+    email: str = ""
+    name_prefix: str = ""
+    surname_prefix: str = ""
+    # Inclusive lower bound on created_at, 0 for none
+    created_after: int = 0
+    # Exclusive upper bound on created_at, 0 for none
+    created_before: int = 0
+
+    def index_name(self) -> str:
+        """Return the index that serves the query and orders its results.
+
+        The first filter set among email, name prefix, surname prefix and
+        the ``created_at`` range picks it; without filters users come in ID
+        order. The other filters are checked for each user the index yields.
+        """
+        if self.email:
+            return INDEX_EMAIL
+        if self.name_prefix:
+            return INDEX_NAME
+        if self.surname_prefix:
+            return INDEX_SURNAME
+        if self.created_after or self.created_before:
+            return INDEX_CREATED_AT
+        return INDEX_ID
+
+    def matches(self, user: example_service_pb2.User) -> bool:
+        """Return whether ``user`` passes every filter that is set."""
+        return (
+            (not self.email or user.email == self.email)
+            and user.name.startswith(self.name_prefix)
+            and user.surname.startswith(self.surname_prefix)
+            and user.created_at >= self.created_after
+            and (not self.created_before or user.created_at < self.created_before)
+        )
+
+    def cursor(self, user: example_service_pb2.User) -> SearchCursor:
+        """Return the position of ``user`` in the query's result order."""
+        index = self.index_name()
+        key = user.id if index == INDEX_ID else getattr(user, index)
+        return key, user.id
+
+    def accepts(self, index: str, cursor: SearchCursor) -> bool:
+        """Return whether ``cursor``, taken from ``index``, can resume this query."""
+        key_type = int if index in (INDEX_CREATED_AT, INDEX_ID) else str
+        return index == self.index_name() and type(cursor[0]) is key_type
+
+
+class SearchPage(NamedTuple):
+    """One page of search results, in the order of the query's index."""
+
+    users: List[example_service_pb2.User]
+    # Cursor to resume the search from, or None when this is the last page.
+    next_cursor: Optional[SearchCursor]
+
+
+def take_matches(
+    query: UserQuery, users: Iterable[example_service_pb2.User], limit: int
+) -> List[example_service_pb2.User]:
+    """Return the first ``limit + 1`` of ``users`` that match ``query``."""
+    return list(islice((user for user in users if query.matches(user)), limit + 1))
+
+
+def search_page(
+    query: UserQuery, users: List[example_service_pb2.User], limit: int
+) -> SearchPage:
+    """Return the page of the first ``limit`` of ``users``.
+
+    ``users`` are matches in result order and hold one extra user when more
+    follow the page.
+    """
+    page = users[:limit]
+    return SearchPage(
+        users=page,
+        next_cursor=query.cursor(page[-1]) if len(users) > limit else None,
+    )
+
+
+class UserIndexes:
+    """Sorted indexes of users by name, surname and ``created_at``.
+
+    Each entry sorts by the indexed field and then by user ID, packed into
+    a single ``bytes`` or ``int`` key rather than a tuple to keep it small:
+    ``name`` UTF-8 encoded, a zero byte and the big-endian ID, or
+    ``created_at << 32 | id``. A prefix or range query bisects to its first
+    entry and walks the index from there, O(log n + k) for k entries.
+
+    Lookups by email and ID are left to the repository's own indexes. The
+    indexes are not thread-safe; callers serialize access.
+    """
+
+    def __init__(self) -> None:
+        self._names = SortedIndex()
+        self._surnames = SortedIndex()
+        self._created_at = SortedIndex()
+
+    @classmethod
+    def of(cls, users: Iterable[example_service_pb2.User]) -> "UserIndexes":
+        """Return indexes of ``users``.
+
+        The keys are sorted before they are added, so each one appends to
+        its index instead of inserting into the middle.
+        """
+        names: List[bytes] = []
+        surnames: List[bytes] = []
+        created_at: List[int] = []
+        for user in users:
+            names.append(_text_key(user.name, user.id))
+            surnames.append(_text_key(user.surname, user.id))
+            created_at.append(_time_key(user.created_at, user.id))
+        indexes = cls()
+        for index, keys in (
+            (indexes._names, names),
+            (indexes._surnames, surnames),
+            (indexes._created_at, created_at),
+        ):
+            keys.sort()
+            for key in keys:
+                index.add(key)
+        return indexes
+
+    def add(self, user: example_service_pb2.User) -> None:
+        """Index ``user``."""
+        user_id = user.id
+        self._names.add(_text_key(user.name, user_id))
+        self._surnames.add(_text_key(user.surname, user_id))
+        self._created_at.add(_time_key(user.created_at, user_id))
+
+    def discard(self, user: example_service_pb2.User) -> None:
+        """Remove ``user``, as it was indexed, from the indexes."""
+        user_id = user.id
+        self._names.discard(_text_key(user.name, user_id))
+        self._surnames.discard(_text_key(user.surname, user_id))
+        self._created_at.discard(_time_key(user.created_at, user_id))
+
+    def candidates(
+        self,
+        query: UserQuery,
+        after: Optional[SearchCursor],
+        ids_after: Callable[[int], Iterable[int]],
+        id_by_email: Callable[[str], Optional[int]],
+    ) -> Iterable[int]:
+        """Return the IDs of possible matches of ``query``, in result order.
+
+        Only the filter that picks the index is applied; callers check the
+        others with ``UserQuery.matches``.
+
+        Args:
+            query: Filters of the search
+            after: Only users after this cursor are returned, if set
+            ids_after: Iterates the repository's IDs greater than its
+                argument in ascending order
+            id_by_email: Looks up the ID of the user with an email
+        """
+        index = query.index_name()
+        if index == INDEX_EMAIL:
+            user_id = id_by_email(query.email)
+            if user_id is None:
+                return ()
+            if after is not None and (query.email, user_id) <= after:
+                return ()
+            return (user_id,)
+        if index == INDEX_ID:
+            return ids_after(0 if after is None else after[1])
+        if index == INDEX_CREATED_AT:
+            return self._scan_created_at(query, after)
+        if index == INDEX_NAME:
+            return self._scan_text(self._names, query.name_prefix, after)
+        return self._scan_text(self._surnames, query.surname_prefix, after)
+
+    @staticmethod
+    def _scan_text(
+        keys: SortedIndex, prefix: str, after: Optional[SearchCursor]
+    ) -> Iterator[int]:
+        encoded_prefix = prefix.encode()
+        start = encoded_prefix
+        if after is not None:
+            start = max(start, _text_key(*after))
+        # The prefix itself is never a key, as every key ends in an ID
+        for key in keys.irange(start, inclusive=False):
+            if not key.startswith(encoded_prefix):
+                return
+            yield _USER_ID.unpack_from(key, len(key) - _USER_ID.size)[0]
+
+    def _scan_created_at(
+        self, query: UserQuery, after: Optional[SearchCursor]
+    ) -> Iterator[int]:
+        # Below the key of every user created at created_after
+        start = _time_key(query.created_after, 0)
+        if after is not None:
+            start = max(start, _time_key(*after))
+        end = _time_key(query.created_before, 0) if query.created_before else None
+        for key in self._created_at.irange(start, inclusive=False):
+            if end is not None and key >= end:
+                return
+            yield key & 0xFFFFFFFF
+
+
+def _text_key(text: str, user_id: int) -> bytes:
+    return text.encode() + b"\0" + _USER_ID.pack(user_id)
+
+
+def _time_key(timestamp: int, user_id: int) -> int:
+    return timestamp << 32 | user_id
@@ -0,0 +1,444 @@
+"""In-process user repository partitioned into independently locked shards."""
+
+import heapq
+import threading
+import time
+import zlib
+from contextlib import ExitStack
+from itertools import islice
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+
+from .base import EncodedUserPage, UserPage, UserRepository
+from .errors import EmailAlreadyExistsError
+from .search import (
+    SearchCursor,
+    SearchPage,
+    UserIndexes,
+    UserQuery,
+    search_page,
+    take_matches,
+)
+from .sorted_index import SortedIndex
+
+DEFAULT_SHARDS = 16
+# Consecutive IDs a shard allocates before moving to its next block
+DEFAULT_ID_BLOCK_SIZE = 64
+
+T = TypeVar("T")
+
+
+class _Shard:
+    """Users whose ID falls in this shard's blocks, plus an email partition.
+
+    Everything here is guarded by ``lock``. ``ids_by_email`` holds the
+    emails that hash to this shard, whichever shard stores their user.
+    """
+
+    def __init__(
+        self, index: int, shards: int, block_size: int, search_indexes: bool
+    ) -> None:
+        self.lock = threading.Lock()
+        self.users: Dict[int, example_service_pb2.User] = {}
+        # Serialized users, filled by the *_encoded reads
+        self.encoded: Dict[int, bytes] = {}
+        self.ids = SortedIndex()
+        # Built on the first search unless search_indexes is set
+        self.indexes: Optional[UserIndexes] = UserIndexes() if search_indexes else None
+        self.ids_by_email: Dict[str, int] = {}
+        self._block_size = block_size
+        # IDs of block b are b * block_size + 1 ..= (b + 1) * block_size;
+        # this shard owns the blocks b with b % shards == index.
+        self._block_stride = shards * block_size
+        self._next_id = index * block_size + 1
+
+    def allocate_id(self) -> int:
+        # Caller must hold self.lock.
+        user_id = self._next_id
+        self._next_id += 1
+        if user_id % self._block_size == 0:
+            # Last ID of the block; continue in this shard's next block
+            self._next_id += self._block_stride - self._block_size
+        return user_id
+
+    def ids_after(self, after_id: int) -> Iterator[int]:
+        # Caller must hold self.lock.
+        return self.ids.irange(after_id, inclusive=False)
+
+    def search_indexes(self) -> UserIndexes:
+        # Caller must hold self.lock.
+        if self.indexes is None:
+            self.indexes = UserIndexes.of(self.users.values())
+        return self.indexes
+
+    def user(self, user_id: int) -> example_service_pb2.User:
+        # Caller must hold self.lock; the user must exist.
+        return self.users[user_id]
+
+    def encode(self, user_id: int) -> bytes:
+        # Caller must hold self.lock; the user must exist.
+        encoded = self.encoded.get(user_id)
+        if encoded is None:
+            encoded = self.encoded[user_id] = self.users[user_id].SerializeToString()
+        return encoded
+
+    def insert(self, user: example_service_pb2.User) -> None:
+        # Caller must hold self.lock. The email goes to the email shard.
+        self.users[user.id] = user
+        # A replaced user's encoding is stale
+        self.encoded.pop(user.id, None)
+        self.ids.add(user.id)
+        if self.indexes is not None:
+            self.indexes.add(user)
+        if user.id >= self._next_id:
+            self._next_id = user.id
+            self.allocate_id()
+
+
+class ShardedUserRepository(UserRepository):
+    """Stores users in memory across ``shards`` independently locked shards.
+
+    ``InMemoryUserRepository`` serializes every call on one lock, so
+    writers on different executor threads queue behind each other. Here a
+    user lives in the shard that owns its ID, and its email is indexed in
+    the shard its email hashes to. IDs are handed out in blocks of
+    ``block_size`` owned by each shard instead of from one shared counter,
+    and ``create`` takes the ID from the email's shard, so a create takes a
+    single shard lock. Reads by ID or email lock one shard each.
+
+    The trade-offs compared to ``InMemoryUserRepository``:
+
+    * IDs are unique and increase within a shard, but are not handed out
+      in creation order across shards and leave gaps until blocks fill up.
+    * ``create_many`` is atomic per shard rather than for the whole batch.
+    * Keyset pages merge the shards, locking one at a time, so a page may
+      miss a user created while it is being built. Offset pages and ``add``
+      lock every shard.
+
+    As in ``InMemoryUserRepository``, each shard keeps the encoding of the
+    users read through the ``*_encoded`` methods until they are replaced,
+    and ``UserIndexes`` of the users it stores for ``search``, built on its
+    first search unless ``search_indexes`` is set.
+    """
+
+    def __init__(
+        self,
+        shards: int = DEFAULT_SHARDS,
+        block_size: int = DEFAULT_ID_BLOCK_SIZE,
+        search_indexes: bool = False,
+    ) -> None:
+        if shards < 1 or block_size < 1:
+            raise ValueError("shards and block_size must be at least 1")
+        self._shards = [
+            _Shard(i, shards, block_size, search_indexes) for i in range(shards)
+        ]
+        self._block_size = block_size
+
+    def __len__(self) -> int:
+        return sum(len(shard.users) for shard in self._shards)
+
+    def get(self, user_id: int) -> Optional[example_service_pb2.User]:
+        """Return the user with the given ID, or None if it does not exist."""
+        shard = self._shard_for_id(user_id)
+        with shard.lock:
+            return shard.users.get(user_id)
+
+    def get_encoded(self, user_id: int) -> Optional[bytes]:
+        """Return the user with the given ID serialized, or None if there is none."""
+        shard = self._shard_for_id(user_id)
+        with shard.lock:
+            return shard.encode(user_id) if user_id in shard.users else None
+
+    def get_by_email(self, email: str) -> Optional[example_service_pb2.User]:
+        """Return the user with the given email, or None if it does not exist."""
+        email_shard = self._shard_for_email(email)
+        with email_shard.lock:
+            user_id = email_shard.ids_by_email.get(email)
+        return None if user_id is None else self.get(user_id)
+
+    def get_many(self, user_ids: Iterable[int]) -> Dict[int, example_service_pb2.User]:
+        """Return the users that exist among ``user_ids``, locking each shard once."""
+        by_shard: Dict[int, List[int]] = {}
+        for user_id in user_ids:
+            by_shard.setdefault(self._shard_index(user_id), []).append(user_id)
+
+        found: Dict[int, example_service_pb2.User] = {}
+        for index, ids in by_shard.items():
+            shard = self._shards[index]
+            with shard.lock:
+                users = shard.users
+                found.update(
+                    (user_id, users[user_id]) for user_id in ids if user_id in users
+                )
+        return found
+
+    def create(
+        self, name: str, email: str, surname: str = ""
+    ) -> example_service_pb2.User:
+        """Create a user with an ID from the shard that indexes its email.
+
+        Raises:
+            EmailAlreadyExistsError: If the email is already taken.
+        """
+        current_time = int(time.time())
+        shard = self._shard_for_email(email)
+        with shard.lock:
+            if email in shard.ids_by_email:
+                raise EmailAlreadyExistsError(email)
+            return self._create_locked(shard, name, email, surname, current_time)
+
+    def create_many(
+        self, entries: Sequence[Tuple[str, str, str]]
+    ) -> List[Optional[example_service_pb2.User]]:
+        """Create a user for each ``(name, email, surname)`` entry.
+
+        Entries are grouped by email shard and each group is inserted under
+        one acquisition of that shard's lock. Repeated emails land in the
+        same group, so an entry whose email is already taken, including by
+        an earlier entry of the same batch, is skipped.
+
+        Returns:
+            The created user for each entry, or None where it was skipped.
+        """
+        current_time = int(time.time())
+        by_shard: Dict[int, List[int]] = {}
+        for position, (_, email, _) in enumerate(entries):
+            by_shard.setdefault(self._email_shard_index(email), []).append(position)
+
+        created: List[Optional[example_service_pb2.User]] = [None] * len(entries)
+        for index, positions in by_shard.items():
+            shard = self._shards[index]
+            with shard.lock:
+                for position in positions:
+                    name, email, surname = entries[position]
+                    if email in shard.ids_by_email:
+                        continue
+                    created[position] = self._create_locked(
+                        shard, name, email, surname, current_time
+                    )
+        return created
+
+    def add(self, user: example_service_pb2.User) -> None:
+        """Store a fully built user, keeping its ID.
+
+        Used for seeding and for restoring users that were created elsewhere.
+        An existing user with the same ID is replaced. The ID, the new email
+        and a replaced email may belong to three different shards, so this
+        locks every shard.
+
+        Raises:
+            EmailAlreadyExistsError: If another user already has the email.
+        """
+        with self._all_locks():
+            self._add_locked(user)
+
+    def restore(self, users: Iterable[example_service_pb2.User]) -> int:
+        """Store fully built users as ``add`` does, locking every shard once.
+
+        A user whose email another stored user already has is skipped.
+
+        Returns:
+            The number of skipped users
+        """
+        skipped = 0
+        with self._all_locks():
+            for user in users:
+                try:
+                    self._add_locked(user)
+                except EmailAlreadyExistsError:
+                    skipped += 1
+        return skipped
+
+    def page(self, offset: int, limit: int) -> UserPage:
+        """Return up to ``limit`` users starting at position ``offset``."""
+        return UserPage(*self._page(offset, limit, _Shard.user))
+
+    def page_after(self, after_id: int, limit: int) -> UserPage:
+        """Return up to ``limit`` users whose ID is greater than ``after_id``.
+
+        Each shard contributes its next ``limit + 1`` IDs under its own
+        lock; the page is the users with the smallest IDs among them.
+        """
+        return UserPage(*self._page_after(after_id, limit, _Shard.user))
+
+    def search(
+        self, query: UserQuery, limit: int, after: Optional[SearchCursor] = None
+    ) -> SearchPage:
+        """Return up to ``limit`` users matching ``query``, in the order of its index.
+
+        Each shard contributes its first ``limit + 1`` matches from its own
+        indexes under its own lock; the page is the first of them in the
+        query's order.
+        """
+        email_owner = None
+        if query.email:
+            email_shard = self._shard_for_email(query.email)
+            with email_shard.lock:
+                email_owner = email_shard.ids_by_email.get(query.email)
+
+        runs: List[List[Tuple[SearchCursor, example_service_pb2.User]]] = []
+        for shard in self._shards:
+            with shard.lock:
+                users = shard.users
+                ids = shard.search_indexes().candidates(
+                    query, after, shard.ids_after, lambda email: email_owner
+                )
+                # The email owner is stored in one shard only
+                matches = take_matches(
+                    query, (users[i] for i in ids if i in users), limit
+                )
+            runs.append([(query.cursor(user), user) for user in matches])
+        # Cursors end in the user ID, so no two compare equal
+        merged = islice(heapq.merge(*runs), limit + 1)
+        return search_page(query, [user for _, user in merged], limit)
+
+    def page_encoded(self, offset: int, limit: int) -> EncodedUserPage:
+        """Return ``page(offset, limit)`` with its users serialized."""
+        return EncodedUserPage(*self._page(offset, limit, _Shard.encode))
+
+    def page_after_encoded(self, after_id: int, limit: int) -> EncodedUserPage:
+        """Return ``page_after(after_id, limit)`` with its users serialized."""
+        return EncodedUserPage(*self._page_after(after_id, limit, _Shard.encode))
+
+    def _page(
+        self, offset: int, limit: int, read: Callable[[_Shard, int], T]
+    ) -> Tuple[List[T], int, Optional[int]]:
+        # ``read`` turns a user ID into a page entry under its shard's lock.
+        if offset == 0:
+            # IDs start at 1, so the first page is a keyset page
+            return self._page_after(0, limit, read)
+        with self._all_locks():
+            start = self._nth_id(offset)
+            if start is None:
+                ids: List[int] = []
+            else:
+                ids = list(
+                    islice(
+                        heapq.merge(*(s.ids.irange(start) for s in self._shards)),
+                        limit + 1,
+                    )
+                )
+            entries = [
+                (user_id, read(self._shard_for_id(user_id), user_id)) for user_id in ids
+            ]
+            return self._build_page(entries, limit)
+
+    def _page_after(
+        self, after_id: int, limit: int, read: Callable[[_Shard, int], T]
+    ) -> Tuple[List[T], int, Optional[int]]:
+        runs: List[List[int]] = []
+        for shard in self._shards:
+            with shard.lock:
+                runs.append(
+                    list(islice(shard.ids.irange(after_id, inclusive=False), limit + 1))
+                )
+        # Only the users that make the page are read. Users are never
+        # removed, so their IDs are still there, but one may have been
+        # replaced since its ID was seen.
+        entries = []
+        for user_id in islice(heapq.merge(*runs), limit + 1):
+            shard = self._shard_for_id(user_id)
+            with shard.lock:
+                entries.append((user_id, read(shard, user_id)))
+        return self._build_page(entries, limit)
+
+    def _build_page(
+        self, entries: List[Tuple[int, T]], limit: int
+    ) -> Tuple[List[T], int, Optional[int]]:
+        # ``entries`` are (ID, page entry) pairs and hold one extra pair
+        # when more users follow the page.
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+        return (
+            [entry for _, entry in entries],
+            len(self),
+            entries[-1][0] if has_more else None,
+        )
+
+    def _nth_id(self, position: int) -> Optional[int]:
+        # Caller must hold every shard lock. Binary search over ID values
+        # for the smallest ID with ``position`` smaller IDs in all shards.
+        shards = [s for s in self._shards if len(s.ids)]
+        if position >= sum(len(s.ids) for s in shards):
+            return None
+        low: int = min(next(iter(s.ids)) for s in shards)
+        high: int = max(next(s.ids.islice(len(s.ids) - 1)) for s in shards)
+        while low < high:
+            middle = (low + high) // 2
+            if sum(s.ids.bisect_right(middle) for s in shards) > position:
+                high = middle
+            else:
+                low = middle + 1
+        return low
+
+    def _add_locked(self, user: example_service_pb2.User) -> None:
+        # Caller must hold every shard lock.
+        shard = self._shard_for_id(user.id)
+        email_shard = self._shard_for_email(user.email)
+        owner = email_shard.ids_by_email.get(user.email)
+        if owner is not None and owner != user.id:
+            raise EmailAlreadyExistsError(user.email)
+
+        previous = shard.users.get(user.id)
+        if previous is not None:
+            del self._shard_for_email(previous.email).ids_by_email[previous.email]
+            if shard.indexes is not None:
+                shard.indexes.discard(previous)
+        shard.insert(user)
+        email_shard.ids_by_email[user.email] = user.id
+
+    def _create_locked(
+        self,
+        shard: _Shard,
+        name: str,
+        email: str,
+        surname: str,
+        current_time: int,
+    ) -> example_service_pb2.User:
+        # Caller must hold shard.lock, the email's shard. IDs it allocates
+        # belong to it as well.
+        user = example_service_pb2.User(
+            id=shard.allocate_id(),
+            name=name,
+            surname=surname,
+            email=email,
+            created_at=current_time,
+            updated_at=current_time,
+        )
+        shard.insert(user)
+        shard.ids_by_email[email] = user.id
+        return user
+
+    def _all_locks(self) -> ExitStack:
+        # Always acquired in shard order, so two callers cannot deadlock.
+        stack = ExitStack()
+        for shard in self._shards:
+            stack.enter_context(shard.lock)
+        return stack
+
+    def _shard_index(self, user_id: int) -> int:
+        return ((user_id - 1) // self._block_size) % len(self._shards)
+
+    def _shard_for_id(self, user_id: int) -> _Shard:
+        return self._shards[self._shard_index(user_id)]
+
+    def _email_shard_index(self, email: str) -> int:
+        # crc32 rather than hash(), which is salted per process
+        return zlib.crc32(email.encode()) % len(self._shards)
+
+    def _shard_for_email(self, email: str) -> _Shard:
+        return self._shards[self._email_shard_index(email)]
@@ -0,0 +1,457 @@
+"""User repository shared between processes through a multiprocessing manager.
+
+The launcher runs one in-memory repository inside a manager process and
+every gRPC worker process accesses it through ``SharedUserRepository``.
+Users cross the process boundary as serialized ``User`` bytes: generated
+protobuf classes cannot be pickled because their ``__module__`` is not
+importable under the ``proto_generated`` package.
+
+The store process also numbers every user stored through it in a
+``ChangeFeed`` and counts them in shared memory. Each worker's WatchUsers
+feed mirrors the users all workers create from it, and so does the copy of
+the store a worker serves reads from. Writes still all go through the store
+process: if it dies, workers keep serving reads from their copies but
+every write fails.
+"""
+
+import logging
+import multiprocessing
+import signal
+import threading
+from multiprocessing.context import BaseContext
+from multiprocessing.managers import BaseManager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from proto_generated import example_service_pb2
+from src.utils.change_feed import ChangeFeed
+
+from .base import EncodedUserPage, UserChangeFeed, UserPage, UserRepository
+from .search import SearchCursor, SearchPage, UserQuery
+
+logger = logging.getLogger(__name__)
+
+# Seconds between a worker's checks for users stored by other workers
+CHANGE_POLL_INTERVAL = 0.01
+# Changes a worker pulls from the store process per round trip
+CHANGE_PULL_LIMIT = 1000
+# Users a worker copies from the store process per round trip
+REPLICA_LOAD_CHUNK_SIZE = 10000
+
+_CREATED = example_service_pb2.UserChange.CREATED
+_UPDATED = example_service_pb2.UserChange.UPDATED
+
+
+class _UserStoreEndpoint:
+    """Manager-side adapter exchanging serialized users with workers.
+
+    Every user stored through it is published to a feed that workers pull
+    from, after which ``published``, a shared ``ctypes`` integer, is set to
+    the feed's sequence.
+    """
+
+    def __init__(
+        self, repository: UserRepository, published: Any, capacity: int
+    ) -> None:
+        self._repository = repository
+        self._changes: UserChangeFeed = ChangeFeed(capacity=capacity)
+        self._published = published
+        # Keeps ``published`` from going backwards between publishers
+        self._publish_lock = threading.Lock()
+
+    def _publish(self, changes: List[Tuple[int, bytes]]) -> None:
+        if not changes:
+            return
+        with self._publish_lock:
+            self._changes.publish(changes)
+            self._published.value = self._changes.sequence
+
+    def feed_position(self) -> Tuple[int, int]:
+        return self._changes.feed_id, self._changes.sequence
+
+    def changes_after(
+        self, after: int, limit: int
+    ) -> Optional[List[Tuple[int, Tuple[int, bytes]]]]:
+        return self._changes.changes_after(after, limit)
+
+    def count(self) -> int:
+        return len(self._repository)
+
+    def get(self, user_id: int) -> Optional[bytes]:
+        return self._repository.get_encoded(user_id)
+
+    def get_by_email(self, email: str) -> Optional[bytes]:
+        user = self._repository.get_by_email(email)
+        return None if user is None else user.SerializeToString()
+
+    def get_many(self, user_ids: List[int]) -> Dict[int, bytes]:
+        users = self._repository.get_many(user_ids)
+        return {user_id: user.SerializeToString() for user_id, user in users.items()}
+
+    def create(self, name: str, email: str, surname: str) -> bytes:
+        user: bytes = self._repository.create(name, email, surname).SerializeToString()
+        self._publish([(_CREATED, user)])
+        return user
+
+    def create_many(self, entries: List[Tuple[str, str, str]]) -> List[Optional[bytes]]:
+        created = [
+            None if user is None else user.SerializeToString()
+            for user in self._repository.create_many(entries)
+        ]
+        self._publish([(_CREATED, user) for user in created if user is not None])
+        return created
+
+    def add(self, user: bytes) -> None:
+        message = example_service_pb2.User.FromString(user)
+        replaced = self._repository.get(message.id) is not None
+        self._repository.add(message)
+        self._publish([(_UPDATED if replaced else _CREATED, user)])
+
+    def page(self, offset: int, limit: int) -> EncodedUserPage:
+        return self._repository.page_encoded(offset, limit)
+
+    def page_after(self, after_id: int, limit: int) -> EncodedUserPage:
+        return self._repository.page_after_encoded(after_id, limit)
+
+    def search(
+        self, query: UserQuery, limit: int, after: Optional[SearchCursor]
+    ) -> Tuple[List[bytes], Optional[SearchCursor]]:
+        page = self._repository.search(query, limit, after)
+        return [user.SerializeToString() for user in page.users], page.next_cursor
+
+    def close(self) -> None:
+        self._repository.close()
+
+
+RepositoryFactory = Callable[[], Optional[UserRepository]]
+
+# Live in the manager process only.
+_endpoint: Optional[_UserStoreEndpoint] = None
+_factory: Optional[RepositoryFactory] = None
+_published: Any = None
+_capacity = 0
+
+
+def _get_endpoint() -> _UserStoreEndpoint:
+    global _endpoint
+    if _endpoint is None:
+        from src.api.example_service import ExampleServiceServicer
+
+        repository = None if _factory is None else _factory()
+        if repository is None:
+            # A default servicer builds a repository seeded with the demo users.
+            repository = ExampleServiceServicer().repository
+        _endpoint = _UserStoreEndpoint(repository, _published, _capacity)
+    return _endpoint
+
+
+def _init_store_process(
+    factory: Optional[RepositoryFactory], published: Any, capacity: int
+) -> None:
+    global _factory, _published, _capacity
+    _factory = factory
+    _published = published
+    _capacity = capacity
+    # The store must outlive draining workers; its owner shuts it down
+    # explicitly once they have exited. Ctrl-C reaches the whole process
+    # group, so SIGINT has to be ignored here too.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+class UserStoreManager(BaseManager):
+    """Hosts the shared user repository in its own process."""
+
+    # Shared ctypes integer holding the sequence of the last change the
+    # store published; set by ``start_user_store``
+    published: Any = None
+
+
+UserStoreManager.register("UserStore", callable=_get_endpoint)
+
+
+def start_user_store(
+    authkey: bytes,
+    ctx: Optional[BaseContext] = None,
+    factory: Optional[RepositoryFactory] = None,
+    capacity: int = 10000,
+) -> UserStoreManager:
+    """Start the store process; stop it with ``shutdown()`` when done.
+
+    The store process calls ``factory``, which must be picklable, to build
+    its seeded repository. It falls back to an ``InMemoryUserRepository``
+    when ``factory`` is omitted or returns None. The manager serves each
+    worker connection on its own thread, so a ``ShardedUserRepository``
+    lets their writes proceed side by side. The last ``capacity`` users
+    stored are kept for workers' change feeds to pull.
+
+    Workers must be handed ``manager.published`` when they are started,
+    as shared memory cannot be passed along later.
+    """
+    ctx = ctx or multiprocessing.get_context("spawn")
+    manager = UserStoreManager(authkey=authkey, ctx=ctx)
+    manager.published = ctx.RawValue("q", 0)  # type: ignore[attr-defined]
+    manager.start(
+        initializer=_init_store_process,
+        initargs=(factory, manager.published, capacity),
+    )
+    return manager
+
+
+class SharedUserRepository(UserRepository):
+    """Worker-side view of the user store hosted by ``UserStoreManager``.
+
+    Offers the same methods as the hosted repository. Writes are one round
+    trip to the store process each; manager proxies keep a connection per
+    thread, so the repository can be used from a thread pool.
+
+    Without ``replica``, reads are round trips too, and every worker's
+    reads queue up at the store process. With it, the repository loads a
+    copy of every user into ``replica()``, a new empty repository, and
+    serves reads from that copy. The copy follows the store's change feed:
+    a read first pulls whatever the store published since the last pull,
+    so it sees every write that completed before it on any worker. Each
+    worker then holds all users in memory. Should the store fall more than
+    its feed capacity ahead, the copy is reloaded from scratch.
+
+    ``published`` is the store's ``UserStoreManager.published``; it tells
+    the repository, without a round trip, whether there are changes to pull
+    for the copy and for the feed given to ``publish_to``.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        address: Any,
+        authkey: bytes,
+        published: Any,
+        replica: Optional[Callable[[], UserRepository]] = None,
+    ) -> None:
+        manager = UserStoreManager(address=address, authkey=authkey)
+        manager.connect()
+        # Proxy of the store process's endpoint, offering the same methods
+        store: _UserStoreEndpoint = manager.UserStore()  # type: ignore[attr-defined]
+        self._store = store
+
+        self._published = published
+        self._new_replica = replica
+        self._replica: Optional[UserRepository] = None
+        self._changes: Optional[UserChangeFeed] = None
+        # Store feed and sequence of the last change applied to _replica
+        # and republished to _changes
+        self._feed_id = 0
+        self._synced = 0
+        self._sync_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._follower: Optional[threading.Thread] = None
+        if replica is not None:
+            with self._sync_lock:
+                self._resync()
+            self._follow_changes()
+
+    def close(self) -> None:
+        """Stop pulling changes; the store process itself keeps running."""
+        self._stopped.set()
+        if self._follower is not None:
+            self._follower.join()
+
+    def publish_to(self, changes: UserChangeFeed) -> bool:
+        """Republish every user stored through any worker to ``changes``.
+
+        ``changes`` takes over the numbering of the store process's feed,
+        so a watcher can resume on any worker. A thread checks for new
+        changes every ``CHANGE_POLL_INTERVAL`` seconds and pulls them.
+        """
+        with self._sync_lock:
+            if self._follower is None:
+                self._feed_id, self._synced = self._store.feed_position()
+            changes.mirror(self._feed_id, self._synced)
+            self._changes = changes
+        self._follow_changes()
+        return True
+
+    def _follow_changes(self) -> None:
+        if self._follower is None:
+            self._follower = threading.Thread(
+                target=self._follow, name="user-store-changes", daemon=True
+            )
+            self._follower.start()
+
+    def _follow(self) -> None:
+        while not self._stopped.wait(CHANGE_POLL_INTERVAL):
+            try:
+                self._pull_changes()
+            except (EOFError, OSError) as e:
+                # Without the store there is nothing more to watch; the
+                # copy keeps serving what it has
+                logger.error("Lost the shared user store, closing WatchUsers: %s", e)
+                if self._changes is not None:
+                    self._changes.close()
+                return
+
+    def _pull_changes(self) -> None:
+        """Apply and republish the changes the store published since the last pull."""
+        with self._sync_lock:
+            while self._published.value > self._synced:
+                pulled = self._store.changes_after(self._synced, CHANGE_PULL_LIMIT)
+                if pulled is None:
+                    # More changes than the store keeps arrived since the
+                    # last pull; start over from its current state
+                    self._resync()
+                    continue
+                if not pulled:
+                    return
+                if self._replica is not None:
+                    self._replica.restore(
+                        example_service_pb2.User.FromString(user)
+                        for _, (_, user) in pulled
+                    )
+                if self._changes is not None:
+                    self._changes.publish(change for _, change in pulled)
+                self._synced = pulled[-1][0]
+
+    def _resync(self) -> None:
+        # Caller must hold self._sync_lock. Changes published while the
+        # copy loads are pulled again afterwards; restoring a user twice
+        # leaves it as it is.
+        self._feed_id, self._synced = self._store.feed_position()
+        if self._new_replica is not None:
+            replica = self._new_replica()
+            after_id = 0
+            while True:
+                page = self._store.page_after(after_id, REPLICA_LOAD_CHUNK_SIZE)
+                replica.restore(_decode_page(page).users)
+                if page.next_after_id is None:
+                    break
+                after_id = page.next_after_id
+            self._replica = replica
+        if self._changes is not None:
+            self._changes.mirror(self._feed_id, self._synced)
+
+    def _read(self) -> Optional[UserRepository]:
+        """Return the copy to read from, caught up with the store, if there is one."""
+        if self._replica is not None and self._published.value > self._synced:
+            self._pull_changes()
+        return self._replica
+
+    def __len__(self) -> int:
+        replica = self._read()
+        if replica is not None:
+            return len(replica)
+        return self._store.count()
+
+    def get(self, user_id: int) -> Optional[example_service_pb2.User]:
+        """Return the user with the given ID, or None if it does not exist."""
+        replica = self._read()
+        if replica is not None:
+            return replica.get(user_id)
+        return _decode(self._store.get(user_id))
+
+    def get_encoded(self, user_id: int) -> Optional[bytes]:
+        """Return the user with the given ID serialized, or None if there is none.
+
+        Users arrive serialized, so this skips decoding and encoding them.
+        """
+        replica = self._read()
+        if replica is not None:
+            return replica.get_encoded(user_id)
+        return self._store.get(user_id)
+
+    def get_by_email(self, email: str) -> Optional[example_service_pb2.User]:
+        """Return the user with the given email, or None if it does not exist."""
+        replica = self._read()
+        if replica is not None:
+            return replica.get_by_email(email)
+        return _decode(self._store.get_by_email(email))
+
+    def get_many(self, user_ids: Iterable[int]) -> Dict[int, example_service_pb2.User]:
+        """Return the users that exist among ``user_ids``, keyed by ID."""
+        replica = self._read()
+        if replica is not None:
+            return replica.get_many(user_ids)
+        users = self._store.get_many(list(user_ids))
+        return {
+            user_id: example_service_pb2.User.FromString(data)
+            for user_id, data in users.items()
+        }
+
+    def create(
+        self, name: str, email: str, surname: str = ""
+    ) -> example_service_pb2.User:
+        """Create a user with the next free ID.
+
+        Raises:
+            EmailAlreadyExistsError: If the email is already taken.
+        """
+        user: example_service_pb2.User = example_service_pb2.User.FromString(
+            self._store.create(name, email, surname)
+        )
+        return user
+
+    def create_many(
+        self, entries: Sequence[Tuple[str, str, str]]
+    ) -> List[Optional[example_service_pb2.User]]:
+        """Create a user for each ``(name, email, surname)`` entry.
+
+        The whole batch is one round trip and runs under the store's lock.
+        Entries whose email is already taken come back as None.
+        """
+        return [_decode(data) for data in self._store.create_many(list(entries))]
+
+    def add(self, user: example_service_pb2.User) -> None:
+        """Store a fully built user, keeping its ID."""
+        self._store.add(user.SerializeToString())
+
+    def page(self, offset: int, limit: int) -> UserPage:
+        """Return up to ``limit`` users starting at position ``offset``."""
+        replica = self._read()
+        if replica is not None:
+            return replica.page(offset, limit)
+        return _decode_page(self._store.page(offset, limit))
+
+    def page_after(self, after_id: int, limit: int) -> UserPage:
+        """Return up to ``limit`` users whose ID is greater than ``after_id``."""
+        replica = self._read()
+        if replica is not None:
+            return replica.page_after(after_id, limit)
+        return _decode_page(self._store.page_after(after_id, limit))
+
+    def search(
+        self, query: UserQuery, limit: int, after: Optional[SearchCursor] = None
+    ) -> SearchPage:
+        """Return up to ``limit`` users matching ``query`` that follow ``after``."""
+        replica = self._read()
+        if replica is not None:
+            return replica.search(query, limit, after)
+        users, next_cursor = self._store.search(query, limit, after)
+        return SearchPage(
+            users=[example_service_pb2.User.FromString(user) for user in users],
+            next_cursor=next_cursor,
+        )
+
+    def page_encoded(self, offset: int, limit: int) -> EncodedUserPage:
+        """Return ``page(offset, limit)`` with its users serialized."""
+        replica = self._read()
+        if replica is not None:
+            return replica.page_encoded(offset, limit)
+        return self._store.page(offset, limit)
+
+    def page_after_encoded(self, after_id: int, limit: int) -> EncodedUserPage:
+        """Return ``page_after(after_id, limit)`` with its users serialized."""
+        replica = self._read()
+        if replica is not None:
+            return replica.page_after_encoded(after_id, limit)
+        return self._store.page_after(after_id, limit)
+
+
+def _decode(data: Optional[bytes]) -> Optional[example_service_pb2.User]:
+    return None if data is None else example_service_pb2.User.FromString(data)
+
+
+def _decode_page(page: EncodedUserPage) -> UserPage:
+    users, total_count, next_after_id = page
+    return UserPage(
+        users=[example_service_pb2.User.FromString(user) for user in users],
+        total_count=total_count,
+        next_after_id=next_after_id,
+    )
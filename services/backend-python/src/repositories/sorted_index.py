@@ -0,0 +1,139 @@
+"""Sorted key index with positional access, used for ordered user scans."""
+
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain, islice
+from typing import Any, Iterator, List, Optional
+
+
+class SortedIndex:
+    """Sorted collection of unique keys stored as a list of bounded chunks.
+
+    This is a flat, two-level B-tree: keys live in sorted chunks of at most
+    ``2 * load`` items and ``_maxes`` holds the last key of every chunk.
+    Lookups and inserts bisect ``_maxes`` and then a single chunk, so they
+    cost O(log n) plus a memmove bounded by the chunk size. Positional
+    access (offset pagination) goes through per-chunk start offsets, which
+    are rebuilt lazily after an insert or delete shifts them.
+
+    Appending a key larger than every stored key - the common case for
+    monotonically allocated user IDs - never invalidates the offsets.
+
+    The index is not thread-safe; callers serialize access.
+    """
+
+    def __init__(self, load: int = 1000) -> None:
+        self._load = load
+        self._chunks: List[List[Any]] = []
+        self._maxes: List[Any] = []
+        self._offsets: Optional[List[int]] = []
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Any]:
+        return chain.from_iterable(self._chunks)
+
+    def __contains__(self, key: Any) -> bool:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return False
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        return bool(chunk[j] == key)
+
+    def add(self, key: Any) -> None:
+        """Insert ``key``; inserting a key that is already present is a no-op."""
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._offsets = [0]
+            self._len = 1
+            return
+
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._chunks[i].append(key)
+            self._maxes[i] = key
+        else:
+            chunk = self._chunks[i]
+            j = bisect_left(chunk, key)
+            if chunk[j] == key:
+                return
+            chunk.insert(j, key)
+        self._len += 1
+
+        if len(self._chunks[i]) > 2 * self._load:
+            self._split(i)
+        elif i != len(self._chunks) - 1:
+            self._offsets = None
+
+    def discard(self, key: Any) -> None:
+        """Remove ``key`` if present."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        if chunk[j] != key:
+            return
+
+        del chunk[j]
+        self._len -= 1
+        if chunk:
+            self._maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i]
+            del self._maxes[i]
+        self._offsets = None
+
+    def bisect_left(self, key: Any) -> int:
+        """Return the position of the first key that is >= ``key``."""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return self._chunk_offsets()[i] + bisect_left(self._chunks[i], key)
+
+    def bisect_right(self, key: Any) -> int:
+        """Return the position of the first key that is > ``key``."""
+        i = bisect_right(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return self._chunk_offsets()[i] + bisect_right(self._chunks[i], key)
+
+    def islice(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Any]:
+        """Iterate keys by position, like ``itertools.islice`` over the index."""
+        if stop is None or stop > self._len:
+            stop = self._len
+        if start < 0 or start >= stop:
+            return iter(())
+
+        offsets = self._chunk_offsets()
+        i = bisect_right(offsets, start) - 1
+        first = self._chunks[i][start - offsets[i] :]
+        return islice(
+            chain(first, chain.from_iterable(self._chunks[i + 1 :])), stop - start
+        )
+
+    def irange(self, minimum: Any, inclusive: bool = True) -> Iterator[Any]:
+        """Iterate keys in order, starting from ``minimum``."""
+        find = bisect_left if inclusive else bisect_right
+        i = find(self._maxes, minimum)
+        if i == len(self._maxes):
+            return iter(())
+        first = self._chunks[i][find(self._chunks[i], minimum) :]
+        return chain(first, chain.from_iterable(self._chunks[i + 1 :]))
+
+    def _split(self, i: int) -> None:
+        chunk = self._chunks[i]
+        half = len(chunk) // 2
+        self._chunks[i : i + 1] = [chunk[:half], chunk[half:]]
+        self._maxes[i : i + 1] = [chunk[half - 1], chunk[-1]]
+        self._offsets = None
+
+    def _chunk_offsets(self) -> List[int]:
+        if self._offsets is None:
+            self._offsets = [0]
+            self._offsets.extend(accumulate(len(c) for c in self._chunks[:-1]))
+        return self._offsets
@@ -0,0 +1,558 @@
+"""User repository persisted in a SQL database through SQLAlchemy."""
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    cast,
+)
+
+from sqlalchemy import (
+    Connection,
+    Engine,
+    Row,
+    Table,
+    and_,
+    bindparam,
+    create_engine,
+    event,
+    func,
+    insert,
+    or_,
+    select,
+    text,
+    update,
+)
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.pool import StaticPool
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.models import Base, UserModel
+
+from .base import UserPage, UserRepository
+from .errors import DatabaseError, EmailAlreadyExistsError
+from .search import INDEX_ID, SearchCursor, SearchPage, UserQuery, search_page
+
+# Values per IN (...) list, well below SQLite's bound parameter limit
+IN_CLAUSE_CHUNK_SIZE = 500
+# Retries of a bulk create that lost a race for an email to another writer
+CREATE_MANY_ATTEMPTS = 3
+# Seconds the table's counted size is reported as ListUsers' total_count
+# before it is counted again. Users created through the repository are
+# added to it in between; those created by other processes show up at the
+# next count.
+COUNT_TTL = 5.0
+
+# Declared as a FromClause; a mapped class always has a Table
+_users = cast(Table, UserModel.__table__)
+_columns = (
+    _users.c.id,
+    _users.c.name,
+    _users.c.surname,
+    _users.c.email,
+    _users.c.created_at,
+    _users.c.updated_at,
+)
+
+# Statements are built once so SQLAlchemy compiles each of them once and
+# serves later executions from its compiled cache.
+_SELECT_BY_ID = select(*_columns).where(_users.c.id == bindparam("user_id"))
+_SELECT_BY_EMAIL = select(*_columns).where(_users.c.email == bindparam("email"))
+_SELECT_BY_IDS = select(*_columns).where(
+    _users.c.id.in_(bindparam("user_ids", expanding=True))
+)
+_SELECT_TAKEN_EMAILS = select(_users.c.email).where(
+    _users.c.email.in_(bindparam("emails", expanding=True))
+)
+_SELECT_EMAIL_OWNER = select(_users.c.id).where(_users.c.email == bindparam("email"))
+_SELECT_PAGE = (
+    select(*_columns)
+    .order_by(_users.c.id)
+    .limit(bindparam("limit"))
+    .offset(bindparam("offset"))
+)
+_SELECT_PAGE_AFTER = (
+    select(*_columns)
+    .where(_users.c.id > bindparam("after_id"))
+    .order_by(_users.c.id)
+    .limit(bindparam("limit"))
+)
+_COUNT = select(func.count()).select_from(_users)
+_INSERT = insert(_users)
+_INSERT_RETURNING_ID = insert(_users).returning(
+    _users.c.id, sort_by_parameter_order=True
+)
+_UPDATE_BY_ID = (
+    update(_users)
+    .where(_users.c.id == bindparam("user_id"))
+    .values(
+        name=bindparam("new_name"),
+        surname=bindparam("new_surname"),
+        email=bindparam("new_email"),
+        created_at=bindparam("new_created_at"),
+        updated_at=bindparam("new_updated_at"),
+    )
+)
+# Keeps a PostgreSQL serial ahead of IDs inserted explicitly by ``add``
+_SYNC_POSTGRES_ID_SEQUENCE = text(
+    "SELECT setval(pg_get_serial_sequence('users', 'id'), "
+    "(SELECT MAX(id) FROM users))"
+)
+
+
+def is_in_memory_sqlite(url: str) -> bool:
+    """Return True if ``url`` names a private in-memory SQLite database."""
+    database_url = make_url(url)
+    if database_url.get_backend_name() != "sqlite":
+        return False
+    return database_url.database in (None, "", ":memory:")
+
+
+def create_user_engine(url: str, pool_size: int = 10) -> Engine:
+    """Create an engine for ``url`` with a pool of ``pool_size`` connections.
+
+    The pool should match the number of threads that query concurrently,
+    usually ``ServerConfig.max_workers``; overflow connections are disabled
+    so a burst waits for a pooled connection instead of opening new ones.
+    An in-memory SQLite database lives in a single connection, so it uses a
+    ``StaticPool`` instead.
+    """
+    database_url = make_url(url)
+    if database_url.get_backend_name() != "sqlite":
+        return create_engine(
+            database_url,
+            pool_size=pool_size,
+            max_overflow=0,
+            # Reuse the most recently returned connection so idle ones can
+            # time out on the server side.
+            pool_use_lifo=True,
+            pool_recycle=1800,
+        )
+
+    if is_in_memory_sqlite(url):
+        return create_engine(
+            database_url,
+            poolclass=StaticPool,
+            connect_args={"check_same_thread": False},
+        )
+
+    engine = create_engine(
+        database_url,
+        pool_size=pool_size,
+        max_overflow=0,
+        # Pooled connections are handed to whichever thread checks them out
+        connect_args={"check_same_thread": False},
+    )
+    event.listen(engine, "connect", _configure_sqlite_connection)
+    return engine
+
+
+def _configure_sqlite_connection(dbapi_connection: Any, connection_record: Any) -> None:
+    # WAL lets readers proceed while a writer commits; concurrent writers
+    # wait for the lock instead of failing immediately.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+class SqlUserRepository(UserRepository):
+    """Stores users in the ``users`` table of a SQL database.
+
+    Lookups by ID and email use the primary key and the unique email index,
+    ``page_after`` and ``scan`` are keyset scans over the primary key,
+    ``search`` one over the ``(column, id)`` index of the query's index
+    field, and ``create_many`` inserts a whole batch with one multi-row
+    statement. The ``total_count`` of pages is counted at most once every
+    ``count_ttl`` seconds and kept up to date with this repository's own
+    inserts in between, so paging does not count the table per page.
+    Every method checks a connection out of the engine's pool for its
+    duration, so concurrency is bounded by the pool size.
+
+    Failures of the database, such as a lost connection or a lock wait
+    running out, are raised as ``DatabaseError``.
+    """
+
+    blocking = True
+
+    def __init__(
+        self,
+        engine: Engine,
+        create_schema: bool = True,
+        count_ttl: float = COUNT_TTL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._engine = engine
+        self._is_postgres = engine.dialect.name == "postgresql"
+        # The single connection of a StaticPool must not be used by two
+        # threads at once.
+        self._serialize: ContextManager[object] = (
+            threading.Lock() if isinstance(engine.pool, StaticPool) else nullcontext()
+        )
+        if create_schema:
+            Base.metadata.create_all(engine)
+            # create_all skips tables that exist, with the indexes added
+            # to them since
+            for index in _users.indexes:
+                index.create(engine, checkfirst=True)
+        self._count_ttl = count_ttl
+        self._clock = clock
+        self._count_lock = threading.Lock()
+        # Users counted in the table, plus those inserted here since
+        self._count = 0
+        self._count_expires: Optional[float] = None
+
+    @classmethod
+    def from_url(cls, url: str, pool_size: int = 10) -> "SqlUserRepository":
+        """Connect to ``url``, creating the ``users`` table if needed."""
+        return cls(create_user_engine(url, pool_size))
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        self._engine.dispose()
+
+    def __len__(self) -> int:
+        with self._connect() as conn:
+            return conn.execute(_COUNT).scalar_one()
+
+    def get(self, user_id: int) -> Optional[example_service_pb2.User]:
+        """Return the user with the given ID, or None if it does not exist."""
+        with self._connect() as conn:
+            row = conn.execute(_SELECT_BY_ID, {"user_id": user_id}).first()
+        return None if row is None else _to_user(row)
+
+    def get_by_email(self, email: str) -> Optional[example_service_pb2.User]:
+        """Return the user with the given email, or None if it does not exist."""
+        with self._connect() as conn:
+            row = conn.execute(_SELECT_BY_EMAIL, {"email": email}).first()
+        return None if row is None else _to_user(row)
+
+    def get_many(self, user_ids: Iterable[int]) -> Dict[int, example_service_pb2.User]:
+        """Return the users that exist among ``user_ids``, keyed by ID."""
+        user_ids = list(user_ids)
+        users: Dict[int, example_service_pb2.User] = {}
+        with self._connect() as conn:
+            for chunk in _chunks(user_ids, IN_CLAUSE_CHUNK_SIZE):
+                for row in conn.execute(_SELECT_BY_IDS, {"user_ids": chunk}):
+                    users[row.id] = _to_user(row)
+        return users
+
+    def create(
+        self, name: str, email: str, surname: str = ""
+    ) -> example_service_pb2.User:
+        """Create a user with the next free ID.
+
+        Raises:
+            EmailAlreadyExistsError: If the email is already taken.
+        """
+        current_time = int(time.time())
+        values: Dict[str, Any] = {
+            "name": name,
+            "surname": surname,
+            "email": email,
+            "created_at": current_time,
+            "updated_at": current_time,
+        }
+        try:
+            with self._transaction() as conn:
+                user_id = conn.execute(_INSERT_RETURNING_ID, values).scalar_one()
+        except IntegrityError as e:
+            # The unique email index is the only constraint a new row can break
+            raise EmailAlreadyExistsError(email) from e
+        self._inserted(1)
+        return example_service_pb2.User(id=user_id, **values)
+
+    def create_many(
+        self, entries: Sequence[Tuple[str, str, str]]
+    ) -> List[Optional[example_service_pb2.User]]:
+        """Create a user for each ``(name, email, surname)`` entry.
+
+        Taken emails are looked up and the new rows inserted in one
+        transaction. If a concurrent writer takes one of the emails in
+        between, the transaction is retried.
+
+        Returns:
+            The created user for each entry, or None where it was skipped.
+
+        Raises:
+            DatabaseError: If concurrent writers took one of the emails on
+                every attempt.
+        """
+        for attempt in range(CREATE_MANY_ATTEMPTS):
+            try:
+                return self._create_many(entries)
+            except IntegrityError as e:
+                if attempt == CREATE_MANY_ATTEMPTS - 1:
+                    raise DatabaseError(
+                        f"Creating users failed after {CREATE_MANY_ATTEMPTS} "
+                        "attempts; concurrent writers kept taking their emails"
+                    ) from e
+        raise AssertionError("unreachable")
+
+    def _create_many(
+        self, entries: Sequence[Tuple[str, str, str]]
+    ) -> List[Optional[example_service_pb2.User]]:
+        current_time = int(time.time())
+        created: List[Optional[example_service_pb2.User]] = [None] * len(entries)
+        with self._transaction() as conn:
+            taken: Set[str] = set()
+            emails = list({email for _, email, _ in entries})
+            for chunk in _chunks(emails, IN_CLAUSE_CHUNK_SIZE):
+                taken.update(
+                    conn.execute(_SELECT_TAKEN_EMAILS, {"emails": chunk}).scalars()
+                )
+
+            positions = []
+            rows: List[Dict[str, Any]] = []
+            for position, (name, email, surname) in enumerate(entries):
+                if email in taken:
+                    continue
+                taken.add(email)
+                positions.append(position)
+                rows.append(
+                    {
+                        "name": name,
+                        "surname": surname,
+                        "email": email,
+                        "created_at": current_time,
+                        "updated_at": current_time,
+                    }
+                )
+            if not rows:
+                return created
+
+            # A single executemany; SQLAlchemy batches it into multi-row
+            # INSERT ... RETURNING statements, keeping parameter order.
+            user_ids = conn.execute(_INSERT_RETURNING_ID, rows).scalars().all()
+        self._inserted(len(user_ids))
+
+        for position, row, user_id in zip(positions, rows, user_ids):
+            created[position] = example_service_pb2.User(id=user_id, **row)
+        return created
+
+    def add(self, user: example_service_pb2.User) -> None:
+        """Store a fully built user, keeping its ID.
+
+        Used for seeding and for restoring users that were created elsewhere.
+        An existing user with the same ID is replaced.
+
+        Raises:
+            EmailAlreadyExistsError: If another user already has the email.
+        """
+        try:
+            self._add(user)
+        except IntegrityError as e:
+            # A concurrent writer stored the email or the ID after the check
+            raise DatabaseError(f"Storing user {user.id} failed: {e.orig}") from e
+
+    def _add(self, user: example_service_pb2.User) -> None:
+        with self._transaction() as conn:
+            owner = conn.execute(_SELECT_EMAIL_OWNER, {"email": user.email}).scalar()
+            if owner is not None and owner != user.id:
+                raise EmailAlreadyExistsError(user.email)
+
+            updated = conn.execute(
+                _UPDATE_BY_ID,
+                {
+                    "user_id": user.id,
+                    "new_name": user.name,
+                    "new_surname": user.surname,
+                    "new_email": user.email,
+                    "new_created_at": user.created_at,
+                    "new_updated_at": user.updated_at,
+                },
+            )
+            inserted = updated.rowcount == 0
+            if inserted:
+                conn.execute(
+                    _INSERT,
+                    {
+                        "id": user.id,
+                        "name": user.name,
+                        "surname": user.surname,
+                        "email": user.email,
+                        "created_at": user.created_at,
+                        "updated_at": user.updated_at,
+                    },
+                )
+                if self._is_postgres:
+                    conn.execute(_SYNC_POSTGRES_ID_SEQUENCE)
+        if inserted:
+            self._inserted(1)
+
+    def page(self, offset: int, limit: int) -> UserPage:
+        """Return up to ``limit`` users starting at position ``offset``."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                _SELECT_PAGE, {"limit": limit + 1, "offset": offset}
+            ).all()
+            total_count = self._total_count(conn)
+        return _build_page(rows, limit, total_count)
+
+    def page_after(self, after_id: int, limit: int) -> UserPage:
+        """Return up to ``limit`` users whose ID is greater than ``after_id``."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                _SELECT_PAGE_AFTER, {"after_id": after_id, "limit": limit + 1}
+            ).all()
+            total_count = self._total_count(conn)
+        return _build_page(rows, limit, total_count)
+
+    def scan(
+        self, after_id: int, chunk_size: int
+    ) -> Iterator[List[example_service_pb2.User]]:
+        """Yield the users whose ID is greater than ``after_id``, in ID order.
+
+        Each chunk is one keyset query on a connection of its own; unlike
+        ``page_after``, the table is never counted.
+        """
+        while True:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    _SELECT_PAGE_AFTER, {"after_id": after_id, "limit": chunk_size}
+                ).all()
+            if rows:
+                yield [_to_user(row) for row in rows]
+            if len(rows) < chunk_size:
+                return
+            after_id = rows[-1].id
+
+    def search(
+        self, query: UserQuery, limit: int, after: Optional[SearchCursor] = None
+    ) -> SearchPage:
+        """Return up to ``limit`` users matching ``query``, in the order of its index.
+
+        Name and surname prefixes are matched as ranges of the column, which
+        agrees with ``str.startswith`` under a binary collation: SQLite's
+        default, ``"C"`` in PostgreSQL.
+        """
+        conditions = []
+        if query.email:
+            conditions.append(_users.c.email == query.email)
+        for column, prefix in (
+            (_users.c.name, query.name_prefix),
+            (_users.c.surname, query.surname_prefix),
+        ):
+            if prefix:
+                conditions.append(column >= prefix)
+                end = _prefix_end(prefix)
+                if end is not None:
+                    conditions.append(column < end)
+        if query.created_after:
+            conditions.append(_users.c.created_at >= query.created_after)
+        if query.created_before:
+            conditions.append(_users.c.created_at < query.created_before)
+
+        index = query.index_name()
+        key_column = _users.c[index]
+        if after is not None:
+            key, after_id = after
+            if index == INDEX_ID:
+                conditions.append(_users.c.id > after_id)
+            else:
+                conditions.append(
+                    or_(
+                        key_column > key,
+                        and_(key_column == key, _users.c.id > after_id),
+                    )
+                )
+        order_by = [_users.c.id] if index == INDEX_ID else [key_column, _users.c.id]
+        statement = (
+            select(*_columns).where(*conditions).order_by(*order_by).limit(limit + 1)
+        )
+        with self._connect() as conn:
+            rows = conn.execute(statement).all()
+        return search_page(query, [_to_user(row) for row in rows], limit)
+
+    def _total_count(self, conn: Connection) -> int:
+        with self._count_lock:
+            if self._count_expires is not None and self._clock() < self._count_expires:
+                return self._count
+        count: int = conn.execute(_COUNT).scalar_one()
+        with self._count_lock:
+            # An insert committed while counting may be counted twice
+            # until the next count
+            self._count = count
+            self._count_expires = self._clock() + self._count_ttl
+        return count
+
+    def _inserted(self, count: int) -> None:
+        with self._count_lock:
+            self._count += count
+
+    @contextmanager
+    def _connect(self) -> Iterator[Connection]:
+        with _database_errors(), self._serialize, self._engine.connect() as conn:
+            yield conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[Connection]:
+        # IntegrityError is left to the caller, which knows the constraint
+        with _database_errors(IntegrityError), self._serialize:
+            with self._engine.begin() as conn:
+                yield conn
+
+
+@contextmanager
+def _database_errors(*passed: Type[SQLAlchemyError]) -> Iterator[None]:
+    """Raise database failures as ``DatabaseError``, except ``passed`` ones."""
+    try:
+        yield
+    except passed:
+        raise
+    except SQLAlchemyError as e:
+        # The driver's error when there is one, without the statement
+        raise DatabaseError(f"User database error: {getattr(e, 'orig', e)}") from e
+
+
+def _to_user(row: Row) -> example_service_pb2.User:
+    user_id, name, surname, email, created_at, updated_at = row
+    return example_service_pb2.User(
+        id=user_id,
+        name=name,
+        surname=surname,
+        email=email,
+        created_at=created_at,
+        updated_at=updated_at,
+    )
+
+
+def _build_page(rows: Sequence[Row], limit: int, total_count: int) -> UserPage:
+    # ``rows`` holds one extra row when more users follow the page.
+    users = [_to_user(row) for row in rows[:limit]]
+    return UserPage(
+        users=users,
+        total_count=total_count,
+        next_after_id=users[-1].id if len(rows) > limit else None,
+    )
+
+
+def _prefix_end(prefix: str) -> Optional[str]:
+    # The smallest string above every string starting with ``prefix``, or
+    # None when there is no such bound
+    last = ord(prefix[-1])
+    if last == 0x10FFFF:
+        return None
+    return prefix[:-1] + chr(last + 1)
+
+
+def _chunks(values: List, size: int) -> Iterator[List]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
@@ -0,0 +1,221 @@
+"""Append-only record files: the write-ahead log and snapshots of the user store.
+
+Both file kinds start with an 8 byte magic and then hold records of::
+
+    length (uint32 LE) | crc32 of payload (uint32 LE) | payload
+
+Payloads are opaque here. Files are read through ``mmap``, so loading a
+snapshot does not copy it into a buffer first.
+"""
+
+import io
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+from typing import Iterable, Iterator, List, Optional
+
+from .errors import RepositoryError
+
+logger = logging.getLogger(__name__)
+
+WAL_MAGIC = b"USRWAL1\n"
+SNAPSHOT_MAGIC = b"USRSNP1\n"
+_HEADER = struct.Struct("<II")
+
+
+def encode_records(payloads: Iterable[bytes]) -> bytes:
+    """Frame ``payloads`` as consecutive records."""
+    return b"".join(
+        _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        for payload in payloads
+    )
+
+
+def read_records(path: str, magic: bytes) -> Iterator[bytes]:
+    """Yield the payloads stored in the record file at ``path``.
+
+    Stops at the first torn or corrupt record, which a crash during an
+    append leaves at the end of a log.
+
+    Raises:
+        RepositoryError: If the file does not start with ``magic``.
+    """
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[: len(magic)] != magic:
+                raise RepositoryError(f"{path} is not a {magic[:-1].decode()} file")
+            end = len(data)
+            position = len(magic)
+            while position + _HEADER.size <= end:
+                length, crc = _HEADER.unpack_from(data, position)
+                start = position + _HEADER.size
+                payload = data[start : start + length]
+                if len(payload) != length or zlib.crc32(payload) != crc:
+                    logger.warning(
+                        "⚠️ Ignoring %d bytes after a damaged record in %s",
+                        end - position,
+                        path,
+                    )
+                    return
+                yield payload
+                position = start + length
+
+
+def write_snapshot(path: str, payloads: Iterable[bytes]) -> None:
+    """Atomically replace ``path`` with a snapshot holding ``payloads``."""
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(SNAPSHOT_MAGIC)
+        for payload in payloads:
+            file.write(encode_records([payload]))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+    fsync_directory(os.path.dirname(path))
+
+
+def fsync_directory(path: str) -> None:
+    """Make renames and new files in directory ``path`` durable."""
+    fd = os.open(path or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """Append-only log with group commit.
+
+    ``append`` only queues records in memory and returns a sequence
+    number; ``wait`` blocks until the records up to it are on disk. A
+    background thread writes everything queued so far with one ``write``
+    and one ``fsync``, so while one fsync runs, the appends of all other
+    threads gather into the next batch. Throughput scales with concurrent
+    writers instead of being capped at one write per fsync.
+    """
+
+    def __init__(self, path: str, sync: bool = True):
+        """Open a new log segment at ``path``.
+
+        Args:
+            path: File to create; it must not exist yet
+            sync: Whether to fsync each batch; without it a crash of the
+                machine, not just of the process, can lose acknowledged
+                records
+        """
+        self._sync = sync
+        self._file = self._create(path)
+        self._condition = threading.Condition()
+        self._pending: List[bytes] = []
+        self._appended = 0
+        self._durable = 0
+        self._rotate_to: Optional[str] = None
+        self._closing = False
+        self._error: Optional[BaseException] = None
+        self.size = len(WAL_MAGIC)
+        self._writer = threading.Thread(
+            target=self._run, name="wal-writer", daemon=True
+        )
+        self._writer.start()
+
+    def append(self, records: bytes) -> int:
+        """Queue framed ``records``; returns the sequence number to wait for."""
+        with self._condition:
+            if self._closing:
+                raise RepositoryError("Write-ahead log is closed")
+            self._pending.append(records)
+            self._appended += 1
+            self.size += len(records)
+            self._condition.notify_all()
+            return self._appended
+
+    def wait(self, sequence: int) -> None:
+        """Block until the records appended as ``sequence`` are durable.
+
+        Raises:
+            RepositoryError: If writing the log failed.
+        """
+        with self._condition:
+            while self._durable < sequence and self._error is None:
+                self._condition.wait()
+            if self._durable < sequence:
+                raise RepositoryError("Write-ahead log failed") from self._error
+
+    def rotate(self, path: str) -> None:
+        """Write out queued records, then continue in a new segment at ``path``.
+
+        Callers must keep other threads from appending meanwhile, so that
+        every record appended before the call ends up in the old segment.
+        When it returns, those records are durable.
+
+        Raises:
+            RepositoryError: If writing the log failed.
+        """
+        with self._condition:
+            self._rotate_to = path
+            self._condition.notify_all()
+            while self._rotate_to is not None and self._error is None:
+                self._condition.wait()
+            if self._error is not None:
+                raise RepositoryError("Write-ahead log failed") from self._error
+            self.size = len(WAL_MAGIC)
+
+    @property
+    def appended(self) -> int:
+        """Sequence number of the last append."""
+        with self._condition:
+            return self._appended
+
+    def close(self) -> None:
+        """Write out queued records and close the log."""
+        with self._condition:
+            self._closing = True
+            self._condition.notify_all()
+        self._writer.join()
+
+    def _create(self, path: str) -> io.BufferedWriter:
+        file = open(path, "xb")
+        file.write(WAL_MAGIC)
+        file.flush()
+        if self._sync:
+            os.fsync(file.fileno())
+            fsync_directory(os.path.dirname(path))
+        return file
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not (self._pending or self._rotate_to or self._closing):
+                    self._condition.wait()
+                batch, self._pending = self._pending, []
+                sequence = self._appended
+                rotate_to = self._rotate_to
+                closing = self._closing
+            try:
+                if batch:
+                    self._file.write(b"".join(batch))
+                    self._file.flush()
+                    if self._sync:
+                        os.fsync(self._file.fileno())
+                if rotate_to is not None:
+                    self._file.close()
+                    self._file = self._create(rotate_to)
+            except OSError as e:
+                logger.exception("❌ Write-ahead log write failed")
+                with self._condition:
+                    self._error = e
+                    self._condition.notify_all()
+                return
+            with self._condition:
+                self._durable = sequence
+                if rotate_to is not None:
+                    self._rotate_to = None
+                self._condition.notify_all()
+                if closing and not self._pending:
+                    self._file.close()
+                    return
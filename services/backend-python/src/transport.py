@@ -0,0 +1,122 @@
+"""HTTP/2 transport settings of the gRPC server, grouped into presets.
+
+gRPC's defaults suit a client on the same host: no compression, no
+keepalive pings from the server for two hours, and receive windows sized
+by BDP probing. Between availability zones, large ``ListUsers`` pages and
+``StreamUsers`` exports are worth compressing, and idle connections have
+to be kept alive through load balancers that drop them after a few
+minutes.
+"""
+
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional, Tuple
+
+import grpc
+
+COMPRESSION_ALGORITHMS = {
+    "none": grpc.Compression.NoCompression,
+    "gzip": grpc.Compression.Gzip,
+    "deflate": grpc.Compression.Deflate,
+}
+# Methods whose responses grow with the page, batch or export size
+LARGE_RESPONSE_METHODS = ("ListUsers", "StreamUsers", "SearchUsers", "BatchGetUsers")
+# Stands for every method in compressed_methods
+ALL_METHODS = "*"
+
+
+@dataclass(frozen=True)
+class TransportSettings:
+    """Compression, keepalive, flow control and message limits of a server.
+
+    Zero leaves a setting at gRPC's default.
+    """
+
+    # Algorithm responses of compressed_methods are sent with, if the
+    # client accepts it; "none" sends them as they are
+    compression: str = "none"
+    # Method names, or "*" for every method of the service
+    compressed_methods: Tuple[str, ...] = LARGE_RESPONSE_METHODS
+    # Server pings an idle connection this often, and closes it when a
+    # ping is not answered within keepalive_timeout_ms
+    keepalive_time_ms: int = 0
+    keepalive_timeout_ms: int = 0
+    # Shortest interval between client keepalive pings the server accepts
+    # before answering with GOAWAY
+    min_client_ping_interval_ms: int = 0
+    # Calls a client may have open on one connection
+    max_concurrent_streams: int = 0
+    # Largest message received or sent
+    max_message_bytes: int = 0
+    # Whether receive windows grow with the measured bandwidth-delay product
+    bdp_probe: bool = True
+    # Initial receive window of each stream
+    stream_window_bytes: int = 0
+
+    def compressed(self, method_name: str) -> bool:
+        """Return whether responses of ``method_name`` are compressed."""
+        if self.compression == "none":
+            return False
+        methods = self.compressed_methods
+        return ALL_METHODS in methods or method_name in methods
+
+    def channel_options(self) -> List[Tuple[str, Any]]:
+        """Return the gRPC channel arguments for these settings."""
+        options: List[Tuple[str, Any]] = []
+        if self.keepalive_time_ms:
+            options.append(("grpc.keepalive_time_ms", self.keepalive_time_ms))
+            # Keep pinging connections that have no call open
+            options.append(("grpc.keepalive_permit_without_calls", 1))
+            # Pings are only sent along with data otherwise
+            options.append(("grpc.http2.max_pings_without_data", 0))
+        if self.keepalive_timeout_ms:
+            options.append(("grpc.keepalive_timeout_ms", self.keepalive_timeout_ms))
+        if self.min_client_ping_interval_ms:
+            options.append(
+                (
+                    "grpc.http2.min_ping_interval_without_data_ms",
+                    self.min_client_ping_interval_ms,
+                )
+            )
+        if self.max_concurrent_streams:
+            options.append(("grpc.max_concurrent_streams", self.max_concurrent_streams))
+        if self.max_message_bytes:
+            options.append(("grpc.max_receive_message_length", self.max_message_bytes))
+            options.append(("grpc.max_send_message_length", self.max_message_bytes))
+        options.append(("grpc.http2.bdp_probe", 1 if self.bdp_probe else 0))
+        if self.stream_window_bytes:
+            options.append(("grpc.http2.lookahead_bytes", self.stream_window_bytes))
+        return options
+
+
+TRANSPORT_PRESETS: Dict[str, TransportSettings] = {
+    # gRPC's own defaults
+    "default": TransportSettings(),
+    # Clients in the same zone: bandwidth is cheap, so nothing is
+    # compressed, but dead peers are noticed within a minute
+    "lan": TransportSettings(
+        keepalive_time_ms=60_000,
+        keepalive_timeout_ms=10_000,
+        min_client_ping_interval_ms=30_000,
+        max_concurrent_streams=1000,
+    ),
+    # Clients across zones or regions: large responses are compressed,
+    # connections are pinged within typical load balancer idle timeouts,
+    # and streams start with a window that covers a longer round trip
+    "wan": TransportSettings(
+        compression="gzip",
+        keepalive_time_ms=30_000,
+        keepalive_timeout_ms=10_000,
+        min_client_ping_interval_ms=10_000,
+        max_concurrent_streams=1000,
+        max_message_bytes=16 * 1024 * 1024,
+        stream_window_bytes=1024 * 1024,
+    ),
+}
+
+
+def resolve_transport(preset: str, **overrides: Optional[Any]) -> TransportSettings:
+    """Return the ``preset`` settings with every override that is not None."""
+    return replace(
+        TRANSPORT_PRESETS[preset],
+        **{name: value for name, value in overrides.items() if value is not None},
+    )
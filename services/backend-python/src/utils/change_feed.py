@@ -0,0 +1,250 @@
+"""Bounded log of recent changes, fanned out to subscribers without blocking.
+
+``ChangeFeed.publish`` numbers changes with consecutive sequence numbers,
+keeps the last ``capacity`` of them in a ring buffer and appends them to the
+queue of every subscriber. Writers never wait for subscribers: a subscriber
+whose queue already holds ``max_pending`` changes is dropped and marked
+``lagged`` instead, and has to reload whatever it mirrors before
+subscribing again. New subscribers can resume after any sequence number
+still in the ring buffer.
+
+A feed can also mirror one kept in another process: it takes over that
+feed's ``feed_id`` and sequence and republishes what ``changes_after``
+pulls from it, so subscribers can resume on any process mirroring it.
+"""
+
+import random
+import threading
+from collections import deque
+from itertools import islice
+from typing import (
+    Callable,
+    Deque,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+class SubscriberLimitError(RuntimeError):
+    """The feed already has as many subscribers as it allows."""
+
+
+class Subscription(Generic[T]):
+    """Changes published to a feed since a subscriber joined it.
+
+    ``wake`` is called from the publishing thread when changes arrive for a
+    subscription with none pending, or when it is dropped or closed; a
+    consumer that found ``drain`` empty waits for that call.
+    """
+
+    def __init__(self, wake: Callable[[], None], max_pending: int, sequence: int):
+        self._wake = wake
+        self._max_pending = max_pending
+        self._pending: Deque[Tuple[int, T]] = deque()
+        self._lock = threading.Lock()
+        # Sequence of the last change drained, the one subscribed after, or
+        # the last one published when the subscription lagged
+        self.sequence = sequence
+        # Set when changes were missed; nothing more is delivered then
+        self.lagged = False
+        # Set when the feed was closed; pending changes can still be drained
+        self.closed = False
+
+    def drain(self, limit: int) -> List[Tuple[int, T]]:
+        """Remove and return up to ``limit`` pending (sequence, change) pairs."""
+        with self._lock:
+            count = min(limit, len(self._pending))
+            changes = [self._pending.popleft() for _ in range(count)]
+            if changes:
+                self.sequence = changes[-1][0]
+        return changes
+
+    def _offer(self, changes: List[Tuple[int, T]]) -> bool:
+        """Queue ``changes``; return False if that would exceed ``max_pending``."""
+        with self._lock:
+            if len(self._pending) + len(changes) > self._max_pending:
+                # Whoever resyncs has to reload at least up to here
+                self._pending.clear()
+                self.sequence = changes[-1][0]
+                self.lagged = True
+                wake = True
+            else:
+                wake = not self._pending
+                self._pending.extend(changes)
+        if wake:
+            self._wake()
+        return not self.lagged
+
+    def _lag(self) -> None:
+        self.lagged = True
+        self._wake()
+
+    def _close(self) -> None:
+        self.closed = True
+        self._wake()
+
+
+class ChangeFeed(Generic[T]):
+    """Numbers changes and fans them out to subscribers.
+
+    Sequence numbers start at 1 in every process; ``feed_id``, random per
+    feed, tells subscribers whether a sequence number they resume from was
+    handed out by this feed.
+    """
+
+    def __init__(
+        self, capacity: int = 10000, max_pending: int = 1000, max_subscribers: int = 0
+    ):
+        """Initialize an empty feed.
+
+        Args:
+            capacity: Recent changes kept for subscribers to resume from
+            max_pending: Changes a subscriber may have queued before it is
+                dropped
+            max_subscribers: Subscribers at once, 0 for no limit
+        """
+        self.feed_id = random.getrandbits(63) or 1
+        self._ring: Deque[Tuple[int, T]] = deque(maxlen=capacity)
+        self._max_pending = max_pending
+        self._max_subscribers = max_subscribers
+        self._subscribers: Set[Subscription[T]] = set()
+        self._sequence = 0
+        self._dropped = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the last published change, 0 before the first."""
+        return self._sequence
+
+    @property
+    def subscribers(self) -> int:
+        """Number of current subscribers."""
+        return len(self._subscribers)
+
+    @property
+    def dropped(self) -> int:
+        """Subscribers dropped so far for falling behind."""
+        return self._dropped
+
+    def publish(self, changes: Iterable[T]) -> None:
+        """Append ``changes`` and queue them for every subscriber."""
+        with self._lock:
+            numbered = []
+            for change in changes:
+                self._sequence += 1
+                numbered.append((self._sequence, change))
+            if not numbered:
+                return
+            self._ring.extend(numbered)
+            for subscription in list(self._subscribers):
+                if not subscription._offer(numbered):
+                    self._subscribers.discard(subscription)
+                    self._dropped += 1
+
+    def subscribe(
+        self,
+        wake: Callable[[], None],
+        after: Optional[int] = None,
+        feed_id: Optional[int] = None,
+    ) -> Subscription[T]:
+        """Start a subscription to the changes after sequence ``after``.
+
+        With ``after`` None, only changes published from now on are
+        delivered. Otherwise the buffered changes after it are queued
+        first; when some of them are no longer buffered, or ``after`` was
+        not handed out by this feed (``feed_id`` differs), the subscription
+        starts out ``lagged`` at the current sequence.
+
+        A subscription to a closed feed starts out ``closed``.
+
+        Raises:
+            SubscriberLimitError: If the feed has ``max_subscribers`` already
+                and the subscription would not start out lagged.
+        """
+        with self._lock:
+            if self._closed:
+                subscription: Subscription[T] = Subscription(
+                    wake, self._max_pending, self._sequence
+                )
+                subscription._close()
+                return subscription
+            if after is None:
+                after = self._sequence
+            elif feed_id != self.feed_id or not self._buffered_after(after):
+                subscription = Subscription(wake, self._max_pending, self._sequence)
+                subscription._lag()
+                return subscription
+            limit = self._max_subscribers
+            if limit and len(self._subscribers) >= limit:
+                raise SubscriberLimitError(f"Feed already has {limit} subscribers")
+            subscription = Subscription(wake, self._max_pending, after)
+            oldest = self._ring[0][0] if self._ring else self._sequence + 1
+            # Sequence numbers in the ring are consecutive
+            backlog = list(islice(self._ring, max(0, after + 1 - oldest), None))
+            subscription._pending.extend(backlog)
+            self._subscribers.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription: Subscription[T]) -> None:
+        """Stop queueing changes for ``subscription``."""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def changes_after(self, after: int, limit: int) -> Optional[List[Tuple[int, T]]]:
+        """Return up to ``limit`` buffered changes after sequence ``after``.
+
+        Returns None if some of the changes after it are no longer buffered.
+        """
+        with self._lock:
+            if not self._buffered_after(after):
+                return None
+            oldest = self._ring[0][0] if self._ring else self._sequence + 1
+            start = max(0, after + 1 - oldest)
+            return list(islice(self._ring, start, start + limit))
+
+    def mirror(self, feed_id: int, sequence: int) -> None:
+        """Continue the numbering of another feed from its ``sequence``.
+
+        Changes published afterwards are numbered as that feed numbered
+        them, provided every one of them is republished in order. Current
+        subscribers and buffered changes belong to the old numbering, so
+        subscribers are told to resync from ``sequence`` and the buffer is
+        emptied.
+        """
+        with self._lock:
+            self.feed_id = feed_id
+            self._sequence = sequence
+            self._ring.clear()
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+            self._dropped += len(subscribers)
+        for subscription in subscribers:
+            with subscription._lock:
+                subscription._pending.clear()
+                subscription.sequence = sequence
+            subscription._lag()
+
+    def close(self) -> None:
+        """Close every subscription, and those started later, e.g. on shutdown."""
+        with self._lock:
+            self._closed = True
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscription in subscribers:
+            subscription._close()
+
+    def _buffered_after(self, after: int) -> bool:
+        """Return whether every change after ``after`` is still in the ring."""
+        if after > self._sequence:
+            return False
+        oldest = self._ring[0][0] if self._ring else self._sequence + 1
+        return after >= oldest - 1
@@ -0,0 +1,219 @@
+"""Adaptive concurrency limits derived from observed latency.
+
+A ``ConcurrencyLimiter`` admits a call only while fewer than ``limit`` calls
+are in flight. Completed calls report their latency; once per window the
+limiter hands the window's average latency to a limit algorithm, which
+returns the new limit:
+
+* ``GradientLimit`` compares the recent latency with a slowly moving
+  baseline. While they agree the limit grows by a small queue allowance;
+  when latency rises above the baseline, the limit shrinks in proportion,
+  before requests pile up in queues.
+* ``AimdLimit`` grows the limit by one per window and cuts it by a factor
+  when calls exceed their deadline or a latency threshold.
+
+Both are modelled after Netflix's concurrency-limits library.
+"""
+
+import math
+import threading
+import time
+from typing import Callable, Optional
+
+
+class LimitAlgorithm:
+    """Computes a new concurrency limit from one window of samples."""
+
+    limit: float
+
+    def update(self, rtt: float, max_in_flight: int, dropped: bool) -> float:
+        """Return the new limit.
+
+        Args:
+            rtt: Average latency of the calls completed in the window
+            max_in_flight: Most calls in flight at once during the window
+            dropped: Whether a call of the window missed its deadline
+        """
+        raise NotImplementedError
+
+
+class GradientLimit(LimitAlgorithm):
+    """Scales the limit by the ratio of baseline to recent latency."""
+
+    def __init__(
+        self,
+        initial_limit: float = 20,
+        min_limit: float = 4,
+        max_limit: float = 1000,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        baseline_windows: int = 600,
+    ):
+        """Initialize the algorithm.
+
+        Args:
+            initial_limit: Limit before the first window completes
+            min_limit: Lower bound of the limit
+            max_limit: Upper bound of the limit
+            tolerance: Latency increase over the baseline accepted before
+                the limit shrinks, 1.5 meaning 50%
+            smoothing: Weight of a new limit against the previous one
+            baseline_windows: Windows averaged into the latency baseline
+        """
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self._baseline_weight = 2.0 / (baseline_windows + 1)
+        self._baseline: Optional[float] = None
+
+    def update(self, rtt: float, max_in_flight: int, dropped: bool) -> float:
+        rtt = max(rtt, 1e-9)
+        if self._baseline is None:
+            self._baseline = rtt
+        else:
+            self._baseline += (rtt - self._baseline) * self._baseline_weight
+        # After an overload the baseline lags far behind; let it recover
+        # faster so the limit can grow again.
+        if self._baseline / rtt > 2:
+            self._baseline *= 0.95
+
+        # Calls did not use the current limit, so latency says nothing
+        # about a higher one.
+        if max_in_flight < self.limit / 2 and not dropped:
+            return self.limit
+
+        gradient = max(0.5, min(1.0, self.tolerance * self._baseline / rtt))
+        if dropped:
+            gradient = 0.5
+        queue_allowance = math.sqrt(self.limit)
+        target = self.limit * gradient + queue_allowance
+        limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+        return self.limit
+
+
+class AimdLimit(LimitAlgorithm):
+    """Additive increase, multiplicative decrease on slow or dropped calls."""
+
+    def __init__(
+        self,
+        initial_limit: float = 20,
+        min_limit: float = 4,
+        max_limit: float = 1000,
+        backoff: float = 0.9,
+        latency_threshold: float = 0.5,
+    ):
+        """Initialize the algorithm.
+
+        Args:
+            initial_limit: Limit before the first window completes
+            min_limit: Lower bound of the limit
+            max_limit: Upper bound of the limit
+            backoff: Factor applied to the limit when a window is too slow
+            latency_threshold: Average latency in seconds counted as too slow
+        """
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_threshold = latency_threshold
+
+    def update(self, rtt: float, max_in_flight: int, dropped: bool) -> float:
+        if dropped or rtt > self.latency_threshold:
+            limit = self.limit * self.backoff
+        elif max_in_flight >= self.limit / 2:
+            limit = self.limit + 1
+        else:
+            limit = self.limit
+        self.limit = max(self.min_limit, min(self.max_limit, limit))
+        return self.limit
+
+
+class ConcurrencyLimiter:
+    """Admits calls while fewer than the current limit are in flight.
+
+    Every admitted call must be released exactly once. The limit is updated
+    at most once per ``window`` seconds; a window stays open until it holds
+    ``min_samples`` completed calls, so single slow calls do not move it.
+    """
+
+    def __init__(
+        self,
+        algorithm: LimitAlgorithm,
+        window: float = 0.1,
+        min_samples: int = 10,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._algorithm = algorithm
+        self._window = window
+        self._min_samples = min_samples
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._limit = int(algorithm.limit)
+        self.in_flight = 0
+        self._window_end = clock() + window
+        self._rtt_sum = 0.0
+        self._samples = 0
+        self._max_in_flight = 0
+        self._dropped = False
+
+    @property
+    def limit(self) -> int:
+        """Calls admitted at once."""
+        return self._limit
+
+    def try_acquire(self) -> bool:
+        """Admit a call if the limit allows it."""
+        with self._lock:
+            if self.in_flight >= self._limit:
+                return False
+            self.in_flight += 1
+            if self.in_flight > self._max_in_flight:
+                self._max_in_flight = self.in_flight
+            return True
+
+    def release(self, rtt: Optional[float], dropped: bool = False) -> None:
+        """Release an admitted call.
+
+        Args:
+            rtt: Latency of the call in seconds, None to leave it out of the
+                limit computation (e.g. long-lived streams)
+            dropped: Whether the call missed its deadline
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if rtt is not None:
+                self._rtt_sum += rtt
+                self._samples += 1
+            self._dropped = self._dropped or dropped
+            now = self._clock()
+            if now < self._window_end or self._samples < self._min_samples:
+                return
+            limit = self._algorithm.update(
+                self._rtt_sum / self._samples, self._max_in_flight, self._dropped
+            )
+            self._limit = max(1, int(limit))
+            self._window_end = now + self._window
+            self._rtt_sum = 0.0
+            self._samples = 0
+            self._max_in_flight = self.in_flight
+            self._dropped = False
+
+
+def build_limiter(kind: str, max_limit: int) -> Optional[ConcurrencyLimiter]:
+    """Create a limiter of ``kind``: "gradient", "aimd", or "off" for None."""
+    if kind == "off":
+        return None
+    bounds = dict(
+        initial_limit=min(20, max_limit),
+        min_limit=min(4, max_limit),
+        max_limit=max_limit,
+    )
+    algorithm: LimitAlgorithm
+    if kind == "aimd":
+        algorithm = AimdLimit(**bounds)
+    else:
+        algorithm = GradientLimit(**bounds)
+    return ConcurrencyLimiter(algorithm)
@@ -0,0 +1,52 @@
+"""``/debug/`` routes served next to ``/metrics`` when profiling is enabled.
+
+* ``/debug/profile?seconds=10&mode=wall`` samples the process for
+  ``seconds`` and answers with the folded stacks of ``mode`` (``wall`` or
+  ``cpu``), ready for flamegraph.pl or speedscope
+* ``/debug/stage-sampling`` returns the fraction of calls whose stages are
+  timed, ``?rate=0.05`` changes it
+"""
+
+from typing import Dict, Optional, Tuple
+
+from src.utils.metrics_server import Route
+from src.utils.profiler import PROFILE_MODES, ProfilerBusyError, SamplingProfiler
+from src.utils.stage_timer import StageTimer
+
+_TEXT = "text/plain; charset=utf-8"
+
+
+def _number(query: Dict[str, str], name: str, default: float) -> float:
+    try:
+        return float(query.get(name, default))
+    except ValueError:
+        raise ValueError(f"{name} must be a number") from None
+
+
+def debug_routes(
+    profiler: SamplingProfiler, stage_timer: Optional[StageTimer]
+) -> Dict[str, Route]:
+    """Return the debug routes for ``start_metrics_server``."""
+
+    def profile(query: Dict[str, str]) -> Tuple[int, str, bytes]:
+        seconds = _number(query, "seconds", 10.0)
+        mode = query.get("mode", "wall")
+        if mode not in PROFILE_MODES or seconds <= 0:
+            raise ValueError(f"expected seconds > 0 and mode in {PROFILE_MODES}")
+        try:
+            result = profiler.profile(seconds)
+        except ProfilerBusyError as e:
+            return 409, _TEXT, f"{e}\n".encode()
+        return 200, _TEXT, result.to_folded(mode).encode()
+
+    def stage_sampling(query: Dict[str, str]) -> Tuple[int, str, bytes]:
+        if stage_timer is None:
+            return 404, _TEXT, b"stage timing needs metrics and validation enabled\n"
+        if "rate" in query:
+            rate = _number(query, "rate", 0.0)
+            if not 0.0 <= rate <= 1.0:
+                raise ValueError("rate must be between 0 and 1")
+            stage_timer.sample_rate = rate
+        return 200, _TEXT, f"{stage_timer.sample_rate}\n".encode()
+
+    return {"/debug/profile": profile, "/debug/stage-sampling": stage_sampling}
@@ -0,0 +1,219 @@
+"""Logging that keeps formatting and I/O off the threads serving RPCs.
+
+``logging.basicConfig`` writes each record to stderr from the thread that
+logged it, under the stream handler's lock, so every worker thread logging
+a request line waits for the others' writes. ``start_logging`` instead
+hands records to a bounded queue drained by one listener thread, which
+formats and writes them. When the queue is full, records are dropped and
+counted rather than blocking the caller.
+
+Per-request records, logged through a ``RequestLogger``, are also
+rate-limited by a token bucket, so a busy server logs a steady sample of
+its calls instead of every one of them. The bucket is checked before the
+record is even built, so a record left out costs about as little as one
+below the logger's level.
+"""
+
+import atexit
+import logging
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Any, MutableMapping, NamedTuple, Optional, Tuple
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class LogStats(NamedTuple):
+    """Counters of the installed logging pipeline."""
+
+    # Records waiting for the listener thread
+    queued: int
+    # Records dropped because the queue was full
+    dropped: int
+    # Request-path records left out by the rate limit
+    suppressed: int
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queues records for a ``QueueListener``, dropping them when it is full.
+
+    Records are queued as they are: the listener runs in the same process,
+    so formatting the message is left to it instead of being done by the
+    logging thread as ``QueueHandler`` does. Arguments of a log call must
+    therefore not be changed after it returns.
+
+    The queue is a ``SimpleQueue``, whose ``put`` is reentrant, so a signal
+    handler that logs cannot deadlock on a record being queued by the
+    thread it interrupted; ``max_queued`` is checked against its size.
+    """
+
+    queue: "SimpleQueue[logging.LogRecord]"
+
+    def __init__(self, max_queued: int) -> None:
+        super().__init__(SimpleQueue())
+        self.dropped = 0
+        self._max_queued = max_queued
+        self._dropped_lock = threading.Lock()
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # The queue is thread-safe, so the handler lock ``Handler.handle``
+        # takes around ``emit`` would only serialize the logging threads
+        result = self.filter(record)
+        if isinstance(result, logging.LogRecord):
+            record = result
+        if result:
+            self.emit(record)
+        return bool(result)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.queue.qsize() < self._max_queued:
+            self.queue.put_nowait(record)
+        else:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+class RequestLogSampler:
+    """Lets through at most ``rate`` per-request records per second.
+
+    A token bucket holding up to ``rate`` tokens, so short bursts pass
+    whole.
+    """
+
+    def __init__(self, rate: float) -> None:
+        self.suppressed = 0
+        self._rate = rate
+        self._burst = max(rate, 1.0)
+        self._tokens = self._burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def admit(self) -> bool:
+        """Take a token for one record, or count it as suppressed."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self._burst, self._tokens + (now - self._updated) * self._rate
+            )
+            self._updated = now
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            self.suppressed += 1
+            return False
+
+
+class LogPipeline:
+    """The root logger's handler, listener thread and request log sampler."""
+
+    def __init__(
+        self,
+        handler: logging.Handler,
+        listener: Optional[QueueListener],
+        sampler: Optional[RequestLogSampler],
+    ) -> None:
+        self.handler = handler
+        self.listener = listener
+        self.sampler = sampler
+
+    def stats(self) -> LogStats:
+        """Return the current counters."""
+        handler = self.handler
+        if isinstance(handler, DroppingQueueHandler):
+            queued, dropped = handler.queue.qsize(), handler.dropped
+        else:
+            queued, dropped = 0, 0
+        suppressed = 0 if self.sampler is None else self.sampler.suppressed
+        return LogStats(queued=queued, dropped=dropped, suppressed=suppressed)
+
+    def stop(self) -> None:
+        """Write out the records still queued and stop the listener thread."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+# Live pipeline of this process, installed by start_logging
+_pipeline: Optional[LogPipeline] = None
+
+
+class RequestLogger(logging.LoggerAdapter):
+    """Logs per-request records, rate-limited by the installed pipeline.
+
+    Records below ERROR are only built once the pipeline's
+    ``RequestLogSampler`` admits them; without one, this logs like the
+    wrapped logger.
+    """
+
+    def __init__(self, logger: logging.Logger) -> None:
+        super().__init__(logger, {})
+
+    def isEnabledFor(self, level: int) -> bool:
+        if not self.logger.isEnabledFor(level):
+            return False
+        sampler = None if _pipeline is None else _pipeline.sampler
+        return sampler is None or level >= logging.ERROR or sampler.admit()
+
+    def process(
+        self, msg: Any, kwargs: MutableMapping[str, Any]
+    ) -> Tuple[Any, MutableMapping[str, Any]]:
+        return msg, kwargs
+
+
+def request_logger(name: str) -> RequestLogger:
+    """Return the ``RequestLogger`` of the logger called ``name``."""
+    return RequestLogger(logging.getLogger(name))
+
+
+def start_logging(
+    level: int = logging.INFO,
+    max_queued: int = 10000,
+    request_log_rate: float = 0.0,
+) -> LogPipeline:
+    """Route the root logger's records to stderr through a listener thread.
+
+    Replaces the root logger's handlers; the records still queued are
+    written out at interpreter exit.
+
+    Args:
+        level: Level of the root logger
+        max_queued: Records buffered for the listener before new ones are
+            dropped; 0 writes records from the logging thread instead
+        request_log_rate: Records per second let through by every
+            ``RequestLogger`` together, 0 for no limit
+    """
+    global _pipeline
+    if _pipeline is not None:
+        _pipeline.stop()
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler: logging.Handler = stream_handler
+    listener = None
+    if max_queued > 0:
+        handler = DroppingQueueHandler(max_queued)
+        listener = QueueListener(handler.queue, stream_handler)
+    sampler = RequestLogSampler(request_log_rate) if request_log_rate > 0 else None
+
+    root = logging.getLogger()
+    for previous in root.handlers[:]:
+        root.removeHandler(previous)
+    root.addHandler(handler)
+    root.setLevel(level)
+    if listener is not None:
+        listener.start()
+
+    _pipeline = LogPipeline(handler, listener, sampler)
+    atexit.register(_pipeline.stop)
+    return _pipeline
+
+
+def log_stats() -> Optional[LogStats]:
+    """Return the counters of the pipeline ``start_logging`` installed, if any."""
+    return None if _pipeline is None else _pipeline.stats()
@@ -0,0 +1,344 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Counters, gauges and histograms keep one cell per thread: a thread only
+ever writes its own cell, so recording a value takes no lock and never
+contends with other worker threads. Reading a metric sums the cells of
+every thread, which happens only when ``/metrics`` is scraped.
+"""
+
+import math
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Generic, Iterable, List, Sequence, Tuple, TypeVar
+
+# Latency buckets in seconds, from sub-millisecond cache hits to slow scans
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Cells:
+    """Per-thread lists of ``size`` floats that are summed on read."""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._cells: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def mine(self) -> List[float]:
+        """Return the calling thread's cell, creating it on first use."""
+        try:
+            cell: List[float] = self._local.cell
+            return cell
+        except AttributeError:
+            cell = [0.0] * self._size
+            with self._lock:
+                self._cells.append(cell)
+            self._local.cell = cell
+            return cell
+
+    @property
+    def local(self) -> threading.local:
+        """Thread-local whose ``cell`` attribute is set once ``mine`` ran."""
+        return self._local
+
+    def total(self) -> List[float]:
+        """Return the element-wise sum of every thread's cell."""
+        totals = [0.0] * self._size
+        with self._lock:
+            cells = list(self._cells)
+        for cell in cells:
+            for index, value in enumerate(cell):
+                totals[index] += value
+        return totals
+
+
+class CounterChild:
+    """One labelled series of a ``Counter``."""
+
+    def __init__(self) -> None:
+        self._cells = _Cells(1)
+        self._local = self._cells.local
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Add ``amount`` to the counter."""
+        # Reading the thread-local directly skips a call on the hot path.
+        try:
+            self._local.cell[0] += amount
+        except AttributeError:
+            self._cells.mine()[0] += amount
+
+    def value(self) -> float:
+        """Return the current total across threads."""
+        return self._cells.total()[0]
+
+
+class GaugeChild(CounterChild):
+    """One labelled series of a ``Gauge``."""
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Subtract ``amount`` from the gauge."""
+        try:
+            self._local.cell[0] -= amount
+        except AttributeError:
+            self._cells.mine()[0] -= amount
+
+
+class HistogramChild:
+    """One labelled series of a ``Histogram``."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = tuple(buckets)
+        # One count per bucket, one for +Inf, then the sum of observations
+        self._cells = _Cells(len(self._buckets) + 2)
+        self._local = self._cells.local
+
+    def observe(self, value: float) -> None:
+        """Record one observation."""
+        try:
+            cell = self._local.cell
+        except AttributeError:
+            cell = self._cells.mine()
+        cell[bisect_left(self._buckets, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> Tuple[List[float], float]:
+        """Return per-bucket counts (last one is +Inf) and the sum."""
+        totals = self._cells.total()
+        return totals[:-1], totals[-1]
+
+
+Child = TypeVar("Child", CounterChild, GaugeChild, HistogramChild)
+
+
+class _Metric(Generic[Child]):
+    """A named metric with labelled children."""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Child] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Child:
+        """Return the child for ``values``, in ``labelnames`` order.
+
+        Children are meant to be looked up once and kept by the caller, so
+        the hot path only touches the child itself.
+        """
+        if len(values) != len(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {values}"
+            )
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._new_child()
+                    self._children[values] = child
+        return child
+
+    def _new_child(self) -> Child:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        """Return the exposition lines of this metric."""
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with self._lock:
+            children = list(self._children.items())
+        for values, child in children:
+            lines.extend(self._render_child(_labels(self.labelnames, values), child))
+        return lines
+
+    def _render_child(self, labels: str, child: Child) -> List[str]:
+        # Histogram renders its own children
+        value = child.value()  # type: ignore[attr-defined]
+        return [f"{self.name}{labels} {_format(value)}"]
+
+
+class Counter(_Metric[CounterChild]):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+
+class Gauge(_Metric[GaugeChild]):
+    """Value that goes up and down."""
+
+    kind = "gauge"
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+
+class Histogram(_Metric[HistogramChild]):
+    """Distribution of observations over fixed buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str],
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def _render_child(self, labels: str, child: HistogramChild) -> List[str]:
+        counts, total = child.snapshot()
+        lines = []
+        cumulative = 0.0
+        for bound, count in zip((*self.buckets, math.inf), counts):
+            cumulative += count
+            le = "+Inf" if bound == math.inf else _format(bound)
+            bucket = _with_label(labels, "le", le)
+            lines.append(f"{self.name}_bucket{bucket} {_format(cumulative)}")
+        lines.append(f"{self.name}_sum{labels} {_format(total)}")
+        lines.append(f"{self.name}_count{labels} {_format(cumulative)}")
+        return lines
+
+
+class _Callback(_Metric[GaugeChild]):
+    """Unlabelled metric whose value is read from a callback on scrape."""
+
+    def __init__(
+        self, name: str, documentation: str, kind: str, read: Callable[[], float]
+    ):
+        super().__init__(name, documentation, ())
+        self.kind = kind
+        self._read = read
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {_escape_help(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+            f"{self.name} {_format(self._read())}",
+        ]
+
+
+M = TypeVar("M", bound=_Metric)  # type: ignore[type-arg]
+
+
+class MetricsRegistry:
+    """Creates metrics and renders all of them for a scrape."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}  # type: ignore[type-arg]
+        self._lock = threading.Lock()
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """Return the counter called ``name``, creating it if needed."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        """Return the gauge called ``name``, creating it if needed."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        """Return the histogram called ``name``, creating it if needed."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_callback(
+        self,
+        name: str,
+        documentation: str,
+        read: Callable[[], float],
+        kind: str = "gauge",
+    ) -> None:
+        """Expose the value returned by ``read`` on every scrape."""
+        self._register(_Callback(name, documentation, kind, read))
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: M) -> M:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if (
+                    type(existing) is not type(metric)
+                    or existing.labelnames != metric.labelnames
+                ):
+                    raise ValueError(
+                        f"Metric {metric.name} already registered differently"
+                    )
+                return existing  # type: ignore[return-value]
+            self._metrics[metric.name] = metric
+            return metric
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _with_label(labels: str, name: str, value: str) -> str:
+    pair = f'{name}="{value}"'
+    if not labels:
+        return "{" + pair + "}"
+    return labels[:-1] + "," + pair + "}"
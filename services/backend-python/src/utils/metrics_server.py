@@ -0,0 +1,74 @@
+"""Minimal HTTP endpoint serving ``/metrics`` from a background thread."""
+
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from src.utils.metrics import CONTENT_TYPE, MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# Query parameters in, (status, content type, body) out
+Route = Callable[[Dict[str, str]], Tuple[int, str, bytes]]
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry
+    routes: Mapping[str, Route]
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if url.path == "/metrics":
+            self._send(200, CONTENT_TYPE, self.registry.render().encode())
+            return
+        route = self.routes.get(url.path)
+        if route is None:
+            self.send_error(404)
+            return
+        try:
+            status, content_type, body = route(dict(parse_qsl(url.query)))
+        except ValueError as e:
+            status, content_type, body = 400, "text/plain", f"{e}\n".encode()
+        self._send(status, content_type, body)
+
+    def _send(self, status: int, content_type: str, body: bytes) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Scrapes would otherwise log a line each
+        pass
+
+
+def start_metrics_server(
+    registry: MetricsRegistry,
+    port: int,
+    host: str = "127.0.0.1",
+    routes: Optional[Mapping[str, Route]] = None,
+) -> ThreadingHTTPServer:
+    """Serve ``registry`` at ``http://host:port/metrics`` until ``shutdown()``.
+
+    The server runs on a daemon thread, so it never delays process exit.
+    ``routes`` maps further paths to functions answering GET requests; a
+    ``ValueError`` they raise becomes a 400 response.
+    """
+    handler = type(
+        "MetricsHandler",
+        (_MetricsHandler,),
+        {"registry": registry, "routes": dict(routes or {})},
+    )
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(
+        target=server.serve_forever, name="metrics-http", daemon=True
+    )
+    thread.start()
+    logger.info(
+        "📈 Metrics available at http://%s:%d/metrics", host, server.server_port
+    )
+    return server
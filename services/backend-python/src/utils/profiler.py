@@ -0,0 +1,173 @@
+"""Time-bounded sampling profiler for the running server process.
+
+Every ``interval`` seconds a background thread reads the stack of every
+other thread through ``sys._current_frames()``. Stacks are counted in the
+folded format read by flamegraph.pl, speedscope and similar tools: one line
+per distinct stack, frames from the root down separated by ``;``, then the
+weight. Nothing is installed in the threads being profiled, so the server
+only pays for the sampling thread while a profile runs.
+
+Two weights are kept per stack:
+
+* ``wall`` counts samples, so threads waiting on a lock or a socket show up
+  as much as threads running Python code
+* ``cpu`` adds the CPU time, in microseconds, each thread used since the
+  previous sample, so only threads actually running show up. Per-thread CPU
+  clocks exist on Linux and most Unixes; elsewhere this profile is empty.
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("wall", "cpu")
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+class Profile(NamedTuple):
+    """Folded stacks collected by one profiling run."""
+
+    wall: Dict[str, int]
+    cpu: Dict[str, int]
+    samples: int
+    duration: float
+
+    def to_folded(self, mode: str = "wall") -> str:
+        """Return the stacks of ``mode`` in the folded format, heaviest first."""
+        stacks = self.wall if mode == "wall" else self.cpu
+        lines = [
+            f"{stack} {weight}"
+            for stack, weight in sorted(stacks.items(), key=lambda item: -item[1])
+        ]
+        return "\n".join(lines) + "\n" if lines else ""
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    location = f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}"
+    # ";" separates frames in the folded format
+    return f"{name} ({location})".replace(";", ":")
+
+
+def _fold(thread_name: str, frame: Optional[FrameType]) -> str:
+    names: List[str] = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.append(thread_name.replace(";", ":"))
+    names.reverse()
+    return ";".join(names)
+
+
+def _thread_cpu_time(ident: int) -> Optional[float]:
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError):
+        # No per-thread CPU clocks here, or the thread just exited
+        return None
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads for a bounded time.
+
+    Only one profile runs at a time; ``profile`` raises
+    ``ProfilerBusyError`` while another one is in progress.
+    """
+
+    def __init__(self, interval: float = 0.005, max_duration: float = 60.0):
+        """Initialize the profiler.
+
+        Args:
+            interval: Seconds between two samples
+            max_duration: Upper bound on the length of a single profile
+        """
+        self.interval = interval
+        self.max_duration = max_duration
+        self._running = threading.Lock()
+
+    def profile(self, duration: float) -> Profile:
+        """Sample every other thread for ``duration`` seconds and return the stacks."""
+        if not self._running.acquire(blocking=False):
+            raise ProfilerBusyError("a profile is already running")
+        try:
+            return self._sample(min(duration, self.max_duration))
+        finally:
+            self._running.release()
+
+    def profile_in_background(
+        self, duration: float, on_done: Callable[[Profile], None]
+    ) -> threading.Thread:
+        """Run ``profile`` on a daemon thread and pass the result to ``on_done``.
+
+        Meant for signal handlers, which must return quickly.
+        """
+
+        def run() -> None:
+            try:
+                on_done(self.profile(duration))
+            except ProfilerBusyError:
+                logger.warning("Profile requested while another one is running")
+            except Exception:
+                logger.exception("Profiling failed")
+
+        thread = threading.Thread(target=run, name="profiler", daemon=True)
+        thread.start()
+        return thread
+
+    def _sample(self, duration: float) -> Profile:
+        own = threading.get_ident()
+        wall: Counter = Counter()
+        cpu: Counter = Counter()
+        cpu_seen: Dict[int, float] = {}
+        samples = 0
+        start = time.monotonic()
+        deadline = start + duration
+        while True:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                stack = _fold(names.get(ident, f"thread-{ident}"), frame)
+                wall[stack] += 1
+                cpu_time = _thread_cpu_time(ident)
+                if cpu_time is None:
+                    continue
+                previous = cpu_seen.get(ident)
+                cpu_seen[ident] = cpu_time
+                if previous is not None and cpu_time > previous:
+                    cpu[stack] += round((cpu_time - previous) * 1e6)
+            # Frames keep their locals alive; don't hold them while sleeping
+            del frames, frame
+            samples += 1
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(self.interval)
+        return Profile(dict(wall), dict(cpu), samples, time.monotonic() - start)
+
+
+def write_profile(profile: Profile, directory: str, prefix: str) -> List[str]:
+    """Write both profiles as ``<prefix>-<mode>.folded`` files in ``directory``.
+
+    Returns:
+        Paths of the written files
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for mode in PROFILE_MODES:
+        path = os.path.join(directory, f"{prefix}-{mode}.folded")
+        with open(path, "w") as f:
+            f.write(profile.to_folded(mode))
+        paths.append(path)
+    return paths
@@ -11,5 +11,5 @@ import sys
 import proto_generated.buf as buf_module
 import proto_generated.buf.validate as validate_module
 
-sys.modules['buf'] = buf_module
-sys.modules['buf.validate'] = validate_module
+sys.modules["buf"] = buf_module
+sys.modules["buf.validate"] = validate_module
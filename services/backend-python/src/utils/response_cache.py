@@ -0,0 +1,135 @@
+"""Bounded cache of serialized gRPC responses."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, NamedTuple, Optional, Set, Tuple
+
+# Approximate bytes of bookkeeping per entry (tuples, dict slots, set slot)
+ENTRY_OVERHEAD = 200
+
+_Key = Tuple[str, bytes]
+
+
+class CacheStats(NamedTuple):
+    """Counters of a ``ResponseCache`` since it was created."""
+
+    hits: int
+    misses: int
+    # Entries dropped to stay within max_bytes
+    evictions: int
+    # Entries found past their TTL
+    expirations: int
+    # Entries dropped by invalidate()
+    invalidations: int
+    entries: int
+    size_bytes: int
+    max_bytes: int
+
+
+class ResponseCache:
+    """LRU cache of response bytes keyed by method and request bytes.
+
+    Entries expire ``ttl`` seconds after they were stored and the least
+    recently used ones are evicted once the cache holds more than
+    ``max_bytes``, counting keys, values and a fixed per-entry overhead.
+    ``invalidate`` drops every entry of a method; a response computed
+    while its method was being invalidated is not stored, so a write can
+    never be hidden by a read that started before it.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 32 * 1024 * 1024,
+        ttl: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Oldest entry first; values are (expires_at, response)
+        self._entries: "OrderedDict[_Key, Tuple[float, bytes]]" = OrderedDict()
+        self._keys_by_method: Dict[str, Set[_Key]] = {}
+        self._generations: Dict[str, int] = {}
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._invalidations = 0
+
+    def get(self, method: str, request: bytes) -> Optional[bytes]:
+        """Return the cached response for ``request``, or None on a miss."""
+        key = (method, request)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            expires_at, response = entry
+            if expires_at <= self._clock():
+                self._remove(key)
+                self._expirations += 1
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return response
+
+    def generation(self, method: str) -> int:
+        """Return a token to pass to ``put`` for a response computed now."""
+        return self._generations.get(method, 0)
+
+    def put(
+        self, method: str, request: bytes, response: bytes, generation: int
+    ) -> None:
+        """Store ``response`` unless ``method`` was invalidated since ``generation``."""
+        size = len(request) + len(response) + ENTRY_OVERHEAD
+        if size > self._max_bytes:
+            return
+        key = (method, request)
+        with self._lock:
+            if self._generations.get(method, 0) != generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (self._clock() + self._ttl, response)
+            self._keys_by_method.setdefault(method, set()).add(key)
+            self._size += size
+            while self._size > self._max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def invalidate(self, method: str) -> int:
+        """Drop every cached response of ``method``; return how many."""
+        with self._lock:
+            self._generations[method] = self._generations.get(method, 0) + 1
+            keys = self._keys_by_method.pop(method, set())
+            for key in keys:
+                self._remove(key)
+            self._invalidations += len(keys)
+            return len(keys)
+
+    def stats(self) -> CacheStats:
+        """Return a snapshot of the cache counters."""
+        with self._lock:
+            return CacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                invalidations=self._invalidations,
+                entries=len(self._entries),
+                size_bytes=self._size,
+                max_bytes=self._max_bytes,
+            )
+
+    def _remove(self, key: _Key) -> None:
+        # Caller must hold self._lock.
+        _, response = self._entries.pop(key)
+        self._size -= len(key[1]) + len(response) + ENTRY_OVERHEAD
+        keys = self._keys_by_method.get(key[0])
+        if keys is not None:
+            keys.discard(key)
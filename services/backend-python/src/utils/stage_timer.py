@@ -0,0 +1,109 @@
+"""Sampled timing of the stages a unary request goes through."""
+
+import random
+import time
+from typing import Any, Callable, Dict, Optional
+
+from src.utils.metrics import Histogram, MetricsRegistry
+
+# Buckets for single stages, which are much shorter than whole calls
+STAGE_BUCKETS = (
+    0.00001,
+    0.000025,
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+)
+
+
+class StageSample:
+    """Stage durations of one sampled call, in seconds."""
+
+    __slots__ = ("method", "durations")
+
+    def __init__(self, method: str):
+        self.method = method
+        self.durations: Dict[str, float] = {}
+
+
+class Sampled:
+    """Request or response message of a sampled call, with its sample.
+
+    gRPC deserializes a sync call's request on its polling thread and runs
+    the behavior on a worker thread, so the sample travels with the
+    messages instead of in thread or context state. Only the behavior
+    wrapped together with the timed (de)serializers ever sees these.
+    """
+
+    __slots__ = ("message", "sample")
+
+    def __init__(self, message: Any, sample: StageSample):
+        self.message = message
+        self.sample = sample
+
+
+class StageTimer:
+    """Times deserialize, validate, handler and serialize for sampled calls.
+
+    A fraction ``sample_rate`` of calls is picked when their request is
+    deserialized. The deserializer then hands the behavior a ``Sampled``
+    request, the behavior times its own stages and returns a ``Sampled``
+    response, and the serializer records all durations in the
+    ``grpc_server_stage_seconds`` histogram; calls that fail before a
+    response is serialized are not recorded. Unsampled calls cost one random
+    number. ``sample_rate`` can be changed while the server runs.
+    """
+
+    def __init__(self, registry: MetricsRegistry, sample_rate: float = 0.0):
+        self.sample_rate = sample_rate
+        self._histogram: Histogram = registry.histogram(
+            "grpc_server_stage_seconds",
+            "Time spent per stage by sampled unary calls",
+            ("grpc_method", "stage"),
+            STAGE_BUCKETS,
+        )
+
+    def wrap_deserializer(
+        self, method: str, deserialize: Optional[Callable[[bytes], Any]]
+    ) -> Callable[[bytes], Any]:
+        """Return ``deserialize`` picking calls of ``method`` and timing them."""
+
+        def timed(data: bytes) -> Any:
+            if random.random() >= self.sample_rate:
+                return deserialize(data) if deserialize else data
+            sample = StageSample(method)
+            start = time.perf_counter()
+            request = deserialize(data) if deserialize else data
+            sample.durations["deserialize"] = time.perf_counter() - start
+            return Sampled(request, sample)
+
+        return timed
+
+    def wrap_serializer(
+        self, serialize: Optional[Callable[[Any], bytes]]
+    ) -> Callable[[Any], bytes]:
+        """Return ``serialize`` timing ``Sampled`` responses and recording them."""
+
+        def timed(response: Any) -> bytes:
+            if type(response) is not Sampled:
+                return serialize(response) if serialize else response
+            sample = response.sample
+            start = time.perf_counter()
+            data = serialize(response.message) if serialize else response.message
+            sample.durations["serialize"] = time.perf_counter() - start
+            self._record(sample)
+            return data
+
+        return timed
+
+    def _record(self, sample: StageSample) -> None:
+        for stage, duration in sample.durations.items():
+            self._histogram.labels(sample.method, stage).observe(duration)
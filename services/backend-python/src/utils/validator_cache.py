@@ -0,0 +1,153 @@
+"""Per message type cache of compiled protovalidate rules.
+
+protovalidate itself, with the CEL runtime it compiles rules for, takes
+longer to import than the rest of the server together, so it is only
+imported once a message type with rules is validated or warmed up.
+"""
+
+import logging
+import threading
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Set, Tuple, Type
+
+from google.protobuf import message_factory
+from google.protobuf.descriptor import Descriptor, FieldDescriptor, ServiceDescriptor
+from google.protobuf.message import Message
+
+# Setup protovalidate module aliases
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from buf.validate import validate_pb2
+
+if TYPE_CHECKING:
+    from protovalidate import Validator
+
+logger = logging.getLogger(__name__)
+
+# Loggers used by cel-python, which protovalidate evaluates rules with. They
+# emit several INFO records per evaluated expression.
+CEL_LOGGER_NAMES = (
+    "Environment",
+    "Evaluator",
+    "InterpretedRunner",
+    "NameContainer",
+    "celtypes",
+    "evaluation",
+)
+
+
+def quiet_cel_logging(level: int = logging.WARNING) -> None:
+    """Raise the level of cel-python's loggers so rule evaluation stays silent."""
+    for name in CEL_LOGGER_NAMES:
+        logging.getLogger(name).setLevel(level)
+
+
+def has_validation_rules(
+    descriptor: Descriptor, _visiting: Optional[Set[str]] = None
+) -> bool:
+    """Return True if validating ``descriptor`` could produce a violation.
+
+    A message carries rules when it, one of its oneofs or one of its fields
+    has a ``buf.validate`` option, or when a message-typed field (including
+    repeated and map fields) points at a message that carries rules.
+    """
+    visiting = _visiting if _visiting is not None else set()
+    if descriptor.full_name in visiting:
+        # Recursive message: any rules are found on the outer visit.
+        return False
+    visiting.add(descriptor.full_name)
+
+    if descriptor.GetOptions().HasExtension(validate_pb2.message):
+        return True
+    for oneof in descriptor.oneofs:
+        if oneof.GetOptions().HasExtension(validate_pb2.oneof):
+            return True
+    for field in descriptor.fields:
+        if field.GetOptions().HasExtension(validate_pb2.field):
+            return True
+        if field.type == FieldDescriptor.TYPE_MESSAGE and has_validation_rules(
+            field.message_type, visiting
+        ):
+            return True
+    return False
+
+
+class ValidationError(ValueError):
+    """A message violates the ``buf.validate`` rules of its type.
+
+    Raised by ``ValidatorCache.validate`` from the
+    ``protovalidate.ValidationError`` holding the violations, so callers can
+    catch it without importing protovalidate.
+    """
+
+
+class ValidatorCache:
+    """Reuses one protovalidate ``Validator`` and remembers rule-free types.
+
+    ``protovalidate.Validator`` compiles the CEL programs for a message type
+    the first time it sees it and keeps them for its lifetime. This cache
+    pins a single validator, lets the server compile every request type up
+    front via ``warm_up_services``, and records which message types have no
+    ``buf.validate`` constraints at all so they skip validation entirely.
+    Without a ``validator``, one is created along with the first rule set.
+    """
+
+    def __init__(self, validator: Optional["Validator"] = None) -> None:
+        self._validator = validator
+        # protovalidate.ValidationError, once protovalidate is imported
+        self._error_type: Tuple[Type[Exception], ...] = ()
+        self._has_rules: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def validate(self, message: Message) -> None:
+        """Validate ``message`` against the rules of its type.
+
+        Raises:
+            ValidationError: If the message violates its rules.
+        """
+        has_rules = self._has_rules.get(message.DESCRIPTOR.full_name)
+        if has_rules is None:
+            has_rules = self.warm_up(message.DESCRIPTOR)
+        if has_rules:
+            try:
+                # Created by warm_up along with the first rule set
+                self._validator.validate(message)  # type: ignore[union-attr]
+            except self._error_type as e:
+                raise ValidationError(str(e)) from e
+
+    def warm_up(self, descriptor: Descriptor) -> bool:
+        """Compile the rules for ``descriptor``; return whether it has any."""
+        with self._lock:
+            cached = self._has_rules.get(descriptor.full_name)
+            if cached is not None:
+                return cached
+
+            has_rules = has_validation_rules(descriptor)
+            if has_rules:
+                validator = self._load_protovalidate()
+                # Validating a default instance makes the validator build and
+                # cache the rule set for this type; violations are expected.
+                message_class = message_factory.GetMessageClass(descriptor)
+                validator.collect_violations(message_class())
+            self._has_rules[descriptor.full_name] = has_rules
+            return has_rules
+
+    def _load_protovalidate(self) -> "Validator":
+        if self._validator is not None and self._error_type:
+            return self._validator
+        import protovalidate
+
+        if self._validator is None:
+            self._validator = protovalidate.Validator()
+        self._error_type = (protovalidate.ValidationError,)
+        return self._validator
+
+    def warm_up_services(self, services: Iterable[ServiceDescriptor]) -> None:
+        """Compile the rules of every request type used by ``services``."""
+        for service in services:
+            for method in service.methods:
+                has_rules = self.warm_up(method.input_type)
+                logger.debug(
+                    "Prepared validation for %s (%s)",
+                    method.full_name,
+                    "rules compiled" if has_rules else "no rules",
+                )
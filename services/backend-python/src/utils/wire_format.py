@@ -0,0 +1,62 @@
+"""Protocol buffer wire format, for assembling messages from encoded fields.
+
+A serialized message is the concatenation of its fields, each a tag
+(field number and wire type) followed by the value: a varint for integer
+fields, or a varint length and the bytes for strings and nested messages.
+Fields holding their default value are left out. Concatenating already
+encoded fields in field number order gives the same bytes as
+``SerializeToString``.
+"""
+
+from google.protobuf.descriptor import Descriptor, FieldDescriptor
+
+_VARINT = 0
+_LENGTH_DELIMITED = 2
+
+_WIRE_TYPES = {
+    FieldDescriptor.TYPE_INT32: _VARINT,
+    FieldDescriptor.TYPE_INT64: _VARINT,
+    FieldDescriptor.TYPE_UINT32: _VARINT,
+    FieldDescriptor.TYPE_UINT64: _VARINT,
+    FieldDescriptor.TYPE_BOOL: _VARINT,
+    FieldDescriptor.TYPE_ENUM: _VARINT,
+    FieldDescriptor.TYPE_STRING: _LENGTH_DELIMITED,
+    FieldDescriptor.TYPE_BYTES: _LENGTH_DELIMITED,
+    FieldDescriptor.TYPE_MESSAGE: _LENGTH_DELIMITED,
+}
+
+# A varint below 128 is the byte itself
+_SMALL_VARINTS = [bytes((value,)) for value in range(128)]
+
+
+def encode_varint(value: int) -> bytes:
+    """Encode ``value`` as a varint; negative values take ten bytes."""
+    if 0 <= value < 128:
+        return _SMALL_VARINTS[value]
+    # Negative int32 and int64 values are sign-extended to 64 bits
+    value &= 0xFFFFFFFFFFFFFFFF
+    encoded = bytearray()
+    while value > 0x7F:
+        encoded.append(value & 0x7F | 0x80)
+        value >>= 7
+    encoded.append(value)
+    return bytes(encoded)
+
+
+def field_tag(message: Descriptor, name: str) -> bytes:
+    """Return the encoded tag of field ``name`` of ``message``.
+
+    Raises:
+        ValueError: For fixed-width and packed repeated fields, which are
+            not encoded by this module.
+    """
+    field = message.fields_by_name[name]
+    wire_type = _WIRE_TYPES.get(field.type)
+    if wire_type is None or (wire_type == _VARINT and field.is_repeated):
+        raise ValueError(f"{message.full_name}.{name} has an unsupported encoding")
+    return encode_varint(field.number << 3 | wire_type)
+
+
+def length_delimited(tag: bytes, payload: bytes) -> bytes:
+    """Encode a string, bytes or message field holding ``payload``."""
+    return tag + encode_varint(len(payload)) + payload
@@ -0,0 +1,110 @@
+"""Shared fixtures: in-process servers behind the production interceptor chain."""
+
+import asyncio
+import threading
+from concurrent import futures
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+import grpc
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2_grpc
+from src.api.async_example_service import AsyncExampleServiceServicer
+from src.api.encoded_responses import EXAMPLE_SERVICE, add_servicer_to_server
+from src.api.example_service import ExampleServiceServicer
+from src.config import ServerConfig
+from src.main import build_interceptors
+from src.utils.metrics import MetricsRegistry
+from src.utils.response_cache import ResponseCache
+from src.utils.stage_timer import StageTimer
+
+ServeFn = Callable[..., example_service_pb2_grpc.ExampleServiceStub]
+
+
+@pytest.fixture
+def event_loop_thread() -> Iterator[asyncio.AbstractEventLoop]:
+    """An event loop running in a background thread for grpc.aio servers."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+@pytest.fixture(params=["sync", "aio"])
+def serve(
+    request: pytest.FixtureRequest, event_loop_thread: asyncio.AbstractEventLoop
+) -> Iterator[ServeFn]:
+    """Start ExampleService in the parametrized mode; return a stub for it.
+
+    Keyword arguments override ``ServerConfig`` fields; ``servicer`` replaces
+    the default demo-seeded servicer, and ``response_cache``, ``metrics`` and
+    ``stage_timer`` add those stages to the interceptor chain. Servers are stopped after
+    the test.
+    """
+    mode = request.param
+    cleanups: List[Callable[[], None]] = []
+    channels: List[grpc.Channel] = []
+
+    def start(
+        servicer: Optional[ExampleServiceServicer] = None,
+        response_cache: Optional[ResponseCache] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        stage_timer: Optional[StageTimer] = None,
+        **overrides: Any,
+    ) -> example_service_pb2_grpc.ExampleServiceStub:
+        config = ServerConfig(mode=mode, metrics_port=0, **overrides)
+        servicer = servicer or ExampleServiceServicer()
+        interceptors = build_interceptors(config, response_cache, metrics, stage_timer)
+        if mode == "aio":
+            executor = futures.ThreadPoolExecutor(max_workers=config.max_workers)
+
+            async def start_aio() -> Tuple[grpc.aio.Server, int]:
+                server = grpc.aio.server(interceptors=interceptors)
+                add_servicer_to_server(
+                    EXAMPLE_SERVICE,
+                    AsyncExampleServiceServicer(servicer, executor),
+                    server,
+                )
+                port = server.add_insecure_port("127.0.0.1:0")
+                await server.start()
+                return server, port
+
+            aio_server, port = asyncio.run_coroutine_threadsafe(
+                start_aio(), event_loop_thread
+            ).result()
+
+            def stop_aio() -> None:
+                asyncio.run_coroutine_threadsafe(
+                    aio_server.stop(None), event_loop_thread
+                ).result()
+                executor.shutdown()
+
+            cleanups.append(stop_aio)
+        else:
+            server = grpc.server(
+                futures.ThreadPoolExecutor(max_workers=config.max_workers),
+                interceptors=interceptors,
+            )
+            add_servicer_to_server(
+                EXAMPLE_SERVICE,
+                servicer,
+                server,
+            )
+            port = server.add_insecure_port("127.0.0.1:0")
+            server.start()
+            cleanups.append(lambda: server.stop(None).wait())
+        channel = grpc.insecure_channel(f"127.0.0.1:{port}")
+        channels.append(channel)
+        return example_service_pb2_grpc.ExampleServiceStub(channel)
+
+    yield start
+    for channel in channels:
+        channel.close()
+    for cleanup in reversed(cleanups):
+        cleanup()
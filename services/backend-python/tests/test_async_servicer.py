@@ -0,0 +1,148 @@
+"""The grpc.aio servicer: where repository calls run, and every RPC served."""
+
+import asyncio
+import threading
+from concurrent import futures
+from typing import Iterator, List, Optional
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.api.async_example_service import AsyncExampleServiceServicer
+from src.api.example_service import ExampleServiceServicer
+from src.repositories import InMemoryUserRepository
+from tests.conftest import ServeFn
+
+
+class ThreadRecordingRepository(InMemoryUserRepository):
+    """Records the thread each ``get`` runs on."""
+
+    def __init__(self, blocking: bool) -> None:
+        super().__init__()
+        self.blocking = blocking
+        self.threads: List[threading.Thread] = []
+
+    def get_encoded(self, user_id: int) -> Optional[bytes]:
+        self.threads.append(threading.current_thread())
+        return super().get_encoded(user_id)
+
+
+class EndlessScanRepository(InMemoryUserRepository):
+    """Scans users no export filter matches until a GetUser is served."""
+
+    # Chunks scanned before giving up on the GetUser
+    limit = 1_000_000
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.scanning = threading.Event()
+        self.served = threading.Event()
+        self.chunks = 0
+
+    def scan(
+        self, after_id: int, chunk_size: int
+    ) -> Iterator[List[example_service_pb2.User]]:
+        self.scanning.set()
+        user = example_service_pb2.User(id=1, name="Ada", email="ada@example.com")
+        while not self.served.is_set() and self.chunks < self.limit:
+            self.chunks += 1
+            yield [user]
+
+    def get_encoded(self, user_id: int) -> Optional[bytes]:
+        self.served.set()
+        return super().get_encoded(user_id)
+
+
+def get_user_on_loop(repository: ThreadRecordingRepository) -> threading.Thread:
+    """Call GetUser on an event loop; return the loop's thread."""
+    user = repository.create("Ada", "ada@example.com")
+    with futures.ThreadPoolExecutor(max_workers=1) as executor:
+        servicer = AsyncExampleServiceServicer(
+            ExampleServiceServicer(repository, watch_users=False), executor
+        )
+
+        async def get_user() -> threading.Thread:
+            await servicer.GetUser(
+                example_service_pb2.GetUserRequest(user_id=user.id), None
+            )
+            return threading.current_thread()
+
+        return asyncio.run(get_user())
+
+
+def test_non_blocking_repositories_run_on_the_event_loop() -> None:
+    repository = ThreadRecordingRepository(blocking=False)
+
+    loop_thread = get_user_on_loop(repository)
+
+    assert repository.threads == [loop_thread]
+
+
+def test_blocking_repositories_run_on_the_executor() -> None:
+    repository = ThreadRecordingRepository(blocking=True)
+
+    loop_thread = get_user_on_loop(repository)
+
+    assert len(repository.threads) == 1
+    assert repository.threads[0] is not loop_thread
+
+
+def test_every_rpc_is_served(serve: ServeFn) -> None:
+    stub = serve(ExampleServiceServicer(InMemoryUserRepository(), watch_users=False))
+
+    created = stub.CreateUser(
+        example_service_pb2.CreateUserRequest(name="Ada", email="ada@example.com"),
+        timeout=10,
+    ).user
+    bulk = stub.BulkCreateUsers(
+        iter(
+            [example_service_pb2.CreateUserRequest(name="Bob", email="bob@example.com")]
+        ),
+        timeout=10,
+    )
+    got = stub.GetUser(
+        example_service_pb2.GetUserRequest(user_id=created.id), timeout=10
+    )
+    listed = stub.ListUsers(
+        example_service_pb2.ListUsersRequest(page=1, page_size=10), timeout=10
+    )
+    batch = stub.BatchGetUsers(
+        example_service_pb2.BatchGetUsersRequest(ids=[created.id, 999]), timeout=10
+    )
+    searched = stub.SearchUsers(
+        example_service_pb2.SearchUsersRequest(name_prefix="B"), timeout=10
+    )
+    streamed = [
+        user
+        for response in stub.StreamUsers(
+            example_service_pb2.StreamUsersRequest(batch_size=1), timeout=10
+        )
+        for user in response.users
+    ]
+
+    assert bulk.created_count == 1
+    assert got.user == created
+    assert listed.total_count == 2
+    assert list(batch.users) == [created] and list(batch.missing_ids) == [999]
+    assert [user.name for user in searched.users] == ["Bob"]
+    assert [user.name for user in streamed] == ["Ada", "Bob"]
+
+
+def test_unary_calls_are_served_while_a_selective_export_scans(
+    serve: ServeFn,
+) -> None:
+    repository = EndlessScanRepository()
+    user = repository.create("Ada", "ada@example.com")
+    stub = serve(ExampleServiceServicer(repository, watch_users=False))
+    export = stub.StreamUsers(
+        example_service_pb2.StreamUsersRequest(email_domain="nomatch.org"), timeout=30
+    )
+    assert repository.scanning.wait(10)
+
+    got = stub.GetUser(example_service_pb2.GetUserRequest(user_id=user.id), timeout=10)
+
+    assert got.user == user
+    assert list(export) == []
+    # Served between two chunks, not after the scan gave up
+    assert repository.chunks < repository.limit
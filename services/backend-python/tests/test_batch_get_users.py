@@ -0,0 +1,41 @@
+"""BatchGetUsers: order, repeated and missing IDs, request limits."""
+
+import grpc
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.api.example_service import ExampleServiceServicer
+from src.repositories import InMemoryUserRepository
+from tests.conftest import ServeFn
+
+
+def test_users_come_in_request_order_with_missing_ids(serve: ServeFn) -> None:
+    servicer = ExampleServiceServicer(InMemoryUserRepository(), watch_users=False)
+    stub = serve(servicer)
+    users = [servicer.repository.create("User", f"u{i}@example.com") for i in range(3)]
+
+    response = stub.BatchGetUsers(
+        example_service_pb2.BatchGetUsersRequest(
+            ids=[users[2].id, 404, users[0].id, users[2].id, 405, 404]
+        ),
+        timeout=10,
+    )
+
+    # Repeated IDs are answered once
+    assert list(response.users) == [users[2], users[0]]
+    assert list(response.missing_ids) == [404, 405]
+
+
+@pytest.mark.parametrize("ids", [[], [0], [1, -2], list(range(1, 1002))])
+def test_invalid_id_lists_are_rejected(serve: ServeFn, ids: list) -> None:
+    stub = serve()
+
+    request = example_service_pb2.BatchGetUsersRequest(ids=ids)
+
+    with pytest.raises(grpc.RpcError) as error:
+        stub.BatchGetUsers(request, timeout=10)
+
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
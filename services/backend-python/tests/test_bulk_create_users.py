@@ -0,0 +1,94 @@
+"""BulkCreateUsers results, and nothing created when any request is invalid."""
+
+from typing import Iterator, List
+
+import grpc
+import pytest
+
+from proto_generated import example_service_pb2
+from src.api import async_example_service, example_service
+from src.api.example_service import BULK_CREATE_CHUNK_SIZE, ExampleServiceServicer
+from tests.conftest import ServeFn
+
+Status = example_service_pb2.BulkCreateUserResult.Status
+
+
+def requests(emails: List[str]) -> Iterator[example_service_pb2.CreateUserRequest]:
+    for email in emails:
+        yield example_service_pb2.CreateUserRequest(name="Bulk", email=email)
+
+
+def test_results_report_each_request(serve: ServeFn) -> None:
+    servicer = ExampleServiceServicer()
+    stub = serve(servicer)
+    taken = servicer.repository.create("Taken", "taken@example.com")
+
+    response = stub.BulkCreateUsers(
+        requests(
+            ["a@example.com", "taken@example.com", "a@example.com", "b@example.com"]
+        ),
+        timeout=10,
+    )
+
+    assert [(r.index, r.status) for r in response.results] == [
+        (0, Status.CREATED),
+        (1, Status.EMAIL_ALREADY_EXISTS),
+        (2, Status.DUPLICATE_IN_REQUEST),
+        (3, Status.CREATED),
+    ]
+    assert response.created_count == 2
+    assert response.results[3].user.id > taken.id
+    first = response.results[0].user
+    assert servicer.repository.get(first.id) == first
+
+
+def test_results_span_chunks(serve: ServeFn) -> None:
+    servicer = ExampleServiceServicer()
+    stub = serve(servicer)
+    count = BULK_CREATE_CHUNK_SIZE * 2 + 1
+    before = len(servicer.repository)
+
+    response = stub.BulkCreateUsers(
+        requests([f"c{i}@example.com" for i in range(count)]), timeout=30
+    )
+
+    assert response.created_count == count
+    assert [r.index for r in response.results] == list(range(count))
+    assert len(servicer.repository) == before + count
+
+
+def test_invalid_request_after_the_first_chunk_creates_nothing(serve: ServeFn) -> None:
+    servicer = ExampleServiceServicer()
+    stub = serve(servicer)
+    before = len(servicer.repository)
+    emails = [f"v{i}@example.com" for i in range(BULK_CREATE_CHUNK_SIZE + 10)]
+    emails.append("not an email")
+
+    with pytest.raises(grpc.RpcError) as error:
+        stub.BulkCreateUsers(requests(emails), timeout=30)
+
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+    assert len(servicer.repository) == before
+    assert servicer.repository.get_by_email("v0@example.com") is None
+
+
+def test_too_many_requests_create_nothing(
+    serve: ServeFn, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    for module in (example_service, async_example_service):
+        monkeypatch.setattr(module, "BULK_CREATE_MAX_REQUESTS", 3)
+    servicer = ExampleServiceServicer()
+    stub = serve(servicer)
+    before = len(servicer.repository)
+
+    response = stub.BulkCreateUsers(
+        requests([f"m{i}@example.com" for i in range(3)]), timeout=10
+    )
+    assert response.created_count == 3
+    with pytest.raises(grpc.RpcError) as error:
+        stub.BulkCreateUsers(
+            requests([f"n{i}@example.com" for i in range(4)]), timeout=10
+        )
+
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+    assert len(servicer.repository) == before + 3
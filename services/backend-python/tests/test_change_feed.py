@@ -0,0 +1,285 @@
+"""ChangeFeed fan-out and resync, and WatchUsers on top of it."""
+
+import os
+import threading
+from typing import List, Tuple
+
+import grpc
+import pytest
+
+from proto_generated import example_service_pb2, example_service_pb2_grpc
+from src.api.example_service import ExampleServiceServicer
+from src.api.health_service import NOT_SERVING, SERVING, HealthServicer
+from src.main import enter_graceful_shutdown
+from src.repositories.shared import SharedUserRepository, start_user_store
+from src.utils.change_feed import ChangeFeed, SubscriberLimitError, Subscription
+from tests.conftest import ServeFn
+
+CREATED = example_service_pb2.UserChange.CREATED
+
+
+def test_subscribers_receive_published_changes_in_order() -> None:
+    feed: ChangeFeed[str] = ChangeFeed()
+    wakes: List[int] = []
+    subscription = feed.subscribe(lambda: wakes.append(1))
+
+    feed.publish(["a", "b"])
+    feed.publish(["c"])
+
+    assert subscription.drain(10) == [(1, "a"), (2, "b"), (3, "c")]
+    assert subscription.sequence == 3
+    # Woken once per batch arriving at an empty queue
+    assert len(wakes) == 1
+
+
+def test_lagging_subscriber_is_dropped_and_told_to_resync() -> None:
+    feed: ChangeFeed[str] = ChangeFeed(max_pending=3)
+    wakes: List[int] = []
+    slow = feed.subscribe(lambda: wakes.append(1))
+    fast = feed.subscribe(lambda: None)
+
+    feed.publish(["a", "b"])
+    fast.drain(10)
+    feed.publish(["c", "d"])
+
+    assert slow.lagged and not fast.lagged
+    # Nothing is delivered after the gap, and the resync point is the
+    # last change the subscriber would have had to see
+    assert slow.drain(10) == []
+    assert slow.sequence == 4
+    assert feed.subscribers == 1 and feed.dropped == 1
+    assert len(wakes) == 2
+    assert fast.drain(10) == [(3, "c"), (4, "d")]
+
+
+def test_resume_from_buffered_sequence_replays_what_was_missed() -> None:
+    feed: ChangeFeed[str] = ChangeFeed(capacity=4)
+    feed.publish(["a", "b", "c", "d", "e", "f"])
+
+    resumed = feed.subscribe(lambda: None, 3, feed.feed_id)
+    too_old = feed.subscribe(lambda: None, 1, feed.feed_id)
+    other_feed = feed.subscribe(lambda: None, 3, feed.feed_id + 1)
+    future = feed.subscribe(lambda: None, 7, feed.feed_id)
+
+    assert resumed.drain(10) == [(4, "d"), (5, "e"), (6, "f")]
+    for subscription in (too_old, other_feed, future):
+        assert subscription.lagged and subscription.sequence == 6
+
+
+def test_subscriber_limit_only_applies_to_registered_subscriptions() -> None:
+    feed: ChangeFeed[str] = ChangeFeed(max_subscribers=1)
+    feed.subscribe(lambda: None)
+
+    with pytest.raises(SubscriberLimitError):
+        feed.subscribe(lambda: None)
+    # A subscription that starts out lagged is never registered
+    assert feed.subscribe(lambda: None, 5, feed.feed_id + 1).lagged
+
+
+def test_close_ends_current_and_later_subscriptions() -> None:
+    feed: ChangeFeed[str] = ChangeFeed()
+    wakes: List[int] = []
+    subscription = feed.subscribe(lambda: wakes.append(1))
+    feed.publish(["a"])
+
+    feed.close()
+
+    assert subscription.closed and feed.subscribers == 0
+    # Changes queued before closing are still delivered
+    assert subscription.drain(10) == [(1, "a")]
+    assert feed.subscribe(lambda: None).closed
+
+
+def test_mirror_continues_another_feeds_numbering() -> None:
+    source: ChangeFeed[str] = ChangeFeed()
+    source.publish(["a", "b", "c"])
+    mirror: ChangeFeed[str] = ChangeFeed()
+    before = mirror.subscribe(lambda: None)
+
+    mirror.mirror(source.feed_id, source.sequence)
+    source.publish(["d"])
+    pulled = source.changes_after(mirror.sequence, 10)
+    assert pulled == [(4, "d")]
+    mirror.publish(change for _, change in pulled)
+
+    # Subscribers of the old numbering resync from the new position
+    assert before.lagged and before.sequence == 3
+    resumed = mirror.subscribe(lambda: None, 3, source.feed_id)
+    assert resumed.drain(10) == [(4, "d")]
+    assert source.changes_after(0, 10) is not None
+    assert mirror.changes_after(0, 10) is None
+
+
+def create_user(
+    stub: example_service_pb2_grpc.ExampleServiceStub, email: str
+) -> example_service_pb2.User:
+    response = stub.CreateUser(
+        example_service_pb2.CreateUserRequest(name="Watch Test", email=email),
+        timeout=10,
+    )
+    user: example_service_pb2.User = response.user
+    return user
+
+
+def test_watch_streams_created_users(serve: ServeFn) -> None:
+    stub = serve()
+    stream = stub.WatchUsers(example_service_pb2.WatchUsersRequest(), timeout=10)
+    start = next(stream)
+    assert not start.changes and start.feed_id
+
+    user = create_user(stub, "w1@example.com")
+    response = next(stream)
+    stream.cancel()
+
+    assert [(c.sequence, c.type, c.user.id) for c in response.changes] == [
+        (start.sequence + 1, CREATED, user.id)
+    ]
+    assert response.sequence == start.sequence + 1
+    assert response.feed_id == start.feed_id
+
+
+def test_watch_resumes_after_a_sequence(serve: ServeFn) -> None:
+    stub = serve()
+    stream = stub.WatchUsers(example_service_pb2.WatchUsersRequest(), timeout=10)
+    start = next(stream)
+    stream.cancel()
+    created = [create_user(stub, f"r{i}@example.com").id for i in range(3)]
+
+    stream = stub.WatchUsers(
+        example_service_pb2.WatchUsersRequest(
+            after_sequence=start.sequence + 1, feed_id=start.feed_id
+        ),
+        timeout=10,
+    )
+    assert not next(stream).changes
+    response = next(stream)
+    stream.cancel()
+
+    assert [change.user.id for change in response.changes] == created[1:]
+
+
+def test_watch_from_another_feed_gets_one_resync(serve: ServeFn) -> None:
+    servicer = ExampleServiceServicer()
+    stub = serve(servicer)
+    assert servicer.changes is not None
+
+    responses = list(
+        stub.WatchUsers(
+            example_service_pb2.WatchUsersRequest(
+                after_sequence=1, feed_id=servicer.changes.feed_id + 1
+            ),
+            timeout=10,
+        )
+    )
+
+    assert len(responses) == 1 and responses[0].resync
+    assert responses[0].feed_id == servicer.changes.feed_id
+
+
+def test_lagging_watcher_gets_a_resync_and_the_stream_ends(serve: ServeFn) -> None:
+    servicer = ExampleServiceServicer(changes=ChangeFeed(max_pending=2))
+    stub = serve(servicer)
+    stream = stub.WatchUsers(example_service_pb2.WatchUsersRequest(), timeout=10)
+    next(stream)
+
+    # One publish of more changes than the watcher may have pending
+    stub.BulkCreateUsers(
+        iter(
+            example_service_pb2.CreateUserRequest(name="B", email=f"b{i}@example.com")
+            for i in range(3)
+        ),
+        timeout=10,
+    )
+    responses = list(stream)
+
+    assert len(responses) == 1 and responses[0].resync
+    assert responses[0].sequence == 3
+    assert servicer.changes is not None and servicer.changes.dropped == 1
+
+
+def test_closing_the_feed_ends_watchers_with_unavailable(serve: ServeFn) -> None:
+    servicer = ExampleServiceServicer()
+    stub = serve(servicer)
+    stream = stub.WatchUsers(example_service_pb2.WatchUsersRequest(), timeout=10)
+    next(stream)
+
+    assert servicer.changes is not None
+    servicer.changes.close()
+
+    with pytest.raises(grpc.RpcError) as error:
+        next(stream)
+    assert error.value.code() == grpc.StatusCode.UNAVAILABLE
+
+
+def test_watch_is_unimplemented_without_a_feed(serve: ServeFn) -> None:
+    stub = serve(ExampleServiceServicer(watch_users=False))
+
+    with pytest.raises(grpc.RpcError) as error:
+        next(stub.WatchUsers(example_service_pb2.WatchUsersRequest(), timeout=10))
+
+    assert error.value.code() == grpc.StatusCode.UNIMPLEMENTED
+    # Creating users still works without anyone to publish them to
+    assert create_user(stub, "nofeed@example.com").id
+
+
+def wait_for_changes(
+    subscription: Subscription[Tuple[int, bytes]],
+    arrived: threading.Event,
+    count: int,
+) -> List[Tuple[int, Tuple[int, bytes]]]:
+    """Drain ``count`` changes, waiting up to 10s for ``arrived`` each time."""
+    changes: List[Tuple[int, Tuple[int, bytes]]] = []
+    while len(changes) < count:
+        arrived.clear()
+        changes += subscription.drain(count)
+        if len(changes) < count:
+            assert arrived.wait(10), f"got {len(changes)} of {count} changes"
+    return changes
+
+
+def test_shared_store_feeds_every_worker_the_same_changes() -> None:
+    authkey = os.urandom(16)
+    store = start_user_store(authkey)
+    workers = [
+        SharedUserRepository(store.address, authkey, store.published) for _ in range(2)
+    ]
+    feeds: List[ChangeFeed[Tuple[int, bytes]]] = [ChangeFeed() for _ in workers]
+    try:
+        for worker, feed in zip(workers, feeds):
+            assert worker.publish_to(feed)
+        assert feeds[0].feed_id == feeds[1].feed_id
+        events = [threading.Event() for _ in feeds]
+        subscriptions = [
+            feed.subscribe(event.set) for feed, event in zip(feeds, events)
+        ]
+
+        created = workers[0].create("One", "one@example.com")
+        workers[1].create_many([("Two", "two@example.com", "")])
+
+        for subscription, event in zip(subscriptions, events):
+            changes = wait_for_changes(subscription, event, 2)
+            users = [
+                example_service_pb2.User.FromString(user) for _, (_, user) in changes
+            ]
+            assert [sequence for sequence, _ in changes] == [1, 2]
+            assert [user.email for user in users] == [
+                "one@example.com",
+                "two@example.com",
+            ]
+            assert users[0].id == created.id
+    finally:
+        for worker in workers:
+            worker.close()
+        store.shutdown()
+
+
+def test_graceful_shutdown_closes_the_feed() -> None:
+    health = HealthServicer()
+    health.set("", SERVING)
+    feed: ChangeFeed[str] = ChangeFeed()
+    subscription = feed.subscribe(lambda: None)
+
+    enter_graceful_shutdown(health, feed)
+
+    assert subscription.closed
+    assert health.status("") == NOT_SERVING
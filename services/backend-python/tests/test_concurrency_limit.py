@@ -0,0 +1,215 @@
+"""Adaptive concurrency limits and the admission interceptor shedding calls."""
+
+import threading
+from concurrent import futures
+from typing import List, Optional
+
+import grpc
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.api.example_service import ExampleServiceServicer
+from src.repositories import InMemoryUserRepository
+from src.utils.concurrency_limit import (
+    AimdLimit,
+    ConcurrencyLimiter,
+    GradientLimit,
+    build_limiter,
+)
+from src.utils.metrics import MetricsRegistry
+from tests.conftest import ServeFn
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class HeldRepository(InMemoryUserRepository):
+    """Repository whose lookups wait until ``release`` is set."""
+
+    # Run on the aio servicer's executor, not the event loop it holds up
+    blocking = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.entered = threading.Semaphore(0)
+        self.release = threading.Event()
+
+    def get_encoded(self, user_id: int) -> Optional[bytes]:
+        self.entered.release()
+        self.release.wait(10)
+        return super().get_encoded(user_id)
+
+
+def test_gradient_limit_grows_while_latency_holds() -> None:
+    algorithm = GradientLimit(initial_limit=20, max_limit=100)
+
+    limits = [algorithm.update(0.01, 20, False) for _ in range(20)]
+
+    assert limits == sorted(limits)
+    assert 20 < limits[-1] <= 100
+
+
+def test_gradient_limit_shrinks_when_latency_rises() -> None:
+    algorithm = GradientLimit(initial_limit=50, min_limit=4)
+    for _ in range(10):
+        algorithm.update(0.01, 50, False)
+    before = algorithm.limit
+
+    for _ in range(10):
+        algorithm.update(0.1, 50, False)
+
+    assert 4 <= algorithm.limit < before
+
+
+def test_gradient_limit_ignores_windows_far_below_the_limit() -> None:
+    algorithm = GradientLimit(initial_limit=20)
+
+    assert algorithm.update(1.0, 5, False) == 20
+
+
+def test_gradient_limit_halves_on_dropped_calls() -> None:
+    algorithm = GradientLimit(initial_limit=100, smoothing=1.0)
+
+    limit = algorithm.update(0.01, 100, True)
+
+    assert limit == pytest.approx(100 * 0.5 + 10)
+
+
+def test_aimd_limit_adds_one_and_backs_off() -> None:
+    algorithm = AimdLimit(
+        initial_limit=10,
+        min_limit=4,
+        max_limit=11,
+        backoff=0.5,
+        latency_threshold=0.5,
+    )
+
+    assert algorithm.update(0.01, 10, False) == 11
+    # Capped at max_limit
+    assert algorithm.update(0.01, 11, False) == 11
+    assert algorithm.update(0.6, 11, False) == 5.5
+    assert algorithm.update(0.01, 5, True) == 4
+
+
+def test_limiter_admits_up_to_its_limit() -> None:
+    limiter = ConcurrencyLimiter(AimdLimit(initial_limit=2))
+
+    admitted = [limiter.try_acquire() for _ in range(3)]
+    limiter.release(None)
+
+    assert admitted == [True, True, False]
+    assert limiter.in_flight == 1
+    assert limiter.try_acquire()
+
+
+def test_limiter_updates_once_per_window_with_enough_samples() -> None:
+    clock = FakeClock()
+    limiter = ConcurrencyLimiter(
+        AimdLimit(initial_limit=4), window=1.0, min_samples=3, clock=clock
+    )
+
+    for _ in range(2):
+        assert limiter.try_acquire()
+    clock.now = 2.0
+    limiter.release(0.01)
+    limiter.release(0.01)
+    # The window is over but holds too few samples
+    assert limiter.limit == 4
+
+    limiter.try_acquire()
+    limiter.release(0.01)
+    assert limiter.limit == 5
+
+    limiter.try_acquire()
+    limiter.release(0.01)
+    assert limiter.limit == 5
+
+
+def test_long_lived_calls_count_as_in_flight_only() -> None:
+    clock = FakeClock()
+    limiter = ConcurrencyLimiter(
+        AimdLimit(initial_limit=4), window=0.0, min_samples=1, clock=clock
+    )
+
+    limiter.try_acquire()
+    limiter.release(None)
+
+    assert limiter.in_flight == 0
+    assert limiter.limit == 4
+
+
+def test_build_limiter() -> None:
+    assert build_limiter("off", 100) is None
+    limiter = build_limiter("gradient", 2)
+    assert limiter is not None and limiter.limit == 2
+    aimd = build_limiter("aimd", 1000)
+    assert aimd is not None and aimd.limit == 20
+
+
+def test_calls_beyond_the_limit_are_shed(serve: ServeFn) -> None:
+    repository = HeldRepository()
+    repository.create("Ada", "ada@example.com")
+    registry = MetricsRegistry()
+    # max_concurrent_rpcs bounds the initial and minimum limit at 4
+    stub = serve(
+        servicer=ExampleServiceServicer(repository),
+        metrics=registry,
+        concurrency_limit="aimd",
+        max_concurrent_rpcs=4,
+    )
+    request = example_service_pb2.GetUserRequest(user_id=1)
+    pool = futures.ThreadPoolExecutor(max_workers=4)
+    try:
+        held: List[futures.Future] = [
+            pool.submit(stub.GetUser, request, timeout=10) for _ in range(4)
+        ]
+        for _ in range(4):
+            assert repository.entered.acquire(timeout=10)
+
+        with pytest.raises(grpc.RpcError) as error:
+            stub.GetUser(request, timeout=10)
+        repository.release.set()
+        responses = [call.result() for call in held]
+    finally:
+        repository.release.set()
+        pool.shutdown()
+
+    assert error.value.code() == grpc.StatusCode.RESOURCE_EXHAUSTED
+    assert [response.user.id for response in responses] == [1, 1, 1, 1]
+    assert (
+        'grpc_server_shed_total{grpc_method="GetUser",reason="limit"} 1'
+        in registry.render()
+    )
+    assert "grpc_server_concurrency_in_flight 0" in registry.render()
+    # Admitted again once the held calls completed
+    assert stub.GetUser(request, timeout=10).user.id == 1
+
+
+def test_calls_with_too_short_a_deadline_are_shed(serve: ServeFn) -> None:
+    repository = HeldRepository()
+    repository.create("Ada", "ada@example.com")
+    registry = MetricsRegistry()
+    stub = serve(servicer=ExampleServiceServicer(repository), metrics=registry)
+    request = example_service_pb2.GetUserRequest(user_id=1)
+    # One call of about 1s sets the method's latency estimate
+    timer = threading.Timer(1.0, repository.release.set)
+    timer.start()
+    stub.GetUser(request, timeout=10)
+    timer.join()
+
+    with pytest.raises(grpc.RpcError) as error:
+        stub.GetUser(request, timeout=0.06)
+
+    assert error.value.code() == grpc.StatusCode.DEADLINE_EXCEEDED
+    assert (
+        'grpc_server_shed_total{grpc_method="GetUser",reason="deadline"} 1'
+        in registry.render()
+    )
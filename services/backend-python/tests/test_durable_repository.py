@@ -0,0 +1,244 @@
+"""DurableUserRepository: recovery, group commit, and what a failed log does."""
+
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Iterator, List
+
+import grpc
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.api.example_service import ExampleServiceServicer
+from src.repositories import (
+    DurableUserRepository,
+    EmailAlreadyExistsError,
+    InMemoryUserRepository,
+    ReadOnlyError,
+    RepositoryError,
+    ShardedUserRepository,
+    UserRepository,
+    wal,
+)
+from tests.conftest import ServeFn
+
+OpenFn = Callable[[], DurableUserRepository]
+
+
+@pytest.fixture
+def open_store(tmp_path: Path) -> Iterator[OpenFn]:
+    """Return a function opening a durable store in ``tmp_path``.
+
+    Stores left open stand for processes that crashed: nothing of theirs
+    runs on close, and the next store recovers from what they logged.
+    """
+    opened: List[DurableUserRepository] = []
+
+    def open_durable() -> DurableUserRepository:
+        store = DurableUserRepository(
+            InMemoryUserRepository(), str(tmp_path), snapshot_interval=0
+        )
+        opened.append(store)
+        return store
+
+    yield open_durable
+    for store in opened:
+        store._wal.close()
+
+
+def test_recovers_every_acknowledged_write_after_a_crash(open_store: OpenFn) -> None:
+    store = open_store()
+    ada = store.create("Ada", "ada@example.com")
+    batch = store.create_many([("B", "b@example.com", ""), ("C", "c@example.com", "")])
+    kept = example_service_pb2.User(id=100, name="Kept", email="kept@example.com")
+    store.add(kept)
+    renamed = example_service_pb2.User()
+    renamed.CopyFrom(ada)
+    renamed.name = "Augusta"
+    store.add(renamed)
+
+    recovered = open_store()
+
+    assert recovered.get(ada.id) == renamed
+    assert recovered.get(100) == kept
+    assert [recovered.get_by_email(u.email) for u in batch if u] == batch
+    assert len(recovered) == 4
+    # New IDs continue after the highest recovered one
+    assert recovered.create("Next", "next@example.com").id == 101
+
+
+def test_recovers_from_a_snapshot_and_the_log_after_it(
+    open_store: OpenFn, tmp_path: Path
+) -> None:
+    store = open_store()
+    before = store.create("Before", "before@example.com")
+    store.snapshot()
+    after = store.create("After", "after@example.com")
+
+    recovered = open_store()
+
+    assert recovered.get(before.id) == before
+    assert recovered.get(after.id) == after
+    names = sorted(os.listdir(tmp_path))
+    assert names[0] == "snapshot-00000002.users"
+    assert "wal-00000001.log" not in names
+
+
+def test_a_torn_record_at_the_end_of_the_log_is_ignored(
+    open_store: OpenFn, tmp_path: Path
+) -> None:
+    store = open_store()
+    user = store.create("Ada", "ada@example.com")
+    (log,) = tmp_path.glob("wal-*.log")
+    with open(log, "ab") as file:
+        # A header promising more bytes than were written
+        file.write(wal.encode_records([b"x" * 100])[:50])
+
+    recovered = open_store()
+
+    assert recovered.get(user.id) == user
+    assert len(recovered) == 1
+
+
+def test_concurrent_writers_share_fsyncs(
+    open_store: OpenFn, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = open_store()
+    fsync = os.fsync
+    fsyncs: List[int] = []
+
+    def slow_fsync(fd: int) -> None:
+        fsyncs.append(fd)
+        threading.Event().wait(0.005)
+        fsync(fd)
+
+    monkeypatch.setattr(wal.os, "fsync", slow_fsync)
+    threads = [
+        threading.Thread(
+            target=lambda t=t: [
+                store.create("User", f"t{t}-{i}@example.com") for i in range(20)
+            ]
+        )
+        for t in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(store) == 160
+    assert len(fsyncs) < 160
+
+
+def test_writes_are_invisible_until_logged(
+    open_store: OpenFn, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = open_store()
+    fsync = os.fsync
+    release = threading.Event()
+    syncing = threading.Event()
+
+    def held_fsync(fd: int) -> None:
+        syncing.set()
+        assert release.wait(10)
+        fsync(fd)
+
+    monkeypatch.setattr(wal.os, "fsync", held_fsync)
+    writer = threading.Thread(target=store.create, args=("Ada", "ada@example.com"))
+    writer.start()
+    assert syncing.wait(10)
+
+    assert store.get_by_email("ada@example.com") is None
+    assert len(store) == 0
+    # The pending email is taken all the same
+    with pytest.raises(EmailAlreadyExistsError):
+        store.create("Other", "ada@example.com")
+
+    release.set()
+    writer.join()
+    assert store.get_by_email("ada@example.com") is not None
+
+
+def failing_fsync(fd: int) -> None:
+    raise OSError(28, "No space left on device")
+
+
+def test_a_failed_log_drops_the_write_and_turns_read_only(
+    open_store: OpenFn, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    store = open_store()
+    kept = store.create("Kept", "kept@example.com")
+    monkeypatch.setattr(wal.os, "fsync", failing_fsync)
+
+    with pytest.raises(RepositoryError):
+        store.create("Lost", "lost@example.com")
+
+    assert store.get_by_email("lost@example.com") is None
+    assert store.get(kept.id) == kept
+    for write in (
+        lambda: store.create("Later", "later@example.com"),
+        lambda: store.create_many([("Later", "later@example.com", "")]),
+        lambda: store.add(kept),
+    ):
+        with pytest.raises(ReadOnlyError):
+            write()
+    monkeypatch.undo()
+    # Closing skips the snapshot instead of failing again
+    store.close()
+    assert open_store().get(kept.id) == kept
+
+
+def test_restore_logs_only_the_users_it_keeps(open_store: OpenFn) -> None:
+    store = open_store()
+    store.create("Ada", "ada@example.com")
+
+    skipped = store.restore(
+        [
+            example_service_pb2.User(id=10, name="Clash", email="ada@example.com"),
+            example_service_pb2.User(id=11, name="New", email="new@example.com"),
+            example_service_pb2.User(id=12, name="Twice", email="new@example.com"),
+        ]
+    )
+
+    assert skipped == 2
+    recovered = open_store()
+    assert recovered.get(10) is None and recovered.get(12) is None
+    assert recovered.get(11) is not None
+
+
+@pytest.mark.parametrize("wrapped", [InMemoryUserRepository, ShardedUserRepository])
+def test_create_many_skips_taken_and_repeated_emails(
+    tmp_path: Path, wrapped: Callable[[], UserRepository]
+) -> None:
+    store = DurableUserRepository(wrapped(), str(tmp_path), snapshot_interval=0)
+    try:
+        store.create("Ada", "ada@example.com")
+        created = store.create_many(
+            [
+                ("A", "ada@example.com", ""),
+                ("B", "b@example.com", ""),
+                ("B", "b@example.com", ""),
+            ]
+        )
+        assert [user is not None for user in created] == [False, True, False]
+        assert len(store) == 2
+    finally:
+        store.close()
+
+
+def test_create_user_on_a_failed_log_is_unavailable(
+    serve: ServeFn, open_store: OpenFn, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    stub = serve(ExampleServiceServicer(open_store(), watch_users=False))
+    monkeypatch.setattr(wal.os, "fsync", failing_fsync)
+
+    for email in ("first@example.com", "second@example.com"):
+        with pytest.raises(grpc.RpcError) as error:
+            stub.CreateUser(
+                example_service_pb2.CreateUserRequest(name="U", email=email),
+                timeout=10,
+            )
+        assert error.value.code() == grpc.StatusCode.UNAVAILABLE
@@ -0,0 +1,169 @@
+"""Encoded responses: handlers built from the descriptor, and the wire bytes."""
+
+from concurrent import futures
+from typing import Iterator
+
+import grpc
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2, example_service_pb2_grpc
+from src.api.encoded_responses import (
+    EXAMPLE_SERVICE,
+    add_servicer_to_server,
+    encode_get_user_response,
+    encode_list_users_response,
+    encode_user_change,
+    encode_watch_users_response,
+    method_handlers,
+)
+from src.api.example_service import ExampleServiceServicer
+from src.repositories import InMemoryUserRepository
+from src.utils.wire_format import encode_varint, field_tag
+from tests.conftest import ServeFn
+
+
+def test_handlers_cover_every_method_with_its_streaming_kind() -> None:
+    handlers = method_handlers(EXAMPLE_SERVICE, ExampleServiceServicer())
+
+    assert handlers.keys() == {method.name for method in EXAMPLE_SERVICE.methods}
+    for method in EXAMPLE_SERVICE.methods:
+        handler = handlers[method.name]
+        assert handler.request_streaming == method.client_streaming
+        assert handler.response_streaming == method.server_streaming
+
+
+def test_serializers_pass_bytes_and_serialize_messages() -> None:
+    handler = method_handlers(EXAMPLE_SERVICE, ExampleServiceServicer())["GetUser"]
+    response = example_service_pb2.GetUserResponse(
+        user=example_service_pb2.User(id=1, name="Ada")
+    )
+
+    assert handler.response_serializer(b"\x0a\x00") == b"\x0a\x00"
+    assert handler.response_serializer(response) == response.SerializeToString()
+
+
+def test_encoded_responses_parse_as_the_messages() -> None:
+    users = [
+        example_service_pb2.User(id=1, name="Ada", email="ada@example.com"),
+        example_service_pb2.User(id=2, name="Bob", email="bob@example.com"),
+    ]
+    encoded = [user.SerializeToString() for user in users]
+
+    assert example_service_pb2.GetUserResponse.FromString(
+        encode_get_user_response(encoded[0])
+    ) == example_service_pb2.GetUserResponse(user=users[0])
+    assert example_service_pb2.ListUsersResponse.FromString(
+        encode_list_users_response(encoded, 7, "token")
+    ) == example_service_pb2.ListUsersResponse(
+        users=users, total_count=7, next_page_token="token"
+    )
+
+
+def test_encoded_responses_match_serialize_to_string() -> None:
+    user = example_service_pb2.User(
+        id=300, name="Ada", email="ada@example.com", created_at=2**40
+    )
+    encoded = user.SerializeToString()
+    change = example_service_pb2.UserChange(
+        sequence=5, type=example_service_pb2.UserChange.CREATED, user=user
+    )
+
+    assert encode_list_users_response([encoded], 0) == (
+        example_service_pb2.ListUsersResponse(users=[user]).SerializeToString()
+    )
+    assert (
+        encode_user_change(5, example_service_pb2.UserChange.CREATED, encoded)
+        == change.SerializeToString()
+    )
+    assert (
+        encode_watch_users_response([change.SerializeToString()], 5, 2**63, resync=True)
+        == example_service_pb2.WatchUsersResponse(
+            changes=[change], sequence=5, feed_id=2**63, resync=True
+        ).SerializeToString()
+    )
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 2**31 - 1, 2**63, -1])
+def test_varints_match_protobuf(value: int) -> None:
+    message = (
+        example_service_pb2.WatchUsersResponse(feed_id=value)
+        if value >= 0
+        else example_service_pb2.WatchUsersResponse(sequence=value)
+    )
+    tag = b"\x18" if value >= 0 else b"\x10"
+
+    expected = message.SerializeToString()
+
+    assert (tag + encode_varint(value) if value else b"") == expected
+
+
+def test_packed_fields_have_no_tag() -> None:
+    with pytest.raises(ValueError):
+        field_tag(example_service_pb2.BatchGetUsersRequest.DESCRIPTOR, "ids")
+
+
+def test_get_user_and_list_users_round_trip(serve: ServeFn) -> None:
+    servicer = ExampleServiceServicer(InMemoryUserRepository())
+    stub = serve(servicer)
+    ada = servicer.repository.create("Ada", "ada@example.com", "Lovelace")
+    bob = servicer.repository.create("Bob", "bob@example.com")
+
+    response = stub.GetUser(
+        example_service_pb2.GetUserRequest(user_id=ada.id), timeout=10
+    )
+    assert response == example_service_pb2.GetUserResponse(user=ada)
+
+    page = stub.ListUsers(
+        example_service_pb2.ListUsersRequest(page=1, page_size=10), timeout=10
+    )
+    assert list(page.users) == [ada, bob]
+    assert page.total_count == 2
+
+
+@pytest.fixture
+def generic_only_stub() -> Iterator[example_service_pb2_grpc.ExampleServiceStub]:
+    """Serve through the generic handler alone, as older servers look it up."""
+    servicer = ExampleServiceServicer(InMemoryUserRepository())
+    servicer.repository.create("Ada", "ada@example.com")
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    handlers = method_handlers(EXAMPLE_SERVICE, servicer)
+    server.add_generic_rpc_handlers(
+        (grpc.method_handlers_generic_handler(EXAMPLE_SERVICE.full_name, handlers),)
+    )
+    port = server.add_insecure_port("127.0.0.1:0")
+    server.start()
+    with grpc.insecure_channel(f"127.0.0.1:{port}") as channel:
+        yield example_service_pb2_grpc.ExampleServiceStub(channel)
+    server.stop(None).wait()
+
+
+def test_generic_handler_serves_encoded_responses(
+    generic_only_stub: example_service_pb2_grpc.ExampleServiceStub,
+) -> None:
+    response = generic_only_stub.GetUser(
+        example_service_pb2.GetUserRequest(user_id=1), timeout=10
+    )
+
+    assert response.user.email == "ada@example.com"
+
+
+def test_add_servicer_to_server_registers_both_lookups() -> None:
+    class RecordingServer:
+        def __init__(self) -> None:
+            self.generic: list = []
+            self.registered: dict = {}
+
+        def add_generic_rpc_handlers(self, handlers: tuple) -> None:
+            self.generic += handlers
+
+        def add_registered_method_handlers(self, name: str, handlers: dict) -> None:
+            self.registered[name] = handlers
+
+    server = RecordingServer()
+    add_servicer_to_server(EXAMPLE_SERVICE, ExampleServiceServicer(), server)
+
+    assert len(server.generic) == 1
+    assert server.registered.keys() == {"example.ExampleService"}
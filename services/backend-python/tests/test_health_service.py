@@ -0,0 +1,145 @@
+"""Health service: Check, Watch and the switch to NOT_SERVING on shutdown."""
+
+import asyncio
+import threading
+from concurrent import futures
+from typing import Callable, Iterator, List, Tuple
+
+import grpc
+import pytest
+
+from health_check import health_check
+from proto_generated import health_pb2, health_pb2_grpc
+from src.api.health_service import (
+    NOT_SERVING,
+    SERVICE_UNKNOWN,
+    SERVING,
+    AsyncHealthServicer,
+    HealthServicer,
+)
+from src.main import mark_serving
+
+HealthFn = Callable[[HealthServicer], Tuple[health_pb2_grpc.HealthStub, str]]
+
+
+@pytest.fixture(params=["sync", "aio"])
+def serve_health(
+    request: pytest.FixtureRequest, event_loop_thread: asyncio.AbstractEventLoop
+) -> Iterator[HealthFn]:
+    """Serve a ``HealthServicer`` in the parametrized mode.
+
+    Returns a stub for the service and the server's address.
+    """
+    cleanups: List[Callable[[], None]] = []
+    channels: List[grpc.Channel] = []
+
+    def start(health: HealthServicer) -> Tuple[health_pb2_grpc.HealthStub, str]:
+        if request.param == "aio":
+
+            async def start_aio() -> Tuple[grpc.aio.Server, int]:
+                server = grpc.aio.server()
+                health_pb2_grpc.add_HealthServicer_to_server(
+                    AsyncHealthServicer(health), server
+                )
+                port = server.add_insecure_port("127.0.0.1:0")
+                await server.start()
+                return server, port
+
+            aio_server, port = asyncio.run_coroutine_threadsafe(
+                start_aio(), event_loop_thread
+            ).result()
+            cleanups.append(
+                lambda: asyncio.run_coroutine_threadsafe(
+                    aio_server.stop(None), event_loop_thread
+                ).result()
+            )
+        else:
+            server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+            health_pb2_grpc.add_HealthServicer_to_server(health, server)
+            port = server.add_insecure_port("127.0.0.1:0")
+            server.start()
+            cleanups.append(lambda: server.stop(None).wait())
+        address = f"127.0.0.1:{port}"
+        channel = grpc.insecure_channel(address)
+        channels.append(channel)
+        return health_pb2_grpc.HealthStub(channel), address
+
+    yield start
+    for channel in channels:
+        channel.close()
+    for cleanup in reversed(cleanups):
+        cleanup()
+
+
+def check(stub: health_pb2_grpc.HealthStub, service: str = "") -> int:
+    """Return the status ``service`` reports."""
+    request = health_pb2.HealthCheckRequest(service=service)
+    status: int = stub.Check(request, timeout=5).status
+    return status
+
+
+def test_services_are_unknown_until_marked_serving(serve_health: HealthFn) -> None:
+    health = HealthServicer()
+    stub, _ = serve_health(health)
+
+    with pytest.raises(grpc.RpcError) as error:
+        check(stub)
+    assert error.value.code() == grpc.StatusCode.NOT_FOUND
+
+    mark_serving(health)
+
+    assert check(stub) == SERVING
+    assert check(stub, "example.ExampleService") == SERVING
+
+
+def test_shutdown_reports_not_serving_for_good(serve_health: HealthFn) -> None:
+    health = HealthServicer()
+    mark_serving(health)
+    stub, _ = serve_health(health)
+
+    health.enter_graceful_shutdown()
+    health.set("", SERVING)
+
+    assert health.shutting_down
+    assert check(stub) == NOT_SERVING
+    assert check(stub, "example.ExampleService") == NOT_SERVING
+
+
+def test_watch_streams_changes_and_ends_on_shutdown(serve_health: HealthFn) -> None:
+    health = HealthServicer()
+    stub, _ = serve_health(health)
+    responses = stub.Watch(health_pb2.HealthCheckRequest(), timeout=10)
+
+    first = next(responses)
+    health.set("", SERVING)
+    second = next(responses)
+    health.enter_graceful_shutdown()
+    rest = list(responses)
+
+    assert first.status == SERVICE_UNKNOWN
+    assert second.status == SERVING
+    assert [response.status for response in rest] == [NOT_SERVING]
+
+
+def test_listeners_run_on_every_change() -> None:
+    health = HealthServicer()
+    changes = threading.Semaphore(0)
+    unsubscribe = health.subscribe(changes.release)
+
+    health.set("", SERVING)
+    unsubscribe()
+    health.set("", NOT_SERVING)
+
+    assert changes.acquire(blocking=False)
+    assert not changes.acquire(blocking=False)
+
+
+def test_health_check_script_follows_the_status(serve_health: HealthFn) -> None:
+    health = HealthServicer()
+    mark_serving(health)
+    _, address = serve_health(health)
+
+    assert health_check(address, timeout=5)
+    health.enter_graceful_shutdown()
+    assert not health_check(address, timeout=5)
+    assert not health_check(address, service="missing.Service", timeout=5)
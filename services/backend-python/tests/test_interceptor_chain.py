@@ -0,0 +1,173 @@
+"""Interceptor chains: handlers wrapped once per method, stages in order."""
+
+import asyncio
+from typing import Any, List, NamedTuple, Optional
+
+import grpc
+import pytest
+
+from src.interceptors.base import (
+    AsyncHandlerInterceptor,
+    AsyncInterceptorChain,
+    HandlerInterceptor,
+    InterceptorChain,
+    replace_behavior,
+)
+
+METHOD = "/example.ExampleService/GetUser"
+HEALTH_METHOD = "/grpc.health.v1.Health/Check"
+
+
+class CallDetails(NamedTuple):
+    method: str
+    invocation_metadata: tuple = ()
+
+
+class Stage(HandlerInterceptor):
+    """Prefixes responses with its name and records what it wrapped."""
+
+    def __init__(self, name: str, trace: List[str]) -> None:
+        super().__init__()
+        self.name = name
+        self.trace = trace
+        self.wrapped: List[str] = []
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        self.wrapped.append(method)
+
+        def wrap(behavior: Any) -> Any:
+            def wrapper(request: Any, context: Any) -> Any:
+                self.trace.append(self.name)
+                return f"{self.name}({behavior(request, context)})"
+
+            return wrapper
+
+        return replace_behavior(handler, wrap)
+
+
+class AsyncStage(AsyncHandlerInterceptor):
+    def __init__(self, name: str) -> None:
+        super().__init__()
+        self.name = name
+        self.wrapped: List[str] = []
+
+    def wrap_handler(
+        self, method: str, handler: grpc.RpcMethodHandler
+    ) -> grpc.RpcMethodHandler:
+        self.wrapped.append(method)
+
+        def wrap(behavior: Any) -> Any:
+            async def wrapper(request: Any, context: Any) -> Any:
+                return f"{self.name}({await behavior(request, context)})"
+
+            return wrapper
+
+        return replace_behavior(handler, wrap)
+
+
+def unary_handler(response: str = "response") -> grpc.RpcMethodHandler:
+    return grpc.unary_unary_rpc_method_handler(
+        lambda request, context: response,
+        request_deserializer=bytes.decode,
+        response_serializer=str.encode,
+    )
+
+
+def test_first_stage_is_outermost_and_wraps_once_per_method() -> None:
+    trace: List[str] = []
+    outer, inner = Stage("outer", trace), Stage("inner", trace)
+    chain = InterceptorChain([outer, inner])
+    resolved: List[str] = []
+
+    def continuation(details: Any) -> Optional[grpc.RpcMethodHandler]:
+        resolved.append(details.method)
+        return unary_handler()
+
+    first = chain.intercept_service(continuation, CallDetails(METHOD))
+    second = chain.intercept_service(continuation, CallDetails(METHOD))
+
+    assert first is second
+    assert resolved == [METHOD]
+    assert outer.wrapped == inner.wrapped == [METHOD]
+    assert first is not None
+    assert first.unary_unary(b"request", None) == "outer(inner(response))"
+    assert trace == ["outer", "inner"]
+
+
+def test_exempt_services_bypass_every_stage() -> None:
+    stage = Stage("stage", [])
+    chain = InterceptorChain([stage], exempt_services=("grpc.health.v1.Health",))
+    handler = unary_handler()
+
+    resolved = chain.intercept_service(lambda _: handler, CallDetails(HEALTH_METHOD))
+
+    assert resolved is handler
+    assert stage.wrapped == []
+
+
+def test_unknown_methods_are_not_memoized() -> None:
+    stage = Stage("stage", [])
+    chain = InterceptorChain([stage])
+    calls: List[str] = []
+
+    def continuation(details: Any) -> Optional[grpc.RpcMethodHandler]:
+        calls.append(details.method)
+        return None
+
+    for _ in range(3):
+        assert chain.intercept_service(continuation, CallDetails("/x/Y")) is None
+    assert calls == ["/x/Y"] * 3
+    assert stage.wrapped == []
+
+
+@pytest.mark.parametrize(
+    "factory, attribute",
+    [
+        (grpc.unary_unary_rpc_method_handler, "unary_unary"),
+        (grpc.unary_stream_rpc_method_handler, "unary_stream"),
+        (grpc.stream_unary_rpc_method_handler, "stream_unary"),
+        (grpc.stream_stream_rpc_method_handler, "stream_stream"),
+    ],
+)
+def test_replace_behavior_keeps_the_kind_and_serializers(
+    factory: Any, attribute: str
+) -> None:
+    handler = factory(
+        lambda request, context: request,
+        request_deserializer=bytes.decode,
+        response_serializer=str.encode,
+    )
+
+    def serialize(response: Any) -> bytes:
+        return repr(response).encode()
+
+    replaced = replace_behavior(handler, lambda behavior: lambda r, c: "wrapped")
+    reserialized = replace_behavior(handler, lambda behavior: behavior, serialize)
+
+    assert getattr(replaced, attribute)(None, None) == "wrapped"
+    assert replaced.request_deserializer is bytes.decode
+    assert replaced.response_serializer is str.encode
+    assert reserialized.response_serializer is serialize
+
+
+def test_async_chain_wraps_once_per_method() -> None:
+    outer, inner = AsyncStage("outer"), AsyncStage("inner")
+    chain = AsyncInterceptorChain([outer, inner])
+
+    async def behavior(request: Any, context: Any) -> str:
+        return "response"
+
+    async def continuation(details: Any) -> grpc.RpcMethodHandler:
+        return grpc.unary_unary_rpc_method_handler(behavior)
+
+    async def call_twice() -> str:
+        first = await chain.intercept_service(continuation, CallDetails(METHOD))
+        second = await chain.intercept_service(continuation, CallDetails(METHOD))
+        assert first is second and first is not None
+        response: str = await first.unary_unary(None, None)
+        return response
+
+    assert asyncio.run(call_twice()) == "outer(inner(response))"
+    assert outer.wrapped == inner.wrapped == [METHOD]
@@ -0,0 +1,142 @@
+"""Draining the worker processes of the multi-process launcher."""
+
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Iterator, List
+
+import grpc
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import (
+    example_service_pb2,
+    example_service_pb2_grpc,
+    health_pb2,
+    health_pb2_grpc,
+)
+from src.launcher import stop_workers
+
+_mp = multiprocessing.get_context("spawn")
+
+
+def drain_slowly(ready: Any, drain_seconds: float) -> None:
+    """Worker that takes ``drain_seconds`` to exit after SIGTERM."""
+    stopping: List[int] = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+    ready.set()
+    while not stopping:
+        time.sleep(0.01)
+    time.sleep(drain_seconds)
+
+
+def ignore_sigterm(ready: Any) -> None:
+    """Worker that never drains."""
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    ready.set()
+    while True:
+        time.sleep(1)
+
+
+def start(target: Any, *args: Any) -> multiprocessing.process.BaseProcess:
+    ready = _mp.Event()
+    process = _mp.Process(target=target, args=(ready, *args))
+    process.start()
+    assert ready.wait(30)
+    return process
+
+
+def test_workers_that_drain_within_the_timeout_exit_cleanly() -> None:
+    processes = [start(drain_slowly, 0.5) for _ in range(2)]
+
+    started = time.monotonic()
+    stop_workers(processes, 10.0)
+
+    # Workers drain in parallel
+    assert time.monotonic() - started < 5.0
+    assert [process.exitcode for process in processes] == [0, 0]
+
+
+def test_workers_still_running_after_the_timeout_are_killed() -> None:
+    stuck = start(ignore_sigterm)
+    draining = start(drain_slowly, 0.2)
+
+    started = time.monotonic()
+    stop_workers([stuck, draining], 1.0)
+
+    assert 1.0 <= time.monotonic() - started < 5.0
+    assert stuck.exitcode == -signal.SIGKILL
+    assert draining.exitcode == 0
+
+
+@pytest.fixture
+def free_port() -> Iterator[int]:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    yield port
+
+
+def test_launcher_drains_workers_longer_than_the_grace_period(
+    free_port: int,
+) -> None:
+    address = f"127.0.0.1:{free_port}"
+    # The drain delay alone exceeds grace plus margin; workers must still
+    # get to finish it rather than be killed.
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "src.main",
+            "--workers=2",
+            f"--listen-addr={address}",
+            "--metrics-port=0",
+            "--drain-delay=6",
+            "--shutdown-grace=0.5",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        env={**os.environ, "PYTHONUNBUFFERED": "1"},
+    )
+    try:
+        with grpc.insecure_channel(address) as channel:
+            health = health_pb2_grpc.HealthStub(channel)
+            deadline = time.monotonic() + 120
+            while True:
+                try:
+                    response = health.Check(
+                        health_pb2.HealthCheckRequest(), timeout=5, wait_for_ready=True
+                    )
+                except grpc.RpcError:
+                    response = None
+                if response is not None and response.status == response.SERVING:
+                    break
+                assert time.monotonic() < deadline, "server did not start"
+                time.sleep(0.5)
+            watch = example_service_pb2_grpc.ExampleServiceStub(channel).WatchUsers(
+                example_service_pb2.WatchUsersRequest(), timeout=60
+            )
+            next(watch)
+
+            server.send_signal(signal.SIGTERM)
+            # Open watches end as soon as the worker starts draining
+            with pytest.raises(grpc.RpcError) as error:
+                next(watch)
+            assert error.value.code() == grpc.StatusCode.UNAVAILABLE
+
+        output, _ = server.communicate(timeout=60)
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.communicate()
+
+    assert server.returncode == 0, output
+    assert "did not drain in time" not in output
+    assert "All workers stopped" in output
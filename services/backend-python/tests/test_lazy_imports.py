@@ -0,0 +1,69 @@
+"""Heavy dependencies stay unloaded until a process actually needs them."""
+
+import os
+import subprocess
+import sys
+from typing import List
+
+import pytest
+
+import src.repositories
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Packages that make up most of the server's import time
+HEAVY = ("protovalidate", "celpy", "sqlalchemy")
+
+
+def loaded_after(code: str) -> List[str]:
+    """Run ``code`` in a fresh interpreter; return the heavy packages it loaded."""
+    report = (
+        "import sys; print(' '.join(sorted({name.split('.')[0] for name in "
+        f"sys.modules}} & set({HEAVY!r}))))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", f"{code}\n{report}"],
+        cwd=SERVICE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=60,
+    )
+    return result.stdout.split()
+
+
+def test_importing_the_server_loads_no_heavy_package() -> None:
+    assert loaded_after("import src.main") == []
+
+
+def test_the_health_probe_loads_no_heavy_package() -> None:
+    assert loaded_after("import health_check") == []
+
+
+def test_building_the_server_without_warm_up_loads_no_heavy_package() -> None:
+    code = (
+        "from src.config import ServerConfig\n"
+        "from src.main import build_interceptors, build_repository\n"
+        "config = ServerConfig(warm_up_validation=False)\n"
+        "build_interceptors(config)\n"
+        "build_repository(config)"
+    )
+
+    assert loaded_after(code) == []
+
+
+def test_warm_up_loads_protovalidate() -> None:
+    code = (
+        "from src.config import ServerConfig\n"
+        "from src.main import build_interceptors\n"
+        "build_interceptors(ServerConfig())"
+    )
+
+    assert "protovalidate" in loaded_after(code)
+
+
+def test_the_sql_repository_is_resolved_on_first_access() -> None:
+    from src.repositories.sql import SqlUserRepository
+
+    assert src.repositories.SqlUserRepository is SqlUserRepository
+    with pytest.raises(AttributeError):
+        src.repositories.NoSuchRepository  # type: ignore[attr-defined]
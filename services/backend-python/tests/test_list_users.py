@@ -0,0 +1,99 @@
+"""ListUsers paging by page number and by page token, through validation."""
+
+import grpc
+import pytest
+
+from proto_generated import example_service_pb2
+from src.api.example_service import ExampleServiceServicer
+from src.api.pagination import decode_page_token, encode_page_token
+from src.repositories import InMemoryUserRepository
+from tests.conftest import ServeFn
+
+
+def make_servicer(users: int) -> ExampleServiceServicer:
+    repository = InMemoryUserRepository()
+    for user_id in range(1, users + 1):
+        repository.add(
+            example_service_pb2.User(
+                id=user_id, name=f"User {user_id}", email=f"u{user_id}@example.com"
+            )
+        )
+    return ExampleServiceServicer(repository)
+
+
+def test_page_token_alone_returns_the_next_page(serve: ServeFn) -> None:
+    stub = serve(make_servicer(25))
+
+    response = stub.ListUsers(
+        example_service_pb2.ListUsersRequest(page_token=encode_page_token(10))
+    )
+
+    # page_size defaults to 10 and page is not needed with a token
+    assert [user.id for user in response.users] == list(range(11, 21))
+    assert response.total_count == 25
+    assert response.next_page_token == encode_page_token(20)
+
+
+def test_page_tokens_walk_every_user_once(serve: ServeFn) -> None:
+    stub = serve(make_servicer(25))
+
+    seen = []
+    response = stub.ListUsers(example_service_pb2.ListUsersRequest(page=1, page_size=7))
+    seen += [user.id for user in response.users]
+    while response.next_page_token:
+        response = stub.ListUsers(
+            example_service_pb2.ListUsersRequest(
+                page_token=response.next_page_token, page_size=7
+            )
+        )
+        seen += [user.id for user in response.users]
+
+    assert seen == list(range(1, 26))
+
+
+def test_page_numbers_are_one_based(serve: ServeFn) -> None:
+    stub = serve(make_servicer(25))
+
+    response = stub.ListUsers(
+        example_service_pb2.ListUsersRequest(page=3, page_size=10)
+    )
+
+    assert [user.id for user in response.users] == list(range(21, 26))
+    assert response.next_page_token == ""
+
+
+@pytest.mark.parametrize(
+    "request_fields",
+    [
+        {"page": 0, "page_size": 10},
+        {"page": 1, "page_size": 101},
+        {"page": -1, "page_token": encode_page_token(1)},
+    ],
+)
+def test_invalid_requests_are_rejected(serve: ServeFn, request_fields: dict) -> None:
+    stub = serve()
+
+    with pytest.raises(grpc.RpcError) as error:
+        stub.ListUsers(example_service_pb2.ListUsersRequest(**request_fields))
+
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+def test_malformed_page_token_is_rejected(serve: ServeFn) -> None:
+    stub = serve()
+
+    with pytest.raises(grpc.RpcError) as error:
+        stub.ListUsers(example_service_pb2.ListUsersRequest(page_token="bm9wZQ=="))
+
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+
+
+def test_page_tokens_round_trip() -> None:
+    for after_id in (0, 1, 2**31 - 1):
+        assert decode_page_token(encode_page_token(after_id)) == after_id
+
+
+@pytest.mark.parametrize("token", ["", "!!!", "bm9wZQ==", encode_page_token(1)[:-4]])
+def test_malformed_page_tokens_do_not_decode(token: str) -> None:
+    with pytest.raises(ValueError):
+        decode_page_token(token)
@@ -0,0 +1,79 @@
+"""The load generator: mix parsing, summaries, and a short run in process."""
+
+import argparse
+import asyncio
+
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from benchmarks.common import percentile
+from benchmarks.loadgen import (
+    build_calls,
+    drive,
+    parse_mix,
+    preload,
+    start_inprocess,
+    summarize,
+)
+
+
+def test_parse_mix_weights_methods() -> None:
+    assert parse_mix("GetUser=80, ListUsers=15,CreateUser") == {
+        "GetUser": 80.0,
+        "ListUsers": 15.0,
+        "CreateUser": 1.0,
+    }
+
+
+@pytest.mark.parametrize("mix", ["DeleteUser=1", "GetUser=0,ListUsers=0"])
+def test_parse_mix_rejects_unknown_methods_and_zero_weights(mix: str) -> None:
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_mix(mix)
+
+
+def test_percentile_picks_from_sorted_values() -> None:
+    values = [float(i) for i in range(1, 101)]
+
+    assert percentile(values, 0.5) == 51.0
+    assert percentile(values, 0.99) == 100.0
+    assert percentile(values, 1.0) == 100.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_summarize_reports_rates_and_latencies_in_ms() -> None:
+    summary = summarize([0.003, 0.001, 0.002, 0.004], errors=1, elapsed=2.0)
+
+    assert summary["requests"] == 4 and summary["errors"] == 1
+    assert summary["rps"] == 2.0
+    assert summary["latency_ms"]["p50"] == 3.0
+    assert summary["latency_ms"]["max"] == 4.0
+    assert summary["latency_ms"]["mean"] == 2.5
+    assert summarize([], 0, 0.0)["latency_ms"]["max"] == 0.0
+
+
+def test_a_short_run_against_an_in_process_server() -> None:
+    server, address = start_inprocess(["--metrics-port", "0"])
+    try:
+        asyncio.run(preload(address, 20))
+        result = asyncio.run(
+            drive(
+                address,
+                build_calls(user_ids=20, list_pages=2, page_size=10),
+                parse_mix("GetUser=2,ListUsers=1,CreateUser=1"),
+                concurrency=4,
+                channels=2,
+                warmup=0.1,
+                duration=0.5,
+                seed=1,
+            )
+        )
+    finally:
+        server.stop(None).wait()
+
+    assert result["requests"] > 0
+    assert result["errors"] == 0, result["error_codes"]
+    assert set(result["methods"]) == {"GetUser", "ListUsers", "CreateUser"}
+    per_method = [summary["requests"] for summary in result["methods"].values()]
+    assert sum(per_method) == result["requests"]
@@ -0,0 +1,114 @@
+"""Logging pipeline: queued records, dropping when full and request log sampling."""
+
+import logging
+import time
+from typing import Callable, Iterator
+
+import pytest
+
+from src.utils import log_pipeline
+from src.utils.log_pipeline import (
+    DroppingQueueHandler,
+    RequestLogSampler,
+    log_stats,
+    request_logger,
+    start_logging,
+)
+
+
+@pytest.fixture
+def stderr(
+    capsys: pytest.CaptureFixture, monkeypatch: pytest.MonkeyPatch
+) -> Iterator[Callable[[], str]]:
+    """Return what the pipeline wrote so far; restore the root logger afterwards."""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield lambda: capsys.readouterr().err
+    if log_pipeline._pipeline is not None:
+        log_pipeline._pipeline.stop()
+    monkeypatch.setattr(log_pipeline, "_pipeline", None)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def record(message: str) -> logging.LogRecord:
+    return logging.LogRecord("test", logging.INFO, __file__, 1, message, None, None)
+
+
+def test_records_are_written_by_the_listener_thread(stderr: Callable[[], str]) -> None:
+    pipeline = start_logging(max_queued=100)
+
+    logging.getLogger("test").info("hello %s", "world")
+    pipeline.stop()
+
+    assert " - test - INFO - hello world\n" in stderr()
+    assert log_stats() == (0, 0, 0)
+
+
+def test_without_a_queue_records_are_written_right_away(
+    stderr: Callable[[], str],
+) -> None:
+    pipeline = start_logging(max_queued=0)
+
+    logging.getLogger("test").warning("now")
+
+    assert pipeline.listener is None
+    assert "WARNING - now" in stderr()
+
+
+def test_a_full_queue_drops_records() -> None:
+    handler = DroppingQueueHandler(max_queued=2)
+
+    for i in range(5):
+        handler.handle(record(f"record {i}"))
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+    # Queued as they were logged, to be formatted by the listener
+    assert handler.queue.get().getMessage() == "record 0"
+
+
+def test_the_sampler_passes_bursts_then_refills() -> None:
+    sampler = RequestLogSampler(rate=20)
+
+    burst = [sampler.admit() for _ in range(21)]
+    time.sleep(0.15)
+
+    assert burst == [True] * 20 + [False]
+    assert sampler.suppressed == 1
+    assert sampler.admit()
+
+
+def test_request_logs_are_sampled_but_errors_pass(stderr: Callable[[], str]) -> None:
+    pipeline = start_logging(max_queued=100, request_log_rate=1)
+    logger = request_logger("requests")
+
+    for i in range(3):
+        logger.info("call %d", i)
+    logger.error("failed")
+    stats = pipeline.stats()
+    pipeline.stop()
+
+    output = stderr()
+    assert "call 0" in output and "call 1" not in output and "call 2" not in output
+    assert "failed" in output
+    assert stats.suppressed == 2
+
+
+def test_request_loggers_without_a_sampler_log_everything(
+    stderr: Callable[[], str],
+) -> None:
+    pipeline = start_logging(max_queued=100)
+    logger = request_logger("requests")
+
+    for i in range(3):
+        logger.info("call %d", i)
+    logger.debug("below the level")
+    pipeline.stop()
+
+    output = stderr()
+    assert all(f"call {i}" in output for i in range(3))
+    assert "below the level" not in output
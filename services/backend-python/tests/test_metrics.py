@@ -0,0 +1,162 @@
+"""Metrics: per-thread cells, exposition format, the interceptor and endpoint."""
+
+import threading
+import urllib.error
+import urllib.request
+from typing import Dict, Tuple
+
+import grpc
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.utils.metrics import CONTENT_TYPE, MetricsRegistry
+from src.utils.metrics_server import start_metrics_server
+from tests.conftest import ServeFn
+
+
+def samples(registry: MetricsRegistry) -> Dict[str, float]:
+    """Return the rendered samples keyed by name and labels."""
+    values = {}
+    for line in registry.render().splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            values[name] = float(value)
+    return values
+
+
+def test_counters_sum_the_cells_of_every_thread() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("calls_total", "Calls", ("method",)).labels("Get")
+
+    def count() -> None:
+        for _ in range(1000):
+            counter.inc()
+
+    threads = [threading.Thread(target=count) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc(0.5)
+
+    assert counter.value() == 4000.5
+    assert samples(registry) == {'calls_total{method="Get"}': 4000.5}
+
+
+def test_gauges_go_up_and_down() -> None:
+    gauge = MetricsRegistry().gauge("in_flight", "In flight").labels()
+
+    gauge.inc(3)
+    gauge.dec()
+
+    assert gauge.value() == 2
+
+
+def test_histograms_render_cumulative_buckets() -> None:
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.labels().observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_labels_and_help_are_escaped() -> None:
+    registry = MetricsRegistry()
+    registry.counter("c", "Line\\one\ntwo", ("l",)).labels('a"b\\c\nd').inc()
+
+    lines = registry.render().splitlines()
+
+    assert lines[0] == "# HELP c Line\\\\one\\ntwo"
+    assert lines[2] == 'c{l="a\\"b\\\\c\\nd"} 1'
+
+
+def test_registering_twice_returns_the_metric_unless_it_differs() -> None:
+    registry = MetricsRegistry()
+    counter = registry.counter("c", "C", ("a",))
+
+    assert registry.counter("c", "C again", ("a",)) is counter
+    with pytest.raises(ValueError):
+        registry.counter("c", "C", ("b",))
+    with pytest.raises(ValueError):
+        registry.gauge("c", "C", ("a",))
+    with pytest.raises(ValueError):
+        counter.labels("x", "y")
+
+
+def test_callbacks_are_read_on_every_render() -> None:
+    registry = MetricsRegistry()
+    value = [1.0]
+    registry.register_callback("size_bytes", "Size", lambda: value[0])
+
+    value[0] = 2.5
+
+    assert samples(registry) == {"size_bytes": 2.5}
+
+
+def fetch(port: int, path: str) -> Tuple[int, str, str]:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=10) as r:
+            return r.status, r.headers["Content-Type"], r.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers["Content-Type"], e.read().decode()
+
+
+def test_endpoint_serves_metrics_and_routes() -> None:
+    registry = MetricsRegistry()
+    registry.counter("c", "C").labels().inc()
+
+    def echo(params: Dict[str, str]) -> Tuple[int, str, bytes]:
+        if "fail" in params:
+            raise ValueError("bad parameter")
+        return 200, "text/plain", params.get("say", "").encode()
+
+    server = start_metrics_server(registry, 0, routes={"/echo": echo})
+    port = server.server_port
+    try:
+        assert fetch(port, "/metrics") == (200, CONTENT_TYPE, registry.render())
+        assert fetch(port, "/echo?say=hi")[::2] == (200, "hi")
+        assert fetch(port, "/echo?fail=1")[::2] == (400, "bad parameter\n")
+        assert fetch(port, "/missing")[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_interceptor_counts_calls_by_method_and_code(serve: ServeFn) -> None:
+    registry = MetricsRegistry()
+    stub = serve(metrics=registry)
+    labels = 'grpc_type="unary",grpc_service="example.ExampleService",grpc_method'
+
+    stub.GetUser(example_service_pb2.GetUserRequest(user_id=1), timeout=10)
+    for user_id in (404, 0):
+        with pytest.raises(grpc.RpcError):
+            stub.GetUser(
+                example_service_pb2.GetUserRequest(user_id=user_id), timeout=10
+            )
+    list(stub.StreamUsers(example_service_pb2.StreamUsersRequest(), timeout=10))
+
+    values = samples(registry)
+    assert values[f'grpc_server_started_total{{{labels}="GetUser"}}'] == 3
+    for code in ("OK", "NOT_FOUND", "INVALID_ARGUMENT"):
+        key = f'grpc_server_handled_total{{{labels}="GetUser",grpc_code="{code}"}}'
+        assert values[key] == 1
+    assert values[f'grpc_server_in_flight_requests{{{labels}="GetUser"}}'] == 0
+    assert values[f'grpc_server_handling_seconds_count{{{labels}="GetUser"}}'] == 3
+    stream = (
+        'grpc_type="server_stream",grpc_service="example.ExampleService",'
+        'grpc_method="StreamUsers"'
+    )
+    assert values[f'grpc_server_handled_total{{{stream},grpc_code="OK"}}'] == 1
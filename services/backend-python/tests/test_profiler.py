@@ -0,0 +1,215 @@
+"""Stage timing of sampled calls, the sampling profiler and the debug routes."""
+
+import os
+import threading
+import time
+from typing import Dict
+
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.utils.debug_endpoints import debug_routes
+from src.utils.metrics import MetricsRegistry
+from src.utils.profiler import (
+    Profile,
+    ProfilerBusyError,
+    SamplingProfiler,
+    write_profile,
+)
+from src.utils.stage_timer import Sampled, StageTimer
+from tests.conftest import ServeFn
+
+
+def stage_counts(registry: MetricsRegistry) -> Dict[str, float]:
+    """Return the observation count of each ``grpc_server_stage_seconds`` series."""
+    counts = {}
+    for line in registry.render().splitlines():
+        if line.startswith("grpc_server_stage_seconds_count"):
+            name, _, value = line.rpartition(" ")
+            counts[name] = float(value)
+    return counts
+
+
+def busy_thread(stop: threading.Event) -> None:
+    """Spin until ``stop`` is set, so the profiler has CPU time to see."""
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_unsampled_calls_pass_messages_through() -> None:
+    registry = MetricsRegistry()
+    timer = StageTimer(registry, sample_rate=0.0)
+    deserialize = timer.wrap_deserializer("GetUser", lambda data: data.decode())
+    serialize = timer.wrap_serializer(lambda message: message.encode())
+
+    request = deserialize(b"request")
+    data = serialize("response")
+
+    assert request == "request"
+    assert data == b"response"
+    assert stage_counts(registry) == {}
+
+
+def test_sampled_calls_record_every_stage() -> None:
+    registry = MetricsRegistry()
+    timer = StageTimer(registry, sample_rate=1.0)
+    deserialize = timer.wrap_deserializer("GetUser", lambda data: data.decode())
+    serialize = timer.wrap_serializer(lambda message: message.encode())
+
+    request = deserialize(b"request")
+    request.sample.durations["handler"] = 0.001
+    data = serialize(Sampled("response", request.sample))
+
+    assert type(request) is Sampled
+    assert request.message == "request"
+    assert data == b"response"
+    assert stage_counts(registry) == {
+        f'grpc_server_stage_seconds_count{{grpc_method="GetUser",stage="{stage}"}}': 1
+        for stage in ("deserialize", "handler", "serialize")
+    }
+
+
+def test_server_times_the_stages_of_sampled_calls(serve: ServeFn) -> None:
+    registry = MetricsRegistry()
+    stub = serve(metrics=registry, stage_timer=StageTimer(registry, sample_rate=1.0))
+
+    response = stub.GetUser(example_service_pb2.GetUserRequest(user_id=1))
+
+    assert response.user.id == 1
+    assert stage_counts(registry) == {
+        f'grpc_server_stage_seconds_count{{grpc_method="GetUser",stage="{stage}"}}': 1
+        for stage in ("deserialize", "validate", "handler", "serialize")
+    }
+
+
+def test_profile_samples_other_threads() -> None:
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_thread, args=(stop,), name="busy")
+    thread.start()
+    try:
+        profile = SamplingProfiler(interval=0.001).profile(0.2)
+    finally:
+        stop.set()
+        thread.join()
+
+    assert profile.samples > 1
+    busy = [stack for stack in profile.wall if stack.startswith("busy;")]
+    assert busy
+    assert any("busy_thread" in stack for stack in busy)
+    assert not any("SamplingProfiler._sample" in stack for stack in profile.wall)
+
+
+def test_profile_duration_is_capped() -> None:
+    profiler = SamplingProfiler(interval=0.01, max_duration=0.05)
+
+    start = time.monotonic()
+    profile = profiler.profile(60)
+
+    assert time.monotonic() - start < 5
+    assert profile.duration < 5
+
+
+def test_only_one_profile_runs_at_a_time() -> None:
+    profiler = SamplingProfiler(interval=0.01)
+    done = threading.Event()
+    thread = profiler.profile_in_background(0.5, lambda profile: done.set())
+    time.sleep(0.05)
+
+    with pytest.raises(ProfilerBusyError):
+        profiler.profile(0.01)
+
+    thread.join()
+    assert done.is_set()
+    assert profiler.profile(0.01).samples >= 1
+
+
+def test_folded_output_puts_the_heaviest_stack_first() -> None:
+    profile = Profile(wall={"main;a": 1, "main;b": 3}, cpu={}, samples=4, duration=0.1)
+
+    assert profile.to_folded("wall") == "main;b 3\nmain;a 1\n"
+    assert profile.to_folded("cpu") == ""
+
+
+def test_write_profile_writes_one_file_per_mode(tmp_path: str) -> None:
+    profile = Profile(wall={"main;a": 2}, cpu={"main;a": 150}, samples=2, duration=0.1)
+    directory = os.path.join(tmp_path, "profiles")
+
+    paths = write_profile(profile, directory, "startup")
+
+    assert [os.path.basename(path) for path in paths] == [
+        "startup-wall.folded",
+        "startup-cpu.folded",
+    ]
+    with open(paths[0]) as f:
+        assert f.read() == "main;a 2\n"
+    with open(paths[1]) as f:
+        assert f.read() == "main;a 150\n"
+
+
+def test_profile_route_returns_folded_stacks() -> None:
+    routes = debug_routes(SamplingProfiler(interval=0.01), None)
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_thread, args=(stop,), name="busy")
+    thread.start()
+    try:
+        status, content_type, body = routes["/debug/profile"](
+            {"seconds": "0.05", "mode": "wall"}
+        )
+    finally:
+        stop.set()
+        thread.join()
+
+    assert status == 200
+    assert content_type.startswith("text/plain")
+    lines = body.decode().splitlines()
+    assert all(line.rpartition(" ")[2].isdigit() for line in lines)
+    assert any(line.startswith("busy;") for line in lines)
+
+
+@pytest.mark.parametrize(
+    "query", [{"mode": "heap"}, {"seconds": "0"}, {"seconds": "soon"}]
+)
+def test_profile_route_rejects_bad_queries(query: Dict[str, str]) -> None:
+    routes = debug_routes(SamplingProfiler(), None)
+
+    with pytest.raises(ValueError):
+        routes["/debug/profile"](query)
+
+
+def test_profile_route_conflicts_while_profiling() -> None:
+    profiler = SamplingProfiler(interval=0.01)
+    routes = debug_routes(profiler, None)
+    thread = profiler.profile_in_background(0.5, lambda profile: None)
+    time.sleep(0.05)
+
+    status, _, _ = routes["/debug/profile"]({"seconds": "0.01"})
+
+    thread.join()
+    assert status == 409
+
+
+def test_stage_sampling_route_reads_and_changes_the_rate() -> None:
+    timer = StageTimer(MetricsRegistry(), sample_rate=0.0)
+    routes = debug_routes(SamplingProfiler(), timer)
+
+    _, _, before = routes["/debug/stage-sampling"]({})
+    status, _, after = routes["/debug/stage-sampling"]({"rate": "0.25"})
+
+    assert before == b"0.0\n"
+    assert status == 200
+    assert after == b"0.25\n"
+    assert timer.sample_rate == 0.25
+    with pytest.raises(ValueError):
+        routes["/debug/stage-sampling"]({"rate": "2"})
+    assert timer.sample_rate == 0.25
+
+
+def test_stage_sampling_route_is_missing_without_a_timer() -> None:
+    routes = debug_routes(SamplingProfiler(), None)
+
+    status, _, _ = routes["/debug/stage-sampling"]({})
+
+    assert status == 404
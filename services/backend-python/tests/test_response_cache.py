@@ -0,0 +1,179 @@
+"""ResponseCache bounds and invalidation, and the interceptor serving from it."""
+
+import threading
+from typing import List
+
+import grpc
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.api.example_service import ExampleServiceServicer
+from src.repositories import EncodedUserPage, InMemoryUserRepository
+from src.utils.response_cache import ENTRY_OVERHEAD, ResponseCache
+from tests.conftest import ServeFn
+
+GET = "/example.ExampleService/GetUser"
+LIST = "/example.ExampleService/ListUsers"
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_hits_misses_and_expiry() -> None:
+    clock = FakeClock()
+    cache = ResponseCache(ttl=5.0, clock=clock)
+
+    assert cache.get(GET, b"1") is None
+    cache.put(GET, b"1", b"ada", cache.generation(GET))
+    assert cache.get(GET, b"1") == b"ada"
+    # Keyed by method as well as request
+    assert cache.get(LIST, b"1") is None
+
+    clock.now = 5.0
+    assert cache.get(GET, b"1") is None
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.expirations) == (1, 3, 1)
+    assert stats.entries == 0 and stats.size_bytes == 0
+
+
+def test_least_recently_used_entries_are_evicted_past_max_bytes() -> None:
+    entry = 1 + 3 + ENTRY_OVERHEAD
+    cache = ResponseCache(max_bytes=2 * entry)
+    for request in (b"1", b"2"):
+        cache.put(GET, request, b"abc", 0)
+    cache.get(GET, b"1")
+
+    cache.put(GET, b"3", b"abc", 0)
+
+    assert cache.get(GET, b"2") is None
+    assert cache.get(GET, b"1") == cache.get(GET, b"3") == b"abc"
+    assert cache.stats().evictions == 1
+    assert cache.stats().size_bytes == 2 * entry
+
+
+def test_responses_larger_than_the_cache_are_not_stored() -> None:
+    cache = ResponseCache(max_bytes=ENTRY_OVERHEAD + 10)
+
+    cache.put(GET, b"1", b"x" * 10, 0)
+
+    assert cache.get(GET, b"1") is None
+
+
+def test_replacing_an_entry_keeps_the_size_right() -> None:
+    cache = ResponseCache()
+    cache.put(GET, b"1", b"short", 0)
+    cache.put(GET, b"1", b"longer response", 0)
+
+    assert cache.get(GET, b"1") == b"longer response"
+    assert cache.stats().size_bytes == 1 + 15 + ENTRY_OVERHEAD
+
+
+def test_invalidate_drops_one_method_and_rejects_older_responses() -> None:
+    cache = ResponseCache()
+    cache.put(GET, b"1", b"user", 0)
+    cache.put(LIST, b"page", b"old", 0)
+    before = cache.generation(LIST)
+
+    assert cache.invalidate(LIST) == 1
+
+    assert cache.get(GET, b"1") == b"user"
+    assert cache.get(LIST, b"page") is None
+    # A response computed before the invalidation is stale
+    cache.put(LIST, b"page", b"stale", before)
+    assert cache.get(LIST, b"page") is None
+    cache.put(LIST, b"page", b"new", cache.generation(LIST))
+    assert cache.get(LIST, b"page") == b"new"
+    assert cache.stats().invalidations == 1
+
+
+class HeldRepository(InMemoryUserRepository):
+    """Holds the next page read after building it, until released."""
+
+    # Run on the aio servicer's executor, not the event loop it holds up
+    blocking = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.hold = False
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def page_encoded(self, offset: int, limit: int) -> EncodedUserPage:
+        page = super().page_encoded(offset, limit)
+        if self.hold:
+            self.hold = False
+            self.reading.set()
+            assert self.release.wait(10)
+        return page
+
+
+def list_users(stub: object) -> List[int]:
+    response = stub.ListUsers(  # type: ignore[attr-defined]
+        example_service_pb2.ListUsersRequest(page=1, page_size=10), timeout=10
+    )
+    return [user.id for user in response.users]
+
+
+def test_reads_are_cached_until_a_write_invalidates_them(serve: ServeFn) -> None:
+    cache = ResponseCache()
+    repository = InMemoryUserRepository()
+    stub = serve(ExampleServiceServicer(repository, watch_users=False), cache)
+    ada = repository.create("Ada", "ada@example.com")
+
+    assert list_users(stub) == [ada.id]
+    # Writes that bypass the service are not seen until the entry expires
+    repository.create("Hidden", "hidden@example.com")
+    assert list_users(stub) == [ada.id]
+    assert cache.stats().hits == 1
+
+    created = stub.CreateUser(
+        example_service_pb2.CreateUserRequest(name="Bob", email="bob@example.com"),
+        timeout=10,
+    ).user
+
+    assert list_users(stub)[-1] == created.id
+
+
+def test_a_read_racing_a_write_is_not_cached(serve: ServeFn) -> None:
+    cache = ResponseCache()
+    repository = HeldRepository()
+    stub = serve(ExampleServiceServicer(repository, watch_users=False), cache)
+    ada = repository.create("Ada", "ada@example.com")
+    repository.hold = True
+    stale: List[List[int]] = []
+    reader = threading.Thread(target=lambda: stale.append(list_users(stub)))
+    reader.start()
+    assert repository.reading.wait(10)
+
+    created = stub.CreateUser(
+        example_service_pb2.CreateUserRequest(name="Bob", email="bob@example.com"),
+        timeout=10,
+    ).user
+    repository.release.set()
+    reader.join()
+
+    # The read started before the write, so it may miss it, but what it
+    # saw must not be served to reads after the write
+    assert stale == [[ada.id]]
+    assert list_users(stub) == [ada.id, created.id]
+
+
+def test_failed_calls_are_not_cached(serve: ServeFn) -> None:
+    cache = ResponseCache()
+    stub = serve(ExampleServiceServicer(InMemoryUserRepository()), cache)
+
+    for _ in range(2):
+        with pytest.raises(grpc.RpcError) as error:
+            stub.GetUser(example_service_pb2.GetUserRequest(user_id=404), timeout=10)
+        assert error.value.code() == grpc.StatusCode.NOT_FOUND
+
+    assert cache.stats().entries == 0
@@ -0,0 +1,142 @@
+"""Search in the in-process stores, with indexes built up front or on demand."""
+
+from typing import Callable, Iterable, List
+
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.api.example_service import ExampleServiceServicer
+from src.repositories import (
+    ColumnarUserRepository,
+    InMemoryUserRepository,
+    ShardedUserRepository,
+    UserRepository,
+)
+from src.repositories.search import UserIndexes, UserQuery
+from tests.conftest import ServeFn
+
+StoreFn = Callable[[bool], UserRepository]
+
+STORES: List[StoreFn] = [
+    InMemoryUserRepository,
+    lambda search_indexes: ShardedUserRepository(4, 2, search_indexes),
+    ColumnarUserRepository,
+]
+
+
+def fill(repository: UserRepository) -> None:
+    for i, (name, surname, created_at) in enumerate(
+        [
+            ("Ada", "Lovelace", 30),
+            ("Alan", "Turing", 10),
+            ("Alonzo", "Church", 20),
+            ("Grace", "Hopper", 10),
+            ("Adele", "Goldberg", 40),
+        ],
+        start=1,
+    ):
+        repository.add(
+            example_service_pb2.User(
+                id=i,
+                name=name,
+                surname=surname,
+                email=f"{name.lower()}@example.com",
+                created_at=created_at,
+            )
+        )
+
+
+def search_all(repository: UserRepository, query: UserQuery, limit: int) -> List[str]:
+    """Return the names of every match, fetched ``limit`` at a time."""
+    names: List[str] = []
+    page = repository.search(query, limit)
+    names += [user.name for user in page.users]
+    while page.next_cursor is not None:
+        page = repository.search(query, limit, page.next_cursor)
+        names += [user.name for user in page.users]
+    return names
+
+
+@pytest.mark.parametrize("search_indexes", [False, True])
+@pytest.mark.parametrize("store", STORES)
+def test_search_pages_through_matches_in_index_order(
+    store: StoreFn, search_indexes: bool
+) -> None:
+    repository = store(search_indexes)
+    fill(repository)
+
+    assert search_all(repository, UserQuery(name_prefix="A"), 2) == [
+        "Ada",
+        "Adele",
+        "Alan",
+        "Alonzo",
+    ]
+    assert search_all(repository, UserQuery(surname_prefix="T"), 2) == ["Alan"]
+    assert search_all(
+        repository, UserQuery(created_after=10, created_before=30), 1
+    ) == ["Alan", "Grace", "Alonzo"]
+    assert search_all(
+        repository, UserQuery(email="grace@example.com", name_prefix="G"), 1
+    ) == ["Grace"]
+    assert len(search_all(repository, UserQuery(), 2)) == 5
+
+
+@pytest.mark.parametrize("store", STORES)
+def test_writes_after_the_first_search_are_indexed(store: StoreFn) -> None:
+    repository = store(False)
+    fill(repository)
+    assert search_all(repository, UserQuery(name_prefix="B"), 10) == []
+
+    created = repository.create("Barbara", "barbara@example.com", "Liskov")
+    renamed = example_service_pb2.User()
+    renamed.CopyFrom(repository.get(1))
+    renamed.name = "Augusta"
+    repository.add(renamed)
+
+    assert search_all(repository, UserQuery(name_prefix="B"), 10) == [created.name]
+    assert search_all(repository, UserQuery(name_prefix="Ad"), 10) == ["Adele"]
+    assert search_all(repository, UserQuery(name_prefix="Au"), 10) == ["Augusta"]
+
+
+@pytest.mark.parametrize("search_indexes", [False, True])
+@pytest.mark.parametrize("store", STORES)
+def test_indexes_are_built_by_the_first_search_unless_built_up_front(
+    store: StoreFn, search_indexes: bool, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    built: List[int] = []
+    of = UserIndexes.of.__func__  # type: ignore[attr-defined]
+
+    def counted_of(cls: type, users: Iterable[example_service_pb2.User]) -> UserIndexes:
+        built.append(1)
+        indexes: UserIndexes = of(cls, users)
+        return indexes
+
+    monkeypatch.setattr(UserIndexes, "of", classmethod(counted_of))
+    repository = store(search_indexes)
+    fill(repository)
+    assert not built
+
+    repository.search(UserQuery(name_prefix="A"), 1)
+    after_first = len(built)
+    repository.search(UserQuery(name_prefix="A"), 1)
+
+    assert bool(after_first) != search_indexes
+    assert len(built) == after_first
+
+
+def test_search_users_pages_through_the_service(serve: ServeFn) -> None:
+    repository = InMemoryUserRepository()
+    fill(repository)
+    stub = serve(ExampleServiceServicer(repository, watch_users=False))
+    request = example_service_pb2.SearchUsersRequest(name_prefix="A", page_size=3)
+
+    first = stub.SearchUsers(request, timeout=10)
+    request.page_token = first.next_page_token
+    second = stub.SearchUsers(request, timeout=10)
+
+    assert [user.name for user in first.users] == ["Ada", "Adele", "Alan"]
+    assert [user.name for user in second.users] == ["Alonzo"]
+    assert second.next_page_token == ""
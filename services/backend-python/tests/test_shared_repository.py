@@ -0,0 +1,131 @@
+"""SharedUserRepository against a real store process, with and without a copy."""
+
+import os
+import threading
+from typing import Callable, Iterator, List, Optional
+
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.repositories import (
+    ColumnarUserRepository,
+    EmailAlreadyExistsError,
+    InMemoryUserRepository,
+    UserChangeFeed,
+    UserRepository,
+)
+from src.repositories.search import UserQuery
+from src.repositories.shared import (
+    SharedUserRepository,
+    UserStoreManager,
+    start_user_store,
+)
+from src.utils.change_feed import ChangeFeed
+
+ConnectFn = Callable[..., SharedUserRepository]
+
+
+@pytest.fixture
+def connect() -> Iterator[ConnectFn]:
+    """Start a store process; return a function connecting workers to it."""
+    stores: List[UserStoreManager] = []
+    workers: List[SharedUserRepository] = []
+    authkey = os.urandom(16)
+
+    def connect_worker(
+        replica: Optional[Callable[[], UserRepository]] = None, capacity: int = 10000
+    ) -> SharedUserRepository:
+        if not stores:
+            stores.append(start_user_store(authkey, capacity=capacity))
+        store = stores[0]
+        worker = SharedUserRepository(store.address, authkey, store.published, replica)
+        workers.append(worker)
+        return worker
+
+    yield connect_worker
+    for worker in workers:
+        worker.close()
+    for store in stores:
+        store.shutdown()
+
+
+@pytest.mark.parametrize(
+    "replica", [None, InMemoryUserRepository, ColumnarUserRepository]
+)
+def test_reads_see_writes_of_every_worker_at_once(
+    connect: ConnectFn, replica: Optional[Callable[[], UserRepository]]
+) -> None:
+    writer = connect()
+    reader = connect(replica)
+    # The store starts out with the demo users
+    seeded = len(writer)
+    assert seeded > 0 and len(reader) == seeded
+
+    created = writer.create("Ada", "ada@example.com", "Lovelace")
+    batch = writer.create_many([("B", "b@example.com", ""), ("C", "c@example.com", "")])
+
+    assert reader.get(created.id) == created
+    assert reader.get_encoded(created.id) == created.SerializeToString()
+    assert reader.get_by_email("c@example.com") == batch[1]
+    assert set(reader.get_many([created.id, 10**9])) == {created.id}
+    assert len(reader) == seeded + 3
+    assert reader.page_after(created.id - 1, 10).users == [created, *batch]
+    assert reader.page_after_encoded(created.id, 10).users == [
+        user.SerializeToString() for user in batch if user is not None
+    ]
+    assert reader.page(seeded, 10).users == [created, *batch]
+    assert reader.search(UserQuery(surname_prefix="Love"), 10).users == [created]
+
+
+def test_replaced_users_are_replaced_in_the_copy(connect: ConnectFn) -> None:
+    writer = connect()
+    reader = connect(InMemoryUserRepository)
+    user = writer.create("Ada", "ada@example.com")
+
+    renamed = example_service_pb2.User()
+    renamed.CopyFrom(user)
+    renamed.name = "Augusta"
+    renamed.email = "augusta@example.com"
+    writer.add(renamed)
+
+    assert reader.get(user.id) == renamed
+    assert reader.get_by_email("ada@example.com") is None
+    with pytest.raises(EmailAlreadyExistsError):
+        writer.create("Other", "augusta@example.com")
+
+
+def test_copy_reloads_when_the_store_feed_overflows(connect: ConnectFn) -> None:
+    # The store keeps only the last two changes for workers to pull
+    writer = connect(capacity=2)
+    reader = connect(InMemoryUserRepository)
+    seeded = len(reader)
+
+    created = writer.create_many([("User", f"u{i}@example.com", "") for i in range(5)])
+
+    assert len(reader) == seeded + 5
+    assert reader.get_many(user.id for user in created if user is not None).keys() == {
+        user.id for user in created if user is not None
+    }
+
+
+def test_feed_of_a_worker_with_a_copy_continues_the_store_numbering(
+    connect: ConnectFn,
+) -> None:
+    writer = connect()
+    writer.create("Before", "before@example.com")
+    reader = connect(InMemoryUserRepository)
+    feed: UserChangeFeed = ChangeFeed()
+    assert reader.publish_to(feed)
+    arrived = threading.Event()
+    subscription = feed.subscribe(arrived.set)
+
+    user = writer.create("After", "after@example.com")
+
+    assert arrived.wait(10)
+    ((sequence, (_, data)),) = subscription.drain(10)
+    assert sequence == 2
+    assert example_service_pb2.User.FromString(data) == user
+    assert reader.get(user.id) == user
@@ -0,0 +1,57 @@
+"""SortedIndex against a plain sorted list, across chunk splits and merges."""
+
+import random
+from typing import List
+
+from src.repositories.sorted_index import SortedIndex
+
+
+def check(index: SortedIndex, expected: List[int]) -> None:
+    assert list(index) == expected
+    assert len(index) == len(expected)
+    for start in range(0, len(expected) + 2, 3):
+        assert list(index.islice(start, start + 5)) == expected[start : start + 5]
+    for key in range(-1, 202, 7):
+        assert (key in index) == (key in expected)
+        assert list(index.irange(key)) == [k for k in expected if k >= key]
+        assert list(index.irange(key, inclusive=False)) == [
+            k for k in expected if k > key
+        ]
+        assert index.bisect_left(key) == sum(k < key for k in expected)
+        assert index.bisect_right(key) == sum(k <= key for k in expected)
+
+
+def test_random_adds_and_discards_match_a_sorted_list() -> None:
+    rng = random.Random(7)
+    # A small load splits chunks after a handful of keys
+    index = SortedIndex(load=2)
+    expected: List[int] = []
+
+    for _ in range(300):
+        key = rng.randrange(200)
+        if rng.random() < 0.6:
+            index.add(key)
+            if key not in expected:
+                expected.append(key)
+                expected.sort()
+        else:
+            index.discard(key)
+            if key in expected:
+                expected.remove(key)
+        check(index, expected)
+
+
+def test_appends_and_draining_to_empty() -> None:
+    index = SortedIndex(load=2)
+    for key in range(20):
+        index.add(key)
+    index.add(5)
+    check(index, list(range(20)))
+
+    for key in range(20):
+        index.discard(key)
+    check(index, [])
+    assert list(index.islice()) == []
+
+    index.add(3)
+    check(index, [3])
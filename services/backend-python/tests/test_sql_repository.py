@@ -0,0 +1,331 @@
+"""SqlUserRepository against an in-memory and a file-backed SQLite database."""
+
+from pathlib import Path
+from typing import Iterator, List
+
+import grpc
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from proto_generated import example_service_pb2
+from src.api.example_service import ExampleServiceServicer
+from src.repositories import DatabaseError, EmailAlreadyExistsError
+from src.repositories.search import UserQuery
+from src.repositories.sql import (
+    COUNT_TTL,
+    CREATE_MANY_ATTEMPTS,
+    SqlUserRepository,
+    create_user_engine,
+)
+from tests.conftest import ServeFn
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture(params=["memory", "file"])
+def repository(
+    request: pytest.FixtureRequest, tmp_path: Path
+) -> Iterator[SqlUserRepository]:
+    if request.param == "memory":
+        url = "sqlite://"
+    else:
+        url = f"sqlite:///{tmp_path / 'users.db'}"
+    repository = SqlUserRepository.from_url(url, pool_size=2)
+    yield repository
+    repository.close()
+
+
+@pytest.fixture
+def unreachable(tmp_path: Path) -> Iterator[SqlUserRepository]:
+    """A repository whose database file cannot be opened."""
+    engine = create_user_engine(f"sqlite:///{tmp_path / 'missing' / 'users.db'}")
+    repository = SqlUserRepository(engine, create_schema=False)
+    yield repository
+    repository.close()
+
+
+def always_contended(
+    repository: SqlUserRepository, monkeypatch: pytest.MonkeyPatch
+) -> List[int]:
+    """Make every create_many attempt lose an email to another writer."""
+    attempts: List[int] = []
+
+    def create_many(entries: object) -> None:
+        attempts.append(1)
+        raise IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed"))
+
+    monkeypatch.setattr(repository, "_create_many", create_many)
+    return attempts
+
+
+def seed(repository: SqlUserRepository, count: int) -> List[int]:
+    created = repository.create_many(
+        [(f"User {i}", f"u{i}@example.com", "") for i in range(count)]
+    )
+    return [user.id for user in created if user is not None]
+
+
+def test_create_assigns_ids_and_round_trips(repository: SqlUserRepository) -> None:
+    first = repository.create("Ada", "ada@example.com", "Lovelace")
+    second = repository.create("Alan", "alan@example.com")
+
+    assert second.id > first.id
+    assert repository.get(first.id) == first
+    assert repository.get_by_email("alan@example.com") == second
+    assert repository.get(second.id + 1) is None
+    assert repository.get_many([first.id, 999]) == {first.id: first}
+    assert len(repository) == 2
+
+
+def test_create_with_a_taken_email_raises(repository: SqlUserRepository) -> None:
+    repository.create("Ada", "ada@example.com")
+
+    with pytest.raises(EmailAlreadyExistsError):
+        repository.create("Other", "ada@example.com")
+    assert len(repository) == 1
+
+
+def test_create_many_skips_duplicates_in_the_batch_and_stored(
+    repository: SqlUserRepository,
+) -> None:
+    stored = repository.create("Ada", "ada@example.com")
+
+    created = repository.create_many(
+        [
+            ("One", "one@example.com", ""),
+            ("Again", "one@example.com", ""),
+            ("Ada", "ada@example.com", ""),
+            ("Two", "two@example.com", "S"),
+        ]
+    )
+
+    assert [user is not None for user in created] == [True, False, False, True]
+    one, two = created[0], created[3]
+    assert one is not None and two is not None
+    assert stored.id < one.id < two.id
+    assert repository.get(two.id) == two
+    assert repository.create_many([]) == []
+    assert len(repository) == 3
+
+
+def test_page_boundaries(repository: SqlUserRepository) -> None:
+    ids = seed(repository, 25)
+
+    first = repository.page(0, 10)
+    assert [user.id for user in first.users] == ids[:10]
+    assert first.total_count == 25 and first.next_after_id == ids[9]
+
+    last = repository.page(20, 10)
+    assert [user.id for user in last.users] == ids[20:]
+    assert last.next_after_id is None
+
+    # A page that ends exactly at the last user has nothing after it
+    exact = repository.page(15, 10)
+    assert [user.id for user in exact.users] == ids[15:]
+    assert exact.next_after_id is None
+    assert repository.page(25, 10).users == []
+
+
+def test_page_after_boundaries(repository: SqlUserRepository) -> None:
+    ids = seed(repository, 25)
+
+    middle = repository.page_after(ids[9], 10)
+    assert [user.id for user in middle.users] == ids[10:20]
+    assert middle.total_count == 25 and middle.next_after_id == ids[19]
+
+    exact = repository.page_after(ids[14], 10)
+    assert [user.id for user in exact.users] == ids[15:]
+    assert exact.next_after_id is None
+    assert repository.page_after(ids[-1], 10).users == []
+    assert repository.page_after_encoded(ids[9], 10).users == [
+        user.SerializeToString() for user in middle.users
+    ]
+
+
+def test_scan_reads_every_user_without_counting(
+    repository: SqlUserRepository,
+) -> None:
+    ids = seed(repository, 25)
+    statements: List[str] = []
+    event.listen(
+        repository._engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    chunks = list(repository.scan(ids[2], 10))
+
+    assert [[user.id for user in users] for users in chunks] == [
+        ids[3:13],
+        ids[13:23],
+        ids[23:],
+    ]
+    assert len(statements) == 3
+    assert not any("count(" in statement.lower() for statement in statements)
+    # A scan that ends on a full chunk reads one more, empty one
+    assert [len(users) for users in repository.scan(ids[4], 10)] == [10, 10]
+
+
+def test_pages_count_the_table_once_per_ttl() -> None:
+    clock = FakeClock()
+    engine = create_user_engine("sqlite://")
+    repository = SqlUserRepository(engine, clock=clock)
+    other_process = SqlUserRepository(engine, create_schema=False)
+    ids = seed(repository, 25)
+    counts: List[str] = []
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: (
+            counts.append(statement) if "count(" in statement.lower() else None
+        ),
+    )
+
+    totals = [repository.page(0, 10).total_count]
+    totals.append(repository.page_after(ids[9], 10).total_count)
+    repository.create("Ada", "ada@example.com")
+    repository.create_many(
+        [("Bob", "bob@example.com", ""), ("Ada", "ada@example.com", "")]
+    )
+    repository.add(example_service_pb2.User(id=999, email="new@example.com"))
+    # Replacing a user adds none
+    repository.add(example_service_pb2.User(id=999, email="renamed@example.com"))
+    other_process.create("Eve", "eve@example.com")
+    totals.append(repository.page_after(ids[19], 10).total_count)
+    clock.now = COUNT_TTL
+    totals.append(repository.page(0, 10).total_count)
+
+    assert totals == [25, 25, 28, 29]
+    assert len(counts) == 2
+    repository.close()
+
+
+def test_search_cursors_resume_in_index_order(repository: SqlUserRepository) -> None:
+    for name in ["Carol", "alice", "Bob", "Alice", "Alfred", "Bea"]:
+        repository.create(name, f"{name.lower()}{len(repository)}@example.com")
+    query = UserQuery(name_prefix="Al")
+
+    first = repository.search(query, 1)
+    assert [user.name for user in first.users] == ["Alfred"]
+    assert first.next_cursor is not None
+    second = repository.search(query, 1, first.next_cursor)
+    assert [user.name for user in second.users] == ["Alice"]
+    assert second.next_cursor is None
+
+    by_id = repository.search(UserQuery(), 4)
+    assert [user.name for user in by_id.users] == ["Carol", "alice", "Bob", "Alice"]
+    assert by_id.next_cursor is not None
+    rest = repository.search(UserQuery(), 4, by_id.next_cursor)
+    assert [user.name for user in rest.users] == ["Alfred", "Bea"]
+
+
+def test_add_and_restore_keep_ids(repository: SqlUserRepository) -> None:
+    user = example_service_pb2.User(
+        id=42, name="Kept", email="kept@example.com", created_at=1, updated_at=2
+    )
+    repository.add(user)
+    assert repository.get(42) == user
+
+    replaced = example_service_pb2.User(
+        id=42, name="Renamed", email="renamed@example.com", created_at=1, updated_at=3
+    )
+    repository.add(replaced)
+    assert repository.get(42) == replaced
+    assert repository.get_by_email("kept@example.com") is None
+
+    with pytest.raises(EmailAlreadyExistsError):
+        repository.add(
+            example_service_pb2.User(id=7, name="Clash", email="renamed@example.com")
+        )
+
+    skipped = repository.restore(
+        [
+            example_service_pb2.User(id=10, name="Ten", email="ten@example.com"),
+            example_service_pb2.User(id=11, name="Clash", email="ten@example.com"),
+        ]
+    )
+    assert skipped == 1
+    assert [u.id for u in repository.page_after(0, 10).users] == [10, 42]
+    # New users continue after the highest restored ID
+    assert repository.create("Next", "next@example.com").id > 42
+
+
+def test_stream_users_exports_every_user_after_the_start(
+    repository: SqlUserRepository, serve: ServeFn
+) -> None:
+    ids = seed(repository, 2500)
+    stub = serve(ExampleServiceServicer(repository, watch_users=False))
+
+    responses = stub.StreamUsers(
+        example_service_pb2.StreamUsersRequest(after_id=ids[0], batch_size=700),
+        timeout=30,
+    )
+
+    assert [user.id for response in responses for user in response.users] == ids[1:]
+
+
+def test_create_many_gives_up_after_its_attempts(
+    repository: SqlUserRepository, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    attempts = always_contended(repository, monkeypatch)
+
+    with pytest.raises(DatabaseError):
+        repository.create_many([("Ada", "ada@example.com", "")])
+    assert len(attempts) == CREATE_MANY_ATTEMPTS
+
+
+def test_database_failures_are_raised_as_database_errors(
+    unreachable: SqlUserRepository,
+) -> None:
+    with pytest.raises(DatabaseError):
+        unreachable.get(1)
+    with pytest.raises(DatabaseError):
+        unreachable.create("Ada", "ada@example.com")
+    with pytest.raises(DatabaseError):
+        list(unreachable.scan(0, 10))
+
+
+def test_bulk_create_is_unavailable_once_attempts_run_out(
+    repository: SqlUserRepository, serve: ServeFn, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    always_contended(repository, monkeypatch)
+    stub = serve(ExampleServiceServicer(repository, watch_users=False))
+    request = example_service_pb2.CreateUserRequest(name="Ada", email="ada@example.com")
+
+    with pytest.raises(grpc.RpcError) as error:
+        stub.BulkCreateUsers(iter([request]), timeout=10)
+
+    assert error.value.code() == grpc.StatusCode.UNAVAILABLE
+
+
+def test_reads_are_unavailable_without_the_database(
+    unreachable: SqlUserRepository, serve: ServeFn
+) -> None:
+    stub = serve(ExampleServiceServicer(unreachable, watch_users=False))
+    calls = [
+        lambda: stub.GetUser(example_service_pb2.GetUserRequest(user_id=1), timeout=10),
+        lambda: stub.ListUsers(
+            example_service_pb2.ListUsersRequest(page=1, page_size=10), timeout=10
+        ),
+        lambda: stub.BatchGetUsers(
+            example_service_pb2.BatchGetUsersRequest(ids=[1]), timeout=10
+        ),
+        lambda: stub.SearchUsers(
+            example_service_pb2.SearchUsersRequest(name_prefix="A"), timeout=10
+        ),
+        lambda: list(
+            stub.StreamUsers(example_service_pb2.StreamUsersRequest(), timeout=10)
+        ),
+    ]
+
+    for call in calls:
+        with pytest.raises(grpc.RpcError) as error:
+            call()
+        assert error.value.code() == grpc.StatusCode.UNAVAILABLE
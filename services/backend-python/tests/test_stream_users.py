@@ -0,0 +1,123 @@
+"""StreamUsers: filters, batching and scanning one chunk at a time."""
+
+from typing import Iterator, List
+
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.api import example_service
+from src.api.example_service import ExampleServiceServicer
+from src.repositories import InMemoryUserRepository
+from tests.conftest import ServeFn
+
+
+def make_servicer(users: int) -> ExampleServiceServicer:
+    repository = InMemoryUserRepository()
+    for user_id in range(1, users + 1):
+        repository.add(
+            example_service_pb2.User(
+                id=user_id,
+                name="Even" if user_id % 2 == 0 else "Odd",
+                email=f"u{user_id}@{'Example.com' if user_id % 3 else 'other.org'}",
+                created_at=user_id * 10,
+            )
+        )
+    return ExampleServiceServicer(repository, watch_users=False)
+
+
+def streamed_ids(
+    responses: Iterator[example_service_pb2.StreamUsersResponse],
+) -> List[int]:
+    return [user.id for response in responses for user in response.users]
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ({}, list(range(1, 13))),
+        ({"after_id": 9}, [10, 11, 12]),
+        ({"name_prefix": "Ev"}, list(range(2, 13, 2))),
+        # Domains match case-insensitively
+        ({"email_domain": "example.COM"}, [1, 2, 4, 5, 7, 8, 10, 11]),
+        ({"created_after": 50, "created_before": 80}, [5, 6, 7]),
+        ({"name_prefix": "Odd", "email_domain": "other.org"}, [3, 9]),
+    ],
+)
+def test_filters_select_users_in_id_order(
+    serve: ServeFn, filters: dict, expected: List[int]
+) -> None:
+    stub = serve(make_servicer(12))
+
+    responses = stub.StreamUsers(
+        example_service_pb2.StreamUsersRequest(**filters), timeout=10
+    )
+
+    assert streamed_ids(responses) == expected
+
+
+def test_batches_hold_batch_size_users_across_scan_chunks(
+    serve: ServeFn, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(example_service, "STREAM_SCAN_CHUNK_SIZE", 4)
+    stub = serve(make_servicer(12))
+
+    responses = list(
+        stub.StreamUsers(
+            example_service_pb2.StreamUsersRequest(batch_size=5), timeout=10
+        )
+    )
+
+    assert [len(response.users) for response in responses] == [5, 5, 2]
+    assert streamed_ids(iter(responses)) == list(range(1, 13))
+
+
+def test_the_scan_advances_only_as_batches_are_taken(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(example_service, "STREAM_SCAN_CHUNK_SIZE", 2)
+    servicer = make_servicer(12)
+    scanned: List[int] = []
+    scan = servicer.repository.scan
+
+    def recording_scan(
+        after_id: int, chunk_size: int
+    ) -> Iterator[List[example_service_pb2.User]]:
+        for users in scan(after_id, chunk_size):
+            scanned.extend(user.id for user in users)
+            yield users
+
+    monkeypatch.setattr(servicer.repository, "scan", recording_scan)
+    batches = servicer.stream_user_batches(
+        example_service_pb2.StreamUsersRequest(batch_size=3)
+    )
+
+    first = next(batch for batch in batches if batch is not None)
+
+    assert [user.id for user in first.users] == [1, 2, 3]
+    assert scanned == [1, 2, 3, 4]
+
+
+def test_the_scan_hands_back_control_after_every_chunk(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(example_service, "STREAM_SCAN_CHUNK_SIZE", 4)
+    servicer = make_servicer(12)
+
+    batches = servicer.stream_user_batches(
+        example_service_pb2.StreamUsersRequest(name_prefix="Nobody")
+    )
+
+    assert list(batches) == [None, None, None]
+
+
+def test_no_matches_stream_nothing(serve: ServeFn) -> None:
+    stub = serve(make_servicer(3))
+
+    responses = stub.StreamUsers(
+        example_service_pb2.StreamUsersRequest(name_prefix="Nobody"), timeout=10
+    )
+
+    assert list(responses) == []
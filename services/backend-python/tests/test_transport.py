@@ -0,0 +1,128 @@
+"""Transport presets, their command-line overrides and response compression."""
+
+from typing import Any, List
+
+import grpc
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.config import ServerConfig
+from src.interceptors.compression_interceptor import CompressionInterceptor
+from src.main import server_options
+from src.transport import TRANSPORT_PRESETS, TransportSettings, resolve_transport
+from tests.conftest import ServeFn
+
+
+class CompressionContext:
+    """Records the compression a behavior asks for."""
+
+    def __init__(self) -> None:
+        self.compression: List[grpc.Compression] = []
+
+    def set_compression(self, compression: grpc.Compression) -> None:
+        self.compression.append(compression)
+
+
+def unary_handler() -> grpc.RpcMethodHandler:
+    return grpc.unary_unary_rpc_method_handler(lambda request, context: request)
+
+
+def test_only_listed_methods_are_compressed() -> None:
+    gzip = TransportSettings(compression="gzip", compressed_methods=("ListUsers",))
+    everything = TransportSettings(compression="gzip", compressed_methods=("*",))
+
+    assert gzip.compressed("ListUsers")
+    assert not gzip.compressed("GetUser")
+    assert everything.compressed("GetUser")
+    assert not TransportSettings(compression="none").compressed("ListUsers")
+
+
+def test_default_preset_only_sets_bdp_probing() -> None:
+    assert TRANSPORT_PRESETS["default"].channel_options() == [
+        ("grpc.http2.bdp_probe", 1)
+    ]
+
+
+def test_wan_preset_channel_options() -> None:
+    options = dict(TRANSPORT_PRESETS["wan"].channel_options())
+
+    assert options["grpc.keepalive_time_ms"] == 30_000
+    assert options["grpc.keepalive_permit_without_calls"] == 1
+    assert options["grpc.keepalive_timeout_ms"] == 10_000
+    assert options["grpc.http2.min_ping_interval_without_data_ms"] == 10_000
+    assert options["grpc.max_concurrent_streams"] == 1000
+    assert options["grpc.max_receive_message_length"] == 16 * 1024 * 1024
+    assert options["grpc.max_send_message_length"] == 16 * 1024 * 1024
+    assert options["grpc.http2.lookahead_bytes"] == 1024 * 1024
+
+
+def test_overrides_replace_preset_values_unless_none() -> None:
+    settings = resolve_transport("lan", compression="deflate", keepalive_time_ms=None)
+
+    assert settings.compression == "deflate"
+    assert settings.keepalive_time_ms == TRANSPORT_PRESETS["lan"].keepalive_time_ms
+
+
+def test_flags_override_the_preset() -> None:
+    config = ServerConfig.from_args(
+        [
+            "--transport-preset",
+            "wan",
+            "--compression",
+            "deflate",
+            "--compressed-methods",
+            "GetUser, ListUsers,",
+            "--keepalive-time",
+            "1.5",
+            "--no-bdp-probe",
+        ]
+    )
+
+    settings = config.transport()
+
+    assert settings.compression == "deflate"
+    assert settings.compressed_methods == ("GetUser", "ListUsers")
+    assert settings.keepalive_time_ms == 1500
+    assert settings.keepalive_timeout_ms == 10_000
+    assert not settings.bdp_probe
+    assert ("grpc.http2.bdp_probe", 0) in server_options(config)
+
+
+def test_negative_transport_flags_are_rejected() -> None:
+    with pytest.raises(SystemExit):
+        ServerConfig.from_args(["--keepalive-time", "-1"])
+
+
+def test_interceptor_compresses_listed_methods_only() -> None:
+    interceptor = CompressionInterceptor(
+        TransportSettings(compression="gzip", compressed_methods=("ListUsers",))
+    )
+    handler = unary_handler()
+    list_users = interceptor.wrap_handler("/example.ExampleService/ListUsers", handler)
+    get_user = interceptor.wrap_handler("/example.ExampleService/GetUser", handler)
+    context = CompressionContext()
+
+    response: Any = list_users.unary_unary("request", context)
+
+    assert response == "request"
+    assert context.compression == [grpc.Compression.Gzip]
+    assert get_user is handler
+
+
+@pytest.mark.parametrize("preset", ["lan", "wan"])
+def test_server_answers_with_each_preset(serve: ServeFn, preset: str) -> None:
+    stub = serve(transport_preset=preset, compressed_methods="*")
+
+    page = stub.ListUsers(
+        example_service_pb2.ListUsersRequest(page=1, page_size=10), timeout=10
+    )
+    user = stub.GetUser(example_service_pb2.GetUserRequest(user_id=1), timeout=10)
+    streamed = list(
+        stub.StreamUsers(example_service_pb2.StreamUsersRequest(), timeout=10)
+    )
+
+    assert page.users and user.user.id == 1
+    assert sum(len(batch.users) for batch in streamed) == page.total_count
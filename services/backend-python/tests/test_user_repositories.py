@@ -0,0 +1,332 @@
+"""Behaviour every in-process user store shares, checked against each one."""
+
+import threading
+import zlib
+from typing import Callable, List
+
+import grpc
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2
+from src.api.example_service import ExampleServiceServicer
+from src.repositories import (
+    ColumnarUserRepository,
+    EmailAlreadyExistsError,
+    InMemoryUserRepository,
+    ShardedUserRepository,
+    UserRepository,
+)
+from tests.conftest import ServeFn
+
+StoreFn = Callable[[], UserRepository]
+
+STORES: List[StoreFn] = [
+    InMemoryUserRepository,
+    # Small blocks, so a few users already span every shard
+    lambda: ShardedUserRepository(shards=4, block_size=2),
+    ColumnarUserRepository,
+]
+
+
+@pytest.fixture(params=STORES)
+def repository(request: pytest.FixtureRequest) -> UserRepository:
+    repository: UserRepository = request.param()
+    return repository
+
+
+def make_user(user_id: int, name: str = "User") -> example_service_pb2.User:
+    return example_service_pb2.User(
+        id=user_id, name=name, email=f"u{user_id}@example.com", created_at=user_id
+    )
+
+
+def test_create_assigns_new_ids_and_indexes_the_email(
+    repository: UserRepository,
+) -> None:
+    ada = repository.create("Ada", "ada@example.com", "Lovelace")
+    alan = repository.create("Alan", "alan@example.com")
+
+    assert ada.id != alan.id
+    assert ada.created_at > 0 and ada.updated_at == ada.created_at
+    assert repository.get(ada.id) == ada
+    assert repository.get_by_email("alan@example.com") == alan
+    assert repository.get_encoded(ada.id) == ada.SerializeToString()
+    assert repository.get(10**6) is None and repository.get_encoded(10**6) is None
+    assert repository.get_by_email("nobody@example.com") is None
+    assert len(repository) == 2
+
+
+def test_create_rejects_a_taken_email(repository: UserRepository) -> None:
+    repository.create("Ada", "ada@example.com")
+
+    with pytest.raises(EmailAlreadyExistsError):
+        repository.create("Other", "ada@example.com")
+    assert len(repository) == 1
+
+
+def test_create_many_skips_taken_and_repeated_emails(
+    repository: UserRepository,
+) -> None:
+    repository.create("Ada", "ada@example.com")
+
+    created = repository.create_many(
+        [
+            ("A", "ada@example.com", ""),
+            ("B", "b@example.com", "Bee"),
+            ("B", "b@example.com", ""),
+        ]
+    )
+
+    assert created[0] is None and created[2] is None
+    assert created[1] is not None and created[1].surname == "Bee"
+    assert repository.get_by_email("b@example.com") == created[1]
+    assert len(repository) == 2
+
+
+def test_add_keeps_ids_and_replaces_the_user_with_the_same_id(
+    repository: UserRepository,
+) -> None:
+    repository.add(make_user(5))
+    repository.add(make_user(2))
+    renamed = make_user(5, "Renamed")
+    renamed.email = "renamed@example.com"
+
+    repository.add(renamed)
+
+    assert repository.get(5) == renamed
+    assert repository.get_encoded(5) == renamed.SerializeToString()
+    assert repository.get_by_email("u5@example.com") is None
+    assert repository.get_by_email("renamed@example.com") == renamed
+    with pytest.raises(EmailAlreadyExistsError):
+        repository.add(example_service_pb2.User(id=9, email="u2@example.com"))
+    # Created users never take a stored ID
+    assert repository.create("Next", "next@example.com").id not in (2, 5)
+    assert len(repository) == 3
+
+
+@pytest.mark.parametrize("store", [InMemoryUserRepository, ColumnarUserRepository])
+def test_ids_continue_after_the_highest_stored_id(store: StoreFn) -> None:
+    repository = store()
+    repository.add(make_user(5))
+
+    assert repository.create("Next", "next@example.com").id == 6
+
+
+def test_restore_skips_users_whose_email_is_taken(repository: UserRepository) -> None:
+    repository.add(make_user(1))
+    clash = make_user(2)
+    clash.email = "u1@example.com"
+
+    assert repository.restore([clash, make_user(3)]) == 1
+    assert repository.get(2) is None and repository.get(3) == make_user(3)
+
+
+def test_get_many_returns_the_users_that_exist(repository: UserRepository) -> None:
+    for user_id in (1, 2, 3):
+        repository.add(make_user(user_id))
+
+    assert repository.get_many([3, 1, 99]) == {1: make_user(1), 3: make_user(3)}
+
+
+def test_pages_by_offset_and_by_id(repository: UserRepository) -> None:
+    for user_id in (4, 1, 3, 2, 5):
+        repository.add(make_user(user_id))
+
+    page = repository.page(1, 2)
+    assert [user.id for user in page.users] == [2, 3]
+    assert page.total_count == 5
+    assert page.next_after_id == 3
+    assert repository.page(4, 2).next_after_id is None
+    assert repository.page(9, 2).users == []
+
+    after = repository.page_after(3, 10)
+    assert [user.id for user in after.users] == [4, 5]
+    assert after.next_after_id is None
+    encoded = repository.page_after_encoded(0, 2)
+    assert encoded.users == [make_user(i).SerializeToString() for i in (1, 2)]
+    assert encoded.next_after_id == 2
+    assert repository.page_encoded(0, 5).users == [
+        make_user(i).SerializeToString() for i in range(1, 6)
+    ]
+
+
+def test_scan_yields_every_user_after_an_id_in_chunks(
+    repository: UserRepository,
+) -> None:
+    for user_id in range(1, 8):
+        repository.add(make_user(user_id))
+
+    chunks = list(repository.scan(2, 2))
+
+    assert [[user.id for user in chunk] for chunk in chunks] == [[3, 4], [5, 6], [7]]
+
+
+def test_concurrent_creates_of_one_email_admit_exactly_one(
+    repository: UserRepository,
+) -> None:
+    results: List[bool] = []
+    start = threading.Barrier(8)
+
+    def create() -> None:
+        start.wait()
+        try:
+            repository.create("Racer", "race@example.com")
+            results.append(True)
+        except EmailAlreadyExistsError:
+            results.append(False)
+
+    threads = [threading.Thread(target=create) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(results) == [False] * 7 + [True]
+    assert len(repository) == 1
+
+
+def test_create_user_with_a_taken_email_already_exists(
+    serve: ServeFn, repository: UserRepository
+) -> None:
+    stub = serve(ExampleServiceServicer(repository, watch_users=False))
+    request = example_service_pb2.CreateUserRequest(name="Ada", email="ada@example.com")
+
+    created = stub.CreateUser(request, timeout=10).user
+    with pytest.raises(grpc.RpcError) as error:
+        stub.CreateUser(request, timeout=10)
+
+    assert error.value.code() == grpc.StatusCode.ALREADY_EXISTS
+    assert repository.get_by_email("ada@example.com") == created
+
+
+def email_in_shard(shard: int, shards: int, taken: int = 0) -> str:
+    """Return the first email numbered from ``taken`` on that hashes to ``shard``."""
+    emails = (f"s{shard}-{i}@example.com" for i in range(taken, 10**6))
+    return next(e for e in emails if zlib.crc32(e.encode()) % shards == shard)
+
+
+def test_sharded_ids_come_from_the_blocks_of_the_email_shard() -> None:
+    repository = ShardedUserRepository(shards=2, block_size=2)
+    shard0 = [email_in_shard(0, 2, i * 1000) for i in range(3)]
+    shard1 = [email_in_shard(1, 2, i * 1000) for i in range(3)]
+
+    ids0 = [repository.create("A", email).id for email in shard0]
+    ids1 = [repository.create("B", email).id for email in shard1]
+
+    # Blocks of two IDs, alternating between the shards
+    assert ids0 == [1, 2, 5]
+    assert ids1 == [3, 4, 7]
+    assert repository.get_by_email(shard1[2]) == repository.get(7)
+
+
+def test_sharded_create_after_add_skips_the_added_id() -> None:
+    repository = ShardedUserRepository(shards=2, block_size=2)
+    # ID 5 is in shard 0's third block
+    repository.add(make_user(5))
+
+    created = repository.create("Next", email_in_shard(0, 2))
+
+    assert created.id == 6
+
+
+def test_sharded_create_many_inserts_each_shard_once() -> None:
+    repository = ShardedUserRepository(shards=4, block_size=2)
+    emails = [f"bulk{i}@example.com" for i in range(20)]
+
+    created = repository.create_many(
+        [("Bulk", email, "") for email in emails + emails[:3]]
+    )
+
+    users = [user for user in created if user is not None]
+    assert len(users) == 20 and created[20:] == [None, None, None]
+    assert len({user.id for user in users}) == 20
+    assert [user.email for user in users] == emails
+    assert [user.id for user in repository.page_after(0, 100).users] == sorted(
+        user.id for user in users
+    )
+
+
+def test_sharded_offset_pages_skip_id_gaps() -> None:
+    repository = ShardedUserRepository(shards=4, block_size=2)
+    ids = [1, 3, 4, 9, 10, 12, 30, 31]
+    for user_id in ids:
+        repository.add(make_user(user_id))
+
+    pages = [
+        [user.id for user in repository.page(offset, 3).users]
+        for offset in range(0, len(ids) + 1)
+    ]
+
+    assert pages == [ids[offset : offset + 3] for offset in range(0, len(ids) + 1)]
+    assert repository.page(3, 3).next_after_id == 12
+    assert repository.page(6, 3).next_after_id is None
+
+
+def test_columnar_email_table_grows_and_finds_every_email() -> None:
+    repository = ColumnarUserRepository()
+
+    users = [repository.create("U", f"user{i}@example.com") for i in range(500)]
+
+    assert all(repository.get_by_email(user.email) == user for user in users)
+    assert repository.get_by_email("user500@example.com") is None
+    with pytest.raises(EmailAlreadyExistsError):
+        repository.create("U", "user250@example.com")
+
+
+def test_columnar_replace_reindexes_every_email() -> None:
+    repository = ColumnarUserRepository()
+    for user_id in range(1, 20):
+        repository.add(make_user(user_id))
+    renamed = make_user(7, "Renamed")
+    renamed.email = "renamed@example.com"
+
+    repository.add(renamed)
+
+    assert repository.get_by_email("u7@example.com") is None
+    assert repository.get_by_email("renamed@example.com") == renamed
+    assert all(
+        repository.get_by_email(f"u{user_id}@example.com") == make_user(user_id)
+        for user_id in range(1, 20)
+        if user_id != 7
+    )
+    # The old email is free again
+    assert repository.create("Seven", "u7@example.com").id == 20
+
+
+def test_columnar_add_below_the_highest_id_inserts_in_order() -> None:
+    repository = ColumnarUserRepository()
+    for user_id in (10, 2, 6, 4):
+        repository.add(make_user(user_id))
+
+    assert [user.id for user in repository.page(0, 10).users] == [2, 4, 6, 10]
+    assert repository.get(6) == make_user(6)
+    assert repository.get_by_email("u4@example.com") == make_user(4)
+
+
+@pytest.mark.parametrize(
+    "user",
+    [
+        # Timestamps of zero are not serialized
+        example_service_pb2.User(id=1, name="Zero", email="zero@example.com"),
+        example_service_pb2.User(
+            id=1,
+            name="Ünï",
+            surname="Çödé",
+            email="ünï@exämple.com",
+            created_at=2**40,
+            updated_at=1,
+        ),
+    ],
+)
+def test_columnar_locates_emails_in_the_serialized_user(
+    user: example_service_pb2.User,
+) -> None:
+    repository = ColumnarUserRepository()
+
+    repository.add(user)
+
+    assert repository.get_by_email(user.email) == user
+    assert repository.get_encoded(user.id) == user.SerializeToString()
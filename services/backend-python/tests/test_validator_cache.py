@@ -0,0 +1,99 @@
+"""ValidatorCache: one compile per message type, none for rule-free types."""
+
+from typing import Any, List
+
+import grpc
+import protovalidate
+import pytest
+
+# Setup protovalidate module aliases BEFORE importing proto files
+from src.utils import protovalidate_setup  # noqa: F401  # isort: split
+
+from proto_generated import example_service_pb2, health_pb2
+from src.api.encoded_responses import EXAMPLE_SERVICE
+from src.utils.validator_cache import (
+    ValidationError,
+    ValidatorCache,
+    has_validation_rules,
+)
+from tests.conftest import ServeFn
+
+
+class CountingValidator:
+    """Delegates to a real validator, counting rule compilations and checks."""
+
+    def __init__(self) -> None:
+        self._validator = protovalidate.Validator()
+        self.compiled: List[str] = []
+        self.validated: List[str] = []
+
+    def collect_violations(self, message: Any) -> Any:
+        self.compiled.append(message.DESCRIPTOR.full_name)
+        return self._validator.collect_violations(message)
+
+    def validate(self, message: Any) -> None:
+        self.validated.append(message.DESCRIPTOR.full_name)
+        self._validator.validate(message)
+
+
+def test_has_validation_rules_follows_fields_and_message_options() -> None:
+    assert has_validation_rules(example_service_pb2.GetUserRequest.DESCRIPTOR)
+    # A message-level CEL rule
+    assert has_validation_rules(example_service_pb2.ListUsersRequest.DESCRIPTOR)
+    # Only through the rules of the User it holds
+    assert has_validation_rules(example_service_pb2.GetUserResponse.DESCRIPTOR)
+    assert not has_validation_rules(health_pb2.HealthCheckRequest.DESCRIPTOR)
+
+
+def test_rules_are_compiled_once_per_type() -> None:
+    validator = CountingValidator()
+    cache = ValidatorCache(validator)  # type: ignore[arg-type]
+
+    for user_id in (1, 2, 3):
+        cache.validate(example_service_pb2.GetUserRequest(user_id=user_id))
+    cache.warm_up(example_service_pb2.GetUserRequest.DESCRIPTOR)
+
+    assert validator.compiled == ["example.GetUserRequest"]
+    assert validator.validated == ["example.GetUserRequest"] * 3
+
+
+def test_rule_free_types_skip_the_validator() -> None:
+    validator = CountingValidator()
+    cache = ValidatorCache(validator)  # type: ignore[arg-type]
+
+    cache.validate(health_pb2.HealthCheckRequest(service="anything"))
+
+    assert validator.compiled == [] and validator.validated == []
+
+
+def test_violations_raise_validation_error() -> None:
+    cache = ValidatorCache()
+
+    cache.validate(example_service_pb2.CreateUserRequest(name="Ada", email="a@b.co"))
+    with pytest.raises(ValidationError):
+        cache.validate(example_service_pb2.CreateUserRequest(name="Ada", email="nope"))
+
+
+def test_warm_up_services_compiles_every_request_type() -> None:
+    validator = CountingValidator()
+    cache = ValidatorCache(validator)  # type: ignore[arg-type]
+
+    cache.warm_up_services([EXAMPLE_SERVICE])
+
+    assert sorted(validator.compiled) == sorted(
+        {
+            method.input_type.full_name
+            for method in EXAMPLE_SERVICE.methods
+            if has_validation_rules(method.input_type)
+        }
+    )
+
+
+def test_invalid_requests_fail_with_invalid_argument(serve: ServeFn) -> None:
+    stub = serve()
+
+    with pytest.raises(grpc.RpcError) as error:
+        stub.GetUser(example_service_pb2.GetUserRequest(user_id=0), timeout=10)
+
+    assert error.value.code() == grpc.StatusCode.INVALID_ARGUMENT
+    assert "Validation failed" in (error.value.details() or "")
@@ -0,0 +1,130 @@
+"""Record files: framing, snapshots and the group-committing write-ahead log."""
+
+import os
+from pathlib import Path
+from typing import List, Union
+
+import pytest
+
+from src.repositories import RepositoryError
+from src.repositories.wal import (
+    SNAPSHOT_MAGIC,
+    WAL_MAGIC,
+    WriteAheadLog,
+    encode_records,
+    read_records,
+    write_snapshot,
+)
+
+
+def stored(path: Union[str, Path], magic: bytes = WAL_MAGIC) -> List[bytes]:
+    """Return the payloads of the record file at ``path``."""
+    return [bytes(payload) for payload in read_records(str(path), magic)]
+
+
+def test_records_round_trip(tmp_path: Path) -> None:
+    path = tmp_path / "records"
+    payloads = [b"first", b"", b"\x00" * 1000]
+    path.write_bytes(WAL_MAGIC + encode_records(payloads))
+
+    assert stored(path) == payloads
+
+
+def test_reading_stops_at_a_damaged_record(tmp_path: Path) -> None:
+    path = tmp_path / "records"
+    damaged = bytearray(encode_records([b"second"]))
+    damaged[-1] ^= 0xFF
+    path.write_bytes(WAL_MAGIC + encode_records([b"first"]) + damaged)
+
+    assert stored(path) == [b"first"]
+
+
+def test_reading_an_empty_file_yields_nothing(tmp_path: Path) -> None:
+    path = tmp_path / "records"
+    path.write_bytes(b"")
+
+    assert list(read_records(str(path), WAL_MAGIC)) == []
+
+
+def test_reading_another_file_kind_fails(tmp_path: Path) -> None:
+    path = tmp_path / "records"
+    path.write_bytes(SNAPSHOT_MAGIC + encode_records([b"user"]))
+
+    with pytest.raises(RepositoryError):
+        list(read_records(str(path), WAL_MAGIC))
+
+
+def test_write_snapshot_replaces_the_file(tmp_path: Path) -> None:
+    path = str(tmp_path / "snapshot")
+    write_snapshot(path, [b"old"])
+
+    write_snapshot(path, [b"a", b"b"])
+
+    assert stored(path, SNAPSHOT_MAGIC) == [b"a", b"b"]
+    assert os.listdir(tmp_path) == ["snapshot"]
+
+
+def test_appended_records_are_durable_after_wait(tmp_path: Path) -> None:
+    path = str(tmp_path / "wal")
+    log = WriteAheadLog(path)
+
+    first = log.append(encode_records([b"one"]))
+    second = log.append(encode_records([b"two", b"three"]))
+    log.wait(second)
+
+    assert (first, second, log.appended) == (1, 2, 2)
+    assert log.size == os.path.getsize(path)
+    assert stored(path) == [b"one", b"two", b"three"]
+    log.close()
+
+
+def test_a_log_never_overwrites_an_existing_file(tmp_path: Path) -> None:
+    path = tmp_path / "wal"
+    path.write_bytes(b"keep")
+
+    with pytest.raises(FileExistsError):
+        WriteAheadLog(str(path))
+    assert path.read_bytes() == b"keep"
+
+
+def test_rotate_moves_later_appends_to_a_new_segment(tmp_path: Path) -> None:
+    old, new = str(tmp_path / "wal.1"), str(tmp_path / "wal.2")
+    log = WriteAheadLog(old, sync=False)
+    log.append(encode_records([b"before"]))
+
+    log.rotate(new)
+    log.wait(log.append(encode_records([b"after"])))
+    log.close()
+
+    assert stored(old) == [b"before"]
+    assert stored(new) == [b"after"]
+    assert log.size == os.path.getsize(new)
+
+
+def test_close_writes_out_queued_records_and_refuses_more(tmp_path: Path) -> None:
+    path = str(tmp_path / "wal")
+    log = WriteAheadLog(path, sync=False)
+    log.append(encode_records([b"queued"]))
+
+    log.close()
+
+    assert stored(path) == [b"queued"]
+    with pytest.raises(RepositoryError):
+        log.append(encode_records([b"late"]))
+
+
+def test_a_failed_write_fails_every_waiter(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    log = WriteAheadLog(str(tmp_path / "wal"))
+
+    def failing_fsync(fd: int) -> None:
+        raise OSError("disk gone")
+
+    monkeypatch.setattr(os, "fsync", failing_fsync)
+    sequence = log.append(encode_records([b"lost"]))
+
+    with pytest.raises(RepositoryError):
+        log.wait(sequence)
+    with pytest.raises(RepositoryError):
+        log.rotate(str(tmp_path / "wal.2"))